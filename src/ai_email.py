@@ -1,77 +1,133 @@
-from llama_cpp import Llama
 import json
-from config import MODEL_PATH
-import os
-
-# --- LLM 모델 로딩 ---
-if os.path.exists(MODEL_PATH):
-    print("LLM 모델을 로딩합니다...")
-    llm = Llama(model_path=MODEL_PATH, n_ctx=2048, verbose=False)
-    print("모델 로딩 완료.")
-else:
-    llm = None
-    print(f"경고: 모델 파일을 찾을 수 없습니다. 경로: {MODEL_PATH}")
-
-def _get_llm_json_response(prompt: str) -> dict:
+import threading
+import time
+import config
+import contact_rules
+import llm_service
+
+def _extract_json(response_text: str) -> dict:
+    """응답 텍스트에서 첫 '{'와 마지막 '}' 사이를 JSON 객체로 변환합니다. 실패하면 json.JSONDecodeError."""
+    start_index = response_text.find('{')
+    end_index = response_text.rfind('}')
+    if start_index != -1 and end_index != -1 and start_index < end_index:
+        return json.loads(response_text[start_index : end_index + 1])
+    raise json.JSONDecodeError("No valid JSON object found", response_text, 0)
+
+def _get_llm_json_response(prompt: str, prefix: str = None, cache_tag: str = None, schema: dict = None) -> dict:
     """
     LLM에 프롬프트를 보내고, 응답에서 JSON 객체만 안전하게 추출하여 반환하는 헬퍼 함수.
+    prefix(고정 시스템 프롬프트)를 넘기면 llm_service가 그 부분의 KV 상태를 재사용하고,
+    cache_tag(템플릿 이름/버전)를 넘기면 같은 입력의 결과를 llm_cache에서 바로 돌려줍니다.
+    schema(JSON 스키마)를 넘기면 스키마에 맞는 토큰만 생성하도록 제약하므로, 객체가 닫히는 즉시
+    생성이 끝나고 JSON 변환도 실패하지 않습니다.
     """
-    if llm is None:
-        print("오류: LLM 모델이 로드되지 않았습니다.")
-        return {}
-
-
-    output = llm(
+    output = llm_service.complete(
         prompt,
-        max_tokens=512,  # 더 긴 JSON 출력을 위해 토큰 수 증가
+        prefix=prefix,
+        cache_tag=cache_tag,
+        json_schema=schema,
+        max_tokens=512,  # 더 긴 JSON 출력을 위해 토큰 수 증가 (스키마 제약 시에는 상한 역할만 함)
         stop=["```"],    # JSON 코드 블록이 끝나면 생성을 멈추도록 설정
         # n=3,           # 다른 답변 후보 생성 
         temperature=0.1, # 일관된 JSON 생성을 위해 온도를 낮춤, 다수 답변 생성 시 온도를 0.5~0.8 정도로 설정
         echo=False
     )
+    if output is None:
+        print("오류: LLM 모델이 로드되지 않았습니다.")
+        return {}
     
     response_text = output["choices"][0]["text"]
     
     try:
-        # 응답 텍스트에서 첫 '{'와 마지막 '}'를 찾아 그 사이의 내용만 추출
-        start_index = response_text.find('{')
-        end_index = response_text.rfind('}')
-        
-        if start_index != -1 and end_index != -1 and start_index < end_index:
-            json_string = response_text[start_index : end_index + 1]
-            return json.loads(json_string)
-        else:
-            raise json.JSONDecodeError("No valid JSON object found", response_text, 0)
-
+        return _extract_json(response_text)
     except json.JSONDecodeError as e:
         print(f"오류: LLM의 답변을 JSON으로 변환하는 데 실패했습니다. - {e}")
         print(f"--- LLM 원본 응답 ---\n{response_text}\n--------------------")
         return {}
 
-def parse_contact_with_llm(email_body: str) -> dict:
-    """
-    LLM을 사용하여 이메일 본문에서 연락처 정보를 추출합니다.
-    """
-    prompt = f"""<|system|>
+# 연락처 추출 프롬프트의 고정 앞부분 (KV 캐시 대상)
+CONTACT_SYSTEM_PROMPT = """<|system|>
 당신은 한국어 및 영어 이메일 서명을 분석하여 연락처 정보를 추출하는 전문가입니다.
 다음 텍스트에서 이름, 이메일, 전화번호, 회사명, 회사주소, 팀, 직급을 찾아서 JSON 형식으로 반환해주세요.
 만약 특정 정보를 찾을 수 없다면, 값으로 null을 사용해주세요.
 
 <|user|>
 --- Text to Analyze ---
-{email_body}
+"""
+
+# 연락처 추출 결과 스키마 (키 이름은 프롬프트의 항목명과 같음)
+CONTACT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "이름": {"type": ["string", "null"]},
+        "이메일": {"type": ["string", "null"]},
+        "전화번호": {"type": ["string", "null"]},
+        "회사명": {"type": ["string", "null"]},
+        "회사주소": {"type": ["string", "null"]},
+        "팀": {"type": ["string", "null"]},
+        "직급": {"type": ["string", "null"]},
+    },
+    "required": ["이름", "이메일", "전화번호", "회사명", "회사주소", "팀", "직급"],
+    "additionalProperties": False,
+}
+
+def build_contact_prompt(email_body: str) -> str:
+    return CONTACT_SYSTEM_PROMPT + f"""{email_body}
 --------------------
 
 <|assistant|>
 ```json
 """
-    return _get_llm_json_response(prompt)
 
-def summarize_with_llm(email_content: str) -> dict:
+# 연락처 추출 경로별 호출 수 (rules: LLM 생략 / partial: 일부 항목만 LLM / llm: 전체 LLM)
+_contact_stats = {"calls": 0, "rules": 0, "partial": 0, "llm": 0}
+_contact_stats_lock = threading.Lock()
+
+def _contact_schema(fields) -> dict:
+    """CONTACT_SCHEMA에서 주어진 항목만 남긴 스키마. (항목 순서는 원래대로)"""
+    keys = [key for key in CONTACT_SCHEMA["properties"] if key in fields]
+    return dict(CONTACT_SCHEMA, properties={key: CONTACT_SCHEMA["properties"][key] for key in keys}, required=keys)
+
+def parse_contact_with_llm(email_body: str) -> dict:
     """
-    LLM을 사용하여 이메일 내용을 요약합니다.
+    LLM을 사용하여 이메일 본문에서 연락처 정보를 추출합니다.
+    config.CONTACT_RULES_ENABLED이면 먼저 contact_rules로 정규식/휴리스틱 추출을 하고,
+    핵심 항목(이름, 이메일, 전화번호, 회사명)을 모두 확신하면 LLM을 호출하지 않습니다.
+    아니면 확신하지 못한 항목만 스키마에 넣어 LLM에 묻고, 확신한 항목은 규칙 결과를 씁니다.
+    (LLM이 없거나 실패하면 규칙 결과를 그대로 돌려줍니다.)
     """
-    prompt = f"""<|system|>
+    prompt = build_contact_prompt(email_body)
+    if not config.CONTACT_RULES_ENABLED:
+        with _contact_stats_lock:
+            _contact_stats["calls"] += 1
+            _contact_stats["llm"] += 1
+        return _get_llm_json_response(prompt, prefix=CONTACT_SYSTEM_PROMPT,
+                                      cache_tag="contact/v2", schema=CONTACT_SCHEMA)
+
+    fields, confident = contact_rules.extract(email_body)
+    path = "rules" if contact_rules.is_confident(confident) else ("partial" if confident else "llm")
+    with _contact_stats_lock:
+        _contact_stats["calls"] += 1
+        _contact_stats[path] += 1
+    if path == "rules":
+        return fields
+
+    unresolved = [key for key in contact_rules.FIELDS if key not in confident]
+    result = _get_llm_json_response(prompt, prefix=CONTACT_SYSTEM_PROMPT, cache_tag="contact/v2",
+                                     schema=_contact_schema(unresolved))
+    if not result:
+        return fields
+    return {key: fields[key] if key in confident else result.get(key) for key in contact_rules.FIELDS}
+
+def contact_parse_stats() -> dict:
+    """이 프로세스에서 연락처 추출 호출 수와 경로별 횟수, LLM을 생략한 비율."""
+    with _contact_stats_lock:
+        stats = dict(_contact_stats)
+    stats["bypass_rate"] = stats["rules"] / stats["calls"] if stats["calls"] else None
+    return stats
+
+# 이메일 요약 프롬프트의 고정 앞부분 (KV 캐시 대상)
+SUMMARY_SYSTEM_PROMPT = """<|system|>
 당신은 유능한 프로젝트 매니저입니다. 아래 이메일 내용을 분석하여 다음 항목에 따라 JSON 형식으로 요약해주세요:
 
 1. "핵심결정사항": 이메일에서 최종적으로 결정되거나 문의한 내용은 무엇인가? 자세하게 작성해주세요.
@@ -81,13 +137,72 @@ def summarize_with_llm(email_content: str) -> dict:
 5. "메일 정보": 메일 제목과 송수신 시간이 표기되었다면 표기해주세요. 메일 정보는 최대한 원본 그대로 추출해주세요.
 
 --- 분석할 이메일 ---
-{email_content}
+"""
+
+# 이메일 요약 결과 스키마 (email_batch가 '핵심결정사항' / '다음행동'을 Task 컬럼으로 사용)
+# 문법은 properties 순서대로 키를 생성하므로 프롬프트의 항목 순서와 맞춥니다.
+SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "핵심결정사항": {"type": ["string", "null"]},
+        "다음행동": {"type": ["string", "null"]},
+        "상태변경": {"type": ["string", "null"]},
+        "주요논의인물": {"type": "array", "items": {"type": "string"}},
+        "메일 정보": {"type": ["string", "null"]},
+    },
+    "required": ["핵심결정사항", "다음행동", "상태변경", "주요논의인물", "메일 정보"],
+    "additionalProperties": False,
+}
+
+def build_summary_prompt(email_content: str) -> str:
+    return SUMMARY_SYSTEM_PROMPT + f"""{email_content}
 --------------------
 
 <|assistant|>
 ```json
 """
-    return _get_llm_json_response(prompt)
+
+def summarize_with_llm(email_content: str) -> dict:
+    """
+    LLM을 사용하여 이메일 내용을 요약합니다.
+    """
+    return _get_llm_json_response(build_summary_prompt(email_content), prefix=SUMMARY_SYSTEM_PROMPT,
+                                  cache_tag="summary/v2", schema=SUMMARY_SCHEMA)
+
+def benchmark_json_decoding(samples: list, runs: int = 3) -> dict:
+    """
+    자유 생성(응답에서 JSON 찾기)과 스키마 제약 생성의 호출당 생성 토큰 수, 시간, JSON 변환 실패율을 비교합니다.
+    결과 캐시(llm_cache)는 쓰지 않습니다.
+
+    Args:
+        samples (list): (build_prompt, prefix, schema, 입력 텍스트) 목록.
+        runs (int): 샘플별 반복 횟수.
+
+    Returns:
+        dict: {'free': {...}, 'schema': {...}} 각각 {'calls', 'avg_tokens', 'avg_seconds', 'failure_rate'}.
+              모델이 없으면 None.
+    """
+    results = {}
+    for mode in ("free", "schema"):
+        calls, tokens, seconds, failures = 0, 0, 0.0, 0
+        for build_prompt, prefix, schema, text in samples:
+            for _ in range(runs):
+                start = time.perf_counter()
+                output = llm_service.complete(build_prompt(text), prefix=prefix,
+                                              json_schema=schema if mode == "schema" else None,
+                                              max_tokens=512, stop=["```"], temperature=0.1, echo=False)
+                seconds += time.perf_counter() - start
+                if output is None:
+                    return None
+                calls += 1
+                tokens += output["usage"]["completion_tokens"]
+                try:
+                    _extract_json(output["choices"][0]["text"])
+                except json.JSONDecodeError:
+                    failures += 1
+        results[mode] = {'calls': calls, 'avg_tokens': tokens / calls, 'avg_seconds': seconds / calls,
+                         'failure_rate': failures / calls}
+    return results
 
 
 # --- 테스트 ---
@@ -111,6 +226,7 @@ Mobilint, Inc.
     parsed_contact_data = parse_contact_with_llm(sample_signature)
     print("--- 최종 추출 결과 ---")
     print(parsed_contact_data)
+    print(f"추출 경로: {contact_parse_stats()}")
     
     print("\n" + "="*50 + "\n")
 
@@ -150,4 +266,24 @@ TechVision에서 45K를 지원받는 것을 기부금으로 서류를 준비하
     print("="*20, "이메일 요약 테스트", "="*20)
     summarized_data = summarize_with_llm(sample_email_content)
     print("--- 최종 요약 결과 ---")
-    print(summarized_data)
\ No newline at end of file
+    print(summarized_data)
+
+    # --- 자유 생성 vs 스키마 제약 생성 비교: python ai_email.py bench ---
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        samples = [
+            (build_contact_prompt, CONTACT_SYSTEM_PROMPT, CONTACT_SCHEMA, sample_signature),
+            (build_contact_prompt, CONTACT_SYSTEM_PROMPT, CONTACT_SCHEMA,
+             "김영희 | 기술영업팀 책임\nTel. 02-555-1234 / Mobile 010-9876-5432\nyounghee.kim@example.co.kr"),
+            (build_summary_prompt, SUMMARY_SYSTEM_PROMPT, SUMMARY_SCHEMA, sample_email_content),
+            (build_summary_prompt, SUMMARY_SYSTEM_PROMPT, SUMMARY_SCHEMA,
+             "다음 주 화요일까지 MLA100 견적서를 보내주시기 바랍니다. 검토 후 구매 여부를 회신드리겠습니다."),
+        ]
+        print("\n" + "="*20, "JSON 생성 방식 비교", "="*20)
+        bench = benchmark_json_decoding(samples)
+        if bench is None:
+            print("LLM 모델이 없어 비교할 수 없습니다.")
+        else:
+            for mode, r in bench.items():
+                print(f"{mode:<7} {r['calls']}회: 평균 {r['avg_tokens']:.0f} 토큰, {r['avg_seconds']:.2f}초, "
+                      f"JSON 변환 실패율 {r['failure_rate'] * 100:.0f}%")
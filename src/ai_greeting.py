@@ -1,52 +1,32 @@
-from llama_cpp import Llama
 import json
-from config import MODEL_PATH
+import llm_service
 import os
+import re
 from datetime import datetime
 
-# --- LLM 모델 로딩 ---
-if os.path.exists(MODEL_PATH):
-    print("LLM 모델을 로딩합니다...")
-    llm = Llama(model_path=MODEL_PATH, n_ctx=2048, verbose=False)
-    print("모델 로딩 완료.")
-else:
-    llm = None
-    print(f"경고: 모델 파일을 찾을 수 없습니다. 경로: {MODEL_PATH}")
-
-def _get_llm_response(prompt: str) -> str:
+def _get_llm_response(prompt: str, prefix: str = None, cache_tag: str = None) -> str:
     """
     LLM에 프롬프트를 보내고 텍스트 응답을 반환하는 헬퍼 함수.
+    prefix(고정 시스템 프롬프트)를 넘기면 llm_service가 그 부분의 KV 상태를 재사용하고,
+    cache_tag(템플릿 이름/버전)를 넘기면 같은 입력의 결과를 llm_cache에서 바로 돌려줍니다.
     """
-    if llm is None:
-        print("오류: LLM 모델이 로드되지 않았습니다.")
-        return ""
-
-    output = llm(
+    output = llm_service.complete(
         prompt,
+        prefix=prefix,
+        cache_tag=cache_tag,
         max_tokens=1024,  # 메일 생성을 위해 충분한 토큰 수 설정
         temperature=0.3,  # 적절한 창의성을 위해 온도 설정
         echo=False
     )
+    if output is None:
+        print("오류: LLM 모델이 로드되지 않았습니다.")
+        return ""
     
     response_text = output["choices"][0]["text"].strip()
     return response_text
 
-def generate_thank_you_email(event_name: str, visitor_name: str, company: str, discussion_content: str) -> str:
-    """
-    행사 방문 감사메일을 자동으로 생성합니다.
-    
-    Args:
-        event_name: 행사명
-        visitor_name: 방문자 성명
-        company: 회사명
-        discussion_content: 논의 내용
-    
-    Returns:
-        생성된 감사메일 내용
-    """
-    current_date = datetime.now().strftime("%Y년 %m월 %d일")
-    
-    prompt = f"""<|system|>
+# 기본 감사메일 프롬프트의 고정 앞부분 (KV 캐시 대상)
+THANK_YOU_SYSTEM_PROMPT = """<|system|>
 당신은 비즈니스 개발 전문가입니다. 행사에서 만난 방문자에게 보낼 정중하고 전문적인 감사메일을 작성해주세요.
 메일은 한국어로 작성하되, 비즈니스 상황에 적합한 격식을 갖춰야 합니다.
 
@@ -60,7 +40,11 @@ def generate_thank_you_email(event_name: str, visitor_name: str, company: str, d
 메일은 너무 길지 않게, 하지만 충분히 정중하게 작성해주세요.
 
 <|user|>
-행사명: {event_name}
+"""
+
+def build_thank_you_prompt(event_name: str, visitor_name: str, company: str, discussion_content: str) -> str:
+    current_date = datetime.now().strftime("%Y년 %m월 %d일")
+    return THANK_YOU_SYSTEM_PROMPT + f"""행사명: {event_name}
 방문자 성명: {visitor_name}
 회사명: {company}
 논의 내용: {discussion_content}
@@ -68,27 +52,25 @@ def generate_thank_you_email(event_name: str, visitor_name: str, company: str, d
 
 <|assistant|>
 """
-    
-    return _get_llm_response(prompt)
 
-def generate_follow_up_email(event_name: str, visitor_name: str, company: str, discussion_content: str, 
-                           next_action: str = "") -> str:
+def generate_thank_you_email(event_name: str, visitor_name: str, company: str, discussion_content: str) -> str:
     """
-    후속 조치를 포함한 감사메일을 생성합니다.
+    행사 방문 감사메일을 자동으로 생성합니다.
     
     Args:
         event_name: 행사명
         visitor_name: 방문자 성명
         company: 회사명
         discussion_content: 논의 내용
-        next_action: 다음 단계 또는 후속 조치
     
     Returns:
-        생성된 후속 조치 포함 감사메일 내용
+        생성된 감사메일 내용
     """
-    current_date = datetime.now().strftime("%Y년 %m월 %d일")
-    
-    prompt = f"""<|system|>
+    prompt = build_thank_you_prompt(event_name, visitor_name, company, discussion_content)
+    return _get_llm_response(prompt, prefix=THANK_YOU_SYSTEM_PROMPT, cache_tag="thank_you/v1")
+
+# 후속 조치 포함 감사메일 프롬프트의 고정 앞부분 (KV 캐시 대상)
+FOLLOW_UP_SYSTEM_PROMPT = """<|system|>
 당신은 비즈니스 개발 전문가입니다. 행사에서 만난 방문자에게 보낼 감사메일을 작성하되, 
 구체적인 후속 조치나 다음 단계를 포함해서 작성해주세요.
 메일은 한국어로 작성하되, 비즈니스 상황에 적합한 격식을 갖춰야 합니다.
@@ -103,7 +85,12 @@ def generate_follow_up_email(event_name: str, visitor_name: str, company: str, d
 메일은 액션 아이템이 명확하게 드러나도록 작성해주세요.
 
 <|user|>
-행사명: {event_name}
+"""
+
+def build_follow_up_prompt(event_name: str, visitor_name: str, company: str, discussion_content: str, 
+                           next_action: str = "") -> str:
+    current_date = datetime.now().strftime("%Y년 %m월 %d일")
+    return FOLLOW_UP_SYSTEM_PROMPT + f"""행사명: {event_name}
 방문자 성명: {visitor_name}
 회사명: {company}
 논의 내용: {discussion_content}
@@ -112,27 +99,27 @@ def generate_follow_up_email(event_name: str, visitor_name: str, company: str, d
 
 <|assistant|>
 """
-    
-    return _get_llm_response(prompt)
 
-def generate_meeting_proposal_email(event_name: str, visitor_name: str, company: str, 
-                                  discussion_content: str, proposed_meeting_topics: str) -> str:
+def generate_follow_up_email(event_name: str, visitor_name: str, company: str, discussion_content: str, 
+                           next_action: str = "") -> str:
     """
-    미팅 제안을 포함한 감사메일을 생성합니다.
+    후속 조치를 포함한 감사메일을 생성합니다.
     
     Args:
         event_name: 행사명
         visitor_name: 방문자 성명
         company: 회사명
         discussion_content: 논의 내용
-        proposed_meeting_topics: 제안할 미팅 주제
+        next_action: 다음 단계 또는 후속 조치
     
     Returns:
-        생성된 미팅 제안 포함 감사메일 내용
+        생성된 후속 조치 포함 감사메일 내용
     """
-    current_date = datetime.now().strftime("%Y년 %m월 %d일")
-    
-    prompt = f"""<|system|>
+    prompt = build_follow_up_prompt(event_name, visitor_name, company, discussion_content, next_action)
+    return _get_llm_response(prompt, prefix=FOLLOW_UP_SYSTEM_PROMPT, cache_tag="follow_up/v1")
+
+# 미팅 제안 포함 감사메일 프롬프트의 고정 앞부분 (KV 캐시 대상)
+MEETING_PROPOSAL_SYSTEM_PROMPT = """<|system|>
 당신은 비즈니스 개발 전문가입니다. 행사에서 만난 방문자에게 보낼 감사메일을 작성하되,
 구체적인 미팅 제안을 포함해서 작성해주세요.
 메일은 한국어로 작성하되, 비즈니스 상황에 적합한 격식을 갖춰야 합니다.
@@ -148,7 +135,12 @@ def generate_meeting_proposal_email(event_name: str, visitor_name: str, company:
 미팅 제안이 자연스럽고 구체적으로 드러나도록 작성해주세요.
 
 <|user|>
-행사명: {event_name}
+"""
+
+def build_meeting_proposal_prompt(event_name: str, visitor_name: str, company: str, 
+                                  discussion_content: str, proposed_meeting_topics: str) -> str:
+    current_date = datetime.now().strftime("%Y년 %m월 %d일")
+    return MEETING_PROPOSAL_SYSTEM_PROMPT + f"""행사명: {event_name}
 방문자 성명: {visitor_name}
 회사명: {company}
 논의 내용: {discussion_content}
@@ -157,8 +149,99 @@ def generate_meeting_proposal_email(event_name: str, visitor_name: str, company:
 
 <|assistant|>
 """
+
+def generate_meeting_proposal_email(event_name: str, visitor_name: str, company: str, 
+                                  discussion_content: str, proposed_meeting_topics: str) -> str:
+    """
+    미팅 제안을 포함한 감사메일을 생성합니다.
     
-    return _get_llm_response(prompt)
+    Args:
+        event_name: 행사명
+        visitor_name: 방문자 성명
+        company: 회사명
+        discussion_content: 논의 내용
+        proposed_meeting_topics: 제안할 미팅 주제
+    
+    Returns:
+        생성된 미팅 제안 포함 감사메일 내용
+    """
+    prompt = build_meeting_proposal_prompt(event_name, visitor_name, company, discussion_content, proposed_meeting_topics)
+    return _get_llm_response(prompt, prefix=MEETING_PROPOSAL_SYSTEM_PROMPT, cache_tag="meeting_proposal/v1")
+
+# --- 스트리밍 생성 ---
+# 메일 유형별 (프롬프트 생성 함수, 고정 시스템 프롬프트). 추가 입력(extra)은 후속 조치 / 미팅 주제입니다.
+EMAIL_TYPES = {
+    "thank_you": (lambda e, v, c, d, extra: build_thank_you_prompt(e, v, c, d), THANK_YOU_SYSTEM_PROMPT),
+    "follow_up": (build_follow_up_prompt, FOLLOW_UP_SYSTEM_PROMPT),
+    "meeting_proposal": (build_meeting_proposal_prompt, MEETING_PROPOSAL_SYSTEM_PROMPT),
+}
+
+# 맺음말 줄 (예: '감사합니다.', '김철수 드림', 'Best regards,')
+_CLOSING_LINE = re.compile(r"^(감사합니다|고맙습니다|Best regards|Regards|Sincerely)[.,!]?$|(드림|올림|배상)$",
+                           re.IGNORECASE)
+_SIGNATURE_MAX_LINES = 4  # 맺음말 뒤 서명(이름/직함/회사/연락처)으로 허용하는 최대 줄 수
+_SIGNATURE_LINE_CHARS = 40  # 이보다 긴 줄은 서명이 아니라 본문으로 봅니다.
+
+def signature_complete(text: str) -> bool:
+    """
+    메일이 맺음말과 서명까지 끝났는지 판단합니다.
+    맺음말 줄 이후 서명 줄이 나오고 빈 줄이 이어지거나, 서명이 _SIGNATURE_MAX_LINES 줄을 채우면 완료로 봅니다.
+    (이후 모델이 덧붙이는 설명/두 번째 메일 등은 버리는 토큰입니다)
+    """
+    lines = text.split("\n")
+    closing = None
+    for i, line in enumerate(lines):
+        if _CLOSING_LINE.search(line.strip()):
+            closing = i
+    if closing is None:
+        return False
+    signature = 0
+    for line in lines[closing + 1:-1]:  # 마지막 줄은 아직 생성 중일 수 있음
+        if len(line.strip()) > _SIGNATURE_LINE_CHARS:
+            return False  # 본문 중간의 '감사합니다.'였던 경우
+        if line.strip():
+            signature += 1
+            if signature >= _SIGNATURE_MAX_LINES:
+                return True
+        elif signature > 0 or lines[closing].strip().endswith(("드림", "올림", "배상")):
+            return True
+    return False
+
+def stream_email(email_type: str, event_name: str, visitor_name: str, company: str,
+                 discussion_content: str, extra: str = "", cancel_event=None):
+    """
+    감사메일을 생성하면서 텍스트 조각을 바로바로 돌려주는 제너레이터.
+    서명까지 작성되면 max_tokens에 도달하지 않아도 생성을 멈춥니다.
+
+    Args:
+        email_type: 'thank_you' / 'follow_up' / 'meeting_proposal'
+        extra: 후속 조치(follow_up) 또는 미팅 주제(meeting_proposal)
+        cancel_event: set 되면 생성을 중단하는 threading.Event
+
+    Yields:
+        str: 생성된 텍스트 조각
+    """
+    if not llm_service.available():
+        print("오류: LLM 모델이 로드되지 않았습니다.")
+        return
+    build_prompt, prefix = EMAIL_TYPES[email_type]
+    prompt = build_prompt(event_name, visitor_name, company, discussion_content, extra)
+    chunks = llm_service.stream(prompt, prefix=prefix, cancel_event=cancel_event,
+                                max_tokens=1024, temperature=0.3,
+                                stop=["<|user|>", "<|system|>", "<|assistant|>"])
+    text = ""
+    try:
+        for chunk in chunks:
+            if not text:
+                chunk = chunk.lstrip()  # 일반 생성 결과의 strip()과 같게 앞 공백 제거
+                if not chunk:
+                    continue
+            text += chunk
+            yield chunk
+            if "\n" in chunk and signature_complete(text):
+                break
+    finally:
+        chunks.close()
 
 # --- 대화형 메일 생성 함수 ---
 def interactive_email_generator():
@@ -183,30 +266,38 @@ def interactive_email_generator():
     
     choice = input("선택 (1-3): ").strip()
     
-    generated_email = ""
-    
+    extra = ""
     if choice == "1":
+        email_type = "thank_you"
         print("\n기본 감사메일을 생성합니다...")
-        generated_email = generate_thank_you_email(event_name, visitor_name, company, discussion_content)
     
     elif choice == "2":
-        next_action = input("다음 단계/후속 조치를 입력하세요: ").strip()
+        email_type = "follow_up"
+        extra = input("다음 단계/후속 조치를 입력하세요: ").strip()
         print("\n후속 조치 포함 감사메일을 생성합니다...")
-        generated_email = generate_follow_up_email(event_name, visitor_name, company, discussion_content, next_action)
     
     elif choice == "3":
-        meeting_topics = input("제안할 미팅 주제를 입력하세요: ").strip()
+        email_type = "meeting_proposal"
+        extra = input("제안할 미팅 주제를 입력하세요: ").strip()
         print("\n미팅 제안 포함 감사메일을 생성합니다...")
-        generated_email = generate_meeting_proposal_email(event_name, visitor_name, company, discussion_content, meeting_topics)
     
     else:
+        email_type = "thank_you"
         print("잘못된 선택입니다. 기본 감사메일을 생성합니다...")
-        generated_email = generate_thank_you_email(event_name, visitor_name, company, discussion_content)
     
     print("\n" + "="*50)
-    print("생성된 감사메일:")
+    print("생성된 감사메일: (Ctrl+C로 생성 중단)")
     print("="*50)
-    print(generated_email)
+    # 생성되는 대로 출력합니다.
+    chunks = []
+    try:
+        for chunk in stream_email(email_type, event_name, visitor_name, company, discussion_content, extra):
+            print(chunk, end="", flush=True)
+            chunks.append(chunk)
+    except KeyboardInterrupt:
+        print("\n(생성을 중단했습니다)")
+    generated_email = "".join(chunks).strip()
+    print()
     print("="*50)
     
     # 파일 저장 옵션
@@ -0,0 +1,191 @@
+# change_journal.py
+
+import json
+import config
+from db_connection import get_connection, transaction, mark_written
+
+# 한 번에 읽는 저널 행 수
+JOURNAL_BATCH_SIZE = 1000
+
+# --------------------------------------------------------------------
+# 변경 저널 (Change Data Capture)
+# --------------------------------------------------------------------
+# db_schema v7의 트리거가 JOURNAL_TABLES의 모든 INSERT/UPDATE/DELETE를 Change_Journal에 기록합니다.
+# 내보내기/캐시/분석/동기화처럼 "지난번 이후 바뀐 것"이 필요한 곳은 테이블 전체를 다시 읽는 대신
+#     for change in change_journal.consume("my_sync"): ...
+# 처럼 자기 이름으로 읽으면 됩니다. 읽은 위치(seq)는 Journal_Consumers에 저장되므로 재시작해도 이어서 읽고,
+# 배치 단위로 저장되므로 처리 도중 중단되면 마지막 배치가 다시 전달될 수 있습니다. (at-least-once)
+#
+# 처음 동기화할 때는 current_seq()를 먼저 기록한 뒤 테이블 전체를 읽고, 그 seq부터 changes_since()로 따라가면 됩니다.
+#
+# 압축(compact) 정책 - 저널이 무한히 커지지 않도록:
+#   1) 등록된 모든 소비자가 읽은 기록은 삭제
+#   2) 같은 행의 기록이 여러 개면 마지막 것만 남김 (각 기록이 변경 후 전체 행을 담고 있으므로 최종 상태는 같음)
+#   3) config.JOURNAL_RETENTION_DAYS보다 오래됐거나 config.JOURNAL_MAX_ROWS를 넘는 기록은 읽지 않은 소비자가 있어도 삭제
+#      -> 이 경우 그 앞에서 읽으려는 소비자는 ValueError를 받고 전체를 다시 읽어야 합니다.
+
+def current_seq() -> int:
+    """지금까지 기록된 마지막 seq. (압축으로 지워져도 줄어들지 않음)"""
+    r = get_connection().execute("SELECT seq FROM sqlite_sequence WHERE name = 'Change_Journal'").fetchone()
+    return r[0] if r else 0
+
+def truncated_through() -> int:
+    """이 seq 이하의 기록은 압축 3)으로 일부 지워졌을 수 있습니다."""
+    r = get_connection().execute("SELECT value FROM Journal_State WHERE key = 'truncated_through'").fetchone()
+    return r[0] if r else 0
+
+def changes_since(seq: int, tables=None, batch_size: int = JOURNAL_BATCH_SIZE):
+    """
+    seq 다음부터의 변경을 순서대로 돌려주는 제너레이터. batch_size건씩 나눠 읽습니다.
+
+    Args:
+        seq (int): 마지막으로 처리한 seq (처음이면 0 또는 전체 동기화 직전의 current_seq()).
+        tables (list): 특정 테이블만 받을 때 테이블 이름 목록.
+
+    Yields:
+        dict: {'seq', 'table', 'op'('I'/'U'/'D'), 'key'(기본키 dict), 'row'(변경 후 행 dict, 삭제는 None), 'changed_at'}
+
+    Raises:
+        ValueError: seq 이후의 기록 일부가 압축으로 지워진 경우 (전체를 다시 읽어야 함).
+    """
+    if seq < truncated_through():
+        raise ValueError(f"seq {seq} 이후의 변경 기록 일부가 압축되어 없습니다. "
+                         f"전체를 다시 읽은 뒤 current_seq()부터 이어서 읽으세요.")
+    where, params = "", ()
+    if tables:
+        where = f"AND table_name IN ({','.join('?' * len(tables))})"
+        params = tuple(tables)
+    while True:
+        rows = get_connection().execute(f"""
+            SELECT seq, table_name, op, row_key, row_data, changed_at FROM Change_Journal
+             WHERE seq > ? {where} ORDER BY seq LIMIT ?
+        """, (seq, *params, batch_size)).fetchall()
+        for s, table, op, key, data, changed_at in rows:
+            yield {'seq': s, 'table': table, 'op': op, 'key': json.loads(key),
+                   'row': json.loads(data) if data is not None else None, 'changed_at': changed_at}
+        if len(rows) < batch_size:
+            return
+        seq = rows[-1][0]
+
+# --------------------------------------------------------------------
+# 소비자 (읽은 위치 저장)
+# --------------------------------------------------------------------
+
+def register_consumer(name: str, from_seq: int = None) -> int:
+    """
+    소비자를 등록하고 읽기 시작 위치를 반환합니다. 이미 등록되어 있으면 저장된 위치를 그대로 반환합니다.
+    from_seq를 생략하면 지금(current_seq()) 이후의 변경부터 받습니다.
+    """
+    with transaction() as conn:
+        mark_written("Journal_Consumers")
+        conn.execute("INSERT OR IGNORE INTO Journal_Consumers (name, last_seq) VALUES (?, ?)",
+                     (name, current_seq() if from_seq is None else from_seq))
+    return get_offset(name)
+
+def unregister_consumer(name: str) -> bool:
+    """더 이상 읽지 않는 소비자를 지웁니다. (남겨 두면 압축 1)이 그 소비자 위치에서 멈춥니다)"""
+    with transaction() as conn:
+        mark_written("Journal_Consumers")
+        c = conn.execute("DELETE FROM Journal_Consumers WHERE name = ?", (name,))
+    return c.rowcount == 1
+
+def get_offset(name: str):
+    """소비자가 마지막으로 처리한 seq. 등록되지 않았으면 None."""
+    r = get_connection().execute("SELECT last_seq FROM Journal_Consumers WHERE name = ?", (name,)).fetchone()
+    return r[0] if r else None
+
+def ack(name: str, seq: int):
+    """소비자가 seq까지 처리했음을 기록합니다. (뒤로 되돌리지는 않음)"""
+    with transaction() as conn:
+        mark_written("Journal_Consumers")
+        conn.execute("""
+            UPDATE Journal_Consumers SET last_seq = MAX(last_seq, ?), updated_at = CURRENT_TIMESTAMP
+             WHERE name = ?
+        """, (seq, name))
+
+def consume(name: str, tables=None, batch_size: int = JOURNAL_BATCH_SIZE):
+    """
+    name 소비자의 저장된 위치부터 변경을 돌려주고, 배치를 다 돌려줄 때마다 위치를 저장하는 제너레이터.
+    등록되지 않은 이름이면 지금부터 받도록 등록합니다.
+    """
+    offset = get_offset(name)
+    if offset is None:
+        offset = register_consumer(name)
+    # 읽기 전에 기록된 변경은 모두 아래 조회에서 보이므로, tables로 거른 경우에도 여기까지는 읽은 것으로 저장할 수 있습니다.
+    head = current_seq()
+    last, pending = offset, 0
+    for change in changes_since(offset, tables, batch_size):
+        yield change
+        last, pending = change['seq'], pending + 1
+        if pending >= batch_size:
+            ack(name, last)
+            pending = 0
+    ack(name, max(last, head) if tables else last)
+
+# --------------------------------------------------------------------
+# 압축
+# --------------------------------------------------------------------
+
+def compact(retention_days: int = None, max_rows: int = None) -> dict:
+    """
+    저널을 압축합니다. (정책은 파일 상단 설명 참고)
+
+    Returns:
+        dict: {'acked': 모두 읽어 지운 수, 'collapsed': 같은 행의 이전 기록을 지운 수,
+               'expired': 보관 기간/행 수 상한으로 지운 수, 'remaining': 남은 행 수}
+    """
+    retention_days = config.JOURNAL_RETENTION_DAYS if retention_days is None else retention_days
+    max_rows = config.JOURNAL_MAX_ROWS if max_rows is None else max_rows
+    result = {'acked': 0, 'collapsed': 0, 'expired': 0}
+    with transaction() as conn:
+        mark_written("Change_Journal", "Journal_State")
+        c = conn.cursor()
+
+        # 1) 모든 소비자가 읽은 기록
+        acked_through = c.execute("SELECT MIN(last_seq) FROM Journal_Consumers").fetchone()[0]
+        if acked_through:
+            result['acked'] = c.execute("DELETE FROM Change_Journal WHERE seq <= ?", (acked_through,)).rowcount
+
+        # 2) 같은 행의 더 최근 기록이 있는 기록
+        result['collapsed'] = c.execute("""
+            DELETE FROM Change_Journal
+             WHERE EXISTS (SELECT 1 FROM Change_Journal L
+                            WHERE L.table_name = Change_Journal.table_name
+                              AND L.row_key = Change_Journal.row_key
+                              AND L.seq > Change_Journal.seq)
+        """).rowcount
+
+        # 3) 보관 기간 / 행 수 상한 - 읽지 않은 소비자가 있을 수 있으므로 지운 위치를 기록합니다.
+        cutoff = c.execute("""
+            SELECT MAX(seq) FROM Change_Journal WHERE changed_at < datetime('now', ?)
+        """, (f"-{int(retention_days)} days",)).fetchone()[0] or 0
+        count = c.execute("SELECT COUNT(*) FROM Change_Journal").fetchone()[0]
+        if count > max_rows:
+            over = c.execute("SELECT seq FROM Change_Journal ORDER BY seq LIMIT 1 OFFSET ?",
+                             (count - max_rows - 1,)).fetchone()[0]
+            cutoff = max(cutoff, over)
+        if cutoff:
+            result['expired'] = c.execute("DELETE FROM Change_Journal WHERE seq <= ?", (cutoff,)).rowcount
+            if result['expired']:
+                c.execute("UPDATE Journal_State SET value = MAX(value, ?) WHERE key = 'truncated_through'",
+                          (cutoff,))
+        result['remaining'] = c.execute("SELECT COUNT(*) FROM Change_Journal").fetchone()[0]
+    return result
+
+def stats() -> dict:
+    """저널 행 수, seq 범위, 소비자별 밀린 건수."""
+    conn = get_connection()
+    rows, first = conn.execute("SELECT COUNT(*), MIN(seq) FROM Change_Journal").fetchone()
+    last = current_seq()
+    consumers = {name: last - seq for name, seq in conn.execute("SELECT name, last_seq FROM Journal_Consumers")}
+    return {'rows': rows, 'first_seq': first, 'last_seq': last,
+            'truncated_through': truncated_through(), 'consumer_lag': consumers}
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "compact":
+        print(compact())
+    print(stats())
@@ -18,4 +18,78 @@ DB_PATH = os.path.join(PROJECT_ROOT, 'data', DB_FILENAME)
 # --- 모델 파일 이름 설정 (Single Source of Truth) ---
 # MODEL_FILENAME = "Midm-2.0-Mini-Instruct-Q8_0.gguf"
 MODEL_FILENAME = "Midm-2.0-Mini-Instruct-Q4_K_M.gguf"
-MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', MODEL_FILENAME)
\ No newline at end of file
+MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', MODEL_FILENAME)
+
+# --- SQLite 스토리지 프로파일 ---
+# 모든 DB 커넥션이 생성될 때 순서대로 적용되는 PRAGMA 값입니다.
+# WAL 모드에서는 쓰기 작업 중에도 다른 사용자의 읽기가 막히지 않습니다.
+DB_STORAGE_PROFILE = {
+    "busy_timeout": 5000,       # 잠금 대기 시간 (ms), journal_mode 전환보다 먼저 적용
+    "journal_mode": "WAL",      # DELETE(기본) / WAL
+    "synchronous": "NORMAL",    # WAL에서는 NORMAL로도 커밋 내구성이 보장됨
+    "cache_size": -20000,       # 음수는 KiB 단위 (약 20MB)
+    "mmap_size": 268435456,     # 256MB 메모리 매핑 읽기
+    "temp_store": "MEMORY",     # 정렬/임시 테이블을 메모리에서 처리
+}
+
+# --- WAL 체크포인트 정책 ---
+DB_WAL_AUTOCHECKPOINT = 1000            # WAL이 이 페이지 수를 넘으면 SQLite가 자동 PASSIVE 체크포인트
+DB_WAL_TRUNCATE_BYTES = 64 * 1024 * 1024  # 커밋 후 WAL 파일이 이 크기를 넘으면 TRUNCATE 체크포인트
+
+# --- LLM 런타임 설정 (llm_service) ---
+LLM_N_CTX = 8192            # 컨텍스트 길이 (토큰). 배치 디코딩 시 LLM_BATCH_SEQUENCES개 요청이 나눠 씀 (4 x 2048)
+LLM_N_THREADS = None        # 생성 스레드 수 (None이면 llama.cpp 기본값: 물리 코어 수)
+LLM_N_BATCH = 512           # 프롬프트 prefill 배치 크기
+LLM_USE_MMAP = True         # 모델 파일을 mmap으로 읽기 (여러 프로세스가 페이지 캐시 공유)
+LLM_USE_MLOCK = False       # 모델 메모리를 RAM에 고정 (스왑 방지, 권한 필요)
+LLM_PREFIX_CACHE_ENTRIES = 8                     # 시스템 프롬프트별 KV 상태를 보관할 최대 개수 (LRU)
+LLM_PREFIX_CACHE_BYTES = 512 * 1024 * 1024       # 보관하는 KV 상태의 총 크기 상한
+
+# --- LLM 요청 스케줄러 (llm_scheduler) ---
+# 배치 디코딩 중에는 여러 요청이 LLM_N_CTX 크기의 KV 캐시를 나눠 씁니다. (요청마다 프롬프트 + max_tokens만큼 예약)
+# 감사메일 한 건이 프롬프트 약 400 + max_tokens 1024 토큰을 예약하므로, 요청당 약 2048 토큰이 필요합니다.
+# LLM_BATCH_SEQUENCES를 바꾸면 LLM_N_CTX도 함께 맞춰주세요. (예: 4개 x 2048 = 8192)
+# 배치 디코딩은 grammar를 시퀀스별로 적용하지 못하므로 json_schema를 쓰는 연락처 추출 / 요약은 묶지 않고
+# 한 건씩 실행합니다. 현재 배치로 묶이는 것은 사실상 감사메일(ai_greeting) 생성뿐입니다.
+LLM_BATCH_SEQUENCES = 4                 # 한 번의 디코딩에 묶는 최대 요청 수 (1이면 배치 디코딩 없이 한 건씩)
+LLM_TOKEN_BUDGET = {                    # 요청 종류별 max_tokens 상한
+    "interactive": 1024,                # 화면에서 사용자가 기다리는 요청
+    "batch": 768,                       # 일괄 처리 / 백그라운드 작업
+}
+LLM_BATCH_MAX_WAIT_SECONDS = 120        # batch 요청이 이보다 오래 기다리면 interactive와 같은 순위로 올림 (기아 방지)
+
+# --- LLM 결과 캐시 (llm_cache) ---
+LLM_CACHE_PATH = os.path.join(PROJECT_ROOT, 'data', 'llm_cache.db')  # CRM DB와 분리된 별도 파일
+LLM_CACHE_ENABLED = True
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 3600           # 마지막 사용 후 30일이 지나면 제거
+LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024           # 저장된 응답 총 크기 상한 (넘으면 오래 안 쓴 것부터 제거)
+
+# --- 변경 저널 (change_journal) ---
+JOURNAL_RETENTION_DAYS = 30      # 이보다 오래된 기록은 소비자가 아직 읽지 않았어도 압축 시 삭제
+JOURNAL_MAX_ROWS = 1_000_000     # 저널 행 수 상한 (넘으면 오래된 것부터 삭제)
+
+# --- 쿼리 프로파일링 (db_profiler) ---
+DB_PROFILING = False             # 시작할 때부터 프로파일링을 켤지 여부 (Streamlit은 Debug Mode에서 켬)
+DB_SLOW_QUERY_MS = 100           # 이 시간(ms) 이상 걸린 문장을 느린 쿼리 로그에 EXPLAIN QUERY PLAN과 함께 기록
+DB_SLOW_QUERY_LOG_SIZE = 200     # 메모리에 보관하는 느린 쿼리 최대 개수
+DB_SLOW_QUERY_LOG_PATH = None    # 파일로도 남기려면 경로 지정 (JSON Lines, 예: os.path.join(PROJECT_ROOT, 'logs', 'slow_queries.jsonl'))
+
+# --- LLM 작업 큐 (llm_jobs) ---
+LLM_JOBS_PATH = os.path.join(PROJECT_ROOT, 'data', 'llm_jobs.db')  # 작업 대기열 파일 (CRM DB와 분리)
+LLM_JOB_MAX_ATTEMPTS = 3             # 실패 시 재시도를 포함한 최대 실행 횟수
+LLM_JOB_RETRY_DELAY_SECONDS = 10     # 첫 재시도까지 대기 시간 (이후 두 배씩 증가)
+LLM_JOB_LEASE_SECONDS = 60           # 작업자가 이 시간 동안 heartbeat가 없으면 죽은 것으로 보고 작업을 되돌림
+LLM_JOB_POLL_SECONDS = 1.0           # 대기열이 비었을 때 작업자가 다시 확인하는 간격
+LLM_JOB_RETENTION_DAYS = 7           # 끝난 작업(완료/실패/취소)을 보관하는 기간
+LLM_JOB_INPROCESS_WORKER = True      # 살아 있는 작업자 프로세스가 없으면 Streamlit 프로세스 안에서 작업자 스레드를 띄움
+
+# --- 연락처 규칙 추출 (contact_rules) ---
+CONTACT_RULES_ENABLED = True         # LLM 전에 정규식/휴리스틱으로 연락처를 추출 (확신하면 LLM 생략, 아니면 남은 항목만 LLM)
+
+# --- 로컬 추론 서버 (llm_server) ---
+LLM_SERVER_ENABLED = True            # 추론 서버가 실행 중이면 모델을 직접 로딩하지 않고 서버에 요청 (없으면 직접 로딩)
+LLM_SERVER_SOCKET = os.path.join(PROJECT_ROOT, 'data', 'llm.sock')  # Unix 소켓 경로 (AF_UNIX가 없는 OS는 아래 TCP 사용)
+LLM_SERVER_HOST = '127.0.0.1'         # TCP는 이 컴퓨터(loopback)에서만 접속하도록 127.0.0.1에 바인드
+LLM_SERVER_TOKEN_PATH = os.path.join(PROJECT_ROOT, 'data', 'llm_server.token')  # TCP 접속용 공유 비밀 (서버가 0600으로 생성)
+LLM_SERVER_PORT = 8765
+LLM_SERVER_TIMEOUT = 600             # 요청 하나의 최대 대기 시간 (초, 앞선 요청이 끝나기를 기다리는 시간 포함)
@@ -0,0 +1,487 @@
+# contact_rules.py
+
+import re
+import time
+
+# --------------------------------------------------------------------
+# 규칙 기반 연락처 추출 (LLM 앞단의 빠른 경로)
+# --------------------------------------------------------------------
+# 이메일 서명의 이메일 주소, 전화번호(M +82-10-...), URL, 회사 접미사(Inc., ㈜ 등)는 정규식으로
+# 마이크로초 단위에 찾을 수 있습니다. ai_email.parse_contact_with_llm이 먼저 이 모듈로 항목을 채우고,
+#   - 핵심 항목(CORE_FIELDS)을 모두 확신할 수 있으면 LLM을 아예 호출하지 않고,
+#   - 아니면 확신하지 못한 항목만 LLM에 묻고 확신한 항목은 규칙 결과를 그대로 씁니다.
+# 확신(confident)은 형식이 정해진 값(이메일, 전화번호, 법인 접미사가 붙은 짧은 회사명)이나
+# 이메일 주소와 맞아떨어지는 이름처럼 틀릴 가능성이 낮은 경우에만 줍니다.
+# 주소 / 팀 / 직급은 휴리스틱이라 값을 채우기는 하지만 확신하지는 않습니다.
+
+FIELDS = ("이름", "이메일", "전화번호", "회사명", "회사주소", "팀", "직급")
+CORE_FIELDS = ("이름", "이메일", "전화번호", "회사명")  # 모두 확신하면 LLM 생략
+
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+_URL_RE = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+# 국내 번호(02-555-1234, 010.1234.5678, 1588-1234)와 국제 표기(+82-10-..., +82 (0)2 ...)
+_PHONE_RE = re.compile(
+    r"(?<![\w+])(?:\+\s?82[\s.-]?(?:\(0\)\s?)?\(?0?\d{1,2}\)?|\(?0\d{1,2}\)?)[\s.-]?\d{3,4}[\s.-]?\d{4}(?!\d)"
+    r"|(?<![\w-])1[5-9]\d{2}-\d{4}(?!\d)"
+    r"|(?<![\w+])\+\d{1,3}[\s.-]?\(?\d{1,4}\)?(?:[\s.-]?\d{2,4}){2,3}(?!\d)")
+_MOBILE_LABEL_RE = re.compile(r"(?:^|[^a-z])(?:m|mobile|mob|cell|hp|h\.p)\s*[.:)]?\s*$|휴대|핸드폰|모바일", re.IGNORECASE)
+_FAX_LABEL_RE = re.compile(r"(?:^|[^a-z])(?:f|fax)\s*[.:)]?\s*$|팩스", re.IGNORECASE)
+_COMPANY_RE = re.compile(
+    r"㈜|\(주\)|주식회사|株式会社|\b(?:Inc|Corp|Co\.,?\s*Ltd|Ltd|LLC|GmbH|Corporation|Limited|Co)\b(?!-)\.?")  # Co-Founder 제외
+# 회사명 조각이 문장(면책 문구 등)인지: 서술어 어미, 접미사 바로 뒤의 조사, 문장 부호 뒤에 이어지는 글
+_SENTENCE_RE = re.compile(r"(?:니다|세요|해요)[.!]?(?:\s|$)|(?:Inc|Ltd|Corp|LLC|GmbH)\.?[가-힣]|[.!?]\s+[A-Za-z가-힣]")
+_ADDRESS_RE = re.compile(
+    r"[가-힣0-9]+(?:로|길)\s?\d|[가-힣]+(?:시|도)\s+[가-힣]+(?:구|군|시)|\d+\s?층|\b\d+F\b|"
+    r"\b\w+-(?:ro|gil|daero|dong|gu|si)\b|\b(?:Seoul|Korea|Street|St\.|Road|Rd\.|Avenue|Ave\.|Suite|Floor|"
+    r"Building|Bldg\.?|Tower)\b", re.IGNORECASE)
+_KO_TEAM = r"[가-힣A-Za-z0-9]*(?:팀|본부|사업부|사업단|연구소|센터|그룹|실)"
+_TEAM_RE = re.compile(
+    rf"(?:{_KO_TEAM}\s+)*{_KO_TEAM}(?![가-힣])"  # 'AI연구소 비전팀'처럼 조직 단위가 이어지면 함께
+    r"|(?:[A-Z][\w&]*\s+)*(?:Team|Dept\.?|Department|Division|Group|Lab|Labs|Center|Centre)\b")
+_KO_TITLE_RE = re.compile(
+    r"(?<![가-힣])(대표이사|부사장|본부장|센터장|연구소장|소장|수석연구원|책임연구원|선임연구원|연구원|팀장|실장|파트장|"
+    r"사장|전무|상무|이사|부장|차장|과장|대리|주임|사원|책임|선임|수석|매니저|프로|대표|교수|박사)(?:님)?(?![가-힣])")
+_EN_TITLE_RE = re.compile(
+    r"\b(?:(?:Senior|Sr\.|Junior|Jr\.|Principal|Chief|Executive|Associate|Assistant|Vice|Deputy|General|Lead|Staff|"
+    r"Regional|Global|Technical|Account|Sales|Product|Project|Marketing|Research)\s+)*"
+    r"(?:Manager|Director|Engineer|Researcher|Scientist|President|Officer|Specialist|Consultant|Analyst|"
+    r"Architect|Developer|Designer|Partner|Professor|Representative|Coordinator|Head|CEO|CTO|CFO|COO|CMO|"
+    r"EVP|SVP|VP|Founder|Co-Founder)\b(?:\s+of\s+[A-Z][\w&]*(?:\s+[A-Z][\w&]*)*)?")
+_LABEL_RE = re.compile(r"^\s*(?:이름|성명|Name)\s*[:：]\s*", re.IGNORECASE)
+_SEGMENT_SPLIT_RE = re.compile(r"\s*[|/·•\t]\s*|\s{2,}")
+_KO_SURNAMES = set("김이박최정강조윤장임한오서신권황안송류전홍고문양손배백허유남심노하곽성차주우구민진지엄채원천방공현함변염여추도소석선설마길연위표명기반라왕금옥육인맹제모탁국어은편용예경봉사부황보")
+_KO_NAME_RE = re.compile(r"^[가-힣]{2,4}$")
+_EN_WORD = r"[A-Z](?:[^\W\d_]|['-])+"  # 대문자로 시작하는 라틴 문자 단어 (Müller, O'Brien 포함)
+_EN_NAME_RE = re.compile(rf"^{_EN_WORD}(?:\s+[A-Z](?:[^\W\d_]|['-])*\.?)?\s+{_EN_WORD}$")
+_FIELD_LABEL_RE = re.compile(
+    r"^(?:[A-Z]|Tel|Phone|Mobile|Mob|Cell|HP|Fax|E-?mail|Web|Addr|Address|전화|휴대폰|핸드폰|팩스|이메일|메일|주소)"
+    r"\.?\s*[:：.]?\s+(?=\S)", re.IGNORECASE)
+_SIGN_OFF_RE = re.compile(r"\s*(?:드림|올림|배상|씀)\.?\s*$")
+_CLOSING_RE = re.compile(r"^(?:감사합니다|고맙습니다|수고하세요|Best regards|Kind regards|Regards|Thanks|Thank you|Sincerely|"
+                         r"Cheers|Best)\b[\s.,!]*$", re.IGNORECASE)
+_GREETING_RE = re.compile(r"안녕하세요|안녕하십니까|님|^(?:Dear|Hi|Hello)\b", re.IGNORECASE)
+_MAIN_LABEL_RE = re.compile(r"대표\s*(?:번호|전화)?\s*[.:)]?\s*$|(?:^|[^a-z])main\s*[.:)]?\s*$", re.IGNORECASE)
+
+def _lines(text: str) -> list:
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+def _segments(line: str) -> list:
+    return [s.strip(" ,;") for s in _SEGMENT_SPLIT_RE.split(line) if s.strip(" ,;")]
+
+def _strip_label(segment: str) -> str:
+    """'E junyeob@...', 'Tel. 02-...' 같은 한 글자/약어 라벨을 지웁니다."""
+    return _FIELD_LABEL_RE.sub("", segment)
+
+def _find_phone(text: str):
+    """휴대폰 > 일반 전화 > 회사 대표번호 순으로 고르고, 팩스 번호는 제외합니다."""
+    mobile, other, main = None, None, None
+    for line in text.splitlines():
+        last_end = 0
+        for m in _PHONE_RE.finditer(line):
+            label = line[last_end:m.start()]
+            last_end = m.end()
+            number = re.sub(r"\s+", " ", m.group().strip())
+            if _FAX_LABEL_RE.search(label):
+                continue
+            digits = re.sub(r"\D", "", number)
+            is_mobile = digits.startswith(("010", "011", "016", "017", "018", "019", "8210", "82010"))
+            if _MOBILE_LABEL_RE.search(label) or is_mobile:
+                mobile = mobile or number
+            elif _MAIN_LABEL_RE.search(label):
+                main = main or number
+            else:
+                other = other or number
+    return mobile or other or main
+
+def _company_is_sure(segment: str) -> bool:
+    """짧고 직급이 섞이지 않은 회사명만 확신합니다. ('Sales Lead, Apex Ltd.' 등은 LLM에)"""
+    return len(segment) <= 40 and not (_KO_TITLE_RE.search(segment) or _EN_TITLE_RE.search(segment) or re.search(r"\bLead\b", segment))
+
+def _find_company(lines: list):
+    """
+    법인 접미사가 붙은 조각을 회사명으로 찾습니다. (회사명, 확신 여부)
+    면책 문구처럼 문장인 조각은 건너뜁니다.
+    확신할 수 있는 조각을 먼저 고르고, 없으면 처음 찾은 조각을 확신 없이 돌려줍니다.
+    """
+    candidates = []
+    for line in lines:
+        for segment in _segments(line):
+            if _COMPANY_RE.search(segment) and not (_ADDRESS_RE.search(segment) or _SENTENCE_RE.search(segment)) \
+                    and len(segment) <= 60:
+                team = _TEAM_RE.search(segment)  # '㈜씨앤비테크 품질보증팀'처럼 부서가 붙어 있으면 떼어냄
+                if team and team.start() > 0:
+                    segment = segment[:team.start()].strip(" ,")
+                if _company_is_sure(segment):
+                    return segment, True
+                candidates.append(segment)
+    return (candidates[0], False) if candidates else (None, False)
+
+def _find_address(lines: list):
+    """주소 표지가 있는 줄을 찾아 이어진 줄까지 합칩니다."""
+    found = []
+    for i, line in enumerate(lines):
+        if _ADDRESS_RE.search(line) and re.search(r"\d|Korea|대한민국", line):
+            if found and found[-1][0] != i - 1:
+                break  # 주소 블록은 한 곳만
+            # 같은 줄에 회사명/전화번호가 섞여 있으면 주소가 있는 조각만
+            parts = [s for s in _segments(line) if _ADDRESS_RE.search(s) or not (_COMPANY_RE.search(s) or _PHONE_RE.search(s))]
+            found.append((i, " ".join(parts).strip(" ,") + ("," if line.endswith(",") else "")))
+    if not found:
+        return None
+    return " ".join(part for _, part in found).strip(" ,")
+
+def _find_team_and_title(lines: list):
+    team, title = None, None
+    for line in lines:
+        if _ADDRESS_RE.search(line) or _GREETING_RE.search(line):
+            continue
+        for segment in _segments(line):
+            if _PHONE_RE.search(segment):
+                continue
+            if _COMPANY_RE.search(segment):
+                m = _TEAM_RE.search(segment)
+                if m and m.start() > 0 and team is None:
+                    team = m.group().strip()
+                continue
+            t = _KO_TITLE_RE.search(segment) or _EN_TITLE_RE.search(segment)
+            if t and title is None:
+                title = t.group(1) if t.re is _KO_TITLE_RE else t.group()
+                segment = (segment[:t.start()] + " " + segment[t.end():]).strip(" ,")
+            m = _TEAM_RE.search(segment)
+            if m and team is None and m.group().strip():
+                team = m.group().strip()
+        if team and title:
+            break
+    return team, title
+
+def _name_matches_email(name: str, email: str) -> bool:
+    """영문 이름의 이름/성 중 하나가 이메일 아이디에 들어 있는지. (예: Junyeob Kim / junyeob@...)"""
+    if not email:
+        return False
+    local = re.sub(r"[^a-z]", "", email.split("@")[0].lower())
+    parts = [re.sub(r"[^a-z]", "", p.lower()) for p in name.split()]
+    return any(len(p) >= 3 and p in local for p in parts) or \
+        (len(parts) >= 2 and local.startswith(parts[0][:1] + parts[-1]))
+
+def _find_name(lines: list, email: str):
+    """
+    서명 앞쪽 줄에서 이름을 찾습니다. (이름, 확신 여부)
+    한글은 흔한 성씨로 시작하는 2~4글자(3글자만 확신), 영문은 대문자로 시작하는 2~3단어이며
+    영문 이름은 이메일 아이디와 맞아야 확신합니다.
+    본문이 함께 들어오면 마지막 맺음말('감사합니다.' 등) 다음 줄부터 보고, 인사말 속 받는 사람 이름('~님')은 건너뜁니다.
+    """
+    closings = [i for i, line in enumerate(lines) if _CLOSING_RE.match(line)]
+    start = closings[-1] + 1 if closings else 0
+    for line in lines[start:start + 6]:
+        if _ADDRESS_RE.search(line) or _GREETING_RE.search(line):
+            continue
+        for segment in _segments(_LABEL_RE.sub("", line)):
+            segment = _SIGN_OFF_RE.sub("", segment)
+            if _PHONE_RE.search(segment) or _COMPANY_RE.search(segment):
+                continue
+            words = segment.split()
+            # '김영희 책임', '박민수 부장님'처럼 직급이 붙은 경우 첫 단어만
+            candidate = words[0] if words and _KO_NAME_RE.match(words[0]) else segment
+            candidate = _KO_TITLE_RE.sub("", candidate).strip()
+            if _KO_NAME_RE.match(candidate) and candidate[0] in _KO_SURNAMES \
+                    and not _TEAM_RE.fullmatch(candidate):
+                return candidate, len(candidate) == 3
+            if _EN_NAME_RE.match(segment) and not (_EN_TITLE_RE.search(segment) or _TEAM_RE.search(segment)):
+                return segment, _name_matches_email(segment, email)
+    return None, False
+
+def extract(text: str) -> tuple:
+    """
+    서명 텍스트에서 규칙으로 연락처 항목을 뽑습니다.
+
+    Returns:
+        tuple: (항목 dict(FIELDS, 못 찾으면 None), 확신하는 항목 이름의 set)
+    """
+    emails = _EMAIL_RE.findall(text)
+    email = emails[0] if emails else None
+    phone = _find_phone(_URL_RE.sub(" ", text))
+    # 이름/회사/주소/팀은 URL과 이메일 주소를 지운 줄에서 찾습니다. (linkedin 주소의 아이디 등)
+    lines = [_strip_label(line) for line in _lines(_EMAIL_RE.sub(" ", _URL_RE.sub(" ", text)))]
+    lines = [line for line in lines if line and not re.fullmatch(r"[A-Za-z]{1,6}\.?", line)]
+    company, company_sure = _find_company(lines)
+    address = _find_address(lines)
+    team, title = _find_team_and_title(lines)
+    name, name_sure = _find_name(lines, email)
+
+    fields = {"이름": name, "이메일": email, "전화번호": phone, "회사명": company,
+              "회사주소": address, "팀": team, "직급": title}
+    confident = {key for key in ("이메일", "전화번호") if fields[key]}
+    if company_sure:
+        confident.add("회사명")
+    if name_sure:
+        confident.add("이름")
+    return fields, confident
+
+def is_confident(confident: set) -> bool:
+    """핵심 항목을 모두 확신하여 LLM 없이 끝낼 수 있는지."""
+    return all(field in confident for field in CORE_FIELDS)
+
+# --------------------------------------------------------------------
+# 라벨링된 서명 모음과 정확도 측정
+# --------------------------------------------------------------------
+# 실제로 받은 서명 형식을 본뜬 샘플입니다. 규칙을 바꾸면 `python contact_rules.py`로 다시 확인하세요.
+
+FIXTURES = [
+    ("""Junyeob Kim
+Business Development Team | Senior Manager
+
+M +82-10-4753-8125
+E junyeob@mobilint.com
+L https://www.linkedin.com/in/juni0409/
+
+Mobilint, Inc.
+3F, Narakium Yeoksam B Building,
+35, Seolleung-ro 93-gil, Gangnam-gu, Seoul, Republic of Korea""",
+     {"이름": "Junyeob Kim", "이메일": "junyeob@mobilint.com", "전화번호": "+82-10-4753-8125", "회사명": "Mobilint, Inc.",
+      "회사주소": "3F, Narakium Yeoksam B Building, 35, Seolleung-ro 93-gil, Gangnam-gu, Seoul, Republic of Korea",
+      "팀": "Business Development Team", "직급": "Senior Manager"}),
+    ("""김영희 | 기술영업팀 책임
+㈜테크비전
+Tel. 02-555-1234 / Mobile 010-9876-5432
+younghee.kim@techvision.co.kr""",
+     {"이름": "김영희", "이메일": "younghee.kim@techvision.co.kr", "전화번호": "010-9876-5432", "회사명": "㈜테크비전",
+      "회사주소": None, "팀": "기술영업팀", "직급": "책임"}),
+    ("""홍길동 / 영업팀 과장 / gildong@example.com / 010-1234-5678""",
+     {"이름": "홍길동", "이메일": "gildong@example.com", "전화번호": "010-1234-5678", "회사명": None,
+      "회사주소": None, "팀": "영업팀", "직급": "과장"}),
+    ("""감사합니다.
+
+박민수 드림
+주식회사 한빛솔루션 | 전략기획본부 부장
+서울특별시 강남구 테헤란로 152, 12층
+T 02-3456-7890  F 02-3456-7891  M 010-2222-3333
+minsoo.park@hanbit-sol.com""",
+     {"이름": "박민수", "이메일": "minsoo.park@hanbit-sol.com", "전화번호": "010-2222-3333", "회사명": "주식회사 한빛솔루션",
+      "회사주소": "서울특별시 강남구 테헤란로 152, 12층", "팀": "전략기획본부", "직급": "부장"}),
+    ("""Best regards,
+Sarah Thompson
+Director of Partnerships
+Northwind Robotics Corp.
+Mobile: +1 415 555 0134
+sarah.thompson@northwindrobotics.com""",
+     {"이름": "Sarah Thompson", "이메일": "sarah.thompson@northwindrobotics.com", "전화번호": "+1 415 555 0134",
+      "회사명": "Northwind Robotics Corp.", "회사주소": None, "팀": None, "직급": "Director of Partnerships"}),
+    ("""이상훈
+University of Toronto, Innovation Hub
+sanghoon.lee@utoronto.ca""",
+     {"이름": "이상훈", "이메일": "sanghoon.lee@utoronto.ca", "전화번호": None, "회사명": "University of Toronto",
+      "회사주소": None, "팀": "Innovation Hub", "직급": None}),
+    ("""최지훈 선임연구원
+AI연구소 비전팀
+(주)딥센스
+경기도 성남시 분당구 판교역로 235, 에이치스퀘어 N동 7층
+M. 010-5555-1212 | E. jihoon.choi@deepsense.ai""",
+     {"이름": "최지훈", "이메일": "jihoon.choi@deepsense.ai", "전화번호": "010-5555-1212", "회사명": "(주)딥센스",
+      "회사주소": "경기도 성남시 분당구 판교역로 235, 에이치스퀘어 N동 7층", "팀": "AI연구소 비전팀", "직급": "선임연구원"}),
+    ("""Thanks,
+Kenji Watanabe | Sales Manager
+Edge Devices Co., Ltd.
++81-3-1234-5678
+k.watanabe@edgedevices.jp""",
+     {"이름": "Kenji Watanabe", "이메일": "k.watanabe@edgedevices.jp", "전화번호": "+81-3-1234-5678",
+      "회사명": "Edge Devices Co., Ltd.", "회사주소": None, "팀": None, "직급": "Sales Manager"}),
+    ("""정다은 대리
+마케팅팀 | 모빌린트
+다은 드림
+Tel: 02-6952-1100
+daeun.jung@mobilint.com""",
+     {"이름": "정다은", "이메일": "daeun.jung@mobilint.com", "전화번호": "02-6952-1100", "회사명": "모빌린트",
+      "회사주소": None, "팀": "마케팅팀", "직급": "대리"}),
+    ("""Michael O'Brien
+VP of Engineering
+Quantix Systems, Inc.
+1200 Mission Street, Suite 400, San Francisco, CA 94103
+mobrien@quantix.io""",
+     {"이름": "Michael O'Brien", "이메일": "mobrien@quantix.io", "전화번호": None, "회사명": "Quantix Systems, Inc.",
+      "회사주소": "1200 Mission Street, Suite 400, San Francisco, CA 94103", "팀": None, "직급": "VP of Engineering"}),
+    ("""강민재 팀장 / 구매팀
+한국전자부품 주식회사
+휴대폰 010-8888-1234 · 팩스 031-777-0001
+mj.kang@kepc.co.kr""",
+     {"이름": "강민재", "이메일": "mj.kang@kepc.co.kr", "전화번호": "010-8888-1234", "회사명": "한국전자부품 주식회사",
+      "회사주소": None, "팀": "구매팀", "직급": "팀장"}),
+    ("""윤서연
+Global Sales Team | Account Manager
+Mobilint, Inc.
+M +82-10-3030-4040
+seoyeon.yoon@mobilint.com
+www.mobilint.com""",
+     {"이름": "윤서연", "이메일": "seoyeon.yoon@mobilint.com", "전화번호": "+82-10-3030-4040", "회사명": "Mobilint, Inc.",
+      "회사주소": None, "팀": "Global Sales Team", "직급": "Account Manager"}),
+]
+
+FIXTURES += [
+    ("""안녕하세요 박민수 부장님,
+
+요청하신 MLA100 견적서를 첨부하여 보내드립니다.
+검토 후 회신 부탁드립니다.
+
+감사합니다.
+이지은 드림
+
+이지은 | 해외영업팀 매니저
+Mobilint, Inc.
+M +82-10-7777-2020
+jieun.lee@mobilint.com""",
+     {"이름": "이지은", "이메일": "jieun.lee@mobilint.com", "전화번호": "+82-10-7777-2020", "회사명": "Mobilint, Inc.",
+      "회사주소": None, "팀": "해외영업팀", "직급": "매니저"}),
+    ("""Robert Chen
+CTO, Lumina AI
++1 650 555 0199
+bob@lumina.ai""",
+     {"이름": "Robert Chen", "이메일": "bob@lumina.ai", "전화번호": "+1 650 555 0199", "회사명": "Lumina AI",
+      "회사주소": None, "팀": None, "직급": "CTO"}),
+    ("""송하늘 수석
+㈜씨앤비테크 품질보증팀
+대표번호 1588-1234 / 직통 02-2222-3333
+haneul.song@cnbtech.co.kr""",
+     {"이름": "송하늘", "이메일": "haneul.song@cnbtech.co.kr", "전화번호": "02-2222-3333", "회사명": "㈜씨앤비테크",
+      "회사주소": None, "팀": "품질보증팀", "직급": "수석"}),
+    ("""Dear Mr. Kim,
+
+Please find the revised NDA attached.
+
+Best regards,
+Anna Müller
+Procurement Department
+Bosch Automotive GmbH
+Tel. +49 711 400 4000
+anna.mueller@bosch.example""",
+     {"이름": "Anna Müller", "이메일": "anna.mueller@bosch.example", "전화번호": "+49 711 400 4000",
+      "회사명": "Bosch Automotive GmbH", "회사주소": None, "팀": "Procurement Department", "직급": None}),
+]
+
+# 규칙이 틀리기 쉬운 경우 (확신하면 안 되는 회사명)
+FIXTURES += [
+    ("""David Park
+Co-Founder & CEO
+NeuralEdge
+M +1 408 555 0111
+david.park@neuraledge.ai""",
+     {"이름": "David Park", "이메일": "david.park@neuraledge.ai", "전화번호": "+1 408 555 0111", "회사명": "NeuralEdge",
+      "회사주소": None, "팀": None, "직급": "Co-Founder & CEO"}),
+    ("""최유진 | 영업팀 대리
+모빌린트
+M 010-4444-5555
+yujin.choi@mobilint.com
+
+본 메일은 Mobilint, Inc.의 기밀 정보를 포함합니다.""",
+     {"이름": "최유진", "이메일": "yujin.choi@mobilint.com", "전화번호": "010-4444-5555", "회사명": "모빌린트",
+      "회사주소": None, "팀": "영업팀", "직급": "대리"}),
+    ("""Emily Stone
+Sales Lead, Apex Ltd.
+M +44 7700 900123
+emily.stone@apex.co.uk""",
+     {"이름": "Emily Stone", "이메일": "emily.stone@apex.co.uk", "전화번호": "+44 7700 900123", "회사명": "Apex Ltd.",
+      "회사주소": None, "팀": None, "직급": "Sales Lead"}),
+    ("""Jonas Berg
+Head of Sales
+This e-mail and any attachments are confidential to Nordic Sensors AB and Nordic Holdings Ltd. Please notify the sender.
+T +46 8 555 123 45
+jonas.berg@nordicsensors.se""",
+     {"이름": "Jonas Berg", "이메일": "jonas.berg@nordicsensors.se", "전화번호": "+46 8 555 123 45",
+      "회사명": "Nordic Sensors AB", "회사주소": None, "팀": None, "직급": "Head of Sales"}),
+]
+
+def _normalize(field: str, value):
+    if value is None:
+        return None
+    value = str(value)
+    if field == "전화번호":
+        digits = re.sub(r"\D", "", value)
+        return "0" + digits[2:].lstrip("0") if digits.startswith("82") else digits
+    if field == "이메일":
+        return value.strip().lower()
+    return re.sub(r"[\s,.]+", "", value).lower()
+
+def _same(field: str, got, expected) -> bool:
+    return _normalize(field, got) == _normalize(field, expected)
+
+def evaluate(fixtures: list = None, parse=None) -> dict:
+    """
+    라벨링된 서명 모음으로 규칙 추출의 정확도와 LLM 생략 비율을 측정합니다.
+
+    Args:
+        fixtures (list): (서명 텍스트, 정답 dict) 목록. 기본값은 FIXTURES.
+        parse (callable): 함께 측정할 전체 추출 함수 (예: ai_email.parse_contact_with_llm). None이면 규칙만.
+
+    Returns:
+        dict: {'samples', 'bypass_rate', 'confident_precision', 'rule_accuracy'(항목별), 'bypass_accuracy',
+               'avg_rule_ms'} (+ parse를 넘기면 'parse_accuracy', 'avg_parse_seconds')
+    """
+    fixtures = fixtures or FIXTURES
+    bypassed, confident_total, confident_correct, rule_seconds = 0, 0, 0, 0.0
+    rule_correct = dict.fromkeys(FIELDS, 0)
+    bypass_correct, bypass_total = 0, 0
+    parse_correct, parse_seconds = dict.fromkeys(FIELDS, 0), 0.0
+    for text, expected in fixtures:
+        start = time.perf_counter()
+        fields, confident = extract(text)
+        rule_seconds += time.perf_counter() - start
+        for field in FIELDS:
+            correct = _same(field, fields[field], expected.get(field))
+            rule_correct[field] += correct
+            if field in confident:
+                confident_total += 1
+                confident_correct += correct
+        if is_confident(confident):
+            bypassed += 1
+            bypass_total += len(FIELDS)
+            bypass_correct += sum(_same(f, fields[f], expected.get(f)) for f in FIELDS)
+        if parse is not None:
+            start = time.perf_counter()
+            result = parse(text) or {}
+            parse_seconds += time.perf_counter() - start
+            for field in FIELDS:
+                parse_correct[field] += _same(field, result.get(field), expected.get(field))
+
+    n = len(fixtures)
+    report = {
+        'samples': n,
+        'bypass_rate': bypassed / n,
+        'confident_precision': confident_correct / confident_total if confident_total else None,
+        'rule_accuracy': {f: rule_correct[f] / n for f in FIELDS},
+        'bypass_accuracy': bypass_correct / bypass_total if bypass_total else None,
+        'avg_rule_ms': rule_seconds / n * 1000,
+    }
+    if parse is not None:
+        report['parse_accuracy'] = {f: parse_correct[f] / n for f in FIELDS}
+        report['avg_parse_seconds'] = parse_seconds / n
+    return report
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    import sys
+    import contact_rules  # 직접 실행 시 __main__과 별개로 import된 모듈의 상태를 쓰도록
+
+    for text, expected in contact_rules.FIXTURES:
+        fields, confident = contact_rules.extract(text)
+        wrong = [f for f in contact_rules.FIELDS if not contact_rules._same(f, fields[f], expected[f])]
+        mark = "LLM 생략" if contact_rules.is_confident(confident) else "LLM 호출"
+        print(f"[{mark}] {expected['이름']}: 확신 {sorted(confident)}" + (f" / 틀림 {wrong}" if wrong else ""))
+        for f in wrong:
+            print(f"    {f}: {fields[f]!r} (정답 {expected[f]!r})")
+
+    # python contact_rules.py llm: ai_email.parse_contact_with_llm(규칙 + LLM)까지 함께 측정
+    parse = None
+    if len(sys.argv) > 1 and sys.argv[1] == "llm":
+        import ai_email
+        parse = ai_email.parse_contact_with_llm
+    report = contact_rules.evaluate(parse=parse)
+    print(f"\n샘플 {report['samples']}개, LLM 생략 {report['bypass_rate'] * 100:.0f}%, "
+          f"규칙 추출 평균 {report['avg_rule_ms']:.2f} ms")
+    print(f"확신한 항목 정확도: {report['confident_precision'] * 100:.1f}%")
+    if report['bypass_accuracy'] is not None:
+        print(f"LLM을 생략한 샘플의 전체 항목 정확도: {report['bypass_accuracy'] * 100:.1f}%")
+    print("규칙 항목별 정확도: " + ", ".join(f"{f} {v * 100:.0f}%" for f, v in report['rule_accuracy'].items()))
+    if parse is not None:
+        print("규칙 + LLM 항목별 정확도: " +
+              ", ".join(f"{f} {v * 100:.0f}%" for f, v in report['parse_accuracy'].items()))
+        print(f"호출당 평균 {report['avg_parse_seconds']:.2f}초")
+        print(ai_email.contact_parse_stats())
@@ -0,0 +1,342 @@
+# db_benchmark.py
+
+import inspect
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import datetime
+import config
+import db_cache
+import db_operations as ops
+import db_queries as q
+import synthetic_data
+from db_connection import get_connection, transaction, close_connection
+
+# --------------------------------------------------------------------
+# db_queries / db_operations 성능 측정
+# --------------------------------------------------------------------
+# synthetic_data로 만든 DB(기본: Task 100만 건)에서 두 모듈의 모든 공개 함수를 실행해 시간을 재고,
+# 결과를 JSON으로 저장합니다. 커밋마다 저장해 두고 --compare로 비교하면 느려진 함수를 찾을 수 있습니다.
+#     python db_benchmark.py --out base.json          (기준 커밋에서)
+#     python db_benchmark.py --compare base.json      (변경 후)
+#
+# - 조회 함수는 cold(매 호출 전 db_cache.clear(), 항상 SQL 실행)와 warm(캐시 적중) 두 가지로 잽니다.
+# - 쓰기 함수는 원본을 건드리지 않도록 DB 복사본에서 잽니다. (write)
+# - 아래 _query_cases / _operation_cases에 없는 공개 함수는 결과의 'skipped'에 남으므로,
+#   함수를 추가하면 여기에도 측정 방법을 추가해야 합니다.
+# - 한 경우(case)는 최소 BENCH_MIN_CALLS번, BENCH_MIN_SECONDS가 지날 때까지 (최대 BENCH_MAX_CALLS번) 반복합니다.
+#   한 번에 오래 걸리는 함수(list_tasks 등)는 BENCH_MIN_CALLS번만 실행됩니다.
+
+BENCH_MIN_CALLS = 1
+BENCH_MIN_SECONDS = 0.3
+BENCH_MAX_CALLS = 200
+
+# 비교 시 느려졌다고 보는 기준: 중앙값이 (1 + threshold)배 이상이고, 차이가 이 값(ms) 이상
+REGRESSION_THRESHOLD = 0.2
+REGRESSION_FLOOR_MS = 0.5
+
+def _sample(conn) -> dict:
+    """측정에 쓸 인자 값을 DB에서 고릅니다. (같은 데이터면 항상 같은 값)"""
+    def one(sql, *params):
+        return conn.execute(sql, params).fetchone()
+
+    by_tasks = conn.execute("""
+        SELECT C.company_id, C.company_name, COUNT(*) FROM Tasks T JOIN Companies C ON C.company_id = T.company_id
+         GROUP BY C.company_id ORDER BY COUNT(*) DESC, C.company_id
+    """).fetchall()
+    big, typical = by_tasks[0], by_tasks[len(by_tasks) // 2]
+    last_day = one("SELECT MAX(action_date) FROM Tasks")[0]
+    return {
+        'big_company': big[1], 'big_company_id': big[0], 'typical_company': typical[1],
+        'typical_company_id': typical[0],
+        'user_id': one("SELECT user_id FROM Tasks GROUP BY user_id ORDER BY COUNT(*) DESC, user_id LIMIT 1")[0],
+        'project_id': one("""SELECT project_id FROM Project_Participants GROUP BY project_id
+                              ORDER BY COUNT(*) DESC, project_id LIMIT 1""")[0],
+        'invoice_id': one("""SELECT invoice_id FROM Invoice_Items GROUP BY invoice_id
+                              ORDER BY COUNT(*) DESC, invoice_id LIMIT 1""")[0],
+        'month_start': one("SELECT date(?, '-30 days')", last_day)[0], 'month_end': last_day,
+        'contact_name': one("SELECT contact_name FROM Contacts WHERE company_id = ? ORDER BY contact_id", big[0])[0],
+        'contact_id': one("SELECT MIN(contact_id) FROM Contacts WHERE company_id = ?", big[0])[0],
+        'project_name': one("SELECT project_name FROM Projects WHERE company_id = ? ORDER BY project_id", big[0])[0],
+        'task_id': one("SELECT MAX(task_id) / 2 FROM Tasks")[0],
+        'product_id': one("SELECT MIN(product_id) FROM Products")[0],
+        'page2_cursor': q.get_tasks_page.uncached()['next_cursor'],
+    }
+
+def _query_cases(s: dict) -> dict:
+    """{함수 이름: [(case 이름, fn(i))]} - 조회 함수"""
+    return {
+        "get_tasks_by_company_name": [("큰 회사", lambda i: q.get_tasks_by_company_name(s['big_company'])),
+                                      ("보통 회사", lambda i: q.get_tasks_by_company_name(s['typical_company']))],
+        "get_all_companies_summary": [("전체", lambda i: q.get_all_companies_summary())],
+        "get_tasks_page": [("첫 페이지", lambda i: q.get_tasks_page()),
+                           ("두번째 페이지", lambda i: q.get_tasks_page(s['page2_cursor'])),
+                           ("회사 필터", lambda i: q.get_tasks_page(company_name=s['big_company'])),
+                           ("미완료+유형 필터", lambda i: q.get_tasks_page(task_status=0, task_type="quote"))],
+        "count_tasks": [("전체", lambda i: q.count_tasks()),
+                        ("보통 회사", lambda i: q.count_tasks(company_name=s['typical_company']))],
+        "get_companies_page": [("첫 페이지", lambda i: q.get_companies_page()),
+                               ("이름 접두어", lambda i: q.get_companies_page(name_prefix="한빛"))],
+        "get_contacts_by_company_name": [("큰 회사", lambda i: q.get_contacts_by_company_name(s['big_company']))],
+        "get_projects_by_company_name": [("큰 회사", lambda i: q.get_projects_by_company_name(s['big_company']))],
+        "get_project_details_with_participants": [
+            ("참여자 최다", lambda i: q.get_project_details_with_participants(s['project_id']))],
+        "get_invoice_details_with_items": [("항목 최다", lambda i: q.get_invoice_details_with_items(s['invoice_id']))],
+        "get_tasks_by_date_range": [("최근 30일", lambda i: q.get_tasks_by_date_range(s['month_start'], s['month_end']))],
+        "get_tasks_by_user": [("최다 담당자", lambda i: q.get_tasks_by_user(s['user_id']))],
+        "get_incomplete_tasks": [("전체", lambda i: q.get_incomplete_tasks())],
+        "search_contacts": [("이름", lambda i: q.search_contacts(s['contact_name'])),
+                            ("짧은 검색어", lambda i: q.search_contacts("김민"))],
+        "search": [("흔한 단어", lambda i: q.search("YOLOv8")),
+                   ("한국어", lambda i: q.search("견적서 발송")),
+                   ("드문 단어", lambda i: q.search(s['contact_name']))],
+        "get_all_from_table": [("Companies", lambda i: q.get_all_from_table("Companies")),
+                               ("Tasks", lambda i: q.get_all_from_table("Tasks"))],
+    }
+
+def _with_cursor(fn, *args):
+    with transaction() as conn:
+        return fn(conn.cursor(), *args)
+
+def _operation_cases(s: dict) -> dict:
+    """{함수 이름: [(case 이름, fn(i))]} - 쓰기 함수 (i는 호출 순번, 이름이 겹치지 않게 사용)"""
+    pool = {}  # 앞 case에서 만든 id (delete_task 등이 사용)
+
+    def add_task(i):
+        task_id = ops.add_task_transactional(user_id=s['user_id'], company_name=s['big_company'],
+                                             action_date="2025-06-30", contact_name=s['contact_name'],
+                                             project_name=s['project_name'], agenda=f"bench agenda {i}",
+                                             task_type="meeting")
+        pool.setdefault('tasks', []).append(task_id)
+        return task_id
+
+    def take_task(i):
+        tasks = pool.get('tasks') or [s['task_id'] - i]
+        return tasks.pop() if len(tasks) > 1 else tasks[0]
+
+    return {
+        "get_or_create_company": [
+            ("기존 이름", lambda i: _with_cursor(ops.get_or_create_company, s['big_company'])),
+            ("새 이름", lambda i: _with_cursor(ops.get_or_create_company, f"bench company {i}"))],
+        "get_or_create_contact": [
+            ("기존 이름", lambda i: _with_cursor(ops.get_or_create_contact, s['big_company_id'], s['contact_name'])),
+            ("새 이름", lambda i: _with_cursor(ops.get_or_create_contact, s['big_company_id'], f"bench contact {i}"))],
+        "get_or_create_project": [
+            ("기존 이름", lambda i: _with_cursor(ops.get_or_create_project, s['big_company_id'], s['project_name'])),
+            ("새 이름", lambda i: _with_cursor(ops.get_or_create_project, s['big_company_id'], f"bench project {i}"))],
+        "add_user": [("새 사용자", lambda i: ops.add_user(f"bench_user_{i}", "x", f"bench{i}@example.com"))],
+        "update_user": [("같은 값", lambda i: ops.update_user(2, "sales01", "x", "sales01@example.com"))],
+        "add_company": [("새 회사", lambda i: ops.add_company(f"bench new company {i}", 10, 1000, None, None, "KOR"))],
+        "update_company": [("이름 유지", lambda i: ops.update_company(s['typical_company_id'], s['typical_company'],
+                                                                 100, 1000, "bench", None, "KOR"))],
+        "add_contact": [("새 담당자", lambda i: ops.add_contact(s['typical_company_id'], f"bench new contact {i}"))],
+        "update_contact": [("이름 유지", lambda i: ops.update_contact(s['contact_id'], s['big_company_id'],
+                                                                 s['contact_name'], "bench", None, None, None, None))],
+        "add_product": [("새 제품", lambda i: ops.add_product(f"bench product {i}", 1.0, 2.0))],
+        "update_product": [("같은 값", lambda i: ops.update_product(s['product_id'], "MLA100", 1_200_000, 1_800_000))],
+        "add_task_transactional": [("기존 회사/담당자/프로젝트", add_task)],
+        "update_task": [("agenda 변경", lambda i: ops.update_task(s['task_id'] + i % 100, agenda=f"bench {i}"))],
+        "delete_task": [("soft", lambda i: ops.delete_task(take_task(i))),
+                        ("hard", lambda i: ops.delete_task(take_task(i), soft=False))],
+        "get_task": [("기존 Task", lambda i: ops.get_task(s['task_id']))],
+        "list_tasks": [("전체", lambda i: ops.list_tasks())],
+        "iter_tasks": [("전체", lambda i: sum(1 for _ in ops.iter_tasks()))],
+        "add_project": [("새 프로젝트", lambda i: ops.add_project(s['typical_company_id'], f"bench new project {i}"))],
+        "link_task_to_project": [("기존 Task", lambda i: ops.link_task_to_project(s['task_id'], 1))],
+        "add_invoice": [("새 인보이스", lambda i: ops.add_invoice(1, 1, s['user_id'], issue_date="2025-06-30"))],
+        "add_invoice_item": [("새 항목", lambda i: ops.add_invoice_item(s['invoice_id'], s['product_id'], 1, 1000.0))],
+        "add_free_trial": [("새 Task", lambda i: ops.add_free_trial(add_task(i), 1, s['product_id']))],
+        "add_tech_inquiry": [("새 Task", lambda i: ops.add_tech_inquiry(add_task(i), None, s['product_id']))],
+    }
+
+def _public_functions(module) -> list:
+    return [name for name, obj in vars(module).items()
+            if inspect.isfunction(obj) and obj.__module__ == module.__name__ and not name.startswith("_")]
+
+def _size(result):
+    """결과 크기 (행 수). 사전이면 안에 든 리스트 길이의 합."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(len(v) for v in result.values() if isinstance(v, list)) or 1
+    return None
+
+def _time_case(fn, cold: bool) -> dict:
+    times, result = [], None
+    if not cold:
+        db_cache.clear()
+        result = fn(0)  # 캐시 채우기
+    started = time.perf_counter()
+    i = 0
+    while i < BENCH_MAX_CALLS and (i < BENCH_MIN_CALLS or time.perf_counter() - started < BENCH_MIN_SECONDS):
+        if cold:
+            db_cache.clear()
+        t = time.perf_counter()
+        result = fn(i + 1)
+        times.append((time.perf_counter() - t) * 1000)
+        i += 1
+    times.sort()
+    return {'calls': len(times), 'min_ms': round(times[0], 4), 'median_ms': round(statistics.median(times), 4),
+            'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))], 4),
+            'mean_ms': round(statistics.fmean(times), 4), 'rows': _size(result), 'error': None}
+
+def _run_cases(module, cases: dict, modes: tuple, only=None, progress=print) -> tuple:
+    results, skipped = [], []
+    for name in _public_functions(module):
+        if only and not any(o in name for o in only):
+            continue
+        if name not in cases:
+            skipped.append({'module': module.__name__, 'function': name, 'reason': "측정 방법이 정의되지 않음"})
+            continue
+        for label, fn in cases[name]:
+            for mode in modes:
+                entry = {'module': module.__name__, 'function': name, 'case': label, 'mode': mode}
+                try:
+                    entry.update(_time_case(fn, cold=(mode == "cold")))
+                except Exception as e:  # 측정 대상의 오류는 결과에 남기고 계속 진행
+                    entry.update(calls=0, error=f"{type(e).__name__}: {e}")
+                results.append(entry)
+                if progress:
+                    progress(_format_entry(entry))
+    return results, skipped
+
+def _format_entry(e: dict) -> str:
+    head = f"{e['function'] + ' [' + e['case'] + ']':<58} {e['mode']:<5}"
+    if e['error']:
+        return f"{head} 오류: {e['error']}"
+    return f"{head} {e['median_ms']:10.3f} ms (p95 {e['p95_ms']:.3f}, {e['calls']}회, {e['rows']}행)"
+
+def _git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=config.PROJECT_ROOT, capture_output=True, text=True,
+                                  timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {'commit': git("rev-parse", "HEAD") or None, 'dirty': bool(git("status", "--porcelain", "--", "src"))}
+
+def run(db_path: str, only=None, progress=print) -> dict:
+    """
+    db_path(synthetic_data.generate()로 만든 DB)에서 측정하고 결과 사전을 반환합니다.
+    쓰기 함수는 db_path 옆의 임시 복사본에서 실행한 뒤 복사본을 지웁니다.
+    """
+    data = synthetic_data.read_meta(db_path)
+    if data is None:
+        raise ValueError(f"synthetic_data로 만든 DB가 아닙니다: {db_path}")
+    saved_path = config.DB_PATH
+    copy_path = db_path + ".write-bench"
+    try:
+        config.DB_PATH = db_path
+        sample = _sample(get_connection())
+        results, skipped = _run_cases(q, _query_cases(sample), ("cold", "warm"), only, progress)
+
+        close_connection(db_path)
+        with sqlite3.connect(db_path) as src, sqlite3.connect(copy_path) as dst:
+            src.backup(dst)
+        config.DB_PATH = copy_path
+        db_cache.clear()
+        more, more_skipped = _run_cases(ops, _operation_cases(sample), ("write",), only, progress)
+        results += more
+        skipped += more_skipped
+    finally:
+        close_connection(copy_path)
+        close_connection(db_path)
+        config.DB_PATH = saved_path
+        db_cache.clear()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(copy_path + suffix):
+                os.remove(copy_path + suffix)
+
+    return {
+        'meta': {**_git_revision(), 'created_at': datetime.now().isoformat(timespec="seconds"),
+                 'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                 'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'data': data},
+        'results': results,
+        'skipped': skipped,
+    }
+
+def compare(base: dict, current: dict, threshold: float = REGRESSION_THRESHOLD,
+            floor_ms: float = REGRESSION_FLOOR_MS) -> list:
+    """
+    두 측정 결과의 중앙값을 비교합니다.
+
+    Returns:
+        list: 양쪽에 모두 있는 항목별 {'function', 'case', 'mode', 'base_ms', 'current_ms', 'ratio', 'status'}
+              status: 'slower' / 'faster' / 'same' / 'error'(새로 실패) / 'fixed'(실패하던 것이 성공) / 'still_error'
+
+    Raises:
+        ValueError: 두 결과가 서로 다른 합성 데이터(생성기 버전/seed/scale)에서 측정된 경우.
+    """
+    key = lambda d: (d['generator_version'], d['seed'], d['scale'])
+    if key(base['meta']['data']) != key(current['meta']['data']):
+        raise ValueError(f"서로 다른 데이터의 결과는 비교할 수 없습니다: "
+                         f"{key(base['meta']['data'])} / {key(current['meta']['data'])}")
+    index = {(r['module'], r['function'], r['case'], r['mode']): r for r in base['results']}
+    rows = []
+    for r in current['results']:
+        b = index.get((r['module'], r['function'], r['case'], r['mode']))
+        if b is None:
+            continue
+        row = {'function': r['function'], 'case': r['case'], 'mode': r['mode'],
+               'base_ms': b.get('median_ms'), 'current_ms': r.get('median_ms'), 'ratio': None}
+        if b['error'] or r['error']:
+            row['status'] = 'error' if not b['error'] else 'fixed' if not r['error'] else 'still_error'
+        else:
+            row['ratio'] = round(r['median_ms'] / b['median_ms'], 3) if b['median_ms'] else None
+            diff = r['median_ms'] - b['median_ms']
+            if diff >= floor_ms and r['median_ms'] >= b['median_ms'] * (1 + threshold):
+                row['status'] = 'slower'
+            elif -diff >= floor_ms and b['median_ms'] >= r['median_ms'] * (1 + threshold):
+                row['status'] = 'faster'
+            else:
+                row['status'] = 'same'
+        rows.append(row)
+    return rows
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="db_queries / db_operations 성능 측정 (합성 데이터)")
+    parser.add_argument("--db", help="측정할 합성 DB 경로 (생략 시 임시 폴더에 seed/scale별로 만들어 재사용)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--only", nargs="*", help="이름에 이 문자열이 들어간 함수만 측정")
+    parser.add_argument("--out", help="결과 JSON 경로 (기본: logs/bench_<커밋>.json)")
+    parser.add_argument("--compare", help="비교할 기준 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    # --db를 지정하면 그 DB를 그대로 쓰고(없을 때만 생성), 생략하면 seed/scale별 임시 DB를 생성기 버전이 바뀔 때만 다시 만듭니다.
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f"crm_synthetic_seed{args.seed}_scale{args.scale}.db")
+    data = synthetic_data.read_meta(db_path)
+    if data is None or (not args.db and data['generator_version'] != synthetic_data.GENERATOR_VERSION):
+        print(f"--- 합성 데이터 생성: {db_path} (seed={args.seed}, scale={args.scale}) ---")
+        synthetic_data.generate(db_path, args.seed, args.scale, overwrite=True)
+
+    report = run(db_path, args.only)
+    out = args.out or os.path.join(config.PROJECT_ROOT, "logs",
+                                   f"bench_{(report['meta']['commit'] or 'nogit')[:10]}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {out} (측정 {len(report['results'])}건)")
+    for s in report['skipped']:
+        print(f"  측정 안 함: {s['module']}.{s['function']} - {s['reason']}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)
+        rows = compare(base, report, args.threshold)
+        changed = [r for r in rows if r['status'] not in ('same', 'still_error')]
+        print(f"\n--- {args.compare} 대비 ({len(rows)}건 중 변화 {len(changed)}건) ---")
+        for r in changed:
+            print(f"{r['status']:<7} {r['function'] + ' [' + r['case'] + ']':<58} {r['mode']:<5} "
+                  f"{r['base_ms']} -> {r['current_ms']} ms (x{r['ratio']})")
+        sys.exit(1 if any(r['status'] in ('slower', 'error') for r in rows) else 0)
@@ -0,0 +1,155 @@
+# db_cache.py
+
+import functools
+import threading
+from collections import OrderedDict
+import config
+from db_connection import table_version, pending_writes
+
+# --------------------------------------------------------------------
+# 조회 결과 캐시 (쓰기 시 무효화)
+# --------------------------------------------------------------------
+# Streamlit은 위젯을 조작할 때마다 스크립트 전체를 다시 실행하므로, 같은 조회가 계속 반복됩니다.
+# 조회 함수의 결과를 (인자, 의존 테이블 버전)과 함께 보관하고, db_operations 등의 쓰기가 커밋되어
+# db_connection의 테이블 버전이 바뀌었을 때만 다시 조회합니다. 버전 비교에는 SQL이 필요 없습니다.
+#
+# 현재 스레드의 열린 트랜잭션이 의존 테이블에 쓰기를 했다면 캐시를 건너뛰고 바로 조회합니다.
+#
+# 주의: 테이블 버전은 프로세스 안에서만 공유됩니다. 다른 프로세스(main.py CLI 등)가 같은 DB에 쓴 내용은
+#       clear()를 호출하기 전까지 반영되지 않습니다.
+
+# 파생 테이블 -> 그 내용을 바꾸는 원본 테이블 (트리거로 갱신되는 테이블)
+DERIVED_TABLES = {
+    "Company_Stats": ("Company_Stats", "Companies", "Tasks", "Projects", "Invoices"),
+}
+
+MAX_ENTRIES_PER_FUNCTION = 128
+
+_caches = []  # clear()용: 모든 cached 함수의 저장소
+_stats = {"hits": 0, "misses": 0, "name_hits": 0, "name_misses": 0}
+_lock = threading.Lock()
+
+def _expand(tables) -> tuple:
+    expanded = []
+    for t in tables:
+        for dep in DERIVED_TABLES.get(t, (t,)):
+            if dep not in expanded:
+                expanded.append(dep)
+    return tuple(expanded)
+
+def _freeze(value):
+    """리스트 인자(예: search의 sources)도 캐시 키로 쓸 수 있게 튜플로 바꿉니다."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _copy(result):
+    """호출한 쪽이 결과를 수정해도 캐시가 오염되지 않도록 리스트/사전은 복사해서 돌려줍니다."""
+    if isinstance(result, list):
+        return [dict(r) if isinstance(r, dict) else r for r in result]
+    if isinstance(result, dict):
+        return {k: _copy(v) if isinstance(v, (list, dict)) else v for k, v in result.items()}
+    return result
+
+def cached(*tables, tables_from=None):
+    """
+    조회 함수에 붙이는 캐시 데코레이터.
+
+    Args:
+        tables: 함수가 읽는 테이블 이름들. 이 중 하나라도 쓰기가 커밋되면 캐시를 버립니다.
+        tables_from: 인자에 따라 읽는 테이블이 달라지는 경우, 인자를 받아 테이블 목록을 돌려주는 함수.
+                     (예: get_all_from_table(table_name))
+
+    사용 예:
+        @cached("Tasks", "Companies")
+        def get_tasks_by_company_name(company_name): ...
+    """
+    def decorator(fn):
+        store = OrderedDict()  # {(DB 경로, 인자): (테이블 버전, 결과)}
+        _caches.append(store)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            deps = _expand(tables_from(*args, **kwargs) if tables_from else tables)
+            if pending_writes(*deps):
+                # 현재 스레드의 트랜잭션이 커밋하지 않은 쓰기를 봐야 하고, 롤백될 수 있는 결과를 공유하면 안 되므로
+                # 캐시를 읽지도 저장하지도 않습니다.
+                return fn(*args, **kwargs)
+            key = (config.DB_PATH, _freeze(args), tuple(sorted((k, _freeze(v)) for k, v in kwargs.items())))
+            version = table_version(*deps)
+            with _lock:
+                entry = store.get(key)
+                if entry is not None and entry[0] == version:
+                    store.move_to_end(key)
+                    _stats["hits"] += 1
+                    return _copy(entry[1])
+                _stats["misses"] += 1
+            # 조회 전에 읽은 버전으로 저장하므로, 조회 도중 커밋된 쓰기가 있으면 다음 호출에서 다시 조회합니다.
+            result = fn(*args, **kwargs)
+            with _lock:
+                store[key] = (version, result)
+                store.move_to_end(key)
+                while len(store) > MAX_ENTRIES_PER_FUNCTION:
+                    store.popitem(last=False)
+            return _copy(result)
+
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
+
+# --------------------------------------------------------------------
+# 이름 -> id 캐시 (db_operations.get_or_create_*)
+# --------------------------------------------------------------------
+# add_task_transactional은 Task마다 회사/담당자/프로젝트 이름을 id로 바꾸느라 최대 6번 조회합니다.
+# 같은 고객의 Task를 반복해서 기록하는 경우가 대부분이므로 (테이블, 이름) -> id를 LRU로 기억합니다.
+# 새 이름이 추가되어도 기존 매핑은 바뀌지 않으므로, 테이블 버전 대신 이름 변경/삭제 때만 올라가는
+# name_key(테이블) 버전으로 검증합니다. 이름을 바꾸거나 지우는 쓰기는 mark_written(name_key(...))을 함께 호출해야 합니다.
+# 현재 스레드가 그 테이블에 커밋하지 않은 쓰기를 했다면 캐시를 건너뜁니다. (롤백될 수 있는 id를 공유하지 않도록)
+
+NAME_CACHE_ENTRIES = 4096
+
+_names = OrderedDict()  # {(DB 경로, 테이블, 키): (이름 버전, id)}
+
+def name_key(table: str) -> str:
+    """이름 변경/삭제 시 mark_written에 넘기는 버전 키."""
+    return f"{table}.names"
+
+def lookup_name(table: str, key) -> tuple:
+    """
+    Returns:
+        tuple: (id 또는 None, 버전). 캐시에 없으면 id가 None이며,
+               DB에서 찾은 id를 같은 버전으로 remember_name에 넘기면 됩니다. (버전이 None이면 저장하지 않음)
+    """
+    if pending_writes(table):
+        return None, None
+    version = table_version(name_key(table))
+    with _lock:
+        entry = _names.get((config.DB_PATH, table, key))
+        if entry is not None and entry[0] == version:
+            _names.move_to_end((config.DB_PATH, table, key))
+            _stats["name_hits"] += 1
+            return entry[1], version
+        _stats["name_misses"] += 1
+    return None, version
+
+def remember_name(table: str, key, row_id: int, version):
+    """lookup_name 이후 DB에서 조회한 id를 캐시에 넣습니다."""
+    if version is None:
+        return
+    with _lock:
+        _names[(config.DB_PATH, table, key)] = (version, row_id)
+        _names.move_to_end((config.DB_PATH, table, key))
+        while len(_names) > NAME_CACHE_ENTRIES:
+            _names.popitem(last=False)
+
+def clear():
+    """모든 조회 캐시와 이름 캐시를 비웁니다. (다른 프로세스가 DB를 수정한 경우 등)"""
+    with _lock:
+        for store in _caches:
+            store.clear()
+        _names.clear()
+
+def stats() -> dict:
+    """캐시 적중/미스 횟수와 보관 중인 항목 수."""
+    with _lock:
+        return dict(_stats, entries=sum(len(s) for s in _caches), name_entries=len(_names))
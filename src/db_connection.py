@@ -0,0 +1,291 @@
+# db_connection.py
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+import config
+import db_profiler
+
+# --------------------------------------------------------------------
+# 커넥션 설정
+# --------------------------------------------------------------------
+# 모든 커넥션이 생성될 때 한 번씩 적용되는 PRAGMA 목록입니다. (config.DB_STORAGE_PROFILE)
+CONNECTION_PRAGMAS = dict(config.DB_STORAGE_PROFILE)
+CONNECTION_PRAGMAS["wal_autocheckpoint"] = config.DB_WAL_AUTOCHECKPOINT
+
+# 새 커넥션을 열 때 db_schema의 미적용 마이그레이션을 자동으로 반영할지 여부
+# (프로세스에서 DB 경로별로 한 번만 시도합니다. 실패해도 스레드 / Streamlit 재실행마다 반복하지 않음)
+AUTO_MIGRATE = True
+_migrated_paths = set()
+_migrate_lock = threading.Lock()
+
+# 스레드별 커넥션 저장소 { DB 경로: sqlite3.Connection }
+# sqlite3 커넥션은 생성한 스레드에서만 사용할 수 있으므로 스레드마다 따로 보관합니다.
+_local = threading.local()
+
+# 테이블별 쓰기 버전 { (DB 경로, 테이블명): 버전 } - 프로세스 전체 공유
+# 트랜잭션이 실제로 커밋된 뒤에만 올라가므로, 조회 캐시(db_cache)는 버전이 같으면 SQL 없이 결과를 재사용할 수 있습니다.
+_table_versions = {}
+_versions_lock = threading.Lock()
+
+def _configure_connection(conn: sqlite3.Connection):
+    """새로 만든 커넥션에 PRAGMA 설정을 적용합니다."""
+    for name, value in CONNECTION_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+def checkpoint(mode: str = "PASSIVE", db_path: str = None) -> tuple:
+    """
+    WAL 내용을 DB 파일에 반영합니다.
+    mode: PASSIVE(기본, 대기 없음) / FULL / RESTART / TRUNCATE(WAL 파일을 0바이트로 비움)
+
+    Returns:
+        tuple: (busy, WAL 프레임 수, 체크포인트된 프레임 수). WAL 모드가 아니면 (0, -1, -1).
+    """
+    if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError(f"지원하지 않는 체크포인트 모드입니다: {mode}")
+    return get_connection(db_path).execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+def _maybe_checkpoint(path: str):
+    """커밋 후 WAL 파일이 설정 크기를 넘었으면 TRUNCATE 체크포인트를 시도합니다."""
+    wal_path = path + "-wal"
+    try:
+        if os.path.getsize(wal_path) < config.DB_WAL_TRUNCATE_BYTES:
+            return
+    except OSError:
+        return
+    try:
+        checkpoint("TRUNCATE", path)
+    except sqlite3.OperationalError:
+        pass  # 다른 커넥션이 읽는 중이면 다음 커밋에서 다시 시도
+
+def _connections() -> dict:
+    if not hasattr(_local, "connections"):
+        _local.connections = {}
+        _local.depth = {}
+        _local.written = {}
+        _local.retired = {}  # { DB 경로: db_profiler 전환으로 교체된 직전 커넥션 }
+    return _local.connections
+
+def _close_retired(path: str):
+    conn = _local.retired.pop(path, None)
+    if conn is not None:
+        conn.close()
+
+def _bump_versions(path: str, tables):
+    with _versions_lock:
+        for table in tables:
+            _table_versions[(path, table)] = _table_versions.get((path, table), 0) + 1
+
+def mark_written(*tables: str, db_path: str = None):
+    """
+    현재 스레드의 트랜잭션이 tables를 수정했음을 기록합니다.
+    가장 바깥 트랜잭션이 커밋될 때 해당 테이블의 버전이 올라가고, 롤백되면 기록은 버려집니다.
+    트랜잭션 밖에서 호출하면 바로 버전을 올립니다.
+    """
+    path = db_path or config.DB_PATH
+    _connections()
+    if _local.depth.get(path, 0) > 0:
+        _local.written.setdefault(path, set()).update(tables)
+    else:
+        _bump_versions(path, tables)
+
+def pending_writes(*tables: str, db_path: str = None) -> bool:
+    """현재 스레드의 열린 트랜잭션이 tables 중 하나를 수정하고 아직 커밋하지 않았으면 True."""
+    path = db_path or config.DB_PATH
+    _connections()
+    return not _local.written.get(path, set()).isdisjoint(tables)
+
+def table_version(*tables: str, db_path: str = None) -> tuple:
+    """tables 각각의 쓰기 버전을 튜플로 반환합니다. (SQL을 실행하지 않음)"""
+    path = db_path or config.DB_PATH
+    with _versions_lock:
+        return tuple(_table_versions.get((path, t), 0) for t in tables)
+
+def get_connection(db_path: str = None) -> sqlite3.Connection:
+    """
+    현재 스레드에서 재사용하는 DB 커넥션을 반환합니다.
+    - 처음 호출될 때만 connect + PRAGMA 설정을 수행하고, 이후에는 같은 커넥션을 돌려줍니다.
+      스키마 마이그레이션 확인은 프로세스에서 DB 경로별로 처음 한 번만 합니다.
+    - db_path를 생략하면 config.DB_PATH를 사용합니다.
+    - db_profiler를 켜거나 끄면, 트랜잭션 중이 아닐 때 그 설정에 맞는 새 커넥션으로 바꿉니다.
+      직전 커넥션은 이미 받아 간 커서가 남아 있을 수 있으므로 바로 닫지 않고 하나만 보관했다가,
+      다음 전환이나 close_connection()에서 닫습니다. (전환할 때마다 커넥션이 쌓이지 않음)
+    """
+    path = db_path or config.DB_PATH
+    conns = _connections()
+    conn = conns.get(path)
+    if conn is not None and isinstance(conn, db_profiler.ProfilingConnection) != db_profiler.is_enabled() \
+            and _local.depth[path] == 0:
+        _close_retired(path)
+        _local.retired[path] = conns.pop(path)
+        conn = None
+    if conn is None:
+        factory = db_profiler.ProfilingConnection if db_profiler.is_enabled() else sqlite3.Connection
+        conn = sqlite3.connect(path, factory=factory)
+        _configure_connection(conn)
+        conns[path] = conn
+        _local.depth[path] = 0
+        if AUTO_MIGRATE and path not in _migrated_paths:
+            from db_schema import apply_migrations  # db_schema가 이 모듈을 import하므로 지연 import
+            with _migrate_lock:
+                if path not in _migrated_paths:
+                    apply_migrations(conn)
+                    _migrated_paths.add(path)
+    return conn
+
+def table_exists(name: str, db_path: str = None) -> bool:
+    """테이블이 있으면 True. (마이그레이션이 적용되지 않은 이전 구조의 DB 대응용)"""
+    return get_connection(db_path).execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+@contextmanager
+def transaction(db_path: str = None):
+    """
+    쓰기 작업용 트랜잭션 컨텍스트 매니저.
+    블록이 정상 종료되면 commit, 예외가 발생하면 rollback 후 예외를 다시 던집니다.
+    중첩해서 사용하면 가장 바깥쪽 블록에서만 commit/rollback 합니다.
+
+    사용 예:
+        with transaction() as conn:
+            conn.execute("INSERT INTO ...")
+    """
+    conn = get_connection(db_path)
+    path = db_path or config.DB_PATH
+    _local.depth[path] += 1
+    try:
+        yield conn
+    except BaseException:
+        _local.depth[path] -= 1
+        if _local.depth[path] == 0:
+            conn.rollback()
+            _local.written.pop(path, None)
+        raise
+    else:
+        _local.depth[path] -= 1
+        if _local.depth[path] == 0:
+            conn.commit()
+            _bump_versions(path, _local.written.pop(path, ()))
+            _maybe_checkpoint(path)
+
+def close_connection(db_path: str = None):
+    """현재 스레드의 커넥션을 닫습니다. (DB 파일 교체, 테스트 정리용)"""
+    path = db_path or config.DB_PATH
+    conn = _connections().pop(path, None)
+    _close_retired(path)
+    if conn is not None:
+        _local.depth.pop(path, None)
+        _local.written.pop(path, None)
+        conn.close()
+
+def close_all_connections():
+    """현재 스레드가 가진 모든 커넥션을 닫습니다."""
+    for path in set(_connections()) | set(_local.retired):
+        close_connection(path)
+
+
+def _concurrency_benchmark(journal_mode: str, readers: int = 8, seconds: float = 3.0) -> dict:
+    """
+    여러 읽기 스레드와 하나의 쓰기 스레드를 동시에 돌려 처리량과 잠금 오류 수를 측정합니다.
+    임시 DB 파일을 사용하므로 실제 CRM DB에는 영향을 주지 않습니다.
+    """
+    import tempfile
+    import time
+
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, "bench.db")
+    saved = dict(CONNECTION_PRAGMAS)
+    CONNECTION_PRAGMAS["journal_mode"] = journal_mode
+    CONNECTION_PRAGMAS["busy_timeout"] = 100  # 잠금 경합이 드러나도록 짧게
+    stats = {"reads": 0, "writes": 0, "lock_errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    with transaction(path) as conn:
+        conn.execute("CREATE TABLE Bench_Tasks (task_id INTEGER PRIMARY KEY, company_id INTEGER, agenda TEXT)")
+        conn.executemany("INSERT INTO Bench_Tasks (company_id, agenda) VALUES (?, ?)",
+                         [(i % 100, f"agenda {i}") for i in range(10000)])
+
+    def reader():
+        n = errors = 0
+        while not stop.is_set():
+            try:
+                get_connection(path).execute(
+                    "SELECT COUNT(*), MAX(task_id) FROM Bench_Tasks WHERE company_id = ?", (n % 100,)
+                ).fetchone()
+                n += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        close_connection(path)
+        with lock:
+            stats["reads"] += n
+            stats["lock_errors"] += errors
+
+    def writer():
+        n = errors = 0
+        while not stop.is_set():
+            try:
+                with transaction(path) as conn:
+                    conn.execute("INSERT INTO Bench_Tasks (company_id, agenda) VALUES (?, ?)", (n % 100, "new"))
+                    conn.execute("UPDATE Bench_Tasks SET agenda = 'touched' WHERE company_id = ?", (n % 100,))
+                n += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        close_connection(path)
+        with lock:
+            stats["writes"] += n
+            stats["lock_errors"] += errors
+
+    try:
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        close_connection(path)
+        CONNECTION_PRAGMAS.clear()
+        CONNECTION_PRAGMAS.update(saved)
+
+    stats["reads_per_sec"] = stats["reads"] / seconds
+    stats["writes_per_sec"] = stats["writes"] / seconds
+    return stats
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    # 1) 호출당 지연 시간 비교: 매번 connect/close vs 스레드별 커넥션 재사용
+    import time
+
+    N = 2000
+    sql = "SELECT user_id, username, auth_level FROM Users WHERE username = ? AND is_deleted = 0"
+
+    def per_call_connect():
+        conn = sqlite3.connect(config.DB_PATH)
+        try:
+            return conn.execute(sql, ('admin',)).fetchone()
+        finally:
+            conn.close()
+
+    def pooled():
+        return get_connection().execute(sql, ('admin',)).fetchone()
+
+    print(f"--- 커넥션 벤치마크 ({N}회, DB: {config.DB_PATH}) ---")
+    for label, fn in [("connect/close 매 호출", per_call_connect), ("공유 커넥션", pooled)]:
+        fn()  # 워밍업
+        start = time.perf_counter()
+        for _ in range(N):
+            fn()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<20}: {elapsed / N * 1e6:8.1f} us/call")
+    close_all_connections()
+
+    # 2) 동시성 테스트: 읽기 8스레드 + 쓰기 1스레드, journal_mode별 비교
+    print("\n--- 동시성 벤치마크 (읽기 8 + 쓰기 1, 3초) ---")
+    for mode in ("DELETE", "WAL"):
+        r = _concurrency_benchmark(mode)
+        print(f"{mode:<7}: 읽기 {r['reads_per_sec']:9.0f}/s, 쓰기 {r['writes_per_sec']:7.0f}/s, "
+              f"잠금 오류 {r['lock_errors']}건")
@@ -1,19 +1,271 @@
-import pandas as pd
+import csv
+import io
 import os
 from datetime import datetime
+from db_connection import get_connection
+from db_queries import company_stats_sql
 
 # --- 설정: 엑셀 파일을 저장할 폴더 ---
 EXPORT_DIR = 'exports'
 
+# 한 번에 DB에서 읽어 파일에 쓰는 행 수. 메모리 사용량은 전체 행 수가 아니라 이 값에 비례합니다.
+EXPORT_BATCH_SIZE = 5000
+
+# --------------------------------------------------------------------
+# 스트리밍 내보내기 엔진
+# --------------------------------------------------------------------
+# DB 커서에서 EXPORT_BATCH_SIZE 행씩 꺼내 바로 파일에 씁니다.
+# (dict 리스트 -> DataFrame -> 파일처럼 전체 데이터를 여러 번 복사하지 않습니다)
+
+_EXPORT_QUERIES = {
+    "companies": """
+        SELECT
+            C.company_id, C.company_name, C.employee_count, C.revenue, C.website, C.nationality,{stats_columns}
+        FROM Companies C
+        {stats_join}
+        ORDER BY C.company_name
+    """,
+    "contacts": """
+        SELECT C.contact_id, CO.company_name, C.contact_name, C.department, C.position,
+               C.email, C.phone, C.mobile_phone
+        FROM Contacts C
+        JOIN Companies CO ON CO.company_id = C.company_id
+        ORDER BY CO.company_name, C.contact_name
+    """,
+    "products": "SELECT product_id, product_name, min_price, max_price FROM Products ORDER BY product_name",
+    "users": "SELECT user_id, username, user_email, auth_level, created_at FROM Users WHERE is_deleted = 0",
+    "tasks": """
+        SELECT
+            T.task_id, T.action_date, CO.company_name, C.contact_name, P.project_name,
+            U.username AS user_name, T.task_type, T.agenda, T.action_item, T.due_date,
+            T.task_status, T.priority, T.memo
+        FROM Tasks T
+        JOIN Companies CO ON CO.company_id = T.company_id
+        LEFT JOIN Users U ON U.user_id = T.user_id
+        LEFT JOIN Contacts C ON C.contact_id = T.contact_id
+        LEFT JOIN Projects P ON P.project_id = T.project_id
+        WHERE T.is_deleted = 0 {where}
+        ORDER BY T.action_date DESC, T.task_id DESC
+    """,
+    # pipeline_analytics의 일별 집계 (refresh() 후 읽습니다)
+    "pipeline_daily": """
+        SELECT D.day, D.metric, D.dim1, D.dim2, P.product_name, D.total, D.n
+        FROM Pipeline_Daily D
+        LEFT JOIN Products P
+               ON D.metric IN ('trial', 'trial_converted', 'days_trial_to_purchase', 'paid_revenue')
+              AND P.product_id = CAST(D.dim1 AS INTEGER)
+        ORDER BY D.day, D.metric, D.dim1, D.dim2
+    """,
+}
+
+def iter_batches(sql: str, params: tuple = (), batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    쿼리 결과를 batch_size 행씩 돌려주는 제너레이터.
+
+    Yields:
+        tuple: (컬럼 이름 리스트, 행 튜플 리스트)
+    """
+    c = get_connection().cursor()
+    try:
+        c.execute(sql, params)
+        columns = [d[0] for d in c.description]
+        while True:
+            rows = c.fetchmany(batch_size)
+            if not rows:
+                break
+            yield columns, rows
+    finally:
+        c.close()
+
+def write_csv(batches, out):
+    """배치를 CSV로 씁니다. out은 텍스트 파일 객체. Returns: 쓴 행 수"""
+    writer = csv.writer(out)
+    count = 0
+    header_written = False
+    for columns, rows in batches:
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+def write_xlsx(batches, path: str, sheet_name: str = "Sheet1"):
+    """
+    배치를 xlsx로 씁니다. openpyxl write-only 모드라 행을 추가하는 즉시 임시 파일로 흘려보내며,
+    시트 전체를 메모리에 올리지 않습니다. Returns: 쓴 행 수
+    """
+    from openpyxl import Workbook  # 엑셀 내보내기를 쓰지 않는 화면에서는 import하지 않습니다.
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+    count = 0
+    header_written = False
+    for columns, rows in batches:
+        if not header_written:
+            ws.append(columns)
+            header_written = True
+        for row in rows:
+            ws.append(row)
+        count += len(rows)
+    wb.save(path)
+    return count
+
+def _arrow_type(storage: set):
+    """SQLite 저장 타입(typeof) 조합 -> Parquet 타입. 정수+실수는 float64, 문자열 등이 섞이면 문자열."""
+    import pyarrow as pa
+
+    storage = storage - {"null"}
+    if storage == {"integer"}:
+        return pa.int64()
+    if storage and storage <= {"integer", "real"}:
+        return pa.float64()
+    if storage == {"blob"}:
+        return pa.binary()
+    return pa.string()
+
+def _arrow_schema(sql: str, params: tuple = ()):
+    """
+    쿼리 결과의 Parquet 스키마를 정합니다.
+    SQLite는 같은 컬럼에도 행마다 다른 타입이 들어갈 수 있고 계산 컬럼은 선언 타입이 없으므로,
+    첫 배치가 아니라 결과 전체의 저장 타입을 한 번 집계해서 정합니다. (값이 모두 NULL이면 문자열)
+    """
+    import pyarrow as pa
+
+    c = get_connection().cursor()
+    try:
+        c.execute(f"SELECT * FROM ({sql}) LIMIT 0", params)
+        columns = [d[0] for d in c.description]
+        quoted = ['"' + col.replace('"', '""') + '"' for col in columns]
+        c.execute(f"SELECT {', '.join(f'GROUP_CONCAT(DISTINCT typeof({q}))' for q in quoted)} FROM ({sql})",
+                  params)
+        storage = c.fetchone()
+    finally:
+        c.close()
+    return pa.schema([pa.field(col, _arrow_type(set((types or "").split(","))))
+                      for col, types in zip(columns, storage)])
+
+def write_parquet(batches, path: str, schema):
+    """배치마다 Parquet row group 하나로 씁니다. schema는 _arrow_schema()로 만듭니다. Returns: 쓴 행 수"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    count = 0
+    try:
+        for columns, rows in batches:
+            if writer is None:
+                writer = pq.ParquetWriter(path, schema)
+            arrays = []
+            for i, field in enumerate(schema):
+                values = [r[i] for r in rows]
+                if pa.types.is_string(field.type):
+                    values = [None if v is None else str(v) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            count += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+_WRITERS = {"csv": ".csv", "xlsx": ".xlsx", "parquet": ".parquet"}
+
+def export_query(sql: str, params: tuple = (), fmt: str = "xlsx", filename_prefix: str = "export",
+                 batch_size: int = EXPORT_BATCH_SIZE) -> str:
+    """
+    쿼리 결과를 EXPORT_DIR에 CSV / xlsx / Parquet 파일로 저장합니다.
+
+    Returns:
+        str: 저장된 파일의 전체 경로. 실패하거나 데이터가 없으면 None.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"지원하지 않는 형식입니다: {fmt}")
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(EXPORT_DIR, f"{filename_prefix}_{timestamp}{_WRITERS[fmt]}")
+
+    batches = iter_batches(sql, params, batch_size)
+    try:
+        if fmt == "csv":
+            # utf-8-sig: 엑셀에서 열어도 한글이 깨지지 않도록 BOM을 붙입니다.
+            with open(filepath, "w", newline="", encoding="utf-8-sig") as f:
+                count = write_csv(batches, f)
+        elif fmt == "xlsx":
+            count = write_xlsx(batches, filepath, sheet_name=filename_prefix[:31])
+        else:
+            count = write_parquet(batches, filepath, _arrow_schema(sql, params))
+    except Exception as e:
+        print(f"오류: 파일 저장 중 문제가 발생했습니다 - {e}")
+        return None
+
+    if count == 0:
+        print("경고: 내보낼 데이터가 없습니다.")
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return None
+    print(f"성공: {count}건이 '{filepath}' 파일로 저장되었습니다.")
+    return filepath
+
+def _companies_query() -> str:
+    """Company_Stats가 없는 이전 구조의 DB에서는 통계를 원본 테이블에서 계산합니다. (db_queries.company_stats_sql)"""
+    stats_columns, stats_join = company_stats_sql()
+    return _EXPORT_QUERIES["companies"].format(stats_columns=stats_columns, stats_join=stats_join)
+
+def _tasks_query(company_name: str = None) -> tuple:
+    if company_name:
+        return _EXPORT_QUERIES["tasks"].format(where="AND CO.company_name = ?"), (company_name,)
+    return _EXPORT_QUERIES["tasks"].format(where=""), ()
+
+def _csv_bytes(sql: str, params: tuple = ()) -> bytes:
+    buf = io.StringIO()
+    write_csv(iter_batches(sql, params), buf)
+    return buf.getvalue().encode("utf-8-sig")
+
+# --------------------------------------------------------------------
+# 화면에서 사용하는 내보내기 함수
+# --------------------------------------------------------------------
+
+def export_companies_to_excel() -> str:
+    """회사 목록(매출/진행중 Task/프로젝트 수 포함)을 엑셀 파일로 저장하고 경로를 반환합니다."""
+    return export_query(_companies_query(), fmt="xlsx", filename_prefix="companies_summary")
+
+def export_tasks(fmt: str = "xlsx", company_name: str = None) -> str:
+    """Task 목록을 파일로 저장하고 경로를 반환합니다. company_name을 주면 해당 회사의 Task만."""
+    sql, params = _tasks_query(company_name)
+    return export_query(sql, params, fmt=fmt, filename_prefix="tasks")
+
+def export_pipeline_daily(fmt: str = "xlsx") -> str:
+    """파이프라인 분석 일별 집계(지표/날짜/차원별 합계와 건수)를 파일로 저장하고 경로를 반환합니다."""
+    import pipeline_analytics  # 내보내기 전에 쌓인 변경을 반영
+    pipeline_analytics.refresh()
+    return export_query(_EXPORT_QUERIES["pipeline_daily"], fmt=fmt, filename_prefix="pipeline_daily")
+
+def export_master_data_csv(kind: str) -> bytes:
+    """
+    기준 정보를 CSV로 만들어 다운로드용 바이트로 반환합니다.
+
+    Args:
+        kind (str): 'companies' / 'contacts' / 'products' / 'users'
+    """
+    if kind not in ("companies", "contacts", "products", "users"):
+        raise ValueError(f"지원하지 않는 데이터 종류입니다: {kind}")
+    return _csv_bytes(_companies_query() if kind == "companies" else _EXPORT_QUERIES[kind])
+
+def export_tasks_csv(company_name: str = None) -> bytes:
+    """Task 목록을 CSV로 만들어 다운로드용 바이트로 반환합니다. company_name을 주면 해당 회사의 Task만."""
+    return _csv_bytes(*_tasks_query(company_name))
+
 def export_to_excel(data: list, filename_prefix: str):
     """
     데이터(딕셔너리의 리스트)를 엑셀 파일로 저장합니다.
-    
+    이미 메모리에 있는 조회 결과용이며, DB에서 바로 내보낼 때는 export_query()를 사용하세요.
+
     Args:
         data (list): db_queries에서 반환된 것과 같은 딕셔너리의 리스트.
         filename_prefix (str): 저장할 엑셀 파일 이름의 접두사.
                                (예: 'companies_summary')
-                               
+
     Returns:
         str: 저장된 파일의 전체 경로. 실패 시 None.
     """
@@ -23,23 +275,18 @@ def export_to_excel(data: list, filename_prefix: str):
 
     # 'exports' 폴더가 없으면 생성
     os.makedirs(EXPORT_DIR, exist_ok=True)
-    
+
     # 현재 시간을 포함한 동적인 파일 이름 생성
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{filename_prefix}_{timestamp}.xlsx"
     filepath = os.path.join(EXPORT_DIR, filename)
-    
+
     try:
-        # 1. 데이터를 pandas DataFrame으로 변환합니다.
-        df = pd.DataFrame(data)
-        
-        # 2. DataFrame을 엑셀 파일로 저장합니다.
-        #    index=False 옵션은 엑셀에 불필요한 순번이 적히는 것을 방지합니다.
-        df.to_excel(filepath, index=False)
-        
+        columns = list(data[0].keys())
+        write_xlsx([(columns, [tuple(d.get(k) for k in columns) for d in data])], filepath)
         print(f"성공: 데이터가 '{filepath}' 파일로 저장되었습니다.")
         return filepath
-        
+
     except Exception as e:
         print(f"오류: 엑셀 파일 저장 중 문제가 발생했습니다 - {e}")
         return None
@@ -52,6 +299,66 @@ if __name__ == '__main__':
         {'id': 2, 'name': '퀄컴', 'task_count': 5},
         {'id': 3, 'name': '인텔', 'task_count': 8}
     ]
-    
+
     print("--- 엑셀 내보내기 기능 테스트 ---")
-    export_to_excel(sample_data, 'test_export')
\ No newline at end of file
+    export_to_excel(sample_data, 'test_export')
+
+    # --- 스트리밍 내보내기 벤치마크: 임시 DB의 Task 5만 건 ---
+    import shutil
+    import tempfile
+    import time
+    import tracemalloc
+    import config
+    from db_connection import transaction, close_connection
+    from db_schema import initialize_database
+
+    N = 50_000
+    tmp_dir = tempfile.mkdtemp()
+    saved_path, saved_dir = config.DB_PATH, EXPORT_DIR
+    config.DB_PATH = os.path.join(tmp_dir, "bench.db")
+    EXPORT_DIR = os.path.join(tmp_dir, "exports")
+    try:
+        initialize_database(config.DB_PATH)
+        with transaction() as conn:
+            conn.execute("INSERT INTO Users (username, password_hash) VALUES ('bench', 'x')")
+            conn.executemany("INSERT INTO Companies (company_name, nationality) VALUES (?, 'KOR')",
+                         [(f"회사{i}",) for i in range(200)])
+            conn.executemany(
+                "INSERT INTO Tasks (company_id, user_id, action_date, task_type, agenda, action_item) "
+                "VALUES (?, 1, ?, 'contact', ?, ?)",
+                [(i % 200 + 1, f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"의제 {i}", f"다음 행동 {i}")
+                 for i in range(N)])
+
+        # tracemalloc이 켜져 있으면 모든 할당을 추적하므로 시간은 실제보다 길게 나옵니다. (상대 비교용)
+        print(f"\n--- Task {N:,}건 내보내기 (시간 / Python 최대 메모리) ---")
+
+        def measure(label, fn):
+            tracemalloc.start()
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{label:<28}: {elapsed:6.2f}초, {peak / 1024 / 1024:7.1f} MB")
+
+        try:
+            import pandas as pd
+
+            def pandas_xlsx():
+                sql, params = _tasks_query()
+                c = get_connection().cursor()
+                c.execute(sql, params)
+                cols = [d[0] for d in c.description]
+                data = [dict(zip(cols, r)) for r in c.fetchall()]
+                pd.DataFrame(data).to_excel(os.path.join(EXPORT_DIR, "pandas.xlsx"), index=False)
+
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            measure("이전 방식 (dict -> DataFrame)", pandas_xlsx)
+        except ImportError:
+            pass
+        for fmt in ("csv", "xlsx", "parquet"):
+            measure(f"스트리밍 {fmt}", lambda: export_tasks(fmt))
+    finally:
+        close_connection()
+        config.DB_PATH, EXPORT_DIR = saved_path, saved_dir
+        shutil.rmtree(tmp_dir, ignore_errors=True)
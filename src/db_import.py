@@ -0,0 +1,429 @@
+import csv
+import functools
+import os
+import sqlite3
+import time
+from datetime import date, datetime
+from db_connection import get_connection, transaction, mark_written
+
+# 한 트랜잭션에서 처리하는 행 수
+IMPORT_CHUNK_SIZE = 10000
+
+# --------------------------------------------------------------------
+# 일괄 가져오기 (CSV / xlsx)
+# --------------------------------------------------------------------
+# add_company / add_contact / add_task_transactional을 행마다 호출하면 행마다 이름 조회와 커밋이 일어납니다.
+# 여기서는 파일을 스트리밍으로 읽어 IMPORT_CHUNK_SIZE 행씩 묶고,
+#   1) 회사/담당자/프로젝트/직원 이름 -> id 사전을 처음 한 번만 DB에서 읽어 메모리에서 찾고
+#   2) 사전에 없는 이름만 묶어서 새로 만든 뒤
+#   3) 본 데이터를 executemany로 한 트랜잭션에 넣습니다.
+# 검증에 실패한 행은 건너뛰고 (행 번호, 사유, 원본 값)을 결과에 담아 돌려줍니다.
+#
+# 처리량 (python db_import.py bench, Task 10만 행 CSV, 회사 500 / 담당자 5,000 / 프로젝트 1,000을 새로 생성):
+#   add_task_transactional 행 단위 : 약 2,000 ~ 2,500 rows/s
+#   import_tasks 일괄            : 약 11,000 rows/s (변경 저널 트리거 추가 전 12,000 ~ 14,500)
+# 일괄 처리 시간의 대부분은 Tasks 트리거(Tasks_FTS 색인, Company_Stats 갱신, Change_Journal 기록)입니다.
+# FTS/Company_Stats 트리거를 빼고 재면 약 40,000 rows/s이지만, 파생 테이블 일관성을 위해 트리거는 그대로 둡니다.
+
+_MAX_SQL_PARAMS = 900  # IN (...) 목록 한 번에 넣는 최대 개수 (SQLite 변수 개수 제한 이내)
+
+def iter_rows(path: str):
+    """
+    CSV / xlsx 파일을 한 행씩 읽어 {컬럼명: 값} 사전으로 돌려주는 제너레이터.
+    첫 행은 헤더로 사용합니다. 엑셀은 read-only 모드로 열어 전체 시트를 메모리에 올리지 않습니다.
+
+    Yields:
+        tuple: (파일상의 행 번호, 사전)
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+    elif ext in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook  # 엑셀 파일을 가져올 때만 import
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else "" for h in next(rows, [])]
+            for line_no, values in enumerate(rows, start=2):
+                if all(v is None for v in values):
+                    continue
+                yield line_no, dict(zip(header, values))
+        finally:
+            wb.close()
+    else:
+        raise ValueError(f"지원하지 않는 파일 형식입니다: {path} (.csv / .xlsx)")
+
+def _chunks(rows, size: int):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# --- 값 변환 (실패 시 ValueError -> 해당 행 거부) ---
+
+def _text(row: dict, key: str):
+    value = row.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _required(row: dict, key: str) -> str:
+    value = _text(row, key)
+    if value is None:
+        raise ValueError(f"'{key}' 값이 비어 있습니다")
+    return value
+
+def _int(row: dict, key: str, allowed=None):
+    value = row.get(key)
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        raise ValueError(f"'{key}' 값이 숫자가 아닙니다: {value!r}")
+    if allowed is not None and number not in allowed:
+        raise ValueError(f"'{key}' 값이 허용 범위({sorted(allowed)})를 벗어났습니다: {number}")
+    return number
+
+def _date(row: dict, key: str):
+    value = row.get(key)
+    if value is None or str(value).strip() == "":
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    normalized = _normalize_date(str(value).strip()[:10])
+    if normalized is None:
+        raise ValueError(f"'{key}' 날짜 형식이 올바르지 않습니다 (YYYY-MM-DD): {value!r}")
+    return normalized
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_date(text: str):
+    # 같은 날짜가 수없이 반복되므로 strptime 결과를 기억해 둡니다.
+    try:
+        return datetime.strptime(text.replace("/", "-").replace(".", "-"), "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+# --- 이름 -> id 사전 ---
+
+class _NameMaps:
+    """가져오기 한 번 동안 사용하는 이름 -> id 사전. 처음 한 번만 DB에서 읽습니다."""
+
+    def __init__(self, conn):
+        self.companies = dict(conn.execute("SELECT company_name, company_id FROM Companies"))
+        # 이름 중복(UNIQUE 인덱스 적용 전의 기존 데이터)이 있으면 get_or_create_*와 같이 가장 작은 id를 씁니다.
+        self.contacts = {(cid, name): pk for pk, cid, name in
+                         conn.execute("SELECT contact_id, company_id, contact_name FROM Contacts "
+                                      "ORDER BY contact_id DESC")}
+        self.projects = {(cid, name): pk for pk, cid, name in
+                         conn.execute("SELECT project_id, company_id, project_name FROM Projects "
+                                      "ORDER BY project_id DESC")}
+        self.users = dict(conn.execute("SELECT username, user_id FROM Users WHERE is_deleted = 0"))
+        self.user_ids = set(self.users.values())
+        self.added = []  # 현재 트랜잭션에서 사전에 추가한 (사전, 키). 롤백되면 discard_added()로 되돌립니다.
+
+    def discard_added(self):
+        """롤백으로 취소된 새 이름을 사전에서 뺍니다. (사전 전체를 다시 읽지 않도록)"""
+        for mapping, key in self.added:
+            mapping.pop(key, None)
+        self.added.clear()
+
+    def ensure_companies(self, c, names):
+        """사전에 없는 회사들을 한 번에 만들고 사전에 추가합니다."""
+        missing = sorted({n for n in names if n and n not in self.companies})
+        if not missing:
+            return
+        c.executemany("INSERT OR IGNORE INTO Companies (company_name, nationality) VALUES (?, 'KOR')",
+                      [(n,) for n in missing])
+        for i in range(0, len(missing), _MAX_SQL_PARAMS):
+            part = missing[i:i + _MAX_SQL_PARAMS]
+            c.execute(f"SELECT company_name, company_id FROM Companies "
+                      f"WHERE company_name IN ({','.join('?' * len(part))})", part)
+            self.companies.update(c.fetchall())
+        self.added.extend((self.companies, n) for n in missing)
+        mark_written("Companies")
+
+    def _ensure_children(self, c, table, name_col, mapping, keys):
+        missing = sorted({k for k in keys if k[1] and k not in mapping})
+        if not missing:
+            return
+        for company_id, name in missing:
+            # lastrowid가 필요하므로 executemany 대신 같은 커서로 연속 실행합니다. (새 이름 수만큼만 실행)
+            c.execute(f"INSERT INTO {table} (company_id, {name_col}) VALUES (?, ?)", (company_id, name))
+            mapping[(company_id, name)] = c.lastrowid
+            self.added.append((mapping, (company_id, name)))
+        mark_written(table)
+
+    def ensure_contacts(self, c, keys):
+        self._ensure_children(c, "Contacts", "contact_name", self.contacts, keys)
+
+    def ensure_projects(self, c, keys):
+        self._ensure_children(c, "Projects", "project_name", self.projects, keys)
+
+# --- 공통 실행 루프 ---
+
+def _run_import(path: str, parse, write, chunk_size: int) -> dict:
+    """
+    파일을 chunk_size 행씩 parse(행) -> write(커서, 사전, 파싱된 행 목록) 합니다.
+    한 묶음을 한 트랜잭션으로 커밋하고, 묶음 안에서 제약조건 오류가 나면 그 묶음만 한 행씩 다시 넣어
+    문제 행을 찾아냅니다.
+    """
+    start = time.perf_counter()
+    result = {'inserted': 0, 'rejected': 0, 'rejects': []}
+    maps = _NameMaps(get_connection())
+
+    def reject(line_no, raw, reason):
+        result['rejected'] += 1
+        result['rejects'].append({'row': line_no, 'reason': reason, 'data': raw})
+
+    for chunk in _chunks(iter_rows(path), chunk_size):
+        parsed = []
+        for line_no, raw in chunk:
+            try:
+                parsed.append((line_no, raw, parse(raw, maps)))
+            except ValueError as e:
+                reject(line_no, raw, str(e))
+        if not parsed:
+            continue
+        maps.added.clear()
+        try:
+            with transaction() as conn:
+                write(conn.cursor(), maps, [p[2] for p in parsed])
+            result['inserted'] += len(parsed)
+        except sqlite3.IntegrityError:
+            # 롤백으로 이번 묶음에서 새로 만든 이름도 취소되었으므로 사전에서 빼고 한 행씩 처리합니다.
+            maps.discard_added()
+            for line_no, raw, values in parsed:
+                maps.added.clear()
+                try:
+                    with transaction() as conn:
+                        write(conn.cursor(), maps, [values])
+                    result['inserted'] += 1
+                except sqlite3.IntegrityError as e:
+                    maps.discard_added()
+                    reject(line_no, raw, f"DB 제약조건 위반: {e}")
+
+    result['seconds'] = time.perf_counter() - start
+    total = result['inserted'] + result['rejected']
+    result['rows_per_sec'] = total / result['seconds'] if result['seconds'] > 0 else 0.0
+    return result
+
+def write_rejects(result: dict, path: str):
+    """거부된 행을 원본 컬럼 + 행 번호/사유 컬럼의 CSV로 저장합니다. (수정 후 다시 가져오기용)"""
+    if not result['rejects']:
+        return
+    columns = []
+    for r in result['rejects']:
+        columns.extend(k for k in r['data'] if k not in columns)
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(["_row", "_reason"] + columns)
+        for r in result['rejects']:
+            writer.writerow([r['row'], r['reason']] + [r['data'].get(k) for k in columns])
+
+# --------------------------------------------------------------------
+# 가져오기 함수
+# --------------------------------------------------------------------
+
+def import_companies(path: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    회사 목록을 가져옵니다.
+    컬럼: company_name(필수), employee_count, revenue, overview, website, nationality
+
+    Returns:
+        dict: {'inserted', 'rejected', 'rejects': [{'row', 'reason', 'data'}], 'seconds', 'rows_per_sec'}
+    """
+    seen = set()
+
+    def parse(row, maps):
+        name = _required(row, "company_name")
+        if name in maps.companies or name in seen:
+            raise ValueError(f"이미 등록된 회사입니다: {name}")
+        seen.add(name)
+        return (name, _int(row, "employee_count"), _int(row, "revenue"), _text(row, "overview"),
+                _text(row, "website"), (_text(row, "nationality") or "KOR").upper())
+
+    def write(c, maps, rows):
+        mark_written("Companies")
+        c.executemany("""
+            INSERT INTO Companies
+            (company_name, employee_count, revenue, overview, website, nationality)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    return _run_import(path, parse, write, chunk_size)
+
+def import_contacts(path: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    담당자 목록을 가져옵니다. 회사가 없으면 새로 만듭니다.
+    컬럼: company_name(필수), contact_name(필수), department, position, email, phone, mobile_phone
+    """
+    def parse(row, maps):
+        return (_required(row, "company_name"), _required(row, "contact_name"), _text(row, "department"),
+                _text(row, "position"), _text(row, "email"), _text(row, "phone"), _text(row, "mobile_phone"))
+
+    def write(c, maps, rows):
+        maps.ensure_companies(c, [r[0] for r in rows])
+        mark_written("Contacts")
+        c.executemany("""
+            INSERT INTO Contacts
+            (company_id, contact_name, department, position, email, phone, mobile_phone)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(maps.companies[r[0]],) + r[1:] for r in rows])
+
+    return _run_import(path, parse, write, chunk_size)
+
+def import_tasks(path: str, default_user_id: int = None, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    Task 목록을 가져옵니다. 회사/담당자/프로젝트가 없으면 새로 만듭니다. (add_task_transactional과 같은 규칙)
+    컬럼: company_name(필수), action_date(필수), user_name 또는 default_user_id(필수),
+          contact_name, project_name, task_type(기본 'contact'), agenda, action_item, due_date,
+          task_status(0/1), priority(0/1/2), memo
+    db_export.export_tasks()로 내보낸 파일을 그대로 가져올 수 있습니다.
+    """
+    def parse(row, maps):
+        user_name = _text(row, "user_name")
+        if user_name:
+            if user_name not in maps.users:
+                raise ValueError(f"등록되지 않은 직원입니다: {user_name}")
+            user_id = maps.users[user_name]
+        elif default_user_id is not None:
+            # foreign_keys가 꺼져 있어 DB가 막아주지 않으므로 직접 확인합니다.
+            if default_user_id not in maps.user_ids:
+                raise ValueError(f"등록되지 않은 직원 id입니다: {default_user_id}")
+            user_id = default_user_id
+        else:
+            raise ValueError("'user_name' 값이 비어 있습니다")
+        action_date = _date(row, "action_date")
+        if action_date is None:
+            raise ValueError("'action_date' 값이 비어 있습니다")
+        status = _int(row, "task_status", allowed={0, 1})
+        priority = _int(row, "priority", allowed={0, 1, 2})
+        return (_required(row, "company_name"), _text(row, "contact_name"), _text(row, "project_name"),
+                user_id, action_date, _text(row, "agenda"), _text(row, "action_item"), _date(row, "due_date"),
+                0 if status is None else status, _text(row, "task_type") or "contact",
+                1 if priority is None else priority, _text(row, "memo"))
+
+    def write(c, maps, rows):
+        maps.ensure_companies(c, [r[0] for r in rows])
+        maps.ensure_contacts(c, [(maps.companies[r[0]], r[1]) for r in rows])
+        maps.ensure_projects(c, [(maps.companies[r[0]], r[2]) for r in rows])
+        mark_written("Tasks")
+        values = []
+        for company, contact, project, *rest in rows:
+            company_id = maps.companies[company]
+            values.append((company_id,
+                           maps.contacts.get((company_id, contact)) if contact else None,
+                           maps.projects.get((company_id, project)) if project else None,
+                           *rest))
+        c.executemany("""
+            INSERT INTO Tasks
+            (company_id, contact_id, project_id, user_id, action_date, agenda, action_item,
+             due_date, task_status, task_type, priority, memo)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, values)
+
+    return _run_import(path, parse, write, chunk_size)
+
+
+def _benchmark(n: int = 100_000, sample: int = 5_000):
+    """Task n행 CSV 가져오기 처리량 측정 (방식마다 새 임시 DB 사용). 행 단위 방식은 앞 sample행만 잽니다."""
+    import random
+    import shutil
+    import tempfile
+    from itertools import islice
+    import config
+    import db_operations as ops
+    from db_connection import close_connection
+    from db_schema import initialize_database
+
+    random.seed(0)
+    tmp_dir = tempfile.mkdtemp()
+    saved_path = config.DB_PATH
+
+    def fresh_db(name):
+        close_connection()
+        config.DB_PATH = os.path.join(tmp_dir, name)
+        initialize_database(config.DB_PATH)
+        ops.add_user("bench", "x")
+
+    try:
+        csv_path = os.path.join(tmp_dir, "tasks.csv")
+        with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.writer(f)
+            w.writerow(["company_name", "contact_name", "project_name", "user_name", "action_date",
+                        "task_type", "agenda", "action_item", "task_status", "priority"])
+            for i in range(n):
+                co = random.randrange(500)
+                w.writerow([f"회사{co}", f"담당자{co}-{random.randrange(10)}", f"프로젝트{co}-{random.randrange(2)}",
+                            "bench", f"2025-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+                            "contact", f"의제 {i}", f"다음 행동 {i}", random.randint(0, 1), random.randint(0, 2)])
+            w.writerow(["", "", "", "bench", "2025-01-01", "contact", "", "", 0, 1])        # 회사명 없음
+            w.writerow(["회사1", "", "", "bench", "2025-13-01", "contact", "", "", 0, 1])   # 잘못된 날짜
+            w.writerow(["회사1", "", "", "nobody", "2025-01-01", "contact", "", "", 0, 1])  # 없는 직원
+            w.writerow(["회사1", "", "", "bench", "2025-01-01", "contact", "", "", 0, 5])   # 우선순위 범위 밖
+
+        print(f"--- Task {n:,}행 CSV 가져오기 ---")
+        fresh_db("per_row.db")
+        start = time.perf_counter()
+        for _, row in islice(iter_rows(csv_path), sample):
+            ops.add_task_transactional(user_id=1, company_name=row["company_name"],
+                                       action_date=row["action_date"], contact_name=row["contact_name"],
+                                       project_name=row["project_name"], agenda=row["agenda"],
+                                       action_item=row["action_item"], task_type=row["task_type"],
+                                       task_status=int(row["task_status"]), priority=int(row["priority"]))
+        per_row = sample / (time.perf_counter() - start)
+        print(f"add_task_transactional 행 단위 ({sample:,}행): {per_row:10,.0f} rows/s")
+
+        fresh_db("bulk.db")
+        result = import_tasks(csv_path)
+        print(f"import_tasks 일괄 ({result['inserted']:,}행)   : {result['rows_per_sec']:10,.0f} rows/s "
+              f"({result['seconds']:.1f}초)")
+        print(f"거부된 행 {result['rejected']}건:")
+        for r in result['rejects']:
+            print(f"  {r['row']}행: {r['reason']}")
+    finally:
+        close_connection()
+        config.DB_PATH = saved_path
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CSV / xlsx 파일을 일괄로 DB에 가져옵니다.")
+    parser.add_argument("kind", choices=["companies", "contacts", "tasks", "bench"],
+                        help="가져올 데이터 종류 (bench: 10만 행 처리량 측정)")
+    parser.add_argument("path", nargs="?", help=".csv / .xlsx 파일 경로")
+    parser.add_argument("--user-id", type=int, default=None,
+                        help="tasks: user_name 컬럼이 비어 있을 때 사용할 직원 ID")
+    parser.add_argument("--rejects", default=None, help="거부된 행을 저장할 CSV 경로")
+    args = parser.parse_args()
+
+    if args.kind == "bench":
+        _benchmark()
+    else:
+        if not args.path:
+            parser.error("가져올 파일 경로를 입력하세요.")
+        if args.kind == "companies":
+            result = import_companies(args.path)
+        elif args.kind == "contacts":
+            result = import_contacts(args.path)
+        else:
+            result = import_tasks(args.path, default_user_id=args.user_id)
+        print(f"완료: 등록 {result['inserted']:,}건, 거부 {result['rejected']:,}건 "
+              f"({result['seconds']:.1f}초, {result['rows_per_sec']:,.0f} rows/s)")
+        for r in result['rejects'][:20]:
+            print(f"  {r['row']}행: {r['reason']}")
+        if args.rejects:
+            write_rejects(result, args.rejects)
+            print(f"거부된 행을 '{args.rejects}'에 저장했습니다.")
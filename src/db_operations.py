@@ -1,83 +1,97 @@
 import sqlite3
-from config import DB_PATH # config 파일에서 DB 경로를 가져옴
 from typing import Optional, List, Dict
+from db_connection import get_connection, transaction, mark_written
+import db_cache
 
 # --------------------------------------------------------------------
 # Helper Functions (Get or Create relational links)
 # --------------------------------------------------------------------
 def get_or_create_company(cursor, company_name: str) -> int:
+    cached_id, version = db_cache.lookup_name("Companies", company_name)
+    if cached_id is not None:
+        return cached_id
     cursor.execute("SELECT company_id FROM Companies WHERE company_name = ?", (company_name,))
     r = cursor.fetchone()
     if r:
+        db_cache.remember_name("Companies", company_name, r[0], version)
         return r[0]
-    cursor.execute("INSERT INTO Companies (company_name) VALUES (?)", (company_name,))
+    cursor.execute("INSERT INTO Companies (company_name, nationality) VALUES (?, 'KOR')", (company_name,))
+    mark_written("Companies")
     return cursor.lastrowid
 
 def get_or_create_contact(cursor, company_id: int, contact_name: str) -> int | None:
     if not contact_name:
         return None
+    cached_id, version = db_cache.lookup_name("Contacts", (company_id, contact_name))
+    if cached_id is not None:
+        return cached_id
     cursor.execute(
-        "SELECT contact_id FROM Contacts WHERE company_id = ? AND contact_name = ?",
+        "SELECT contact_id FROM Contacts WHERE company_id = ? AND contact_name = ? ORDER BY contact_id LIMIT 1",
         (company_id, contact_name)
     )
     r = cursor.fetchone()
     if r:
+        db_cache.remember_name("Contacts", (company_id, contact_name), r[0], version)
         return r[0]
     cursor.execute(
         "INSERT INTO Contacts (company_id, contact_name) VALUES (?, ?)",
         (company_id, contact_name)
     )
+    mark_written("Contacts")
     return cursor.lastrowid
 
 def get_or_create_project(cursor, company_id: int, project_name: str) -> int | None:
     """
     company_id와 project_name 조합으로 프로젝트를 조회하고,
     없으면 최소 정보로 새로 생성한 뒤 project_id를 리턴합니다.
+    조회 결과는 db_cache의 이름 캐시에 보관됩니다.
     """
     if not project_name:
         return None
+    cached_id, version = db_cache.lookup_name("Projects", (company_id, project_name))
+    if cached_id is not None:
+        return cached_id
     cursor.execute(
-        "SELECT project_id FROM Projects WHERE company_id = ? AND project_name = ?",
+        "SELECT project_id FROM Projects WHERE company_id = ? AND project_name = ? ORDER BY project_id LIMIT 1",
         (company_id, project_name)
     )
     r = cursor.fetchone()
     if r:
+        db_cache.remember_name("Projects", (company_id, project_name), r[0], version)
         return r[0]
     cursor.execute(
         "INSERT INTO Projects (company_id, project_name) VALUES (?, ?)",
         (company_id, project_name)
     )
+    mark_written("Projects")
     return cursor.lastrowid
 
 # --------------------------------------------------------------------
 # Master Data CRUD
 # --------------------------------------------------------------------
 def add_user(username: str, password_hash: str, user_email: str = None, auth_level: int = 0) -> int:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
     try:
-        c.execute(
-            "INSERT INTO Users (username, password_hash, user_email, auth_level) VALUES (?, ?, ?, ?)",
-            (username, password_hash, user_email, auth_level)
-        )
-        conn.commit()
+        with transaction() as conn:
+            mark_written("Users")
+            c = conn.cursor()
+            c.execute(
+                "INSERT INTO Users (username, password_hash, user_email, auth_level) VALUES (?, ?, ?, ?)",
+                (username, password_hash, user_email, auth_level)
+            )
         return c.lastrowid
     except sqlite3.IntegrityError:
         return None
-    finally:
-        conn.close()
 
 def update_user(user_id: int, username: str, password_hash: str, user_email: str) -> bool:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    try:
+    with transaction() as conn:
+        mark_written("Users")
+        c = conn.cursor()
         c.execute("""
             UPDATE Users
                SET username = ?, password_hash = ?, user_email = ?, updated_at = CURRENT_TIMESTAMP
              WHERE user_id = ?
         """, (username, password_hash, user_email, user_id))
-        conn.commit()
-        return c.rowcount == 1
-    finally:
-        conn.close()
+    return c.rowcount == 1
 
 def add_company(company_name: str,
                 employee_count: int = None,
@@ -85,19 +99,18 @@ def add_company(company_name: str,
                 overview: str = None,
                 website: str = None,
                 nationality: str = None) -> int:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
     try:
-        c.execute("""
-            INSERT INTO Companies
-            (company_name, employee_count, revenue, overview, website, nationality)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (company_name, employee_count, revenue, overview, website, nationality))
-        conn.commit()
+        with transaction() as conn:
+            mark_written("Companies")
+            c = conn.cursor()
+            c.execute("""
+                INSERT INTO Companies
+                (company_name, employee_count, revenue, overview, website, nationality)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (company_name, employee_count, revenue, overview, website, nationality))
         return c.lastrowid
     except sqlite3.IntegrityError:
         return None
-    finally:
-        conn.close()
 
 def update_company(company_id: int,
                    company_name: str,
@@ -106,8 +119,9 @@ def update_company(company_id: int,
                    overview: str,
                    website: str,
                    nationality: str) -> bool:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    try:
+    with transaction() as conn:
+        mark_written("Companies", db_cache.name_key("Companies"))
+        c = conn.cursor()
         c.execute("""
             UPDATE Companies
                SET company_name = ?, employee_count = ?, revenue = ?,
@@ -115,10 +129,7 @@ def update_company(company_id: int,
                    updated_at = CURRENT_TIMESTAMP
              WHERE company_id = ?
         """, (company_name, employee_count, revenue, overview, website, nationality, company_id))
-        conn.commit()
-        return c.rowcount == 1
-    finally:
-        conn.close()
+    return c.rowcount == 1
 
 def add_contact(company_id: int,
                 contact_name: str,
@@ -127,19 +138,18 @@ def add_contact(company_id: int,
                 email: str = None,
                 phone: str = None,
                 mobile_phone: str = None) -> int:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
     try:
-        c.execute("""
-            INSERT INTO Contacts
-            (company_id, contact_name, department, position, email, phone, mobile_phone)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (company_id, contact_name, department, position, email, phone, mobile_phone))
-        conn.commit()
+        with transaction() as conn:
+            mark_written("Contacts")
+            c = conn.cursor()
+            c.execute("""
+                INSERT INTO Contacts
+                (company_id, contact_name, department, position, email, phone, mobile_phone)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (company_id, contact_name, department, position, email, phone, mobile_phone))
         return c.lastrowid
     except sqlite3.IntegrityError:
         return None
-    finally:
-        conn.close()
 
 def update_contact(contact_id: int,
                    company_id: int,
@@ -149,8 +159,9 @@ def update_contact(contact_id: int,
                    email: str,
                    phone: str,
                    mobile_phone: str) -> bool:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    try:
+    with transaction() as conn:
+        mark_written("Contacts", db_cache.name_key("Contacts"))
+        c = conn.cursor()
         c.execute("""
             UPDATE Contacts
                SET company_id = ?, contact_name = ?, department = ?,
@@ -158,43 +169,37 @@ def update_contact(contact_id: int,
                    updated_at = CURRENT_TIMESTAMP
              WHERE contact_id = ?
         """, (company_id, contact_name, department, position, email, phone, mobile_phone, contact_id))
-        conn.commit()
-        return c.rowcount == 1
-    finally:
-        conn.close()
+    return c.rowcount == 1
 
 def add_product(product_name: str,
                 min_price: float = None,
                 max_price: float = None) -> int:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
     try:
-        c.execute(
-            "INSERT INTO Products (product_name, min_price, max_price) VALUES (?, ?, ?)",
-            (product_name, min_price, max_price)
-        )
-        conn.commit()
+        with transaction() as conn:
+            mark_written("Products")
+            c = conn.cursor()
+            c.execute(
+                "INSERT INTO Products (product_name, min_price, max_price) VALUES (?, ?, ?)",
+                (product_name, min_price, max_price)
+            )
         return c.lastrowid
     except sqlite3.IntegrityError:
         return None
-    finally:
-        conn.close()
 
 def update_product(product_id: int,
                    product_name: str,
                    min_price: float,
                    max_price: float) -> bool:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    try:
+    with transaction() as conn:
+        mark_written("Products")
+        c = conn.cursor()
         c.execute("""
             UPDATE Products
                SET product_name = ?, min_price = ?, max_price = ?,
                    updated_at = CURRENT_TIMESTAMP
              WHERE product_id = ?
         """, (product_name, min_price, max_price, product_id))
-        conn.commit()
-        return c.rowcount == 1
-    finally:
-        conn.close()
+    return c.rowcount == 1
 
 # --------------------------------------------------------------------
 # Task CRUD
@@ -214,8 +219,9 @@ def add_task_transactional(
     memo: str = None,
     invoice_id: int = None,
 ) -> int:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    try:
+    with transaction() as conn:
+        mark_written("Tasks")
+        c = conn.cursor()
         comp_id = get_or_create_company(c, company_name)
         cont_id = get_or_create_contact(c, comp_id, contact_name)
         proj_id = get_or_create_project(c, comp_id, project_name)
@@ -231,10 +237,7 @@ def add_task_transactional(
             action_date, agenda, action_item, due_date,
             task_status, task_type, priority, memo,
         ))
-        conn.commit()
-        return c.lastrowid
-    finally:
-        conn.close()
+    return c.lastrowid
         
 ALLOWED_TASK_FIELDS = {
     "company_id","contact_id","project_id","invoice_id",
@@ -251,22 +254,19 @@ def update_task(task_id: int, **fields) -> bool:
     if not fields:
         return False
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    try:
-        cols = ", ".join(f"{k}=?" for k in fields)
-        vals = list(fields.values()) + [task_id]
-        sql = f"""
-            UPDATE Tasks
-               SET {cols},
-                   updated_at = CURRENT_TIMESTAMP
-             WHERE task_id = ?
-        """
+    cols = ", ".join(f"{k}=?" for k in fields)
+    vals = list(fields.values()) + [task_id]
+    sql = f"""
+        UPDATE Tasks
+           SET {cols},
+               updated_at = CURRENT_TIMESTAMP
+         WHERE task_id = ?
+    """
+    with transaction() as conn:
+        mark_written("Tasks")
+        c = conn.cursor()
         c.execute(sql, vals)
-        conn.commit()
-        return c.rowcount == 1
-    finally:
-        conn.close()
+    return c.rowcount == 1
 
 def delete_task(task_id: int, soft: bool = True) -> bool:
     """
@@ -274,9 +274,9 @@ def delete_task(task_id: int, soft: bool = True) -> bool:
       soft=True  : is_deleted=1, updated_at 갱신
       soft=False : 레코드 완전 삭제
     """
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    try:
+    with transaction() as conn:
+        mark_written("Tasks")
+        c = conn.cursor()
         if soft:
             c.execute("""
                 UPDATE Tasks
@@ -286,41 +286,50 @@ def delete_task(task_id: int, soft: bool = True) -> bool:
             """, (task_id,))
         else:
             c.execute("DELETE FROM Tasks WHERE task_id = ?", (task_id,))
-        conn.commit()
-        return c.rowcount == 1
-    finally:
-        conn.close()
+    return c.rowcount == 1
 
 def get_task(task_id: int) -> Optional[Dict]:
     """
     단일 Task를 dict로 반환 (없으면 None).
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    try:
-        c.execute("SELECT * FROM Tasks WHERE task_id = ?", (task_id,))
-        row = c.fetchone()
-        return dict(row) if row else None
-    finally:
-        conn.close()
+    c = get_connection().cursor()
+    c.row_factory = sqlite3.Row
+    c.execute("SELECT * FROM Tasks WHERE task_id = ?", (task_id,))
+    row = c.fetchone()
+    return dict(row) if row else None
 
 def list_tasks(include_deleted: bool = False) -> List[Dict]:
     """
     모든 Task 리스트를 반환.
     include_deleted=False일 때 is_deleted=0만 리턴.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    try:
-        if include_deleted:
-            c.execute("SELECT * FROM Tasks")
-        else:
-            c.execute("SELECT * FROM Tasks WHERE is_deleted = 0")
-        return [dict(r) for r in c.fetchall()]
-    finally:
-        conn.close()
+    c = get_connection().cursor()
+    c.row_factory = sqlite3.Row
+    if include_deleted:
+        c.execute("SELECT * FROM Tasks")
+    else:
+        c.execute("SELECT * FROM Tasks WHERE is_deleted = 0")
+    return [dict(r) for r in c.fetchall()]
+
+def iter_tasks(include_deleted: bool = False, batch_size: int = 1000):
+    """
+    list_tasks()와 같은 Task들을 task_id 순으로 batch_size건씩 나눠 읽어 한 건씩 돌려주는 제너레이터.
+    전체 목록을 한 번에 메모리에 올리지 않으며, 각 배치는 직전 배치의 마지막 task_id 다음부터 읽습니다.
+    """
+    where = "" if include_deleted else "AND is_deleted = 0"
+    last_id = 0
+    while True:
+        c = get_connection().cursor()
+        c.row_factory = sqlite3.Row
+        c.execute(f"SELECT * FROM Tasks WHERE task_id > ? {where} ORDER BY task_id LIMIT ?",
+                  (last_id, batch_size))
+        rows = c.fetchall()
+        c.close()
+        for r in rows:
+            yield dict(r)
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]['task_id']
 
 # --------------------------------------------------------------------
 # Project Operations
@@ -337,8 +346,9 @@ def add_project(company_id: int,
                 status: str = None,
                 phase: int = 0,
                 memo: str = None) -> int:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    try:
+    with transaction() as conn:
+        mark_written("Projects")
+        c = conn.cursor()
         c.execute("""
             INSERT INTO Projects
             (company_id, project_name, contact_id, description,
@@ -348,19 +358,15 @@ def add_project(company_id: int,
         """, (company_id, project_name, contact_id, description,
               application, ai_model, requirement,
               start_date, end_date, status, phase, memo))
-        conn.commit()
-        return c.lastrowid
-    finally:
-        conn.close()
+    return c.lastrowid
 
 def link_task_to_project(task_id: int, project_id: int) -> bool:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    c.execute("UPDATE Tasks SET project_id = ?, updated_at = CURRENT_TIMESTAMP WHERE task_id = ?",
-              (project_id, task_id))
-    conn.commit()
-    success = c.rowcount == 1
-    conn.close()
-    return success
+    with transaction() as conn:
+        mark_written("Tasks")
+        c = conn.cursor()
+        c.execute("UPDATE Tasks SET project_id = ?, updated_at = CURRENT_TIMESTAMP WHERE task_id = ?",
+                  (project_id, task_id))
+    return c.rowcount == 1
 
 # --------------------------------------------------------------------
 # Invoice Operations
@@ -373,8 +379,9 @@ def add_invoice(project_id: int,
                 due_date: str = None,
                 status: int = 0,
                 total_amount: float = None) -> int:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    try:
+    with transaction() as conn:
+        mark_written("Invoices")
+        c = conn.cursor()
         c.execute("""
             INSERT INTO Invoices
             (project_id, company_id, contact_id, user_id,
@@ -382,26 +389,22 @@ def add_invoice(project_id: int,
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (project_id, company_id, contact_id, user_id,
               issue_date, due_date, status, total_amount))
-        conn.commit()
-        return c.lastrowid
-    finally:
-        conn.close()
+    return c.lastrowid
 
 def add_invoice_item(invoice_id: int,
                      product_id: int,
                      quantity: int,
                      unit_price_at_sale: float) -> int:
     subtotal = quantity * unit_price_at_sale
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    c.execute("""
-        INSERT INTO Invoice_Items
-        (invoice_id, product_id, quantity, unit_price_at_sale, subtotal)
-        VALUES (?, ?, ?, ?, ?)
-    """, (invoice_id, product_id, quantity, unit_price_at_sale, subtotal))
-    conn.commit()
-    last = c.lastrowid
-    conn.close()
-    return last
+    with transaction() as conn:
+        mark_written("Invoice_Items")
+        c = conn.cursor()
+        c.execute("""
+            INSERT INTO Invoice_Items
+            (invoice_id, product_id, quantity, unit_price_at_sale, subtotal)
+            VALUES (?, ?, ?, ?, ?)
+        """, (invoice_id, product_id, quantity, unit_price_at_sale, subtotal))
+    return c.lastrowid
 
 # --------------------------------------------------------------------
 # Free Trial Operations
@@ -411,17 +414,14 @@ def add_free_trial(task_id: int,
                    product_id: int,
                    start_date: str = None,
                    end_date: str = None) -> bool:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    try:
-        c.execute("""
+    with transaction() as conn:
+        mark_written("Free_Trials")
+        conn.execute("""
             INSERT INTO Free_Trials
             (task_id, project_id, product_id, start_date, end_date)
             VALUES (?, ?, ?, ?, ?)
         """, (task_id, project_id, product_id, start_date, end_date))
-        conn.commit()
-        return True
-    finally:
-        conn.close()
+    return True
 
 # --------------------------------------------------------------------
 # Tech Inquiry Operations
@@ -432,14 +432,11 @@ def add_tech_inquiry(task_id: int,
                      application: str = None,
                      ai_model: str = None,
                      is_resolved: int = 0) -> bool:
-    conn = sqlite3.connect(DB_PATH); c = conn.cursor()
-    try:
-        c.execute("""
+    with transaction() as conn:
+        mark_written("Tech_Inquiries")
+        conn.execute("""
             INSERT INTO Tech_Inquiries
             (task_id, project_id, product_id, application, ai_model, is_resolved)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (task_id, project_id, product_id, application, ai_model, is_resolved))
-        conn.commit()
-        return True
-    finally:
-        conn.close()
+    return True
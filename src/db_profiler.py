@@ -0,0 +1,334 @@
+# db_profiler.py
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import config
+
+# --------------------------------------------------------------------
+# 쿼리 프로파일러 (느린 쿼리 로그)
+# --------------------------------------------------------------------
+# enable()을 호출하면 db_connection이 이후 새로 여는 커넥션(각 스레드에서 트랜잭션 밖일 때 교체)을
+# ProfilingConnection으로 만들고, 모든 SQL 문장에 대해 다음을 기록합니다.
+#   - 실행 + 결과를 다 읽을 때까지의 시간 (SQLite는 fetch할 때 실제로 실행하므로 둘을 합산)
+#   - 돌려준 행 수 (INSERT/UPDATE/DELETE는 영향받은 행 수)
+#   - SQL을 실행한 함수 (예: db_queries.get_tasks_by_user, 커넥션 설정 PRAGMA는 db_connection._configure_connection)
+# config.DB_SLOW_QUERY_MS 이상 걸린 문장은 느린 쿼리 로그에 EXPLAIN QUERY PLAN과 함께 남기고,
+# config.DB_SLOW_QUERY_LOG_PATH가 있으면 JSON Lines로도 추가합니다.
+# 꺼져 있을 때는 일반 sqlite3.Connection을 쓰므로 비용이 없습니다. 켜져 있으면 행마다 파이썬 호출이 하나 늘어
+# 큰 결과를 행 단위로 읽는 조회가 느려질 수 있습니다. (python db_profiler.py 참고)
+# 켜기/끄기와 통계는 프로세스 전체(모든 스레드/세션) 공유입니다. Streamlit은 Debug Mode를 켠 세션이
+# request()로 켜고, 그런 세션이 모두 release()해야 꺼집니다. (Debug Mode인 채로 닫힌 세션이 있으면 켜진 채 남음)
+
+# 통계에 보관하는 서로 다른 (문장, 호출자) 최대 개수 (넘으면 '(기타)'로 합산)
+MAX_STATEMENTS = 2000
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_enabled = config.DB_PROFILING
+_threshold_ms = config.DB_SLOW_QUERY_MS
+_lock = threading.Lock()
+_stats = {}  # {(정규화된 SQL, 호출자): [호출 수, 총 ms, 최대 ms, 행 수]}
+_slow = deque(maxlen=config.DB_SLOW_QUERY_LOG_SIZE)
+_plans = {}  # {정규화된 SQL: EXPLAIN QUERY PLAN 텍스트}
+_requesters = set()  # request()로 프로파일링을 켜 둔 곳 (예: Debug Mode를 켠 Streamlit 세션)
+
+def _normalize(sql: str) -> str:
+    return " ".join(sql.split())
+
+def _caller() -> str:
+    f = sys._getframe(2)
+    while f is not None and f.f_globals.get("__name__") == __name__:
+        f = f.f_back
+    if f is None:
+        return "(알 수 없음)"
+    return f"{f.f_globals.get('__name__')}.{f.f_code.co_name}"
+
+def _explain(conn, sql: str, params) -> str:
+    """EXPLAIN QUERY PLAN 결과를 들여쓰기한 텍스트로. 같은 문장은 한 번만 실행합니다."""
+    key = _normalize(sql)
+    if key in _plans:
+        return _plans[key]
+    if params is None or not key.upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except sqlite3.Error as e:
+        return f"(EXPLAIN 실패: {e})"
+    depth, lines = {0: -1}, []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    plan = "\n".join(lines) or None  # 단순 INSERT 등은 플랜이 없음
+    with _lock:
+        if len(_plans) < MAX_STATEMENTS:
+            _plans[key] = plan
+    return plan
+
+def _record(conn, sql: str, params, caller: str, elapsed_ms: float, rows: int):
+    key = (_normalize(sql), caller)
+    with _lock:
+        entry = _stats.get(key)
+        if entry is None:
+            if len(_stats) >= MAX_STATEMENTS:
+                key = ("(기타)", "(기타)")
+            entry = _stats.setdefault(key, [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += elapsed_ms
+        entry[2] = max(entry[2], elapsed_ms)
+        entry[3] += rows
+    if elapsed_ms < _threshold_ms:
+        return
+    slow = {'at': time.strftime("%Y-%m-%d %H:%M:%S"), 'ms': round(elapsed_ms, 2), 'rows': rows,
+            'caller': caller, 'sql': _normalize(sql), 'plan': _explain(conn, sql, params)}
+    with _lock:
+        _slow.append(slow)
+    if config.DB_SLOW_QUERY_LOG_PATH:
+        try:
+            with open(config.DB_SLOW_QUERY_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(slow, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"느린 쿼리 로그 기록 실패: {e}")
+
+class ProfilingCursor(sqlite3.Cursor):
+    """실행부터 결과를 다 읽을(또는 다시 실행/닫을) 때까지의 시간과 행 수를 기록하는 커서."""
+    _current = None  # [sql, params, caller, 누적 ms, 행 수]
+
+    def _finish(self):
+        current, self._current = self._current, None
+        if current is not None:
+            _record(self.connection, *current)
+
+    def _run(self, method, sql, params, many: bool):
+        self._finish()
+        caller = _caller()
+        start = time.perf_counter()
+        try:
+            method(sql, params)
+        finally:
+            self._current = [sql, None if many else params, caller, (time.perf_counter() - start) * 1000, 0]
+        if self.description is None:  # 결과 행이 없는 문장
+            self._current[4] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters, many=False)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters, many=True)
+
+    def _fetched(self, start: float, n: int, done: bool):
+        if self._current is not None:
+            self._current[3] += (time.perf_counter() - start) * 1000
+            self._current[4] += n
+            if done:
+                self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(start, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class ProfilingConnection(sqlite3.Connection):
+    """모든 커서를 ProfilingCursor로 만드는 커넥션 (conn.execute() 단축 호출 포함)."""
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+# --------------------------------------------------------------------
+# 켜기 / 끄기 / 조회
+# --------------------------------------------------------------------
+
+def is_enabled() -> bool:
+    return _enabled
+
+def enable(threshold_ms: float = None):
+    """프로파일링을 켭니다. threshold_ms를 주면 느린 쿼리 기준도 바꿉니다."""
+    global _enabled, _threshold_ms
+    if threshold_ms is not None:
+        _threshold_ms = threshold_ms
+    _enabled = True
+
+def disable():
+    """프로파일링을 끕니다. (모은 통계는 reset() 전까지 남아 있음)"""
+    global _enabled
+    _enabled = False
+
+def request(owner):
+    """
+    owner(예: Streamlit 세션 id)가 프로파일링을 켭니다.
+    프로파일링은 프로세스 전체 설정이므로, 여러 곳이 켜 두면 release()로 마지막 요청이 빠질 때만 꺼집니다.
+    """
+    with _lock:
+        _requesters.add(owner)
+        enable()
+
+def release(owner):
+    """owner의 request()를 거둡니다. 켜 둔 곳이 더 없으면 끕니다. (request()하지 않은 owner는 무시)"""
+    with _lock:
+        if owner not in _requesters:
+            return
+        _requesters.discard(owner)
+        if not _requesters:
+            disable()
+
+@contextmanager
+def profiling(threshold_ms: float = None):
+    """with 블록 안에서만 프로파일링을 켭니다. (원래 상태와 기준으로 되돌림)"""
+    global _enabled, _threshold_ms
+    saved = (_enabled, _threshold_ms)
+    enable(threshold_ms)
+    try:
+        yield
+    finally:
+        _enabled, _threshold_ms = saved
+
+def reset():
+    """통계, 느린 쿼리 로그, 저장된 쿼리 플랜을 비웁니다."""
+    with _lock:
+        _stats.clear()
+        _slow.clear()
+        _plans.clear()
+
+def top_queries(n: int = 10, by: str = "total_ms") -> list:
+    """
+    (문장, 호출자)별 통계를 by 기준 내림차순으로 n개.
+
+    Args:
+        by (str): 'total_ms' / 'max_ms' / 'avg_ms' / 'calls' / 'rows'
+
+    Returns:
+        list: {'sql', 'caller', 'calls', 'total_ms', 'avg_ms', 'max_ms', 'rows'} 리스트
+    """
+    if by not in ("total_ms", "max_ms", "avg_ms", "calls", "rows"):
+        raise ValueError(f"지원하지 않는 정렬 기준입니다: {by}")
+    with _lock:
+        items = list(_stats.items())
+    result = [{'sql': sql, 'caller': caller, 'calls': calls, 'total_ms': round(total, 2),
+               'avg_ms': round(total / calls, 2), 'max_ms': round(peak, 2), 'rows': rows}
+              for (sql, caller), (calls, total, peak, rows) in items]
+    result.sort(key=lambda r: r[by], reverse=True)
+    return result[:n]
+
+def top_callers(n: int = 10) -> list:
+    """호출 함수별 합계 (총 시간 내림차순): {'caller', 'calls', 'statements', 'total_ms', 'rows'}"""
+    callers = {}
+    with _lock:
+        for (_, caller), (calls, total, _, rows) in _stats.items():
+            c = callers.setdefault(caller, {'caller': caller, 'calls': 0, 'statements': 0, 'total_ms': 0.0, 'rows': 0})
+            c['calls'] += calls
+            c['statements'] += 1
+            c['total_ms'] += total
+            c['rows'] += rows
+    result = sorted(callers.values(), key=lambda c: c['total_ms'], reverse=True)[:n]
+    for c in result:
+        c['total_ms'] = round(c['total_ms'], 2)
+    return result
+
+def slow_queries(n: int = None) -> list:
+    """느린 쿼리 로그 (최근 것부터): {'at', 'ms', 'rows', 'caller', 'sql', 'plan'}"""
+    with _lock:
+        entries = list(_slow)
+    entries.reverse()
+    return entries if n is None else entries[:n]
+
+def slow_threshold_ms() -> float:
+    return _threshold_ms
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    # 합성 데이터(Task 1만 건)로 조회 몇 가지를 실행하고 상위 쿼리/느린 쿼리와 프로파일링 비용을 출력합니다.
+    import os
+    import shutil
+    import tempfile
+    import db_cache
+    import db_queries
+    import db_profiler as profiler  # db_connection이 import한 것과 같은 모듈 객체를 써야 함
+    import synthetic_data
+    from db_connection import get_connection, close_connection
+
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, "profile.db")
+    saved_path = config.DB_PATH
+    try:
+        synthetic_data.generate(path, scale=0.01)
+        config.DB_PATH = path
+        company = get_connection().execute("SELECT company_name FROM Companies ORDER BY company_id").fetchone()[0]
+
+        def workload():
+            db_cache.clear()
+            db_queries.get_tasks_by_company_name(company)
+            db_queries.get_all_companies_summary()
+            db_queries.get_tasks_page(task_status=0)
+            db_queries.get_incomplete_tasks()
+            db_queries.search("YOLOv8")
+
+        with profiler.profiling(threshold_ms=5):
+            workload()
+        print("\n--- 상위 쿼리 (총 시간) ---")
+        for r in profiler.top_queries(5):
+            print(f"{r['total_ms']:9.2f} ms  {r['calls']:3}회 {r['rows']:7}행  {r['caller']:<45} {r['sql'][:60]}")
+        print("\n--- 느린 쿼리 ---")
+        for s in profiler.slow_queries(3):
+            print(f"{s['ms']:9.2f} ms  {s['caller']}\n{s['plan']}\n")
+
+        # 비용: 같은 조회를 프로파일링 없이 / 켜고 실행
+        close_connection(path)
+        for label, enabled in (("끔", False), ("켬", True)):
+            (profiler.enable if enabled else profiler.disable)()
+            close_connection(path)
+            start = time.perf_counter()
+            for _ in range(3):
+                workload()
+            print(f"프로파일링 {label}: {(time.perf_counter() - start) / 3 * 1000:8.1f} ms/회")
+        profiler.disable()
+    finally:
+        close_connection(path)
+        config.DB_PATH = saved_path
+        shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -1,7 +1,8 @@
 # db_queries.py
 
-import sqlite3
-from config import DB_PATH
+import re
+from db_connection import get_connection, table_exists
+from db_cache import cached
 
 def _dict_factory(cursor, row):
     """
@@ -12,10 +13,40 @@ def _dict_factory(cursor, row):
         d[col[0]] = row[idx]
     return d
 
+# 회사별 통계 컬럼: 트리거로 유지되는 Company_Stats(마이그레이션 v1, db_schema 참고)에서 읽습니다.
+# 마이그레이션이 적용되지 않은 이전 구조의 DB에는 Company_Stats가 없으므로, 원본 테이블을 회사마다 서브쿼리로 집계합니다.
+_COMPANY_STATS_COLUMNS = """
+                COALESCE(S.total_revenue, 0)         AS total_revenue,
+                COALESCE(S.active_tasks_count, 0)    AS active_tasks_count,
+                COALESCE(S.active_projects_count, 0) AS active_projects_count"""
+_COMPANY_STATS_JOIN = "LEFT JOIN Company_Stats S ON S.company_id = C.company_id"
+_COMPANY_STATS_FALLBACK_COLUMNS = """
+                COALESCE((SELECT SUM(I.total_amount)
+                         FROM Invoices I
+                         WHERE I.company_id = C.company_id AND I.status = 2), 0) AS total_revenue,
+                (SELECT COUNT(task_id)
+                 FROM Tasks
+                 WHERE company_id = C.company_id AND task_status = 0) AS active_tasks_count,
+                (SELECT COUNT(project_id)
+                 FROM Projects
+                 WHERE company_id = C.company_id AND status = 'active') AS active_projects_count"""
+
+def company_stats_sql() -> tuple:
+    """
+    회사 목록 조회(별칭 C = Companies)에 붙일 통계 컬럼과 JOIN 절.
+
+    Returns:
+        tuple: (SELECT 컬럼 SQL, JOIN SQL). Company_Stats가 없으면 JOIN SQL은 빈 문자열.
+    """
+    if table_exists("Company_Stats"):
+        return _COMPANY_STATS_COLUMNS, _COMPANY_STATS_JOIN
+    return _COMPANY_STATS_FALLBACK_COLUMNS, ""
+
 # --------------------------------------------------------------------
 # 고급 조회 함수 (여러 테이블 JOIN 및 분석용)
 # --------------------------------------------------------------------
 
+@cached("Tasks", "Users", "Companies", "Contacts")
 def get_tasks_by_company_name(company_name: str) -> list:
     """
     특정 회사 이름으로 해당 회사의 모든 Task 기록을 시간순으로 조회합니다.
@@ -27,9 +58,8 @@ def get_tasks_by_company_name(company_name: str) -> list:
     Returns:
         list: 각 Task 정보를 담은 사전(dict)의 리스트. 정보가 없으면 빈 리스트.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory # 조회 결과를 dict로 받기 위한 설정
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory # 조회 결과를 dict로 받기 위한 설정
     
     try:
         # 먼저 회사 이름으로 company_id를 찾습니다.
@@ -70,8 +100,9 @@ def get_tasks_by_company_name(company_name: str) -> list:
         return tasks
         
     finally:
-        conn.close()
+        c.close()
 
+@cached("Companies", "Company_Stats")
 def get_all_companies_summary() -> list:
     """
     모든 회사의 목록과 각 회사에 연결된 매출, 진행중인 Task 수, 프로젝트 수를 함께 조회합니다.
@@ -79,28 +110,20 @@ def get_all_companies_summary() -> list:
     Returns:
         list: 각 회사 정보를 담은 사전(dict)의 리스트.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
     
     try:
-        # 서브쿼리를 사용하여 각 회사별 통계를 계산합니다.
-        sql = """
+        # Companies를 이름 인덱스 순서로 한 번 훑고, 통계는 Company_Stats에서 기본키로 바로 찾습니다.
+        stats_columns, stats_join = company_stats_sql()
+        sql = f"""
             SELECT
                 C.company_id,
                 C.company_name,
-                C.website,
-                COALESCE((SELECT SUM(I.total_amount) 
-                         FROM Invoices I 
-                         WHERE I.company_id = C.company_id AND I.status = 2), 0) AS total_revenue,
-                (SELECT COUNT(task_id) 
-                 FROM Tasks 
-                 WHERE company_id = C.company_id AND task_status = 0) AS active_tasks_count,
-                (SELECT COUNT(project_id) 
-                 FROM Projects 
-                 WHERE company_id = C.company_id AND status = 'active') AS active_projects_count
+                C.website,{stats_columns}
             FROM
                 Companies C
+            {stats_join}
             ORDER BY
                 C.company_name ASC
         """
@@ -108,12 +131,178 @@ def get_all_companies_summary() -> list:
         companies = c.fetchall()
         return companies
     finally:
-        conn.close()
+        c.close()
+
+# --------------------------------------------------------------------
+# 페이지 단위 조회 (키셋 페이지네이션)
+# --------------------------------------------------------------------
+# OFFSET은 건너뛸 행을 매번 모두 읽으므로 뒤 페이지일수록 느려집니다.
+# 대신 직전 페이지 마지막 행의 정렬 키(cursor)보다 뒤에 있는 행만 인덱스에서 바로 찾아 읽습니다.
+# - Task: (action_date, task_id) -> idx_tasks_action_date / idx_tasks_company_date / idx_tasks_user_date
+#   (task_id는 rowid이므로 모든 인덱스의 끝에 이미 포함되어 있습니다)
+# - 회사: (company_name, company_id) -> company_name UNIQUE 인덱스
+
+COUNT_ESTIMATE_CAP = 10000  # 전체 건수를 셀 때 이 이상은 세지 않고 'N건 이상'으로 표시
+
+def _task_filters(company_name=None, user_id=None, task_status=None, task_type=None,
+                  date_from=None, date_to=None, include_deleted=False) -> tuple:
+    """Task 목록 필터를 WHERE 조건 목록과 파라미터로 변환합니다. (모두 SQL에서 처리)"""
+    where, params = [], []
+    if company_name:
+        where.append("T.company_id = (SELECT company_id FROM Companies WHERE company_name = ?)")
+        params.append(company_name)
+    if user_id is not None:
+        where.append("T.user_id = ?")
+        params.append(user_id)
+    if task_status is not None:
+        where.append("T.task_status = ?")
+        params.append(task_status)
+    if task_type:
+        where.append("T.task_type = ?")
+        params.append(task_type)
+    if date_from:
+        where.append("T.action_date >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("T.action_date <= ?")
+        params.append(date_to)
+    if not include_deleted:
+        where.append("T.is_deleted = 0")
+    return where, params
+
+@cached("Tasks", "Users", "Companies", "Contacts")
+def get_tasks_page(cursor: tuple = None, limit: int = 50, descending: bool = True, **filters) -> dict:
+    """
+    Task 목록을 (action_date, task_id) 순서로 한 페이지씩 조회합니다.
+
+    Args:
+        cursor (tuple): 직전 페이지의 next_cursor. None이면 첫 페이지.
+        limit (int): 페이지 크기.
+        descending (bool): True면 최신순, False면 오래된 순.
+        filters: company_name, user_id, task_status, task_type, date_from, date_to, include_deleted
+
+    Returns:
+        dict: {'rows': Task 사전 리스트, 'next_cursor': 다음 페이지 cursor (마지막 페이지면 None)}
+    """
+    where, params = _task_filters(**filters)
+    op, order = ("<", "DESC") if descending else (">", "ASC")
+    if cursor is not None:
+        where.append(f"(T.action_date, T.task_id) {op} (?, ?)")
+        params.extend(cursor)
+
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
+    try:
+        # 다음 페이지가 있는지 알기 위해 한 행을 더 읽습니다.
+        sql = f"""
+            SELECT
+                T.task_id,
+                T.action_date,
+                T.agenda,
+                T.action_item,
+                T.due_date,
+                T.task_status,
+                T.task_type,
+                T.priority,
+                U.username AS user_name,
+                CO.company_name,
+                C.contact_name
+            FROM
+                Tasks T
+            JOIN
+                Users U ON T.user_id = U.user_id
+            JOIN
+                Companies CO ON T.company_id = CO.company_id
+            LEFT JOIN
+                Contacts C ON T.contact_id = C.contact_id
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY
+                T.action_date {order}, T.task_id {order}
+            LIMIT ?
+        """
+        c.execute(sql, params + [limit + 1])
+        rows = c.fetchall()
+    finally:
+        c.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1]['action_date'], rows[-1]['task_id'])
+    return {'rows': rows, 'next_cursor': next_cursor}
+
+@cached("Tasks", "Companies")
+def count_tasks(cap: int = COUNT_ESTIMATE_CAP, **filters) -> tuple:
+    """
+    필터에 맞는 Task 수를 셉니다. cap건까지만 세므로 Task가 아주 많아도 빠르게 끝납니다.
+
+    Returns:
+        tuple: (건수, 정확한 값인지 여부). cap을 넘으면 (cap, False).
+    """
+    where, params = _task_filters(**filters)
+    sql = f"""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM Tasks T {"WHERE " + " AND ".join(where) if where else ""} LIMIT ?
+        )
+    """
+    n = get_connection().execute(sql, params + [cap + 1]).fetchone()[0]
+    return (cap, False) if n > cap else (n, True)
+
+@cached("Companies", "Company_Stats")
+def get_companies_page(cursor: tuple = None, limit: int = 50, name_prefix: str = None) -> dict:
+    """
+    회사 목록(매출/진행중 Task/프로젝트 수 포함)을 이름순으로 한 페이지씩 조회합니다.
+
+    Args:
+        cursor (tuple): 직전 페이지의 next_cursor. None이면 첫 페이지.
+        limit (int): 페이지 크기.
+        name_prefix (str): 회사명 접두어 필터.
+
+    Returns:
+        dict: {'rows': 회사 사전 리스트, 'next_cursor': 다음 페이지 cursor (마지막 페이지면 None)}
+    """
+    where, params = [], []
+    if name_prefix:
+        # LIKE 대신 범위 조건을 써야 company_name 인덱스를 탑니다.
+        where.append("C.company_name >= ? AND C.company_name < ?")
+        params.extend([name_prefix, name_prefix + "\U0010ffff"])
+    if cursor is not None:
+        where.append("(C.company_name, C.company_id) > (?, ?)")
+        params.extend(cursor)
+
+    stats_columns, stats_join = company_stats_sql()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
+    try:
+        sql = f"""
+            SELECT
+                C.company_id,
+                C.company_name,
+                C.website,{stats_columns}
+            FROM
+                Companies C
+            {stats_join}
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY
+                C.company_name ASC, C.company_id ASC
+            LIMIT ?
+        """
+        c.execute(sql, params + [limit + 1])
+        rows = c.fetchall()
+    finally:
+        c.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1]['company_name'], rows[-1]['company_id'])
+    return {'rows': rows, 'next_cursor': next_cursor}
 
 # --------------------------------------------------------------------
 # 기본적인 전체 테이블 조회 함수 (디버깅 및 기본 UI 구성용)
 # --------------------------------------------------------------------
 
+@cached("Contacts", "Companies")
 def get_contacts_by_company_name(company_name: str) -> list:
     """
     특정 회사의 모든 담당자 목록을 조회합니다.
@@ -124,9 +313,8 @@ def get_contacts_by_company_name(company_name: str) -> list:
     Returns:
         list: 담당자 정보를 담은 사전(dict)의 리스트.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
     
     try:
         sql = """
@@ -149,8 +337,9 @@ def get_contacts_by_company_name(company_name: str) -> list:
         c.execute(sql, (company_name,))
         return c.fetchall()
     finally:
-        conn.close()
+        c.close()
 
+@cached("Projects", "Companies")
 def get_projects_by_company_name(company_name: str) -> list:
     """
     특정 회사의 모든 프로젝트 목록을 조회합니다.
@@ -161,9 +350,8 @@ def get_projects_by_company_name(company_name: str) -> list:
     Returns:
         list: 프로젝트 정보를 담은 사전(dict)의 리스트.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
     
     try:
         sql = """
@@ -172,8 +360,7 @@ def get_projects_by_company_name(company_name: str) -> list:
                 P.project_name,
                 P.start_date,
                 P.end_date,
-                P.project_status,
-                P.budget,
+                P.status AS project_status,
                 CO.company_name
             FROM 
                 Projects P
@@ -187,8 +374,9 @@ def get_projects_by_company_name(company_name: str) -> list:
         c.execute(sql, (company_name,))
         return c.fetchall()
     finally:
-        conn.close()
+        c.close()
 
+@cached("Projects", "Companies", "Project_Participants", "Contacts")
 def get_project_details_with_participants(project_id: int) -> dict:
     """
     특정 프로젝트의 상세 정보와 참여자 목록을 조회합니다.
@@ -199,9 +387,8 @@ def get_project_details_with_participants(project_id: int) -> dict:
     Returns:
         dict: 프로젝트 정보와 참여자 목록을 포함한 사전.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
     
     try:
         # 프로젝트 기본 정보 조회
@@ -225,14 +412,14 @@ def get_project_details_with_participants(project_id: int) -> dict:
         # 프로젝트 참여자 조회
         participants_sql = """
             SELECT 
-                PP.participant_id,
+                PP.contact_id,
                 PP.role,
-                U.username,
-                U.email
+                C.contact_name,
+                C.email
             FROM 
                 Project_Participants PP
             JOIN 
-                Users U ON PP.user_id = U.user_id
+                Contacts C ON PP.contact_id = C.contact_id
             WHERE 
                 PP.project_id = ?
             ORDER BY 
@@ -246,8 +433,9 @@ def get_project_details_with_participants(project_id: int) -> dict:
             'participants': participants
         }
     finally:
-        conn.close()
+        c.close()
 
+@cached("Invoices", "Companies", "Invoice_Items", "Products")
 def get_invoice_details_with_items(invoice_id: int) -> dict:
     """
     특정 인보이스의 상세 정보와 항목 목록을 조회합니다.
@@ -258,9 +446,8 @@ def get_invoice_details_with_items(invoice_id: int) -> dict:
     Returns:
         dict: 인보이스 정보와 항목 목록을 포함한 사전.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
     
     try:
         # 인보이스 기본 정보 조회
@@ -303,8 +490,9 @@ def get_invoice_details_with_items(invoice_id: int) -> dict:
             'items': items
         }
     finally:
-        conn.close()
+        c.close()
 
+@cached("Tasks", "Users", "Companies", "Contacts")
 def get_tasks_by_date_range(start_date: str, end_date: str) -> list:
     """
     특정 기간의 Task 목록을 조회합니다.
@@ -316,9 +504,8 @@ def get_tasks_by_date_range(start_date: str, end_date: str) -> list:
     Returns:
         list: Task 정보를 담은 사전(dict)의 리스트.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
     
     try:
         sql = """
@@ -348,8 +535,9 @@ def get_tasks_by_date_range(start_date: str, end_date: str) -> list:
         c.execute(sql, (start_date, end_date))
         return c.fetchall()
     finally:
-        conn.close()
+        c.close()
 
+@cached("Tasks", "Users", "Companies", "Contacts")
 def get_tasks_by_user(user_id: int) -> list:
     """
     특정 사용자의 모든 Task 목록을 조회합니다.
@@ -360,9 +548,8 @@ def get_tasks_by_user(user_id: int) -> list:
     Returns:
         list: Task 정보를 담은 사전(dict)의 리스트.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
     
     try:
         sql = """
@@ -392,8 +579,9 @@ def get_tasks_by_user(user_id: int) -> list:
         c.execute(sql, (user_id,))
         return c.fetchall()
     finally:
-        conn.close()
+        c.close()
 
+@cached("Tasks", "Users", "Companies", "Contacts")
 def get_incomplete_tasks() -> list:
     """
     미완료 상태의 모든 Task 목록을 조회합니다.
@@ -401,9 +589,8 @@ def get_incomplete_tasks() -> list:
     Returns:
         list: 미완료 Task 정보를 담은 사전(dict)의 리스트.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
     
     try:
         sql = """
@@ -435,11 +622,31 @@ def get_incomplete_tasks() -> list:
         c.execute(sql)
         return c.fetchall()
     finally:
-        conn.close()
+        c.close()
+
+# --------------------------------------------------------------------
+# 전문 검색 (FTS5, db_schema.FTS_TABLES 참고)
+# --------------------------------------------------------------------
 
+# trigram 토크나이저는 3글자 미만의 검색어를 MATCH로 찾지 못하므로, 이 경우 LIKE로 대신 검색합니다.
+_TRIGRAM_MIN_CHARS = 3
+
+def _fts_phrase(term: str) -> str:
+    """검색어를 FTS5 구문 문자열로 감쌉니다. (따옴표, 연산자 등 특수문자로 인한 구문 오류 방지)"""
+    return '"' + term.replace('"', '""') + '"'
+
+def _highlight(text: str, terms: list, open_mark: str, close_mark: str) -> str:
+    """LIKE 검색 결과처럼 snippet() 강조가 없는 텍스트에 검색어 강조 표시를 붙입니다."""
+    if not text:
+        return text
+    pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+    return pattern.sub(lambda m: f"{open_mark}{m.group(0)}{close_mark}", text)
+
+@cached("Contacts", "Companies")
 def search_contacts(search_term: str) -> list:
     """
     담당자 이름, 이메일, 전화번호로 검색합니다.
+    3글자 이상이면 Contacts_FTS 전문 인덱스를, 그보다 짧으면 LIKE 검색을 사용합니다.
     
     Args:
         search_term (str): 검색어.
@@ -447,36 +654,153 @@ def search_contacts(search_term: str) -> list:
     Returns:
         list: 검색된 담당자 정보를 담은 사전(dict)의 리스트.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
+    search_term = search_term.strip()
     
     try:
-        sql = """
-            SELECT 
-                C.contact_id,
-                C.contact_name,
-                C.position,
-                C.email,
-                C.phone,
-                CO.company_name
-            FROM 
-                Contacts C
-            JOIN 
-                Companies CO ON C.company_id = CO.company_id
-            WHERE 
-                C.contact_name LIKE ? OR
-                C.email LIKE ? OR
-                C.phone LIKE ?
-            ORDER BY 
-                C.contact_name ASC
-        """
-        search_pattern = f"%{search_term}%"
-        c.execute(sql, (search_pattern, search_pattern, search_pattern))
+        if len(search_term) >= _TRIGRAM_MIN_CHARS:
+            sql = """
+                SELECT 
+                    C.contact_id,
+                    C.contact_name,
+                    C.position,
+                    C.email,
+                    C.phone,
+                    CO.company_name
+                FROM 
+                    Contacts_FTS
+                JOIN 
+                    Contacts C ON C.contact_id = Contacts_FTS.rowid
+                JOIN 
+                    Companies CO ON C.company_id = CO.company_id
+                WHERE 
+                    Contacts_FTS MATCH ?
+                ORDER BY 
+                    C.contact_name ASC
+            """
+            c.execute(sql, ("{contact_name email phone} : " + _fts_phrase(search_term),))
+        else:
+            sql = """
+                SELECT 
+                    C.contact_id,
+                    C.contact_name,
+                    C.position,
+                    C.email,
+                    C.phone,
+                    CO.company_name
+                FROM 
+                    Contacts C
+                JOIN 
+                    Companies CO ON C.company_id = CO.company_id
+                WHERE 
+                    C.contact_name LIKE ? OR
+                    C.email LIKE ? OR
+                    C.phone LIKE ?
+                ORDER BY 
+                    C.contact_name ASC
+            """
+            search_pattern = f"%{search_term}%"
+            c.execute(sql, (search_pattern, search_pattern, search_pattern))
         return c.fetchall()
     finally:
-        conn.close()
+        c.close()
+
+# 통합 검색 대상: { source: (FTS 테이블, 검색 컬럼, SELECT 문) }
+# SELECT 문의 {snippet}/{rank}/{where}는 search()에서 MATCH 또는 LIKE 방식에 맞게 채웁니다.
+_SEARCH_SOURCES = {
+    "contact": ("Contacts_FTS",
+                ["contact_name", "department", "position", "email", "phone", "mobile_phone"], """
+        SELECT 'contact' AS source, C.contact_id AS id, C.contact_name AS title,
+               CO.company_name, {snippet} AS snippet, {rank} AS rank
+          FROM Contacts_FTS
+          JOIN Contacts C ON C.contact_id = Contacts_FTS.rowid
+          LEFT JOIN Companies CO ON CO.company_id = C.company_id
+         WHERE {where} AND C.is_deleted = 0
+    """),
+    "task": ("Tasks_FTS", ["agenda", "action_item", "memo"], """
+        SELECT 'task' AS source, T.task_id AS id, COALESCE(T.agenda, T.action_item) AS title,
+               CO.company_name, {snippet} AS snippet, {rank} AS rank
+          FROM Tasks_FTS
+          JOIN Tasks T ON T.task_id = Tasks_FTS.rowid
+          LEFT JOIN Companies CO ON CO.company_id = T.company_id
+         WHERE {where} AND T.is_deleted = 0
+    """),
+    "project": ("Projects_FTS",
+                ["project_name", "description", "application", "ai_model", "requirement", "memo"], """
+        SELECT 'project' AS source, P.project_id AS id, P.project_name AS title,
+               CO.company_name, {snippet} AS snippet, {rank} AS rank
+          FROM Projects_FTS
+          JOIN Projects P ON P.project_id = Projects_FTS.rowid
+          LEFT JOIN Companies CO ON CO.company_id = P.company_id
+         WHERE {where} AND P.is_deleted = 0
+    """),
+    "tech_inquiry": ("Tech_Inquiries_FTS", ["application", "ai_model"], """
+        SELECT 'tech_inquiry' AS source, TI.task_id AS id, COALESCE(T.agenda, TI.application) AS title,
+               CO.company_name, {snippet} AS snippet, {rank} AS rank
+          FROM Tech_Inquiries_FTS
+          JOIN Tech_Inquiries TI ON TI.task_id = Tech_Inquiries_FTS.rowid
+          LEFT JOIN Tasks T ON T.task_id = TI.task_id
+          LEFT JOIN Companies CO ON CO.company_id = T.company_id
+         WHERE {where} AND TI.is_deleted = 0
+    """),
+}
 
+@cached("Contacts", "Companies", "Tasks", "Projects", "Tech_Inquiries")
+def search(query: str, sources: list = None, limit: int = 20, highlight: tuple = ("[", "]")) -> list:
+    """
+    담당자, Task, 프로젝트, 기술 문의를 한 번에 검색하여 관련도(bm25) 순으로 반환합니다.
+    공백으로 구분된 검색어는 모두 포함(AND)되어야 하며, 각 검색어는 부분 문자열로 찾습니다.
+    
+    Args:
+        query (str): 검색어. (예: "김준엽", "YOLO 품질검사")
+        sources (list): 검색 대상. 'contact', 'task', 'project', 'tech_inquiry' 중 선택. (기본: 전체)
+        limit (int): 최대 결과 수.
+        highlight (tuple): snippet에서 검색어 앞뒤에 붙일 강조 표시. (Streamlit에서는 ("**", "**"))
+        
+    Returns:
+        list: {'source', 'id', 'title', 'company_name', 'snippet', 'rank'} 사전(dict)의 리스트.
+              rank는 작을수록 관련도가 높습니다.
+    """
+    terms = query.split()
+    if not terms:
+        return []
+    use_match = all(len(t) >= _TRIGRAM_MIN_CHARS for t in terms)
+    open_mark, close_mark = highlight
+
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
+    results = []
+    
+    try:
+        for source in (sources or _SEARCH_SOURCES):
+            fts, columns, template = _SEARCH_SOURCES[source]
+            if use_match:
+                where = f"{fts} MATCH ?"
+                params = [" ".join(_fts_phrase(t) for t in terms)]
+                rank = f"bm25({fts})"
+            else:
+                # 짧은 검색어: 검색어마다 (컬럼1 LIKE ? OR 컬럼2 LIKE ? ...)를 AND로 연결
+                where = " AND ".join(
+                    "(" + " OR ".join(f"{fts}.{col} LIKE ?" for col in columns) + ")" for _ in terms
+                )
+                params = [f"%{t}%" for t in terms for _ in columns]
+                rank = "0"
+            sql = template.format(snippet=f"snippet({fts}, -1, ?, ?, '…', 32)", rank=rank, where=where)
+            sql += " ORDER BY rank LIMIT ?"
+            c.execute(sql, [open_mark, close_mark] + params + [limit])
+            rows = c.fetchall()
+            if not use_match:
+                for row in rows:
+                    row['snippet'] = _highlight(row['snippet'], terms, open_mark, close_mark)
+            results.extend(rows)
+    finally:
+        c.close()
+
+    results.sort(key=lambda r: r['rank'])
+    return results[:limit]
+
+@cached(tables_from=lambda table_name: (table_name,))
 def get_all_from_table(table_name: str) -> list:
     """
     지정된 테이블의 모든 데이터를 조회합니다.
@@ -493,22 +817,84 @@ def get_all_from_table(table_name: str) -> list:
     if table_name not in allowed_tables:
         raise ValueError(f"허용되지 않은 테이블 이름입니다: {table_name}")
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = _dict_factory
-    c = conn.cursor()
+    c = get_connection().cursor()
+    c.row_factory = _dict_factory
     
     try:
         # f-string을 사용하지만, 위에서 테이블 이름을 검증했으므로 안전합니다.
         c.execute(f"SELECT * FROM {table_name}")
         return c.fetchall()
     finally:
-        conn.close()
+        c.close()
+
+def check_company_summary(db_path: str) -> list:
+    """
+    db_path DB의 복사본에서 회사 목록 조회와 회사 내보내기를 실행해 봅니다.
+    (마이그레이션이 적용되지 않은 이전 구조의 DB, 예: 배포된 data/mobilint_crm.db 호환 확인용. 원본은 바꾸지 않음)
+
+    Returns:
+        list: 문제 설명 목록. 없으면 빈 리스트.
+    """
+    import os
+    import shutil
+    import sqlite3
+    import tempfile
+    import config
+    import db_cache
+    import db_export
+    from db_connection import close_connection
+
+    tmp_dir = tempfile.mkdtemp()
+    saved_path = config.DB_PATH
+    config.DB_PATH = os.path.join(tmp_dir, os.path.basename(db_path))
+    # WAL 파일에만 있는 내용까지 옮기도록 파일 복사 대신 backup API를 씁니다.
+    src, dst = sqlite3.connect(db_path), sqlite3.connect(config.DB_PATH)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+    db_cache.clear()
+    problems = []
+    try:
+        n = get_connection().execute("SELECT COUNT(*) FROM Companies").fetchone()[0]
+        checks = [
+            ("get_all_companies_summary", lambda: len(get_all_companies_summary())),
+            ("get_companies_page", lambda: len(get_companies_page(limit=max(n, 1))['rows'])),
+            ("export_master_data_csv('companies')",
+             # 행이 없으면 헤더도 쓰지 않습니다.
+             lambda: max(len(db_export.export_master_data_csv("companies").decode("utf-8-sig").splitlines()) - 1, 0)),
+        ]
+        for name, run in checks:
+            try:
+                rows = run()
+            except Exception as e:
+                problems.append(f"{name}: {e}")
+                continue
+            if rows != n:
+                problems.append(f"{name}: {rows}건 (회사 {n}건)")
+    finally:
+        close_connection()
+        db_cache.clear()
+        config.DB_PATH = saved_path
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return problems
 
 
 # --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
 if __name__ == '__main__':
     # 테스트를 위해 db_operations를 실행하여 데이터가 미리 입력되어 있어야 합니다.
+    import sys
     from pprint import pprint
+    import config
+
+    # 배포된 DB(마이그레이션 전 이전 구조일 수 있음)에서도 회사 목록/내보내기가 동작하는지 복사본으로 확인
+    problems = check_company_summary(config.DB_PATH)
+    for p in problems:
+        print(f"[회사 목록 호환] {p}")
+    if problems:
+        sys.exit(f"회사 목록 호환 검사 실패: 문제 {len(problems)}건")
+    print("회사 목록 호환 검사: 통과")
     
     print("\n" + "="*50)
     print("=== '모빌린트' 회사의 모든 활동 내역 조회 (고급 기능) ===")
@@ -1,11 +1,16 @@
 import sqlite3
 import os
 from config import DB_PATH
+from db_connection import get_connection, transaction, mark_written
 
-def initialize_database():
-    """데이터베이스와 모든 테이블 구조를 생성(DDL)합니다."""
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+def initialize_database(db_path: str = None):
+    """
+    데이터베이스와 모든 테이블 구조를 생성(DDL)합니다.
+    커넥션은 db_connection을 통해 열리므로 config.DB_STORAGE_PROFILE(WAL 등)이 함께 적용됩니다.
+    """
+    db_path = db_path or DB_PATH
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = get_connection(db_path)
     c = conn.cursor()
 
     try:
@@ -36,7 +41,7 @@ def initialize_database():
                 revenue INTEGER,
                 overview TEXT,
                 website TEXT,
-                nationality TEXT NOT NULL  -- alpha-3 code (e.g., KOR, USA),
+                nationality TEXT NOT NULL,  -- alpha-3 code (e.g., KOR, USA)
                 created_at     TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at     TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 is_deleted     BOOLEAN DEFAULT 0
@@ -263,12 +268,11 @@ def initialize_database():
 
                 FOREIGN KEY (task_id) REFERENCES Tasks(task_id),
                 FOREIGN KEY (project_id) REFERENCES Projects(project_id),
-                FOREIGN KEY (product_id) REFERENCES Products(product_id),
+                FOREIGN KEY (product_id) REFERENCES Products(product_id)
             )
         ''')
 
          # --- 2. 인덱스 생성 (성능 최적화) ---
-        c.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user    ON Tasks(user_id);")
         c.execute("CREATE INDEX IF NOT EXISTS idx_tasks_project ON Tasks(project_id);")
         c.execute("CREATE INDEX IF NOT EXISTS idx_tasks_type    ON Tasks(task_type);")
         c.execute("CREATE INDEX IF NOT EXISTS idx_invoices_user  ON Invoices(user_id);")
@@ -278,12 +282,702 @@ def initialize_database():
         c.execute("CREATE INDEX IF NOT EXISTS idx_techinq_product ON Tech_Inquiries(product_id);")
         
         conn.commit()
+
+        # --- 3. 버전별 마이그레이션 (집계 테이블, 조회용 인덱스 등) ---
+        apply_migrations(conn)
         print("--- 데이터베이스 초기화 완료: 모든 테이블이 준비되었습니다. ---")
 
     except sqlite3.Error as e:
+        conn.rollback()
         print(f"데이터베이스 오류: {e}")
     finally:
-        conn.close()
+        c.close()
+
+# --------------------------------------------------------------------
+# Company_Stats: 회사별 매출/진행중 Task/활성 프로젝트 집계
+# --------------------------------------------------------------------
+# get_all_companies_summary()가 회사마다 서브쿼리 3개를 돌지 않도록,
+# Invoices/Tasks/Projects의 INSERT/UPDATE/DELETE 트리거가 집계 값을 바로 갱신합니다.
+#   total_revenue         : SUM(Invoices.total_amount) WHERE status = 2 (입금 완료)
+#   active_tasks_count    : COUNT(Tasks) WHERE task_status = 0 (미실행)
+#   active_projects_count : COUNT(Projects) WHERE status = 'active'
+
+_COMPANY_STATS_TRIGGERS = {
+    "trg_stats_company_ins": """
+        AFTER INSERT ON Companies
+        BEGIN
+            INSERT INTO Company_Stats (company_id) VALUES (NEW.company_id)
+            ON CONFLICT(company_id) DO NOTHING;
+        END""",
+    "trg_stats_company_del": """
+        AFTER DELETE ON Companies
+        BEGIN
+            DELETE FROM Company_Stats WHERE company_id = OLD.company_id;
+        END""",
+
+    # Invoices -> total_revenue
+    "trg_stats_invoice_ins": """
+        AFTER INSERT ON Invoices WHEN NEW.status = 2
+        BEGIN
+            INSERT INTO Company_Stats (company_id, total_revenue)
+            VALUES (NEW.company_id, COALESCE(NEW.total_amount, 0))
+            ON CONFLICT(company_id) DO UPDATE SET total_revenue = total_revenue + excluded.total_revenue;
+        END""",
+    "trg_stats_invoice_upd": """
+        AFTER UPDATE OF status, total_amount, company_id ON Invoices
+        BEGIN
+            UPDATE Company_Stats SET total_revenue = total_revenue - COALESCE(OLD.total_amount, 0)
+             WHERE company_id = OLD.company_id AND OLD.status = 2;
+            INSERT INTO Company_Stats (company_id, total_revenue)
+            SELECT NEW.company_id, COALESCE(NEW.total_amount, 0) WHERE NEW.status = 2
+            ON CONFLICT(company_id) DO UPDATE SET total_revenue = total_revenue + excluded.total_revenue;
+        END""",
+    "trg_stats_invoice_del": """
+        AFTER DELETE ON Invoices WHEN OLD.status = 2
+        BEGIN
+            UPDATE Company_Stats SET total_revenue = total_revenue - COALESCE(OLD.total_amount, 0)
+             WHERE company_id = OLD.company_id;
+        END""",
+
+    # Tasks -> active_tasks_count
+    "trg_stats_task_ins": """
+        AFTER INSERT ON Tasks WHEN NEW.task_status = 0
+        BEGIN
+            INSERT INTO Company_Stats (company_id, active_tasks_count) VALUES (NEW.company_id, 1)
+            ON CONFLICT(company_id) DO UPDATE SET active_tasks_count = active_tasks_count + 1;
+        END""",
+    "trg_stats_task_upd": """
+        AFTER UPDATE OF task_status, company_id ON Tasks
+        BEGIN
+            UPDATE Company_Stats SET active_tasks_count = active_tasks_count - 1
+             WHERE company_id = OLD.company_id AND OLD.task_status = 0;
+            INSERT INTO Company_Stats (company_id, active_tasks_count)
+            SELECT NEW.company_id, 1 WHERE NEW.task_status = 0
+            ON CONFLICT(company_id) DO UPDATE SET active_tasks_count = active_tasks_count + 1;
+        END""",
+    "trg_stats_task_del": """
+        AFTER DELETE ON Tasks WHEN OLD.task_status = 0
+        BEGIN
+            UPDATE Company_Stats SET active_tasks_count = active_tasks_count - 1
+             WHERE company_id = OLD.company_id;
+        END""",
+
+    # Projects -> active_projects_count
+    "trg_stats_project_ins": """
+        AFTER INSERT ON Projects WHEN NEW.status = 'active'
+        BEGIN
+            INSERT INTO Company_Stats (company_id, active_projects_count) VALUES (NEW.company_id, 1)
+            ON CONFLICT(company_id) DO UPDATE SET active_projects_count = active_projects_count + 1;
+        END""",
+    "trg_stats_project_upd": """
+        AFTER UPDATE OF status, company_id ON Projects
+        BEGIN
+            UPDATE Company_Stats SET active_projects_count = active_projects_count - 1
+             WHERE company_id = OLD.company_id AND OLD.status = 'active';
+            INSERT INTO Company_Stats (company_id, active_projects_count)
+            SELECT NEW.company_id, 1 WHERE NEW.status = 'active'
+            ON CONFLICT(company_id) DO UPDATE SET active_projects_count = active_projects_count + 1;
+        END""",
+    "trg_stats_project_del": """
+        AFTER DELETE ON Projects WHEN OLD.status = 'active'
+        BEGIN
+            UPDATE Company_Stats SET active_projects_count = active_projects_count - 1
+             WHERE company_id = OLD.company_id;
+        END""",
+}
+
+# 원본 테이블에서 집계를 처음부터 다시 계산하는 쿼리 (재구축/정합성 검사용)
+_COMPANY_STATS_SOURCE_SQL = """
+    SELECT
+        C.company_id,
+        COALESCE(I.revenue, 0) AS total_revenue,
+        COALESCE(T.cnt, 0)     AS active_tasks_count,
+        COALESCE(P.cnt, 0)     AS active_projects_count
+    FROM
+        Companies C
+    LEFT JOIN
+        (SELECT company_id, SUM(total_amount) AS revenue
+           FROM Invoices WHERE status = 2 GROUP BY company_id) I ON I.company_id = C.company_id
+    LEFT JOIN
+        (SELECT company_id, COUNT(*) AS cnt
+           FROM Tasks WHERE task_status = 0 GROUP BY company_id) T ON T.company_id = C.company_id
+    LEFT JOIN
+        (SELECT company_id, COUNT(*) AS cnt
+           FROM Projects WHERE status = 'active' GROUP BY company_id) P ON P.company_id = C.company_id
+"""
+
+def _create_company_stats(c):
+    """Company_Stats 테이블과 갱신 트리거를 만들고, 집계 행이 없는 회사를 채웁니다."""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Company_Stats (
+            company_id            INTEGER PRIMARY KEY,
+            total_revenue         REAL    NOT NULL DEFAULT 0,
+            active_tasks_count    INTEGER NOT NULL DEFAULT 0,
+            active_projects_count INTEGER NOT NULL DEFAULT 0,
+
+            FOREIGN KEY (company_id) REFERENCES Companies (company_id)
+        )
+    ''')
+    for name, body in _COMPANY_STATS_TRIGGERS.items():
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    # 기존 DB에 처음 추가되는 경우: 아직 집계 행이 없는 회사만 원본에서 계산해 채웁니다.
+    c.execute(f"""
+        INSERT INTO Company_Stats (company_id, total_revenue, active_tasks_count, active_projects_count)
+        SELECT * FROM ({_COMPANY_STATS_SOURCE_SQL})
+         WHERE company_id NOT IN (SELECT company_id FROM Company_Stats)
+    """)
+
+def rebuild_company_stats(db_path: str = None) -> int:
+    """
+    Company_Stats를 원본 테이블(Invoices/Tasks/Projects)에서 처음부터 다시 계산합니다.
+
+    Returns:
+        int: 재구축된 회사 수.
+    """
+    with transaction(db_path or DB_PATH) as conn:
+        mark_written("Company_Stats", db_path=db_path or DB_PATH)
+        conn.execute("DELETE FROM Company_Stats")
+        c = conn.execute(f"""
+            INSERT INTO Company_Stats (company_id, total_revenue, active_tasks_count, active_projects_count)
+            {_COMPANY_STATS_SOURCE_SQL}
+        """)
+    return c.rowcount
+
+def check_company_stats(repair: bool = False, db_path: str = None) -> list:
+    """
+    Company_Stats가 원본 테이블과 일치하는지 검사합니다.
+
+    Args:
+        repair (bool): True이면 불일치가 있을 때 rebuild_company_stats()로 재구축합니다.
+
+    Returns:
+        list: 불일치 항목 사전(dict)의 리스트. 모두 일치하면 빈 리스트.
+              각 항목: {'company_id', 'column', 'expected', 'actual'}
+    """
+    conn = get_connection(db_path or DB_PATH)
+    columns = ("total_revenue", "active_tasks_count", "active_projects_count")
+    expected = {r[0]: r[1:] for r in conn.execute(_COMPANY_STATS_SOURCE_SQL)}
+    actual = {r[0]: r[1:] for r in conn.execute(
+        "SELECT company_id, total_revenue, active_tasks_count, active_projects_count FROM Company_Stats"
+    )}
+
+    mismatches = []
+    for company_id, exp_row in expected.items():
+        act_row = actual.get(company_id)
+        for i, col in enumerate(columns):
+            act = act_row[i] if act_row else None
+            if act is None or abs(act - exp_row[i]) > 1e-6:
+                mismatches.append({'company_id': company_id, 'column': col,
+                                   'expected': exp_row[i], 'actual': act})
+
+    if mismatches and repair:
+        rebuild_company_stats(db_path)
+    return mismatches
+
+# --------------------------------------------------------------------
+# 스키마 마이그레이션 (PRAGMA user_version으로 버전 관리)
+# --------------------------------------------------------------------
+# 기존 DB 파일에도 새 테이블/인덱스가 자동으로 반영되도록, initialize_database() 이후의
+# 스키마 변경은 여기에 버전 순서대로 추가합니다. 한 번 배포된 항목은 수정하지 말고
+# 새 버전을 추가해야 합니다.
+
+# db_queries의 조회 경로별 인덱스
+_QUERY_INDEXES = [
+    # get_tasks_by_company_name: WHERE company_id = ? ORDER BY action_date DESC
+    "CREATE INDEX IF NOT EXISTS idx_tasks_company_date ON Tasks(company_id, action_date)",
+    # get_tasks_by_date_range: WHERE action_date BETWEEN ? AND ? ORDER BY action_date DESC
+    "CREATE INDEX IF NOT EXISTS idx_tasks_action_date  ON Tasks(action_date)",
+    # get_tasks_by_user: WHERE user_id = ? ORDER BY action_date DESC (idx_tasks_user 대체)
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_date    ON Tasks(user_id, action_date)",
+    "DROP INDEX IF EXISTS idx_tasks_user",
+    # get_incomplete_tasks: WHERE task_status = 0 ORDER BY due_date ASC, action_date DESC
+    # 미완료 Task만 담는 부분 인덱스라 완료된 Task가 쌓여도 크기가 커지지 않습니다.
+    """CREATE INDEX IF NOT EXISTS idx_tasks_open_due ON Tasks(due_date, action_date DESC)
+        WHERE task_status = 0""",
+    # get_contacts_by_company_name / search_contacts JOIN: WHERE company_id = ? ORDER BY contact_name
+    "CREATE INDEX IF NOT EXISTS idx_contacts_company_name ON Contacts(company_id, contact_name)",
+    # get_projects_by_company_name: WHERE company_id = ? ORDER BY start_date DESC
+    "CREATE INDEX IF NOT EXISTS idx_projects_company_start ON Projects(company_id, start_date)",
+    # get_invoice_details_with_items: WHERE invoice_id = ? ORDER BY item_id
+    "CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice ON Invoice_Items(invoice_id)",
+    # Company_Stats 재구축 시 회사별 입금 완료 인보이스 집계
+    "CREATE INDEX IF NOT EXISTS idx_invoices_company_status ON Invoices(company_id, status)",
+]
+
+def _add_query_indexes(c):
+    for sql in _QUERY_INDEXES:
+        c.execute(sql)
+
+# FTS5 전문 검색 인덱스: { FTS 테이블: (원본 테이블, rowid 컬럼, [검색 컬럼]) }
+# 원본 테이블의 내용을 복사하지 않는 external-content 방식이며, 트리거로 동기화합니다.
+# trigram 토크나이저는 띄어쓰기/형태소와 무관하게 3글자 이상의 부분 문자열을 찾으므로
+# 한국어 이름, 회사명, 모델명(YOLOv8 등) 검색에 적합합니다.
+FTS_TABLES = {
+    "Contacts_FTS": ("Contacts", "contact_id",
+                     ["contact_name", "department", "position", "email", "phone", "mobile_phone"]),
+    "Tasks_FTS": ("Tasks", "task_id",
+                  ["agenda", "action_item", "memo"]),
+    "Projects_FTS": ("Projects", "project_id",
+                     ["project_name", "description", "application", "ai_model", "requirement", "memo"]),
+    "Tech_Inquiries_FTS": ("Tech_Inquiries", "task_id",
+                           ["application", "ai_model"]),
+}
+
+def _create_fts_indexes(c):
+    """FTS5 가상 테이블과 동기화 트리거를 만들고, 기존 데이터로 인덱스를 채웁니다."""
+    for fts, (table, key, cols) in FTS_TABLES.items():
+        col_list = ", ".join(cols)
+        new_vals = ", ".join(f"NEW.{col}" for col in cols)
+        old_vals = ", ".join(f"OLD.{col}" for col in cols)
+        prefix = fts.lower()
+
+        c.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {col_list},
+                content='{table}', content_rowid='{key}', tokenize='trigram'
+            )
+        """)
+        c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_ins AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {fts} (rowid, {col_list}) VALUES (NEW.{key}, {new_vals});
+            END
+        """)
+        c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_del AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {col_list}) VALUES ('delete', OLD.{key}, {old_vals});
+            END
+        """)
+        # 검색 컬럼이 바뀔 때만 다시 색인합니다. (task_status 변경 등은 무시)
+        c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_upd AFTER UPDATE OF {key}, {col_list} ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {col_list}) VALUES ('delete', OLD.{key}, {old_vals});
+                INSERT INTO {fts} (rowid, {col_list}) VALUES (NEW.{key}, {new_vals});
+            END
+        """)
+        c.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+def _create_email_import_log(c):
+    """email_batch 파이프라인의 처리 이력(체크포인트 겸 중복 방지)."""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Email_Import_Log (
+            message_key  TEXT PRIMARY KEY,            -- 발신자/제목/본문(인용 제거) 해시
+            source       TEXT,                        -- 파일 경로 (mbox는 '경로#순번')
+            subject      TEXT,
+            status       TEXT NOT NULL,               -- 'done' / 'failed'
+            task_id      INTEGER,                     -- 생성된 Task (status='done'일 때)
+            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            FOREIGN KEY (task_id) REFERENCES Tasks (task_id)
+        )
+    ''')
+
+# 회사 안에서 이름이 유일해야 하는 테이블: { 테이블: (기본키, 이름 컬럼, 인덱스 이름) }
+# get_or_create_contact / get_or_create_project의 조회 경로이자, 같은 이름이 두 번 생기지 않도록 막습니다.
+# 기존 데이터에 중복이 있으면 그동안은 'idx_' 일반 인덱스를 쓰고, 이름 조회는 가장 작은 id를 고릅니다.
+_UNIQUE_NAME_INDEXES = {
+    "Contacts": ("contact_id", "contact_name", "ux_contacts_company_name"),
+    "Projects": ("project_id", "project_name", "ux_projects_company_name"),
+}
+
+def _duplicate_names(c, table: str, key: str, name_col: str) -> list:
+    """(company_id, 이름)이 같은 행 묶음 [(company_id, 이름, 'id,id,...'), ...]"""
+    return c.execute(f"""
+        SELECT company_id, {name_col}, GROUP_CONCAT({key}) FROM {table}
+         WHERE {name_col} IS NOT NULL
+         GROUP BY company_id, {name_col} HAVING COUNT(*) > 1
+         ORDER BY company_id, {name_col}
+    """).fetchall()
+
+_DUPLICATE_REPORT_LIMIT = 20  # 중복 목록 출력 최대 건수 (테이블별)
+
+def _ensure_unique_name_indexes(c, report: bool = True) -> list:
+    """
+    아직 UNIQUE 인덱스가 없는 테이블에 만들 수 있으면 만듭니다.
+    같은 회사에 이름이 같은 행이 있으면 (동명이인일 수 있으므로) 합치거나 지우지 않고,
+    그 테이블은 같은 컬럼의 일반 인덱스로 둡니다. report=True면 중복 목록을 출력합니다.
+
+    Returns:
+        list: 중복 때문에 UNIQUE 인덱스를 만들지 못한 테이블 이름 목록.
+    """
+    blocked = []
+    for table, (key, name_col, index) in _UNIQUE_NAME_INDEXES.items():
+        if c.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index,)).fetchone():
+            continue
+        plain = "idx_" + index[len("ux_"):]  # 중복이 있는 동안 쓰는 일반 인덱스
+        groups = _duplicate_names(c, table, key, name_col)
+        if groups:
+            blocked.append(table)
+            c.execute(f"CREATE INDEX IF NOT EXISTS {plain} ON {table}(company_id, {name_col})")
+            if report:
+                print(f"{table}: 같은 회사에 {name_col}이(가) 같은 행이 {len(groups)}묶음 있어 "
+                      f"UNIQUE 인덱스 대신 일반 인덱스를 만들었습니다.")
+                for company_id, name, ids in groups[:_DUPLICATE_REPORT_LIMIT]:
+                    print(f"  company_id={company_id} {name_col}={name!r}: {key} {ids}")
+                if len(groups) > _DUPLICATE_REPORT_LIMIT:
+                    print(f"  ... 외 {len(groups) - _DUPLICATE_REPORT_LIMIT}묶음")
+            continue
+        c.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {table}(company_id, {name_col})")
+        # UNIQUE 인덱스가 같은 조회 경로를 대신하므로 일반 인덱스는 지웁니다.
+        c.execute(f"DROP INDEX IF EXISTS {plain}")
+    return blocked
+
+def _add_unique_name_indexes(c):
+    """
+    회사별 담당자/프로젝트 이름에 UNIQUE 인덱스를 만듭니다.
+    이름 중복이 있는 테이블은 일반 인덱스로 두고 다음 마이그레이션을 계속합니다.
+    (이후 이름을 구분되게 고치면 apply_migrations가 시작할 때 UNIQUE 인덱스로 바꿉니다)
+    """
+    _ensure_unique_name_indexes(c)
+
+# --------------------------------------------------------------------
+# 파이프라인 분석 (pipeline_analytics)
+# --------------------------------------------------------------------
+# 영업 단계 테이블의 변경을 트리거가 Pipeline_Changes에 (원본 테이블, id)로 쌓고,
+# pipeline_analytics.refresh()가 바뀐 행만 다시 계산해 Pipeline_Daily(일별 집계)에 반영합니다.
+#   Pipeline_Facts : 원본 행 하나가 일별 집계에 더한 값 (다시 계산할 때 먼저 빼기 위해 보관)
+#   Pipeline_Daily : (지표, 날짜, 차원1, 차원2)별 합계와 건수
+
+# { 원본 테이블: 기본키 } - 변경을 기록할 테이블
+_PIPELINE_SOURCES = {
+    "First_Contact_Logs": "log_id",
+    "Projects": "project_id",
+    "Free_Trials": "task_id",
+    "Invoices": "invoice_id",
+    "Invoice_Items": "item_id",
+}
+
+def _pipeline_triggers() -> dict:
+    triggers = {}
+    for table, key in _PIPELINE_SOURCES.items():
+        log_new = f"INSERT INTO Pipeline_Changes (source, row_id) VALUES ('{table}', NEW.{key});"
+        log_old = f"INSERT INTO Pipeline_Changes (source, row_id) VALUES ('{table}', OLD.{key});"
+        # 인보이스는 프로젝트의 첫 입금일(단계별 소요 일수)에도 영향을 주므로 프로젝트도 함께 기록합니다.
+        proj_new = proj_old = ""
+        if table == "Invoices":
+            proj_new = "INSERT INTO Pipeline_Changes (source, row_id) VALUES ('Projects', NEW.project_id);"
+            proj_old = "INSERT INTO Pipeline_Changes (source, row_id) VALUES ('Projects', OLD.project_id);"
+        triggers[f"trg_pipeline_{table.lower()}_ins"] = f"""
+            AFTER INSERT ON {table}
+            BEGIN
+                {log_new} {proj_new}
+            END"""
+        triggers[f"trg_pipeline_{table.lower()}_upd"] = f"""
+            AFTER UPDATE ON {table}
+            BEGIN
+                {log_old} {log_new} {proj_old} {proj_new}
+            END"""
+        triggers[f"trg_pipeline_{table.lower()}_del"] = f"""
+            AFTER DELETE ON {table}
+            BEGIN
+                {log_old} {proj_old}
+            END"""
+    # 국가별 매출은 회사의 nationality를 따르므로 국가가 바뀌면 해당 회사의 인보이스 항목을 다시 계산합니다.
+    triggers["trg_pipeline_companies_upd"] = """
+        AFTER UPDATE OF nationality ON Companies
+        BEGIN
+            INSERT INTO Pipeline_Changes (source, row_id) VALUES ('Companies', NEW.company_id);
+        END"""
+    return triggers
+
+def _create_pipeline_analytics(c):
+    """파이프라인 분석용 변경 로그/집계 테이블과 트리거를 만들고, 기존 행 전체를 변경 로그에 올립니다."""
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Pipeline_Changes (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source    TEXT NOT NULL,
+            row_id    INTEGER NOT NULL
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Pipeline_Facts (
+            source TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            metric TEXT NOT NULL,
+            day    DATE NOT NULL,
+            dim1   TEXT NOT NULL DEFAULT '',
+            dim2   TEXT NOT NULL DEFAULT '',
+            value  REAL NOT NULL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_pipeline_facts_row ON Pipeline_Facts(source, row_id)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Pipeline_Daily (
+            metric TEXT NOT NULL,
+            day    DATE NOT NULL,
+            dim1   TEXT NOT NULL DEFAULT '',
+            dim2   TEXT NOT NULL DEFAULT '',
+            total  REAL NOT NULL DEFAULT 0,
+            n      INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, day, dim1, dim2)
+        ) WITHOUT ROWID
+    """)
+    for name, body in _pipeline_triggers().items():
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    # 첫 refresh()에서 기존 데이터 전체가 집계되도록 모든 행을 변경 로그에 올립니다.
+    for table, key in _PIPELINE_SOURCES.items():
+        c.execute(f"INSERT INTO Pipeline_Changes (source, row_id) SELECT '{table}', {key} FROM {table}")
+
+# --------------------------------------------------------------------
+# 변경 저널 (change_journal)
+# --------------------------------------------------------------------
+# 아래 테이블의 INSERT/UPDATE/DELETE를 트리거가 Change_Journal에 순번(seq)과 함께 기록합니다.
+# seq는 AUTOINCREMENT라 압축(compact)으로 앞부분을 지워도 재사용되지 않고 항상 증가합니다.
+# 행 내용은 변경 후 전체 행을 JSON으로 저장합니다. (삭제는 키만)
+# Users는 비밀번호 해시가 있으므로 기록하지 않습니다.
+# 주의: 이후 마이그레이션에서 이 테이블들에 컬럼을 추가하면 마지막에 _install_journal_triggers(c)를 다시 호출해야
+#       새 컬럼이 저널에 포함됩니다.
+JOURNAL_TABLES = [
+    "Companies", "Contacts", "Products", "Projects", "Project_Products", "Project_Participants",
+    "Invoices", "Invoice_Items", "Tasks", "First_Contact_Logs", "Free_Trials", "Tech_Inquiries",
+]
+
+def _install_journal_triggers(c):
+    """JOURNAL_TABLES의 현재 컬럼 구성으로 저널 트리거를 (다시) 만듭니다."""
+    for table in JOURNAL_TABLES:
+        info = c.execute(f"PRAGMA table_info({table})").fetchall()
+        columns = [row[1] for row in info]
+        keys = [row[1] for row in sorted(info, key=lambda r: r[5]) if row[5] > 0]
+        row_json = lambda ref: "json_object(" + ", ".join(f"'{col}', {ref}.{col}" for col in columns) + ")"
+        key_json = lambda ref: "json_object(" + ", ".join(f"'{col}', {ref}.{col}" for col in keys) + ")"
+        prefix = f"trg_journal_{table.lower()}"
+        for op, event, ref in (("I", "INSERT", "NEW"), ("U", "UPDATE", "NEW"), ("D", "DELETE", "OLD")):
+            c.execute(f"DROP TRIGGER IF EXISTS {prefix}_{event.lower()}")
+            row_data = row_json(ref) if op != "D" else "NULL"
+            c.execute(f"""
+                CREATE TRIGGER {prefix}_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO Change_Journal (table_name, op, row_key, row_data)
+                    VALUES ('{table}', '{op}', {key_json(ref)}, {row_data});
+                END
+            """)
+        # 기본키가 바뀌는 UPDATE는 예전 키를 삭제로 기록해 소비자가 옛 행을 지울 수 있게 합니다.
+        c.execute(f"DROP TRIGGER IF EXISTS {prefix}_rekey")
+        changed = " OR ".join(f"OLD.{col} IS NOT NEW.{col}" for col in keys)
+        c.execute(f"""
+            CREATE TRIGGER {prefix}_rekey BEFORE UPDATE ON {table} WHEN {changed}
+            BEGIN
+                INSERT INTO Change_Journal (table_name, op, row_key, row_data)
+                VALUES ('{table}', 'D', {key_json("OLD")}, NULL);
+            END
+        """)
+
+def _create_change_journal(c):
+    """변경 저널, 소비자별 읽은 위치, 압축 상태 테이블과 트리거를 만듭니다."""
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Change_Journal (
+            seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op         TEXT NOT NULL CHECK (op IN ('I', 'U', 'D')),
+            row_key    TEXT NOT NULL,       -- 기본키 JSON (예: {"task_id": 12})
+            row_data   TEXT,                -- 변경 후 전체 행 JSON (삭제는 NULL)
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_journal_row ON Change_Journal(table_name, row_key, seq)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Journal_Consumers (
+            name       TEXT PRIMARY KEY,    -- 소비자 이름 (예: 'search_sync')
+            last_seq   INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Journal_State (
+            key   TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    # 이 seq 이하의 기록은 압축으로 버려졌을 수 있음 (이보다 앞에서 읽으려는 소비자는 전체를 다시 읽어야 함)
+    c.execute("INSERT OR IGNORE INTO Journal_State (key, value) VALUES ('truncated_through', 0)")
+    _install_journal_triggers(c)
+
+# (버전, 설명, 적용 함수) - 적용 함수는 cursor를 받습니다.
+SCHEMA_MIGRATIONS = [
+    (1, "Company_Stats 집계 테이블 및 트리거", _create_company_stats),
+    (2, "db_queries 조회 경로별 인덱스", _add_query_indexes),
+    (3, "FTS5 전문 검색 인덱스 (trigram)", _create_fts_indexes),
+    (4, "이메일 일괄 요약 처리 이력 (Email_Import_Log)", _create_email_import_log),
+    (5, "담당자/프로젝트 이름 UNIQUE 인덱스 (회사별)", _add_unique_name_indexes),
+    (6, "파이프라인 분석 변경 로그 및 일별 집계", _create_pipeline_analytics),
+    (7, "변경 저널 (Change_Journal) 및 소비자 위치", _create_change_journal),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    아직 적용되지 않은 마이그레이션을 순서대로 적용합니다.
+    db_connection이 프로세스에서 DB 경로별로 처음 커넥션을 만들 때 한 번 호출합니다. (최신 버전이면 PRAGMA 한 번)
+    기본 테이블이 아직 없는 DB(initialize_database 이전)는 건너뜁니다.
+    마이그레이션은 버전별로 커밋되며, 실패하면 해당 버전만 롤백하고 오류를 출력한 뒤 멈춥니다.
+    (v5는 회사별 이름 중복이 있으면 중복 목록을 출력하고 그 테이블은 일반 인덱스로 둡니다.)
+    마이그레이션이 참조하는 컬럼이 없는 이전 구조의 DB는 아무것도 적용하지 않고 원인을 출력합니다.
+
+    Returns:
+        int: 적용 후 스키마 버전.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        _retry_unique_name_indexes(conn)
+        return version
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Tasks'").fetchone():
+        return version
+
+    # 기본 테이블이 예전 구조(컬럼 이름이 다름)이면 중간까지만 적용되지 않도록 아무것도 바꾸지 않습니다.
+    missing = _missing_migration_columns(conn)
+    if missing:
+        print(f"DB 마이그레이션 중단: 이 DB는 현재 기본 스키마보다 이전 구조입니다. (현재 v{version}) "
+              f"없는 컬럼: {', '.join(missing)}")
+        print("  DB를 initialize_database()로 새로 만들어 데이터를 옮기거나 컬럼을 맞춘 뒤 다시 실행해주세요.")
+        return version
+
+    c = conn.cursor()
+    for target, description, step in SCHEMA_MIGRATIONS:
+        if target <= version:
+            continue
+        # 여러 프로세스가 동시에 시작해도 한 곳에서만 적용되도록 쓰기 잠금을 먼저 잡고 다시 확인합니다.
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            version = c.execute("PRAGMA user_version").fetchone()[0]
+            if target <= version:
+                conn.commit()
+                continue
+            step(c)
+            c.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"DB 마이그레이션 오류: v{target} - {description}: {e}")
+            print(f"  v{target} 이후 마이그레이션은 적용되지 않았습니다. (현재 v{version}) "
+                  f"DB를 initialize_database()로 새로 만들어 데이터를 옮기거나 컬럼을 맞춘 뒤 다시 실행해주세요.")
+            break
+        print(f"DB 마이그레이션 적용: v{target} - {description}")
+        version = target
+    return version
+
+def _retry_unique_name_indexes(conn: sqlite3.Connection):
+    """v5에서 이름 중복 때문에 UNIQUE 인덱스를 만들지 못한 테이블이 있으면, 중복이 정리됐는지 확인해 다시 만듭니다."""
+    names = [index for _, _, index in _UNIQUE_NAME_INDEXES.values()]
+    existing = conn.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' "
+                            f"AND name IN ({','.join('?' * len(names))})", names).fetchone()[0]
+    if existing == len(names):
+        return
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        blocked = _ensure_unique_name_indexes(c, report=False)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"DB 이름 UNIQUE 인덱스 확인 실패: {e}")
+        return
+    if blocked:
+        print(f"DB 참고: {', '.join(blocked)}에 회사별 이름 중복이 있어 UNIQUE 인덱스 대신 일반 인덱스를 쓰고 있습니다.")
+
+def _missing_migration_columns(conn: sqlite3.Connection) -> list:
+    """마이그레이션이 참조하는 기본 테이블 컬럼 중 DB에 없는 것 ('테이블.컬럼' 목록). (이전 구조의 DB 진단용)"""
+    needed = {}
+    for table, key, cols in FTS_TABLES.values():
+        needed.setdefault(table, set()).update([key, *cols])
+    for table, (key, name_col, _) in _UNIQUE_NAME_INDEXES.items():
+        needed.setdefault(table, set()).update([key, name_col, "company_id"])
+    missing = []
+    for table, cols in needed.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if existing:
+            missing += [f"{table}.{col}" for col in sorted(cols - existing)]
+    return missing
+
+def migrate_database(db_path: str = None) -> int:
+    """지정한 DB(기본: config.DB_PATH)를 최신 스키마 버전으로 올립니다."""
+    return apply_migrations(get_connection(db_path or DB_PATH))
+
+# --------------------------------------------------------------------
+# 쿼리 플랜 회귀 검사
+# --------------------------------------------------------------------
+# 의도적으로 전체를 읽는 조회만 예외로 둡니다. (함수 이름: 사유)
+_FULL_SCAN_ALLOWED = {
+    "get_all_companies_summary": "전체 회사 목록 (이름순 인덱스 스캔)",
+}
+
+def check_query_plans() -> list:
+    """
+    db_queries의 조회 함수를 임시 DB에서 실행하며 실제 SQL을 수집하고,
+    EXPLAIN QUERY PLAN 결과에 전체 테이블 스캔(SCAN)이 있는지 검사합니다.
+
+    Returns:
+        list: 문제 항목 사전(dict)의 리스트. 문제가 없으면 빈 리스트.
+              각 항목: {'function', 'sql', 'detail'} (실행 자체가 실패하면 detail에 오류 메시지)
+    """
+    import tempfile
+    import config
+    import db_queries
+    from db_connection import close_connection
+
+    tmp_path = os.path.join(tempfile.mkdtemp(), "plan_check.db")
+    initialize_database(tmp_path)
+    with transaction(tmp_path) as conn:
+        conn.execute("INSERT INTO Users (username, password_hash) VALUES ('plan', 'x')")
+        conn.execute("INSERT INTO Companies (company_name, nationality) VALUES ('plan_co', 'KOR')")
+        conn.execute("INSERT INTO Contacts (company_id, contact_name) VALUES (1, 'plan_contact')")
+        conn.execute("INSERT INTO Projects (company_id, project_name) VALUES (1, 'plan_project')")
+        conn.execute("INSERT INTO Project_Participants (project_id, contact_id, role) VALUES (1, 1, 'PM')")
+        conn.execute("INSERT INTO Invoices (project_id, company_id, user_id, issue_date) VALUES (1, 1, 1, '2025-01-01')")
+        conn.execute("INSERT INTO Tasks (company_id, user_id, action_date, task_type) VALUES (1, 1, '2025-01-01', 'contact')")
+
+    cases = [
+        ("get_tasks_by_company_name", ("plan_co",)),
+        ("get_all_companies_summary", ()),
+        ("get_contacts_by_company_name", ("plan_co",)),
+        ("get_projects_by_company_name", ("plan_co",)),
+        ("get_project_details_with_participants", (1,)),
+        ("get_invoice_details_with_items", (1,)),
+        ("get_tasks_by_date_range", ("2025-01-01", "2025-12-31")),
+        ("get_tasks_by_user", (1,)),
+        ("get_incomplete_tasks", ()),
+        ("search_contacts", ("plan",)),
+        ("search", ("plan",)),
+        ("get_tasks_page", (("2025-06-01", 1),)),
+        ("get_tasks_page", (("2025-06-01", 1), 50, True), {'company_name': "plan_co"}),
+        ("get_companies_page", (("plan", 1), 50, "plan")),
+    ]
+
+    problems = []
+    saved_path = config.DB_PATH
+    config.DB_PATH = tmp_path
+    conn = get_connection(tmp_path)
+    try:
+        for func_name, args, *kwargs in cases:
+            statements = []
+            conn.set_trace_callback(statements.append)
+            try:
+                func = getattr(db_queries, func_name)
+                getattr(func, "uncached", func)(*args, **(kwargs[0] if kwargs else {}))  # db_cache를 거치지 않고 항상 SQL 실행
+            except sqlite3.Error as e:
+                problems.append({'function': func_name, 'sql': statements[-1] if statements else None,
+                                 'detail': f"실행 오류: {e}"})
+                continue
+            finally:
+                conn.set_trace_callback(None)
+            if func_name in _FULL_SCAN_ALLOWED:
+                continue
+            for sql in statements:
+                if sql.lstrip().startswith("--"):  # 트리거/FTS5 내부 문장은 주석 형태로 기록됨
+                    continue
+                if "sqlite_master" in sql:  # 테이블 존재 확인 (db_connection.table_exists, 스키마 목록은 작음)
+                    continue
+                for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+                    detail = row[3]
+                    # FTS5 검색은 'SCAN ... VIRTUAL TABLE INDEX'로 표시되지만 전문 인덱스를 사용합니다.
+                    if detail.startswith("SCAN ") and " USING " not in detail \
+                            and " VIRTUAL TABLE INDEX " not in detail:
+                        problems.append({'function': func_name, 'sql': sql, 'detail': detail})
+    finally:
+        config.DB_PATH = saved_path
+        close_connection(tmp_path)
+    return problems
 
 NATIONALITY_MAP = {
     "KOR": {"ko": "대한민국", "en": "South Korea"},
@@ -314,5 +1008,18 @@ def get_status_label(status: int, lang: str = "ko") -> str:
     return INVOICE_STATUS.get(status, {}).get(lang, "알 수 없음")        
 
 if __name__ == '__main__':
+    import sys
     print("database.py가 직접 실행되었습니다. 데이터베이스 초기화를 진행합니다.")
     initialize_database()
+    mismatches = check_company_stats(repair=True)
+    if mismatches:
+        print(f"Company_Stats 불일치 {len(mismatches)}건을 발견하여 재구축했습니다.")
+
+    print("\n--- db_queries 쿼리 플랜 검사 ---")
+    problems = check_query_plans()
+    for p in problems:
+        print(f"[{p['function']}] {p['detail']}")
+    if problems:
+        # 실행 오류나 허용되지 않은 전체 스캔이 있으면 실패로 종료합니다. (CI / 배포 전 점검용)
+        sys.exit(f"쿼리 플랜 검사 실패: 문제 {len(problems)}건")
+    print("전체 테이블 스캔 없음")
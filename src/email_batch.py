@@ -0,0 +1,327 @@
+# email_batch.py
+
+import hashlib
+import json
+import mailbox
+import os
+import queue
+import re
+import threading
+from datetime import date
+from email import policy
+from email.parser import BytesParser
+from email.utils import parsedate_to_datetime, parseaddr
+
+import ai_email
+import db_operations as ops
+import llm_scheduler
+from db_connection import get_connection, transaction
+
+# --------------------------------------------------------------------
+# 1. 메일 읽기 (디렉토리 내 .eml / .mbox / .txt를 한 통씩 스트리밍)
+# --------------------------------------------------------------------
+
+# 답장/전달 메일에서 이전 대화가 인용되기 시작하는 줄
+_QUOTE_HEADER_PATTERNS = [
+    re.compile(r"^On .+wrote:\s*$", re.IGNORECASE),
+    re.compile(r"^-{2,}\s*(Original Message|Forwarded message|원본 메시지|전달된 메시지)", re.IGNORECASE),
+    re.compile(r"^(From|보낸 사람|보낸사람)\s*:", re.IGNORECASE),
+    re.compile(r"^\d{4}[.-]\s*\d{1,2}[.-]\s*\d{1,2}.*(작성|wrote)"),
+]
+_SUBJECT_PREFIX = re.compile(r"^\s*((re|fw|fwd|회신|답장|전달)\s*:\s*)+", re.IGNORECASE)
+
+def strip_quoted(body: str) -> str:
+    """
+    답장 메일의 인용된 이전 대화를 제거하고 새로 작성된 부분만 남깁니다.
+    - '>'로 시작하는 인용 줄 제거
+    - 'On ... wrote:', '-----원본 메시지-----', '보낸 사람:' 등 인용 헤더 이후는 모두 제거
+    """
+    lines = []
+    for i, line in enumerate(body.splitlines()):
+        stripped = line.strip()
+        # 첫 줄의 'From:'은 .txt로 저장된 메일 자체의 헤더일 수 있으므로 인용으로 보지 않습니다.
+        if i > 0 and any(p.match(stripped) for p in _QUOTE_HEADER_PATTERNS):
+            break
+        if stripped.startswith(">"):
+            continue
+        lines.append(line.rstrip())
+    return "\n".join(lines).strip()
+
+def _message_key(sender: str, subject: str, body: str) -> str:
+    """같은 메일이 여러 파일/스레드에 중복으로 들어 있어도 한 번만 처리하기 위한 키."""
+    normalized = "\n".join([
+        (sender or "").lower(),
+        _SUBJECT_PREFIX.sub("", subject or "").strip().lower(),
+        re.sub(r"\s+", " ", body).strip(),
+    ])
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def _body_text(msg) -> str:
+    part = msg.get_body(preferencelist=("plain", "html"))
+    if part is None:
+        return ""
+    text = part.get_content()
+    if part.get_content_subtype() == "html":
+        text = re.sub(r"<br\s*/?>|</p>", "\n", text, flags=re.IGNORECASE)
+        text = re.sub(r"<[^>]+>", "", text)
+    return text
+
+def _from_email_message(msg, source: str) -> dict:
+    subject = str(msg.get("Subject", "") or "")
+    sender_name, sender_addr = parseaddr(str(msg.get("From", "") or ""))
+    try:
+        action_date = parsedate_to_datetime(msg.get("Date")).strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        action_date = date.today().strftime("%Y-%m-%d")
+    body = strip_quoted(_body_text(msg))
+    return {
+        'key': _message_key(sender_addr, subject, body),
+        'source': source,
+        'subject': subject,
+        'sender_name': sender_name,
+        'sender': sender_addr,
+        'date': action_date,
+        'body': body,
+    }
+
+def _from_text_file(path: str) -> dict:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        raw = f.read()
+    body = strip_quoted(raw)
+    subject = next((line.strip() for line in body.splitlines() if line.strip()), "")
+    return {
+        'key': _message_key("", subject, body),
+        'source': path,
+        'subject': subject,
+        'sender_name': "",
+        'sender': "",
+        'date': date.today().strftime("%Y-%m-%d"),
+        'body': body,
+    }
+
+def iter_messages(directory: str, on_error=None):
+    """
+    디렉토리(하위 폴더 포함)의 메일 파일을 한 통씩 읽어 dict로 돌려주는 제너레이터.
+    mbox는 전체를 메모리에 올리지 않고 메시지 단위로 순회합니다.
+    알 수 없는 charset 등으로 한 통을 읽지 못해도 경고만 출력하고 다음 메일로 넘어갑니다.
+
+    Args:
+        on_error (callable): 읽지 못한 메일마다 (source, 예외)로 호출됩니다.
+
+    Yields:
+        dict: {'key', 'source', 'subject', 'sender_name', 'sender', 'date', 'body'}
+    """
+    parser = BytesParser(policy=policy.default)
+
+    def failed(source, e):
+        print(f"경고: '{source}' 메일을 읽을 수 없습니다 - {type(e).__name__}: {e}")
+        if on_error:
+            on_error(source, e)
+
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            ext = os.path.splitext(name)[1].lower()
+            if ext == ".mbox":
+                try:
+                    box = mailbox.mbox(path, factory=lambda f: parser.parse(f), create=False)
+                    keys = box.iterkeys()
+                except (OSError, mailbox.Error) as e:
+                    failed(path, e)
+                    continue
+                try:
+                    for i, key in enumerate(keys):
+                        source = f"{path}#{i}"
+                        try:
+                            msg = _from_email_message(box.get(key), source)
+                        except Exception as e:  # 디코딩 오류(LookupError, UnicodeError) 등은 그 메일만 건너뜀
+                            failed(source, e)
+                            continue
+                        yield msg
+                finally:
+                    box.close()
+                continue
+            if ext not in (".eml", ".txt"):
+                continue
+            try:
+                if ext == ".eml":
+                    with open(path, "rb") as f:
+                        msg = _from_email_message(parser.parse(f), path)
+                else:
+                    msg = _from_text_file(path)
+            except Exception as e:
+                failed(path, e)
+                continue
+            yield msg
+
+# --------------------------------------------------------------------
+# 2. 요약 결과 -> Task 변환
+# --------------------------------------------------------------------
+
+def _as_text(value) -> str:
+    """LLM이 문자열 대신 리스트/사전을 돌려주는 경우도 Task 컬럼에 넣을 수 있게 문자열로 변환합니다."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, list):
+        return "\n".join(filter(None, (_as_text(v) for v in value))) or None
+    return json.dumps(value, ensure_ascii=False)
+
+def _guess_company(msg: dict) -> str:
+    """발신자 메일 도메인으로 회사명을 추정합니다. (예: kim@mobilint.com -> mobilint)"""
+    domain = msg['sender'].rpartition("@")[2].lower()
+    if not domain:
+        return None
+    labels = [l for l in domain.split(".") if l not in ("co", "com", "ac", "or", "go", "ne", "kr", "net", "org")]
+    return labels[-1] if labels else domain
+
+def _task_fields(msg: dict, summary: dict) -> dict:
+    memo = {k: v for k, v in summary.items() if k not in ("핵심결정사항", "다음행동")}
+    memo["원본"] = {'subject': msg['subject'], 'from': msg['sender'], 'source': msg['source']}
+    return {
+        'action_date': msg['date'],
+        'contact_name': msg['sender_name'] or None,
+        'agenda': _as_text(summary.get("핵심결정사항")) or msg['subject'],
+        'action_item': _as_text(summary.get("다음행동")),
+        'task_type': 'contact',
+        'memo': json.dumps(memo, ensure_ascii=False),
+    }
+
+# --------------------------------------------------------------------
+# 3. 일괄 처리 파이프라인
+# --------------------------------------------------------------------
+
+_DONE = object()  # 작업자 종료 신호
+
+def _load_processed_keys() -> set:
+    rows = get_connection().execute("SELECT message_key FROM Email_Import_Log WHERE status = 'done'")
+    return {r[0] for r in rows}
+
+def _flush(buffer: list, user_id: int, company_name: str, stats: dict):
+    """요약 결과 묶음을 Task로 저장하고 처리 이력을 남깁니다. (한 트랜잭션으로 커밋)"""
+    with transaction() as conn:
+        for msg, summary in buffer:
+            if not summary:
+                conn.execute(
+                    "INSERT OR REPLACE INTO Email_Import_Log (message_key, source, subject, status) "
+                    "VALUES (?, ?, ?, 'failed')",
+                    (msg['key'], msg['source'], msg['subject'])
+                )
+                stats['failed'] += 1
+                continue
+            company = company_name or _guess_company(msg) or "미분류"
+            task_id = ops.add_task_transactional(user_id=user_id, company_name=company,
+                                                 **_task_fields(msg, summary))
+            conn.execute(
+                "INSERT OR REPLACE INTO Email_Import_Log (message_key, source, subject, status, task_id) "
+                "VALUES (?, ?, ?, 'done', ?)",
+                (msg['key'], msg['source'], msg['subject'], task_id)
+            )
+            stats['tasks'] += 1
+    buffer.clear()
+
+def run_batch(directory: str,
+              user_id: int,
+              company_name: str = None,
+              workers: int = 2,
+              batch_size: int = 20,
+              summarize=None) -> dict:
+    """
+    디렉토리의 메일을 요약하여 Tasks에 일괄 등록합니다.
+    - 읽기(1개 스레드) → 요약(workers개 스레드) → DB 저장(호출한 스레드) 순으로 큐를 통해 흘려보냅니다.
+      llm_service가 추론을 직렬화하므로 workers를 늘려도 추론이 겹치지는 않지만,
+      메일 파싱/DB 저장과 추론이 겹쳐 전체 시간이 줄어듭니다.
+    - batch_size건마다 Task와 처리 이력을 한 트랜잭션으로 커밋합니다.
+      중간에 중단되어도 다시 실행하면 이미 처리된 메일은 건너뛰고 이어서 진행합니다.
+
+    Args:
+        directory (str): .eml / .mbox / .txt 파일이 있는 디렉토리.
+        user_id (int): Task 담당 직원 ID.
+        company_name (str): 모든 메일을 이 회사로 등록. 생략하면 발신자 도메인으로 추정합니다.
+        workers (int): 요약 작업자 스레드 수.
+        batch_size (int): 한 번에 커밋할 Task 수.
+        summarize (callable): 요약 함수. (기본: ai_email.summarize_with_llm)
+
+    Returns:
+        dict: {'read', 'skipped', 'tasks', 'failed', 'unreadable'} 처리 건수. (unreadable: 읽지 못한 메일)
+    """
+    summarize = summarize or ai_email.summarize_with_llm
+    stats = {'read': 0, 'skipped': 0, 'tasks': 0, 'failed': 0, 'unreadable': 0}
+    processed = _load_processed_keys()
+    in_q = queue.Queue(maxsize=workers * 4)  # 읽기가 요약보다 너무 앞서가지 않도록 제한
+    out_q = queue.Queue()
+
+    def unreadable(source, e):
+        stats['unreadable'] += 1
+
+    def reader():
+        seen = set()
+        try:
+            for msg in iter_messages(directory, on_error=unreadable):
+                stats['read'] += 1
+                if msg['key'] in processed or msg['key'] in seen or not msg['body']:
+                    stats['skipped'] += 1
+                    continue
+                seen.add(msg['key'])
+                in_q.put(msg)
+        except Exception as e:  # 읽기가 중간에 멈추면 나머지 메일이 조용히 빠지므로 알림
+            stats['unreadable'] += 1
+            print(f"오류: 메일 읽기가 중단되었습니다. 이후 파일은 처리되지 않았습니다 - {type(e).__name__}: {e}")
+        finally:
+            for _ in range(workers):
+                in_q.put(_DONE)
+
+    def worker():
+        while True:
+            msg = in_q.get()
+            if msg is _DONE:
+                out_q.put(_DONE)
+                return
+            try:
+                with llm_scheduler.request_class(llm_scheduler.BATCH):  # 화면 요청보다 뒤로
+                    summary = summarize(msg['body'])
+            except Exception as e:
+                print(f"오류: '{msg['source']}' 요약 실패 - {e}")
+                summary = {}
+            out_q.put((msg, summary))
+
+    threads = [threading.Thread(target=reader, daemon=True)]
+    threads += [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+
+    buffer = []
+    finished = 0
+    while finished < workers:
+        item = out_q.get()
+        if item is _DONE:
+            finished += 1
+            continue
+        buffer.append(item)
+        if len(buffer) >= batch_size:
+            _flush(buffer, user_id, company_name, stats)
+            print(f"진행: Task {stats['tasks']}건 등록, 실패 {stats['failed']}건")
+    if buffer:
+        _flush(buffer, user_id, company_name, stats)
+
+    for t in threads:
+        t.join()
+    return stats
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="메일 파일을 일괄 요약하여 Task로 등록합니다.")
+    parser.add_argument("directory", help=".eml / .mbox / .txt 파일이 있는 디렉토리")
+    parser.add_argument("--user-id", type=int, default=1, help="Task 담당 직원 ID (기본: 1)")
+    parser.add_argument("--company", default=None, help="모든 메일을 등록할 회사명 (생략 시 발신자 도메인으로 추정)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args()
+
+    result = run_batch(args.directory, args.user_id, args.company, args.workers, args.batch_size)
+    print(f"완료: 읽음 {result['read']}건, 건너뜀 {result['skipped']}건, "
+          f"Task 등록 {result['tasks']}건, 실패 {result['failed']}건, 읽기 실패 {result['unreadable']}건")
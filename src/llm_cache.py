@@ -0,0 +1,155 @@
+# llm_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+import config
+from db_connection import get_connection, transaction
+
+# --------------------------------------------------------------------
+# LLM 결과 캐시 (내용 주소 방식)
+# --------------------------------------------------------------------
+# 같은 서명/메일 본문이 재가져오기나 Streamlit 재실행으로 반복해서 들어오면
+# 매번 수 초씩 CPU 추론을 하게 됩니다. (모델 파일, 프롬프트 템플릿 버전, 프롬프트, 샘플링 옵션)의
+# 해시를 키로 결과를 config.LLM_CACHE_PATH의 SQLite 파일에 저장해 두고 재사용합니다.
+
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+_model_id = None
+_ready_paths = set()  # LLM_Cache 테이블을 확인한 캐시 파일 경로
+
+def _count(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+def _db():
+    conn = get_connection(config.LLM_CACHE_PATH)
+    if config.LLM_CACHE_PATH in _ready_paths:
+        return conn
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS LLM_Cache (
+            cache_key    TEXT PRIMARY KEY,
+            tag          TEXT,                  -- 프롬프트 템플릿 이름/버전 (예: 'contact/v1')
+            response     TEXT NOT NULL,         -- completion 결과 JSON
+            size         INTEGER NOT NULL,      -- response 바이트 수
+            created_at   REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hit_count    INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON LLM_Cache(last_used_at)")
+    conn.commit()
+    _ready_paths.add(config.LLM_CACHE_PATH)
+    return conn
+
+def model_id() -> str:
+    """모델 파일을 식별하는 문자열. 파일이 바뀌면(크기/수정 시각) 이전 캐시는 자동으로 무효가 됩니다."""
+    global _model_id
+    if _model_id is None:
+        try:
+            st = os.stat(config.MODEL_PATH)
+            _model_id = f"{os.path.basename(config.MODEL_PATH)}:{st.st_size}:{st.st_mtime_ns}"
+        except OSError:
+            _model_id = os.path.basename(config.MODEL_PATH)
+    return _model_id
+
+def make_key(tag: str, prompt: str, params: dict) -> str:
+    """(모델, 템플릿 버전, 프롬프트, 샘플링 옵션)의 SHA-256 해시."""
+    payload = json.dumps([model_id(), tag, prompt, params], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get(key: str):
+    """
+    캐시된 결과를 반환합니다. 없거나 만료되었으면 None.
+    """
+    try:
+        conn = _db()
+        row = conn.execute("SELECT response, last_used_at FROM LLM_Cache WHERE cache_key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > config.LLM_CACHE_TTL_SECONDS:
+            _count("misses")
+            return None
+        with transaction(config.LLM_CACHE_PATH) as conn:
+            conn.execute("UPDATE LLM_Cache SET last_used_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+                         (now, key))
+    except Exception as e:
+        # 캐시 파일 문제로 추론 자체가 실패하지 않도록, 오류는 미스로 처리합니다.
+        print(f"경고: LLM 캐시 조회 실패 - {e}")
+        _count("misses")
+        return None
+    _count("hits")
+    return json.loads(row[0])
+
+def put(key: str, tag: str, value):
+    """결과를 저장하고, 만료/용량 초과 항목을 정리합니다."""
+    response = json.dumps(value, ensure_ascii=False)
+    now = time.time()
+    try:
+        _db()
+        with transaction(config.LLM_CACHE_PATH) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO LLM_Cache (cache_key, tag, response, size, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tag, response, len(response.encode("utf-8")), now, now)
+            )
+        _count("stores")
+        prune()
+    except Exception as e:
+        print(f"경고: LLM 캐시 저장 실패 - {e}")
+
+def prune() -> int:
+    """
+    TTL이 지난 항목을 지우고, 총 크기가 config.LLM_CACHE_MAX_BYTES를 넘으면 오래 사용하지 않은 것부터 지웁니다.
+
+    Returns:
+        int: 제거한 항목 수.
+    """
+    _db()
+    with transaction(config.LLM_CACHE_PATH) as conn:
+        removed = conn.execute("DELETE FROM LLM_Cache WHERE last_used_at < ?",
+                               (time.time() - config.LLM_CACHE_TTL_SECONDS,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM LLM_Cache").fetchone()[0]
+        if total > config.LLM_CACHE_MAX_BYTES:
+            victims = []
+            for key, size in conn.execute("SELECT cache_key, size FROM LLM_Cache ORDER BY last_used_at"):
+                if total <= config.LLM_CACHE_MAX_BYTES:
+                    break
+                victims.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM LLM_Cache WHERE cache_key = ?", victims)
+            removed += len(victims)
+    _count("evictions", removed)
+    return removed
+
+def stats() -> dict:
+    """이 프로세스의 적중/미스/저장/제거 횟수와 캐시 파일의 항목 수, 총 크기."""
+    entries, total = _db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM LLM_Cache").fetchone()
+    with _stats_lock:
+        return dict(_stats, entries=entries, bytes=total)
+
+def clear(tag: str = None):
+    """캐시를 비웁니다. tag를 지정하면 해당 템플릿의 결과만 지웁니다."""
+    _db()
+    with transaction(config.LLM_CACHE_PATH) as conn:
+        if tag is None:
+            conn.execute("DELETE FROM LLM_Cache")
+        else:
+            conn.execute("DELETE FROM LLM_Cache WHERE tag = ?", (tag,))
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "clear":
+        clear()
+        print("LLM 캐시를 비웠습니다.")
+    else:
+        print(f"캐시 파일: {config.LLM_CACHE_PATH}")
+        print(f"모델 ID: {model_id()}")
+        print(stats())
+        for tag, n, size, hits in _db().execute(
+                "SELECT tag, COUNT(*), SUM(size), SUM(hit_count) FROM LLM_Cache GROUP BY tag ORDER BY tag"):
+            print(f"  {tag:<24} {n:6}건 {size / 1024:8.1f} KB  누적 적중 {hits}회")
@@ -0,0 +1,492 @@
+# llm_jobs.py
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import config
+import llm_scheduler
+from db_connection import get_connection, transaction
+
+# --------------------------------------------------------------------
+# LLM 작업 큐 (영속 대기열 + 작업자)
+# --------------------------------------------------------------------
+# Streamlit 스크립트 안에서 llm(...)을 직접 호출하면 생성이 끝날 때까지 그 세션이 멈추고
+# 서버 스레드도 붙잡힙니다. 화면은 작업을 config.LLM_JOBS_PATH의 LLM_Jobs 테이블에 넣고(submit)
+# 상태만 확인(get)하며, 추론은 작업자(별도 프로세스 또는 백그라운드 스레드)가 꺼내서 실행합니다.
+#
+# 상태 전이: queued -> running -> done
+#                         \-> queued (재시도, available_at까지 대기) -> ... -> failed
+#            queued -> cancelled, running -> (cancel_requested) -> cancelled
+# - 작업자는 실행 중인 작업의 lease_until을 heartbeat로 연장합니다. 작업자가 죽어서 lease가 만료되면
+#   다른 작업자가 그 작업을 다시 대기열로 돌려 실행하므로, 재시작해도 작업이 사라지지 않습니다.
+# - 우선순위(priority)가 높은 작업부터, 같으면 먼저 들어온 작업부터 실행합니다.
+
+PRIORITY_HIGH = 10     # 화면에서 사용자가 기다리는 작업
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10     # 일괄 처리 등 급하지 않은 작업
+
+STATUSES = ("queued", "running", "done", "failed", "cancelled")
+_FINISHED = ("done", "failed", "cancelled")
+
+_ready_paths = set()  # LLM_Jobs 테이블을 확인한 파일 경로
+_background = None    # 이 프로세스에서 띄운 작업자 스레드
+_background_lock = threading.Lock()
+
+def _db():
+    conn = get_connection(config.LLM_JOBS_PATH)
+    if config.LLM_JOBS_PATH in _ready_paths:
+        return conn
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS LLM_Jobs (
+            job_id       INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind         TEXT NOT NULL,                  -- JOB_KINDS의 키 (예: 'contact')
+            payload      TEXT NOT NULL,                  -- 처리 함수에 넘길 인자 JSON
+            job_key      TEXT NOT NULL,                  -- (kind, payload) 해시, 중복 제출 확인용
+            priority     INTEGER NOT NULL DEFAULT 0,
+            status       TEXT NOT NULL DEFAULT 'queued',
+            attempts     INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            result       TEXT,                           -- 결과 JSON
+            partial      TEXT,                           -- 실행 중 생성된 텍스트 (greeting 등 진행 표시용)
+            cancel_requested INTEGER NOT NULL DEFAULT 0, -- 실행 중 취소 요청 (작업자가 확인하고 중단)
+            error        TEXT,                           -- 마지막 실패 사유
+            worker_id    TEXT,
+            created_at   REAL NOT NULL,
+            available_at REAL NOT NULL,                  -- 재시도 대기 중이면 이 시각 이후에 실행
+            started_at   REAL,
+            lease_until  REAL,
+            finished_at  REAL
+        )
+    ''')
+    # partial / cancel_requested가 없던 이전 파일
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(LLM_Jobs)")}
+    if "partial" not in columns:
+        conn.execute("ALTER TABLE LLM_Jobs ADD COLUMN partial TEXT")
+    if "cancel_requested" not in columns:
+        conn.execute("ALTER TABLE LLM_Jobs ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_jobs_queue ON LLM_Jobs(status, priority DESC, job_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_jobs_key ON LLM_Jobs(job_key, status)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS LLM_Workers (
+            worker_id    TEXT PRIMARY KEY,
+            pid          INTEGER,
+            host         TEXT,
+            started_at   REAL NOT NULL,
+            heartbeat_at REAL NOT NULL,
+            job_id       INTEGER                         -- 실행 중인 작업 (없으면 NULL)
+        )
+    ''')
+    conn.commit()
+    _ready_paths.add(config.LLM_JOBS_PATH)
+    return conn
+
+# --------------------------------------------------------------------
+# 1. 작업 종류
+# --------------------------------------------------------------------
+# 처리 함수는 (payload(dict), progress)를 받아 JSON으로 저장할 수 있는 결과를 돌려줍니다.
+# 결과가 비어 있으면({} / "") 모델이 없거나 응답을 해석하지 못한 것이므로 실패로 보고 재시도합니다.
+# progress(지금까지의 텍스트)는 진행 상황을 작업 행에 기록하고, 취소 요청이 있었으면 True를 돌려줍니다.
+# (스트리밍하는 작업은 True를 받으면 생성을 멈추고 돌려줍니다)
+# ai_email / ai_greeting은 작업자에서만 필요하므로 지연 import 합니다.
+
+def _run_contact(payload: dict, progress) -> dict:
+    import ai_email
+    return ai_email.parse_contact_with_llm(payload['email_body'])
+
+def _run_summary(payload: dict, progress) -> dict:
+    import ai_email
+    return ai_email.summarize_with_llm(payload['email_content'])
+
+def _run_greeting(payload: dict, progress) -> str:
+    import ai_greeting
+    text = ""
+    chunks = ai_greeting.stream_email(
+        payload['email_type'], payload['event_name'], payload['visitor_name'], payload['company'],
+        payload['discussion_content'], payload.get('extra', ""))
+    try:
+        for chunk in chunks:
+            text += chunk
+            if progress(text):
+                break
+    finally:
+        chunks.close()  # 생성 중단
+    progress(text, force=True)
+    return text
+
+JOB_KINDS = {
+    "contact": _run_contact,    # {'email_body'} -> 연락처 dict
+    "summary": _run_summary,    # {'email_content'} -> 요약 dict
+    "greeting": _run_greeting,  # {'email_type', 'event_name', 'visitor_name', 'company', 'discussion_content', 'extra'} -> 메일 본문
+}
+
+# --------------------------------------------------------------------
+# 2. 제출 / 조회 (화면 쪽)
+# --------------------------------------------------------------------
+
+def _job_key(kind: str, payload: dict) -> str:
+    raw = json.dumps([kind, payload], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _row_to_job(row) -> dict:
+    job = dict(zip(("job_id", "kind", "payload", "priority", "status", "attempts", "max_attempts", "result",
+                    "partial", "cancel_requested", "error", "worker_id", "created_at", "started_at",
+                    "finished_at"), row))
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    job['payload'] = json.loads(job['payload'])
+    job['result'] = json.loads(job['result']) if job['result'] is not None else None
+    return job
+
+_JOB_COLUMNS = ("job_id, kind, payload, priority, status, attempts, max_attempts, result, "
+                "partial, cancel_requested, error, worker_id, created_at, started_at, finished_at")
+
+def submit(kind: str, payload: dict, priority: int = PRIORITY_NORMAL, max_attempts: int = None,
+           dedupe: bool = True) -> int:
+    """
+    작업을 대기열에 넣고 job_id를 반환합니다. (추론을 기다리지 않고 바로 반환)
+
+    Args:
+        kind (str): JOB_KINDS의 작업 종류.
+        payload (dict): 처리 함수에 넘길 인자.
+        priority (int): 클수록 먼저 실행. (PRIORITY_HIGH / PRIORITY_NORMAL / PRIORITY_LOW)
+        max_attempts (int): 최대 실행 횟수. 생략하면 config.LLM_JOB_MAX_ATTEMPTS.
+        dedupe (bool): 같은 (kind, payload)의 작업이 대기/실행 중이거나 이미 완료되었으면
+                       새로 넣지 않고 그 job_id를 돌려줍니다. (Streamlit 재실행으로 같은 요청이 반복될 때)
+
+    Returns:
+        int: job_id
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"지원하지 않는 작업 종류입니다: {kind}")
+    key = _job_key(kind, payload)
+    now = time.time()
+    _db()
+    with transaction(config.LLM_JOBS_PATH) as conn:
+        if dedupe:
+            row = conn.execute(
+                "SELECT job_id FROM LLM_Jobs WHERE job_key = ? AND status IN ('queued', 'running', 'done') "
+                "ORDER BY job_id DESC LIMIT 1", (key,)).fetchone()
+            if row:
+                # 이미 대기 중인 작업을 더 급한 요청이 다시 넣으면 우선순위만 올립니다.
+                conn.execute("UPDATE LLM_Jobs SET priority = MAX(priority, ?) WHERE job_id = ? AND status = 'queued'",
+                             (priority, row[0]))
+                return row[0]
+        cur = conn.execute(
+            "INSERT INTO LLM_Jobs (kind, payload, job_key, priority, max_attempts, created_at, available_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload, ensure_ascii=False), key, priority,
+             max_attempts or config.LLM_JOB_MAX_ATTEMPTS, now, now)
+        )
+        return cur.lastrowid
+
+def get(job_id: int) -> dict:
+    """
+    작업 상태를 반환합니다. 없으면 None.
+
+    Returns:
+        dict: {'job_id', 'kind', 'payload', 'priority', 'status', 'attempts', 'max_attempts',
+               'result', 'partial', 'cancel_requested', 'error', 'worker_id', 'created_at', 'started_at',
+               'finished_at'}
+              partial은 실행 중 지금까지 생성된 텍스트입니다. (진행을 알리는 작업만)
+    """
+    row = _db().execute(f"SELECT {_JOB_COLUMNS} FROM LLM_Jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+def queue_position(job_id: int) -> int:
+    """대기 중인 작업 앞에 있는 작업 수 (실행 중인 작업 포함). 대기 중이 아니면 0."""
+    row = _db().execute(
+        "SELECT (SELECT COUNT(*) FROM LLM_Jobs o WHERE o.status = 'running' "
+        "        OR (o.status = 'queued' AND (o.priority > j.priority "
+        "            OR (o.priority = j.priority AND o.job_id < j.job_id)))) "
+        "FROM LLM_Jobs j WHERE j.job_id = ? AND j.status = 'queued'", (job_id,)).fetchone()
+    return row[0] if row else 0
+
+def wait(job_id: int, timeout: float = None, poll_interval: float = 0.5) -> dict:
+    """작업이 끝날 때까지(또는 timeout초) 기다린 뒤 get() 결과를 반환합니다. (스크립트/일괄 처리용)"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        job = get(job_id)
+        if job is None or job['status'] in _FINISHED:
+            return job
+        if deadline is not None and time.monotonic() >= deadline:
+            return job
+        time.sleep(poll_interval)
+
+def cancel(job_id: int) -> bool:
+    """
+    작업을 취소합니다. 대기 중이면 바로 cancelled로 바꾸고, 실행 중이면 취소를 요청합니다.
+    (작업자가 다음 진행 기록 때 요청을 확인하고 생성을 멈춘 뒤 cancelled로 바꿈. 진행을 기록하지 않는
+    contact / summary 작업은 실행 중에는 멈출 수 없어 끝까지 실행됩니다) 이미 끝난 작업이면 False.
+    """
+    _db()
+    with transaction(config.LLM_JOBS_PATH) as conn:
+        if conn.execute(
+                "UPDATE LLM_Jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id)).rowcount:
+            return True
+        return conn.execute("UPDATE LLM_Jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'",
+                            (job_id,)).rowcount > 0
+
+# --------------------------------------------------------------------
+# 3. 작업자
+# --------------------------------------------------------------------
+
+def _recover_expired(conn, now: float) -> int:
+    """lease가 만료된 실행 중 작업(작업자가 죽은 경우)을 대기열로 되돌리거나, 횟수를 다 썼으면 실패 처리합니다."""
+    return conn.execute(
+        "UPDATE LLM_Jobs SET "
+        "  status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+        "  finished_at = CASE WHEN attempts >= max_attempts THEN ? END, "
+        "  error = '작업자가 응답하지 않아 작업을 되돌렸습니다. (' || COALESCE(worker_id, '?') || ')', "
+        "  worker_id = NULL, lease_until = NULL, available_at = ? "
+        "WHERE status = 'running' AND lease_until < ?",
+        (now, now, now)).rowcount
+
+def claim(worker_id: str, kinds=None) -> dict:
+    """
+    실행할 작업 하나를 가져와 running으로 표시합니다. 없으면 None.
+    선택과 상태 변경을 UPDATE ... RETURNING 한 문장으로 처리하므로 여러 작업자가 동시에 호출해도
+    같은 작업을 두 번 가져가지 않습니다.
+    """
+    kinds = list(kinds or JOB_KINDS)
+    now = time.time()
+    _db()
+    with transaction(config.LLM_JOBS_PATH) as conn:
+        _recover_expired(conn, now)
+        placeholders = ", ".join("?" * len(kinds))
+        rows = conn.execute(
+            f"UPDATE LLM_Jobs SET status = 'running', attempts = attempts + 1, worker_id = ?, "
+            f"  started_at = ?, lease_until = ?, partial = NULL "
+            f"WHERE job_id = (SELECT job_id FROM LLM_Jobs WHERE status = 'queued' AND available_at <= ? "
+            f"                AND kind IN ({placeholders}) ORDER BY priority DESC, job_id LIMIT 1) "
+            f"RETURNING {_JOB_COLUMNS}",
+            (worker_id, now, now + config.LLM_JOB_LEASE_SECONDS, now, *kinds)
+        ).fetchall()
+    return _row_to_job(rows[0]) if rows else None
+
+def _finish(job: dict, worker_id: str, result=None, error: str = None, cancelled: bool = False) -> str:
+    """
+    실행 결과를 저장합니다. 실패했고 횟수가 남았으면 지수 백오프 후 다시 대기열로. 바뀐 상태를 반환.
+    실행 중 취소 요청을 받아 멈췄으면(cancelled) 재시도하지 않고 cancelled로 끝냅니다.
+    """
+    now = time.time()
+    if cancelled:
+        status, available_at, result, error = "cancelled", None, None, None
+    elif error is None:
+        status, available_at = "done", None
+    elif job['attempts'] < job['max_attempts']:
+        status = "queued"
+        available_at = now + config.LLM_JOB_RETRY_DELAY_SECONDS * 2 ** (job['attempts'] - 1)
+    else:
+        status, available_at = "failed", None
+    with transaction(config.LLM_JOBS_PATH) as conn:
+        # lease가 만료되어 다른 작업자가 가져간 작업이면 (worker_id가 다름) 결과를 덮어쓰지 않습니다.
+        conn.execute(
+            "UPDATE LLM_Jobs SET status = ?, result = ?, error = ?, lease_until = NULL, "
+            "  available_at = COALESCE(?, available_at), finished_at = ? "
+            "WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+            (status, json.dumps(result, ensure_ascii=False) if status == "done" else None, error,
+             available_at, None if status == "queued" else now, job['job_id'], worker_id)
+        )
+    return status
+
+def _release(job: dict, worker_id: str):
+    """작업자가 종료되어 실행하지 못한 작업을 횟수 차감 없이 대기열로 되돌립니다."""
+    with transaction(config.LLM_JOBS_PATH) as conn:
+        conn.execute(
+            "UPDATE LLM_Jobs SET status = 'queued', attempts = attempts - 1, worker_id = NULL, lease_until = NULL "
+            "WHERE job_id = ? AND worker_id = ? AND status = 'running'", (job['job_id'], worker_id))
+
+_PROGRESS_INTERVAL = 0.3  # 진행 텍스트를 작업 행에 기록하는 최소 간격 (초)
+
+def _progress_writer(job_id: int, worker_id: str):
+    """처리 함수에 넘길 progress(text, force=False). 기록하면서 취소 요청 여부를 함께 읽어 옵니다."""
+    state = {'written_at': 0.0, 'cancelled': False}
+
+    def progress(text: str, force: bool = False) -> bool:
+        now = time.monotonic()
+        if force or now - state['written_at'] >= _PROGRESS_INTERVAL:
+            state['written_at'] = now
+            with transaction(config.LLM_JOBS_PATH) as conn:
+                row = conn.execute(
+                    "UPDATE LLM_Jobs SET partial = ? WHERE job_id = ? AND worker_id = ? AND status = 'running' "
+                    "RETURNING cancel_requested", (text, job_id, worker_id)).fetchone()
+            # 행이 없으면 lease가 만료되어 다른 작업자가 가져간 것이므로 이쪽은 멈춥니다.
+            state['cancelled'] = row is None or bool(row[0])
+        return state['cancelled']
+
+    progress.state = state
+    return progress
+
+def run_one(worker_id: str, kinds=None) -> dict:
+    """작업 하나를 가져와 실행하고 결과를 저장합니다. 실행한 작업(get() 형식)을 반환하고, 없으면 None."""
+    job = claim(worker_id, kinds)
+    if job is None:
+        return None
+    _heartbeat(worker_id, job['job_id'])
+    start = time.perf_counter()
+    # 화면에서 기다리는 작업(PRIORITY_HIGH 이상)만 interactive로, 나머지는 batch로 스케줄러에 요청합니다.
+    cls = llm_scheduler.INTERACTIVE if job['priority'] >= PRIORITY_HIGH else llm_scheduler.BATCH
+    progress = _progress_writer(job['job_id'], worker_id)
+    try:
+        with llm_scheduler.request_class(cls):
+            result = JOB_KINDS[job['kind']](job['payload'], progress)
+        error = None if result else "LLM 결과가 비어 있습니다. (모델 파일 또는 응답 형식 확인)"
+    except Exception as e:
+        result, error = None, f"{type(e).__name__}: {e}"
+    except BaseException:
+        _release(job, worker_id)  # KeyboardInterrupt 등으로 작업자가 멈추면 다른 작업자가 이어서 실행
+        raise
+    status = _finish(job, worker_id, result, error, cancelled=progress.state['cancelled'])
+    print(f"LLM 작업 #{job['job_id']} ({job['kind']}) {status} - {time.perf_counter() - start:.1f}초"
+          + (f", {error}" if error else ""))
+    _heartbeat(worker_id, None)
+    return get(job['job_id'])
+
+def _heartbeat(worker_id: str, job_id=...):
+    """작업자 생존 시각을 갱신하고, 실행 중인 작업의 lease를 연장합니다. (job_id를 주면 현재 작업도 기록)"""
+    now = time.time()
+    _db()
+    with transaction(config.LLM_JOBS_PATH) as conn:
+        if job_id is ...:
+            conn.execute("UPDATE LLM_Workers SET heartbeat_at = ? WHERE worker_id = ?", (now, worker_id))
+        else:
+            conn.execute("UPDATE LLM_Workers SET heartbeat_at = ?, job_id = ? WHERE worker_id = ?",
+                         (now, job_id, worker_id))
+        conn.execute("UPDATE LLM_Jobs SET lease_until = ? WHERE worker_id = ? AND status = 'running'",
+                     (now + config.LLM_JOB_LEASE_SECONDS, worker_id))
+
+def run_worker(worker_id: str = None, kinds=None, stop_event: threading.Event = None,
+               max_jobs: int = None, poll_interval: float = None) -> int:
+    """
+    대기열의 작업을 계속 꺼내 실행합니다. stop_event가 set 되거나 max_jobs개를 처리하면 끝납니다.
+    추론 중에도 별도 스레드가 heartbeat를 보내 lease를 연장합니다.
+
+    Returns:
+        int: 처리한 작업 수.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+    stop_event = stop_event or threading.Event()
+    poll_interval = poll_interval or config.LLM_JOB_POLL_SECONDS
+    now = time.time()
+    _db()
+    with transaction(config.LLM_JOBS_PATH) as conn:
+        conn.execute("INSERT OR REPLACE INTO LLM_Workers (worker_id, pid, host, started_at, heartbeat_at) "
+                     "VALUES (?, ?, ?, ?, ?)", (worker_id, os.getpid(), socket.gethostname(), now, now))
+
+    beat_stop = threading.Event()
+
+    def beat():
+        while not beat_stop.wait(config.LLM_JOB_LEASE_SECONDS / 3):
+            try:
+                _heartbeat(worker_id)
+            except Exception as e:
+                print(f"경고: LLM 작업자 heartbeat 실패 - {e}")
+
+    threading.Thread(target=beat, daemon=True).start()
+    done = 0
+    try:
+        while not stop_event.is_set() and (max_jobs is None or done < max_jobs):
+            if run_one(worker_id, kinds) is None:
+                stop_event.wait(poll_interval)
+                continue
+            done += 1
+    finally:
+        beat_stop.set()
+        with transaction(config.LLM_JOBS_PATH) as conn:
+            conn.execute("DELETE FROM LLM_Workers WHERE worker_id = ?", (worker_id,))
+    return done
+
+def active_workers() -> list:
+    """heartbeat가 lease 시간 안에 있었던 작업자 목록: {'worker_id', 'pid', 'host', 'heartbeat_at', 'job_id'}"""
+    rows = _db().execute(
+        "SELECT worker_id, pid, host, heartbeat_at, job_id FROM LLM_Workers WHERE heartbeat_at >= ? "
+        "ORDER BY started_at", (time.time() - config.LLM_JOB_LEASE_SECONDS,))
+    return [dict(zip(("worker_id", "pid", "host", "heartbeat_at", "job_id"), r)) for r in rows]
+
+def ensure_background_worker() -> bool:
+    """
+    살아 있는 작업자가 없으면 이 프로세스 안에 작업자 스레드를 하나 띄웁니다.
+    (config.LLM_JOB_INPROCESS_WORKER가 False면 띄우지 않음. 별도 프로세스: python llm_jobs.py worker)
+
+    Returns:
+        bool: 작업자(다른 프로세스 포함)가 있으면 True.
+    """
+    global _background
+    with _background_lock:
+        if _background is not None and _background.is_alive():
+            return True
+        if active_workers():
+            return True
+        if not config.LLM_JOB_INPROCESS_WORKER:
+            return False
+        _background = threading.Thread(target=run_worker, name="llm-job-worker", daemon=True)
+        _background.start()
+        return True
+
+# --------------------------------------------------------------------
+# 4. 관리
+# --------------------------------------------------------------------
+
+def stats() -> dict:
+    """상태별 작업 수와 살아 있는 작업자 수."""
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update(_db().execute("SELECT status, COUNT(*) FROM LLM_Jobs GROUP BY status").fetchall())
+    counts['workers'] = len(active_workers())
+    return counts
+
+def prune() -> int:
+    """config.LLM_JOB_RETENTION_DAYS보다 오래전에 끝난 작업과 오래된 작업자 기록을 지웁니다. 지운 작업 수를 반환."""
+    now = time.time()
+    _db()
+    with transaction(config.LLM_JOBS_PATH) as conn:
+        removed = conn.execute(
+            "DELETE FROM LLM_Jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?",
+            (now - config.LLM_JOB_RETENTION_DAYS * 86400,)).rowcount
+        conn.execute("DELETE FROM LLM_Workers WHERE heartbeat_at < ?", (now - config.LLM_JOB_LEASE_SECONDS,))
+    return removed
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    import argparse
+    import llm_jobs  # 직접 실행 시 __main__과 별개로 import된 모듈의 상태를 쓰도록
+
+    parser = argparse.ArgumentParser(description="LLM 작업 큐 관리 / 작업자 실행")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("worker", help="작업자 실행 (Ctrl+C로 종료, 실행 중이던 작업은 대기열로 되돌림)")
+    p.add_argument("--kinds", nargs="*", choices=list(JOB_KINDS), help="처리할 작업 종류 (기본: 전부)")
+    p.add_argument("--max-jobs", type=int, default=None)
+    p = sub.add_parser("submit", help="작업 제출")
+    p.add_argument("kind", choices=list(JOB_KINDS))
+    p.add_argument("payload", help='JSON 인자 (예: \'{"email_body": "홍길동 / gildong@example.com"}\')')
+    p.add_argument("--priority", type=int, default=PRIORITY_NORMAL)
+    p.add_argument("--wait", action="store_true", help="끝날 때까지 기다렸다가 결과 출력")
+    sub.add_parser("status", help="상태별 작업 수와 작업자 목록")
+    sub.add_parser("prune", help="오래된 작업 정리")
+    args = parser.parse_args()
+
+    print(f"작업 큐 파일: {config.LLM_JOBS_PATH}")
+    if args.command == "worker":
+        try:
+            n = llm_jobs.run_worker(kinds=args.kinds, max_jobs=args.max_jobs)
+            print(f"작업자 종료: {n}건 처리")
+        except KeyboardInterrupt:
+            print("작업자를 중단했습니다.")
+    elif args.command == "submit":
+        job_id = llm_jobs.submit(args.kind, json.loads(args.payload), priority=args.priority)
+        print(f"작업 #{job_id} 제출")
+        if args.wait:
+            llm_jobs.ensure_background_worker()
+            job = llm_jobs.wait(job_id)
+            print(f"상태: {job['status']} (시도 {job['attempts']}회)")
+            print(job['result'] if job['status'] == "done" else job['error'])
+    elif args.command == "status":
+        print(llm_jobs.stats())
+        for w in llm_jobs.active_workers():
+            print(f"  {w['worker_id']:<40} 작업 {w['job_id'] or '-'}  "
+                  f"마지막 heartbeat {time.time() - w['heartbeat_at']:.0f}초 전")
+    elif args.command == "prune":
+        print(f"{llm_jobs.prune()}건 정리")
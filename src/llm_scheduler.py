@@ -0,0 +1,642 @@
+# llm_scheduler.py
+
+import itertools
+import queue
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import config
+
+# --------------------------------------------------------------------
+# LLM 요청 스케줄러
+# --------------------------------------------------------------------
+# 여러 영업 담당자가 동시에 요약/감사메일을 요청하면 하나의 Llama 인스턴스가 들어온 순서대로
+# 한 건씩 끝까지 생성합니다. 일괄 처리 100건 뒤에 들어온 화면 요청도 그만큼 기다려야 합니다.
+# 이 모듈은 모델 앞에서 요청을 받아 다음 순서로 실행합니다.
+#
+# - 요청 종류(interactive / batch)별 우선순위. 같은 종류는 먼저 온 순서대로.
+#   batch 요청도 config.LLM_BATCH_MAX_WAIT_SECONDS 넘게 기다리면 interactive와 같은 순위가 됩니다.
+# - 요청 종류별 토큰 상한 (config.LLM_TOKEN_BUDGET)으로 max_tokens를 제한합니다.
+# - 대기 요청이 여러 개면 llama.cpp의 다중 시퀀스 배치 디코딩으로 한 번의 forward에
+#   여러 요청의 토큰을 함께 넣습니다. (CPU 디코딩은 메모리 대역폭이 병목이라 시퀀스를 늘려도
+#   한 step의 시간은 조금만 늘어남) 진행 중인 배치에도 새 요청이 step 단위로 합류하고,
+#   KV 캐시가 모자라면 interactive 요청을 위해 batch 요청 하나를 잠시 빼서 다시 대기열에 넣습니다.
+# - interactive 요청 하나만 있을 때는 llm_service의 기존 경로(시스템 프롬프트 KV 캐시 사용)로 실행합니다.
+#
+# 모델에 접근하는 것은 스케줄러 스레드 하나뿐이고, 호출한 스레드는 결과가 나올 때까지 기다립니다.
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+_CLASS_RANK = {INTERACTIVE: 0, BATCH: 1}
+
+_local = threading.local()
+_order = itertools.count()
+_END = object()  # 스트림 종료 표시
+
+def current_class() -> str:
+    """이 스레드에서 보내는 요청의 종류. (기본: interactive)"""
+    return getattr(_local, "request_class", INTERACTIVE)
+
+@contextmanager
+def request_class(cls: str):
+    """
+    with 블록 안에서 이 스레드가 보내는 LLM 요청의 종류를 지정합니다.
+
+    사용 예:
+        with llm_scheduler.request_class(llm_scheduler.BATCH):
+            ai_email.summarize_with_llm(body)
+    """
+    if cls not in _CLASS_RANK:
+        raise ValueError(f"지원하지 않는 요청 종류입니다: {cls}")
+    previous = current_class()
+    _local.request_class = cls
+    try:
+        yield
+    finally:
+        _local.request_class = previous
+
+def token_budget(cls: str, requested) -> int:
+    """요청 종류의 토큰 상한을 적용한 max_tokens. (llama_cpp처럼 None/0 이하는 '제한 없음'으로 보고 상한을 사용)"""
+    budget = config.LLM_TOKEN_BUDGET[cls]
+    if requested is None or requested <= 0:
+        return budget
+    return min(requested, budget)
+
+class _Request:
+    """스케줄러 대기열의 요청 하나. 배치 디코딩 중의 진행 상태도 함께 들고 있습니다."""
+
+    def __init__(self, prompt: str, prefix: str, kwargs: dict, cls: str, stream: bool = False):
+        if cls not in _CLASS_RANK:
+            raise ValueError(f"지원하지 않는 요청 종류입니다: {cls}")
+        self.prompt = prompt
+        self.prefix = prefix
+        self.kwargs = dict(kwargs or {})
+        self.cls = cls
+        self.stream = stream
+        self.order = next(_order)
+        self.submitted = time.monotonic()
+        self.max_tokens = token_budget(cls, self.kwargs.get("max_tokens", 16))  # llama_cpp 기본값 16
+        self.chunks = queue.Queue() if stream else None
+        self.cancelled = False
+        self.done = threading.Event()
+        self.output = None
+        self.error = None
+        self.finished = None
+        # 배치 디코딩 상태
+        self.tokens = None       # 프롬프트 토큰
+        self.seq_id = None
+        self.pos = 0             # 다음에 넣을 토큰의 위치 (프롬프트 prefill 진행도 겸함)
+        self.generated = []
+        self.next_token = None   # 샘플링했지만 아직 디코딩에 넣지 않은 토큰
+        self.emitted = 0         # 스트림으로 내보낸 글자 수
+        self.reserve = 0         # 예약한 KV 셀 수
+        self.rng = None
+
+    def reset_progress(self):
+        self.seq_id, self.pos, self.generated, self.next_token, self.reserve = None, 0, [], None, 0
+
+def _complete(req: _Request, output):
+    req.output = output
+    req.finished = time.monotonic()
+    if req.stream:
+        req.chunks.put(_END)
+    req.done.set()
+
+def _fail(req: _Request, error: BaseException):
+    req.error = error
+    _complete(req, None)
+
+# --------------------------------------------------------------------
+# 1. 다중 시퀀스 배치 디코딩 (llama.cpp 저수준 API)
+# --------------------------------------------------------------------
+
+def _sample(logits: np.ndarray, req: _Request) -> int:
+    """llama_cpp의 기본 샘플링 옵션(temperature / top_k / top_p / min_p / repeat_penalty)을 numpy로 구현."""
+    kw = req.kwargs
+    penalty = kw.get("repeat_penalty", 1.0)
+    if penalty != 1.0:
+        recent = np.unique(np.asarray((req.tokens + req.generated)[-64:]))
+        logits = logits.copy()
+        values = logits[recent]
+        logits[recent] = np.where(values > 0, values / penalty, values * penalty)
+    temperature = kw.get("temperature", 0.8)
+    if temperature <= 0:
+        return int(np.argmax(logits))
+    top_k = kw.get("top_k", 40)
+    ids = np.argpartition(logits, -top_k)[-top_k:] if 0 < top_k < len(logits) else np.arange(len(logits))
+    scaled = logits[ids] / temperature
+    probs = np.exp(scaled - scaled.max())
+    probs /= probs.sum()
+    order = np.argsort(-probs)
+    probs, ids = probs[order], ids[order]
+    keep = int(np.searchsorted(np.cumsum(probs), kw.get("top_p", 0.95))) + 1
+    keep = max(1, min(keep, int(np.sum(probs >= kw.get("min_p", 0.05) * probs[0]))))
+    probs = probs[:keep] / probs[:keep].sum()
+    return int(ids[req.rng.choice(keep, p=probs)])
+
+def _find_stop(text: str, stops, start: int) -> int:
+    """text[start:] 이후에 처음 나타나는 stop 문자열의 위치. 없으면 -1."""
+    found = [i for i in (text.find(s, start) for s in stops) if i >= 0]
+    return min(found) if found else -1
+
+class BatchEngine:
+    """
+    하나의 llama.cpp 컨텍스트에서 여러 요청을 시퀀스 ID로 나눠 함께 디코딩합니다.
+    매 step마다 생성 중인 요청은 토큰 1개씩, 아직 prefill 중인 요청은 남은 n_batch만큼의
+    프롬프트 토큰을 한 llama_batch에 담아 llama_decode 한 번으로 처리합니다.
+    """
+
+    # 이 옵션만 쓰는 요청을 배치로 처리합니다. (json_schema / grammar / logprobs 등은 llm_service의 기존 경로로)
+    SUPPORTED_KWARGS = {"max_tokens", "temperature", "top_p", "top_k", "min_p", "stop", "echo",
+                        "repeat_penalty", "seed"}
+
+    def __init__(self, llm, n_seq: int, lock: threading.Lock):
+        import llama_cpp
+        self.llm = llm
+        self.lock = lock
+        self.ctx = llm._ctx.ctx
+        self.n_ctx = llm.n_ctx()
+        self.n_batch = llm.n_batch
+        self.n_vocab = llm.n_vocab()
+        self._decode = llama_cpp.llama_decode
+        self._logits = llama_cpp.llama_get_logits_ith
+        # KV 캐시 함수 이름이 llama.cpp 버전에 따라 다릅니다.
+        self._seq_rm = getattr(llama_cpp, "llama_kv_self_seq_rm", None) or llama_cpp.llama_kv_cache_seq_rm
+        is_eog = getattr(llama_cpp, "llama_token_is_eog", None)
+        model = getattr(getattr(llm, "_model", None), "model", None)
+        eos = llm.token_eos()
+        self._is_eog = (lambda t: bool(is_eog(model, t))) if is_eog and model else (lambda t: t == eos)
+        self._batch = llama_cpp.llama_batch_init(self.n_batch, 0, 1)
+        self.free_ids = list(range(n_seq))
+        self.active = []
+        self.reserved = 0
+
+    def can_batch(self, req: _Request) -> bool:
+        used = {k for k, v in req.kwargs.items() if v is not None}
+        return not (used - self.SUPPORTED_KWARGS) and not req.kwargs.get("echo")
+
+    def admit(self, req: _Request) -> bool:
+        """KV 캐시와 시퀀스 여유가 있으면 요청을 배치에 넣습니다. (프롬프트가 컨텍스트보다 길면 ValueError)"""
+        if not self.free_ids:
+            return False
+        if req.tokens is None:
+            req.tokens = self.llm.tokenize(req.prompt.encode("utf-8"), add_bos=True, special=True)
+            if len(req.tokens) >= self.n_ctx:
+                raise ValueError(f"프롬프트({len(req.tokens)} 토큰)가 컨텍스트 길이({self.n_ctx})보다 깁니다.")
+            req.max_tokens = min(req.max_tokens, self.n_ctx - len(req.tokens))
+        reserve = len(req.tokens) + req.max_tokens
+        if self.active and self.reserved + reserve > self.n_ctx:
+            return False
+        if not self.active:
+            # llm_service의 일반 경로가 남긴 KV를 비우고, 다음 일반 호출이 처음부터 평가하도록 초기화
+            with self.lock:
+                self._seq_rm(self.ctx, -1, -1, -1)
+                self.llm.reset()
+        req.seq_id = self.free_ids.pop(0)
+        req.reserve = reserve
+        req.rng = np.random.default_rng(req.kwargs.get("seed"))
+        self.reserved += reserve
+        self.active.append(req)
+        return True
+
+    def evictable(self):
+        """interactive 요청에 자리를 내줄 수 있는 요청 (가장 늦게 들어온, 스트림이 아닌 batch 요청)."""
+        candidates = [r for r in self.active if r.cls == BATCH and not r.stream]
+        return max(candidates, key=lambda r: r.order) if candidates else None
+
+    def _release(self, req: _Request):
+        self._seq_rm(self.ctx, req.seq_id, -1, -1)
+        self.free_ids.append(req.seq_id)
+        self.reserved -= req.reserve
+        self.active.remove(req)
+
+    def evict(self, req: _Request):
+        """요청을 배치에서 빼고 진행 상태를 지웁니다. (다시 대기열에 넣으면 처음부터 생성)"""
+        with self.lock:
+            self._release(req)
+        req.reset_progress()
+
+    def _add(self, token: int, pos: int, seq_id: int, logits: bool):
+        b = self._batch
+        i = b.n_tokens
+        b.token[i] = token
+        b.pos[i] = pos
+        b.n_seq_id[i] = 1
+        b.seq_id[i][0] = seq_id
+        b.logits[i] = logits
+        b.n_tokens = i + 1
+
+    def step(self) -> int:
+        """한 번의 llama_decode. 처리한 토큰 수를 반환합니다."""
+        with self.lock:
+            self._batch.n_tokens = 0
+            rows = []  # (요청, logits를 읽을 배치 내 위치)
+            room = self.n_batch
+            for req in self.active:
+                if req.next_token is not None:
+                    self._add(req.next_token, req.pos, req.seq_id, True)
+                    rows.append((req, self._batch.n_tokens - 1))
+                    req.pos += 1
+                    room -= 1
+            for req in self.active:
+                if req.next_token is None and req.pos < len(req.tokens) and room > 0:
+                    take = min(room, len(req.tokens) - req.pos)
+                    for k in range(take):
+                        pos = req.pos + k
+                        self._add(req.tokens[pos], pos, req.seq_id, pos == len(req.tokens) - 1)
+                    req.pos += take
+                    room -= take
+                    if req.pos == len(req.tokens):
+                        rows.append((req, self._batch.n_tokens - 1))
+            n_tokens = self._batch.n_tokens
+            rc = self._decode(self.ctx, self._batch)
+            if rc != 0:
+                raise RuntimeError(f"llama_decode 실패 (코드 {rc})")
+            for req, i in rows:
+                logits = np.ctypeslib.as_array(self._logits(self.ctx, i), shape=(self.n_vocab,))
+                self._accept(req, _sample(logits, req))
+        return n_tokens
+
+    def _accept(self, req: _Request, token: int):
+        stops = req.kwargs.get("stop") or []
+        stops = [stops] if isinstance(stops, str) else stops
+        if self._is_eog(token):
+            self._finish(req, self._text(req), "stop")
+            return
+        req.generated.append(token)
+        text = self._text(req)
+        at = _find_stop(text, stops, max(0, req.emitted - max(map(len, stops), default=0)))
+        if at >= 0:
+            self._finish(req, text[:at], "stop")
+        elif len(req.generated) >= req.max_tokens:
+            self._finish(req, text, "length")
+        elif req.cancelled:
+            self._finish(req, text, "stop")
+        else:
+            req.next_token = token
+            if req.stream:
+                # stop 문자열의 앞부분일 수 있는 끝부분은 다음 토큰까지 보고 내보냅니다.
+                safe = len(text) - max((len(s) - 1 for s in stops), default=0)
+                if safe > req.emitted:
+                    req.chunks.put(text[req.emitted:safe])
+                    req.emitted = safe
+
+    def _text(self, req: _Request) -> str:
+        return self.llm.detokenize(req.generated).decode("utf-8", errors="ignore")
+
+    def _finish(self, req: _Request, text: str, reason: str):
+        self._release(req)
+        if req.stream and len(text) > req.emitted:
+            req.chunks.put(text[req.emitted:])
+        _complete(req, {
+            "id": f"cmpl-batch-{req.order}",
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": self.llm.model_path,
+            "choices": [{"text": text, "index": 0, "logprobs": None, "finish_reason": reason}],
+            "usage": {"prompt_tokens": len(req.tokens), "completion_tokens": len(req.generated),
+                      "total_tokens": len(req.tokens) + len(req.generated)},
+        })
+
+# --------------------------------------------------------------------
+# 2. 스케줄러
+# --------------------------------------------------------------------
+
+class Scheduler:
+    """
+    요청 대기열과 이를 처리하는 스레드 하나.
+
+    Args:
+        run_sequential (callable): 요청 하나를 기존 방식으로 끝까지 실행하는 함수 run(req) -> completion 결과.
+                                   스트림 요청이면 req.chunks에 텍스트 조각을 넣고 None을 반환합니다.
+        batch_engine: BatchEngine (없으면 항상 한 건씩 실행)
+        use_priority (bool): False면 들어온 순서대로만 실행 (부하 테스트 비교용)
+    """
+
+    def __init__(self, run_sequential, batch_engine=None, use_priority: bool = True):
+        self.run_sequential = run_sequential
+        self.batch_engine = batch_engine
+        self.use_priority = use_priority
+        self._pending = []
+        self._cv = threading.Condition()
+        self._stats = {"requests": 0, "sequential": 0, "batched": 0, "decode_steps": 0,
+                       "max_concurrent": 0, "preempted": 0, "completion_tokens": 0}
+        self._thread = threading.Thread(target=self._loop, name="llm-scheduler", daemon=True)
+        self._thread.start()
+
+    # --- 호출하는 쪽 ---
+
+    def submit(self, req: _Request):
+        with self._cv:
+            self._pending.append(req)
+            self._stats["requests"] += 1
+            self._cv.notify()
+
+    def generate(self, prompt: str, prefix: str = None, kwargs: dict = None, cls: str = None) -> dict:
+        """요청을 넣고 결과가 나올 때까지 기다립니다."""
+        req = _Request(prompt, prefix, kwargs, cls or current_class())
+        self.submit(req)
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.output
+
+    def stream(self, prompt: str, prefix: str = None, kwargs: dict = None, cls: str = None,
+               cancel_event: threading.Event = None):
+        """텍스트 조각을 돌려주는 제너레이터. 닫거나 cancel_event가 set 되면 스케줄러도 생성을 멈춥니다."""
+        req = _Request(prompt, prefix, kwargs, cls or current_class(), stream=True)
+        self.submit(req)
+        try:
+            while True:
+                try:
+                    item = req.chunks.get(timeout=0.1)
+                except queue.Empty:
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    continue
+                if item is _END:
+                    break
+                yield item
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+        finally:
+            req.cancelled = True
+        if req.error is not None:
+            raise req.error
+
+    def stats(self) -> dict:
+        with self._cv:
+            return dict(self._stats, pending=len(self._pending),
+                        active=len(self.batch_engine.active) if self.batch_engine else 0,
+                        batching=self.batch_engine is not None)
+
+    # --- 스케줄러 스레드 ---
+
+    def _rank(self, req: _Request, now: float) -> tuple:
+        if not self.use_priority:
+            return (0, req.order)
+        rank = _CLASS_RANK[req.cls]
+        if rank and now - req.submitted > config.LLM_BATCH_MAX_WAIT_SECONDS:
+            rank = 0
+        return (rank, req.order)
+
+    def _ordered_pending(self) -> list:
+        """취소된 요청을 정리하고 우선순위 순으로 정렬한 대기 목록. (self._cv 안에서 호출)"""
+        for req in [r for r in self._pending if r.cancelled]:
+            self._pending.remove(req)
+            _complete(req, None)
+        now = time.monotonic()
+        self._pending.sort(key=lambda r: self._rank(r, now))
+        return list(self._pending)
+
+    def _loop(self):
+        while True:
+            engine = self.batch_engine
+            with self._cv:
+                while not self._pending and not (engine and engine.active):
+                    self._cv.wait()
+                pending = self._ordered_pending()
+            if engine and (engine.active or (pending and engine.can_batch(pending[0])
+                                             and (len(pending) > 1 or pending[0].cls == BATCH))):
+                self._batch_step(engine, pending)
+            elif pending:
+                with self._cv:
+                    self._pending.remove(pending[0])
+                self._run_one(pending[0])
+
+    def _run_one(self, req: _Request):
+        try:
+            output = self.run_sequential(req)
+        except Exception as e:
+            _fail(req, e)
+            return
+        self._stats["sequential"] += 1
+        if output:
+            self._stats["completion_tokens"] += output.get("usage", {}).get("completion_tokens", 0)
+        _complete(req, output)
+
+    def _batch_step(self, engine, pending: list):
+        for req in pending:
+            if not engine.can_batch(req):
+                # 배치로 돌릴 수 없는 요청(json_schema 등)이 앞 순위이면 새 요청은 더 넣지 않고 배치를 비운 뒤
+                # 기존 경로로 실행합니다. (뒤의 batch 요청이 계속 들어와 앞지르지 않도록)
+                # interactive 요청이면 자리를 내줄 수 있는 batch 요청을 빼서 대기열로 되돌려 더 빨리 비웁니다.
+                if req.cls == INTERACTIVE and self.use_priority:
+                    victim = engine.evictable()
+                    while victim is not None:
+                        engine.evict(victim)
+                        self._stats["preempted"] += 1
+                        with self._cv:
+                            self._pending.append(victim)
+                        victim = engine.evictable()
+                break
+            try:
+                admitted = engine.admit(req)
+                if not admitted and req.cls == INTERACTIVE and self.use_priority:
+                    victim = engine.evictable()
+                    if victim is not None:
+                        engine.evict(victim)
+                        self._stats["preempted"] += 1
+                        with self._cv:
+                            self._pending.append(victim)
+                        admitted = engine.admit(req)
+            except ValueError as e:
+                with self._cv:
+                    self._pending.remove(req)
+                _fail(req, e)
+                continue
+            if not admitted:
+                break  # 우선순위가 낮은 요청이 앞질러 자리를 차지하지 않도록 여기서 멈춤
+            with self._cv:
+                self._pending.remove(req)
+            self._stats["batched"] += 1
+        self._stats["max_concurrent"] = max(self._stats["max_concurrent"], len(engine.active))
+        if not engine.active:
+            return
+        stepped = list(engine.active)
+        try:
+            engine.step()
+        except Exception as e:
+            # 이 llama.cpp 빌드에서 다중 시퀀스 디코딩이 안 되면 이후로는 한 건씩 실행합니다.
+            print(f"경고: 배치 디코딩을 사용할 수 없어 순차 실행으로 전환합니다. - {e}")
+            for req in list(engine.active):
+                engine.evict(req)
+                with self._cv:
+                    self._pending.append(req)
+            self.batch_engine = None
+            return
+        self._stats["decode_steps"] += 1
+        self._stats["completion_tokens"] += sum(r.output["usage"]["completion_tokens"]
+                                                for r in stepped if r.done.is_set() and r.output)
+
+# --------------------------------------------------------------------
+# 3. 부하 테스트
+# --------------------------------------------------------------------
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def load_test(scheduler: Scheduler, interactive: list, batch: list, interval: float) -> dict:
+    """
+    batch 요청을 한꺼번에 넣고, interactive 요청은 interval초마다 하나씩 넣으면서 지연 시간을 잽니다.
+
+    Args:
+        interactive / batch: (prompt, prefix, kwargs) 목록
+
+    Returns:
+        dict: {'interactive': {'n', 'p50', 'p95'}, 'batch': {...}, 'wall', 'tokens', 'tokens_per_sec', 'stats'}
+    """
+    requests = []
+    start = time.monotonic()
+    for prompt, prefix, kwargs in batch:
+        req = _Request(prompt, prefix, kwargs, BATCH)
+        requests.append(req)
+        scheduler.submit(req)
+    for prompt, prefix, kwargs in interactive:
+        time.sleep(interval)
+        req = _Request(prompt, prefix, kwargs, INTERACTIVE)
+        requests.append(req)
+        scheduler.submit(req)
+    for req in requests:
+        req.done.wait()
+    wall = time.monotonic() - start
+    result = {'wall': wall, 'stats': scheduler.stats()}
+    for cls in (INTERACTIVE, BATCH):
+        latencies = [r.finished - r.submitted for r in requests if r.cls == cls]
+        result[cls] = {'n': len(latencies), 'p50': _percentile(latencies, 0.5), 'p95': _percentile(latencies, 0.95)}
+    errors = [r.error for r in requests if r.error is not None]
+    if errors:
+        print(f"경고: {len(errors)}건 실패 - {errors[0]}")
+    result['tokens'] = sum(r.output["usage"]["completion_tokens"] for r in requests if r.output)
+    result['tokens_per_sec'] = result['tokens'] / wall
+    return result
+
+class _SimulatedEngine:
+    """
+    모델 없이 스케줄링 정책을 비교하기 위한 비용 모델. (실제 측정값이 아니라 가정값)
+    - prefill: 토큰당 prefill_ms
+    - 디코딩 step: step_ms + 같은 step의 시퀀스 하나당 per_seq_ms
+    """
+
+    def __init__(self, n_seq: int, n_ctx: int = None, prefill_ms: float = 2.0, step_ms: float = 60.0,
+                 per_seq_ms: float = 6.0):
+        self.n_seq, self.n_ctx = n_seq, n_ctx or config.LLM_N_CTX  # 기본값은 배포 설정과 같은 컨텍스트 길이
+        self.prefill_ms, self.step_ms, self.per_seq_ms = prefill_ms, step_ms, per_seq_ms
+        self.free_ids = list(range(n_seq))
+        self.active = []
+        self.reserved = 0
+
+    @staticmethod
+    def _prompt_tokens(req: _Request) -> list:
+        return list(range(len(req.prompt) // 2))
+
+    def _output(self, req: _Request, n: int) -> dict:
+        return {"choices": [{"text": "x" * n, "index": 0, "logprobs": None, "finish_reason": "length"}],
+                "usage": {"prompt_tokens": len(req.tokens), "completion_tokens": n,
+                          "total_tokens": len(req.tokens) + n}}
+
+    def run_sequential(self, req: _Request) -> dict:
+        req.tokens = self._prompt_tokens(req)
+        time.sleep((len(req.tokens) * self.prefill_ms + req.max_tokens * (self.step_ms + self.per_seq_ms)) / 1000)
+        return self._output(req, req.max_tokens)
+
+    def can_batch(self, req: _Request) -> bool:
+        return not req.kwargs.get("json_schema")  # BatchEngine과 같이 스키마 제약 요청은 순차 실행
+
+    def admit(self, req: _Request) -> bool:
+        req.tokens = req.tokens or self._prompt_tokens(req)
+        reserve = len(req.tokens) + req.max_tokens
+        if not self.free_ids or (self.active and self.reserved + reserve > self.n_ctx):
+            return False
+        req.seq_id, req.reserve = self.free_ids.pop(0), reserve
+        self.reserved += reserve
+        self.active.append(req)
+        return True
+
+    def evictable(self):
+        candidates = [r for r in self.active if r.cls == BATCH]
+        return max(candidates, key=lambda r: r.order) if candidates else None
+
+    def evict(self, req: _Request):
+        self.free_ids.append(req.seq_id)
+        self.reserved -= req.reserve
+        self.active.remove(req)
+        req.reset_progress()
+
+    def step(self) -> int:
+        prefill = 0
+        for req in self.active:
+            prefill += len(req.tokens) - req.pos
+            req.pos = len(req.tokens)
+            req.generated.append(0)
+        time.sleep((prefill * self.prefill_ms + self.step_ms + len(self.active) * self.per_seq_ms) / 1000)
+        for req in [r for r in self.active if len(r.generated) >= r.max_tokens]:
+            self.evict(req)
+            _complete(req, self._output(req, req.max_tokens))
+        return prefill + len(self.active)
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    import argparse
+    import llm_scheduler  # 직접 실행 시 __main__과 별개로 import된 모듈의 상태를 쓰도록
+
+    parser = argparse.ArgumentParser(description="LLM 스케줄러 부하 테스트 (p50/p95 지연, 전체 토큰/초)")
+    parser.add_argument("--interactive", type=int, default=8, help="interactive 요청 수")
+    parser.add_argument("--batch", type=int, default=16, help="batch 요청 수 (시작 시 한꺼번에 제출)")
+    parser.add_argument("--interval", type=float, default=2.0, help="interactive 요청 간격 (초)")
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--simulate", action="store_true",
+                        help="모델 없이 가정한 비용 모델로 스케줄링 정책만 비교")
+    args = parser.parse_args()
+
+    import ai_email
+    import ai_greeting
+    kwargs = {"max_tokens": args.max_tokens, "temperature": 0.1, "stop": ["```"]}
+    # 실제 호출과 같이 연락처 추출 / 요약은 JSON 스키마 제약을 걸어 보냅니다. (배치로 묶이지 않음)
+    samples = [
+        (ai_email.build_contact_prompt("홍길동 / 영업팀 과장 / gildong@example.com / 010-1234-5678"),
+         ai_email.CONTACT_SYSTEM_PROMPT, dict(kwargs, json_schema=ai_email.CONTACT_SCHEMA)),
+        (ai_email.build_summary_prompt("다음 주 화요일까지 견적서를 보내주시기 바랍니다. 검토 후 회신드리겠습니다."),
+         ai_email.SUMMARY_SYSTEM_PROMPT, dict(kwargs, json_schema=ai_email.SUMMARY_SCHEMA)),
+        (ai_greeting.build_thank_you_prompt("AI 엑스포", "김철수", "테크솔루션", "NPU 도입 논의"),
+         ai_greeting.THANK_YOU_SYSTEM_PROMPT, kwargs),
+    ]
+    make = lambda n, offset: [samples[(i + offset) % len(samples)] for i in range(n)]
+    interactive, batch = make(args.interactive, 0), make(args.batch, 1)
+
+    if args.simulate:
+        print("※ 가정한 비용 모델(prefill 2ms/토큰, step 60ms + 시퀀스당 6ms)로 실행한 결과입니다.")
+        sim = llm_scheduler._SimulatedEngine(1)
+        modes = {
+            "순차 FIFO (기존)": lambda: llm_scheduler.Scheduler(sim.run_sequential, None, use_priority=False),
+            "우선순위": lambda: llm_scheduler.Scheduler(sim.run_sequential, None),
+            f"우선순위 + 배치 {config.LLM_BATCH_SEQUENCES}": lambda: llm_scheduler.Scheduler(
+                sim.run_sequential, llm_scheduler._SimulatedEngine(config.LLM_BATCH_SEQUENCES)),
+        }
+    else:
+        import llm_service
+        config.LLM_SERVER_ENABLED = False
+        llm = llm_service.get_llm()
+        if llm is None:
+            raise SystemExit("모델 파일이 없습니다. --simulate로 스케줄링 정책만 비교할 수 있습니다.")
+        lock = llm_service._inference_lock
+        modes = {
+            "순차 FIFO (기존)": lambda: llm_scheduler.Scheduler(llm_service._run_sequential, None, use_priority=False),
+            "우선순위": lambda: llm_scheduler.Scheduler(llm_service._run_sequential, None),
+            f"우선순위 + 배치 {config.LLM_BATCH_SEQUENCES}": lambda: llm_scheduler.Scheduler(
+                llm_service._run_sequential, llm_scheduler.BatchEngine(llm, config.LLM_BATCH_SEQUENCES, lock)),
+        }
+
+    print(f"interactive {args.interactive}건 ({args.interval}초 간격), batch {args.batch}건, "
+          f"max_tokens {args.max_tokens}")
+    print(f"{'방식':<18} {'interactive p50/p95':>22} {'batch p50/p95':>20} {'토큰/초':>9} {'전체':>8}")
+    for label, factory in modes.items():
+        r = llm_scheduler.load_test(factory(), interactive, batch, args.interval)
+        i, b = r[INTERACTIVE], r[BATCH]
+        print(f"{label:<18} {i['p50']:9.1f}s /{i['p95']:7.1f}s {b['p50']:9.1f}s /{b['p95']:7.1f}s "
+              f"{r['tokens_per_sec']:9.1f} {r['wall']:7.1f}s")
@@ -0,0 +1,304 @@
+# llm_server.py
+
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+import config
+
+# --------------------------------------------------------------------
+# 로컬 추론 서버
+# --------------------------------------------------------------------
+# llm_service는 프로세스마다 모델을 한 번 로딩하지만, CLI / Streamlit 서버 / 일괄 처리 스크립트가
+# 동시에 떠 있으면 GGUF 모델이 프로세스 수만큼 메모리에 올라가고 로딩 시간도 매번 듭니다.
+# 이 서버 프로세스가 모델을 한 번만 로딩해 두고 Unix 소켓(없는 OS는 localhost TCP)으로 요청을 받습니다.
+# config.LLM_SERVER_ENABLED이면 llm_service.complete / stream이 먼저 서버에 요청하고,
+# 서버가 없을 때만 직접 로딩하므로 ai_email / ai_greeting 쪽은 바꿀 필요가 없습니다.
+#
+# 프로토콜: 연결 하나에 요청 하나. 요청과 응답은 한 줄짜리 JSON입니다.
+#   {"op": "ping"}                                          -> {"ok": true, "loaded": ..., "model": ..., ...}
+#   {"op": "complete", "prompt", "prefix", "kwargs", "priority"} -> {"ok": true, "output": completion 결과 또는 null}
+#   {"op": "stream", "prompt", "prefix", "kwargs", "priority"}   -> {"text": 조각} ... {"done": true}
+#   {"op": "warmup", "prefixes"}                            -> {"ok": true, "elapsed": 초 (모델이 없으면 -1)}
+#   실패하면                                                -> {"ok": false, "error": "..."}
+# stream 도중 클라이언트가 연결을 닫으면 서버도 생성을 멈춥니다.
+#
+# 인증: Unix 소켓은 파일 권한(0600)으로 같은 사용자만 접속합니다. TCP는 권한이 없으므로 서버가 시작할 때
+# 무작위 토큰을 config.LLM_SERVER_TOKEN_PATH에 0600으로 써 두고, 모든 요청의 "token"이 같아야 처리합니다.
+# (그 파일을 읽을 수 있는 같은 사용자 프로세스만 접속 가능. TCP 주소는 loopback으로 두세요)
+
+_RECONNECT_INTERVAL = 5.0  # 서버 연결에 실패한 뒤 이 시간(초) 동안은 다시 시도하지 않고 바로 직접 로딩 경로로
+_down_until = 0.0
+
+# --------------------------------------------------------------------
+# 1. 클라이언트
+# --------------------------------------------------------------------
+
+def _address():
+    if hasattr(socket, "AF_UNIX") and config.LLM_SERVER_SOCKET:
+        return socket.AF_UNIX, config.LLM_SERVER_SOCKET
+    return socket.AF_INET, (config.LLM_SERVER_HOST, config.LLM_SERVER_PORT)
+
+def _read_token() -> str:
+    """TCP 서버가 만든 공유 비밀. 파일이 없으면 (서버가 없으면) ConnectionError."""
+    try:
+        with open(config.LLM_SERVER_TOKEN_PATH, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError as e:
+        raise ConnectionError(f"LLM 서버 토큰을 읽을 수 없습니다. - {e}") from e
+
+def _open(request: dict, timeout: float = None):
+    """
+    서버에 연결하여 요청을 보내고 (소켓, 응답 줄 reader)를 반환합니다.
+    서버가 없으면 ConnectionError. (실패 후 _RECONNECT_INTERVAL 동안은 연결을 시도하지 않음)
+    """
+    global _down_until
+    if time.monotonic() < _down_until:
+        raise ConnectionError("LLM 서버에 연결할 수 없습니다. (재시도 대기 중)")
+    family, address = _address()
+    if family == socket.AF_INET:
+        try:
+            request = dict(request, token=_read_token())
+        except ConnectionError:
+            _down_until = time.monotonic() + _RECONNECT_INTERVAL
+            raise
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout or config.LLM_SERVER_TIMEOUT)
+    try:
+        sock.connect(address)
+        sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+    except OSError as e:  # 소켓 파일 없음 / 연결 거부 등
+        sock.close()
+        _down_until = time.monotonic() + _RECONNECT_INTERVAL
+        raise ConnectionError(f"LLM 서버에 연결할 수 없습니다. - {e}") from e
+    return sock, sock.makefile("rb")
+
+def _read(reader) -> dict:
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("LLM 서버가 응답 중에 연결을 끊었습니다.")
+    response = json.loads(line)
+    if response.get("ok") is False:
+        raise RuntimeError(f"LLM 서버 오류: {response.get('error')}")
+    return response
+
+def server_info(timeout: float = 2.0) -> dict:
+    """실행 중인 서버의 상태. 서버가 없으면 None."""
+    try:
+        sock, reader = _open({"op": "ping"}, timeout)
+    except ConnectionError:
+        return None
+    try:
+        return _read(reader)
+    except (OSError, ConnectionError, ValueError):
+        return None
+    finally:
+        sock.close()
+
+def remote_complete(prompt: str, prefix: str = None, kwargs: dict = None, priority: str = None) -> dict:
+    """
+    서버에서 completion을 실행합니다. (llm_service.complete가 호출)
+
+    Returns:
+        dict: completion 결과. 서버에 모델이 없으면 None.
+    Raises:
+        ConnectionError: 서버가 없거나 요청을 보내지 못함. (호출한 쪽은 직접 로딩으로 대신함)
+    """
+    sock, reader = _open({"op": "complete", "prompt": prompt, "prefix": prefix, "kwargs": kwargs or {},
+                          "priority": priority})
+    try:
+        return _read(reader)["output"]
+    finally:
+        sock.close()
+
+def remote_warmup(prefixes=()) -> float:
+    """
+    서버에 모델 로딩과 시스템 프롬프트 KV 상태 준비를 요청합니다. (llm_service.warmup이 호출)
+
+    Returns:
+        float: 서버에서 걸린 시간(초). 서버에 모델이 없으면 -1.
+    Raises:
+        ConnectionError: 서버가 없거나 요청을 보내지 못함.
+    """
+    sock, reader = _open({"op": "warmup", "prefixes": list(prefixes)})
+    try:
+        return _read(reader)["elapsed"]
+    finally:
+        sock.close()
+
+def remote_stream(prompt: str, prefix: str = None, kwargs: dict = None, priority: str = None):
+    """
+    서버에 stream 요청을 보내고, 텍스트 조각을 돌려주는 제너레이터를 반환합니다.
+    연결은 이 함수에서 바로 하므로 서버가 없으면 제너레이터를 만들기 전에 ConnectionError가 납니다.
+    제너레이터를 닫으면 연결이 끊기고 서버도 생성을 멈춥니다.
+    """
+    sock, reader = _open({"op": "stream", "prompt": prompt, "prefix": prefix, "kwargs": kwargs or {},
+                          "priority": priority})
+
+    def chunks():
+        try:
+            while True:
+                response = _read(reader)
+                if response.get("done"):
+                    return
+                yield response["text"]
+        finally:
+            sock.close()
+
+    return chunks()
+
+# --------------------------------------------------------------------
+# 2. 서버
+# --------------------------------------------------------------------
+
+_started_at = time.time()
+_served = {"complete": 0, "stream": 0, "warmup": 0, "errors": 0}
+_token = None  # TCP 서버일 때 요청에 있어야 하는 공유 비밀 (Unix 소켓이면 None)
+_served_lock = threading.Lock()
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _send(self, response: dict):
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def handle(self):
+        import llm_cache
+        import llm_service
+        try:
+            request = json.loads(self.rfile.readline() or b"{}")
+            if _token is not None and not hmac.compare_digest(str(request.get("token", "")), _token):
+                raise PermissionError("인증 토큰이 맞지 않습니다.")
+            op = request.get("op")
+            if op == "ping":
+                with _served_lock:
+                    served = dict(_served)
+                self._send({"ok": True, "loaded": llm_service.is_loaded(), "model": llm_cache.model_id(),
+                            "pid": os.getpid(), "uptime": round(time.time() - _started_at, 1),
+                            "served": served, "prefix_cache": llm_service.prefix_cache_stats(),
+                            "scheduler": llm_service.scheduler_stats()})
+            elif op == "complete":
+                output = llm_service.complete(request["prompt"], prefix=request.get("prefix"),
+                                              priority=request.get("priority"), **request.get("kwargs", {}))
+                self._send({"ok": True, "output": output})
+            elif op == "stream":
+                for text in llm_service.stream(request["prompt"], prefix=request.get("prefix"),
+                                               priority=request.get("priority"), **request.get("kwargs", {})):
+                    self._send({"text": text})
+                self._send({"done": True})
+            elif op == "warmup":
+                self._send({"ok": True, "elapsed": llm_service.warmup(request.get("prefixes", []))})
+            else:
+                raise ValueError(f"지원하지 않는 요청입니다: {op}")
+            if op in _served:
+                with _served_lock:
+                    _served[op] += 1
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 클라이언트가 stream을 중간에 닫음 (llm_service.stream 제너레이터는 여기서 닫히며 생성 중단)
+        except Exception as e:
+            with _served_lock:
+                _served["errors"] += 1
+            print(f"오류: LLM 서버 요청 처리 실패 - {type(e).__name__}: {e}")
+            try:
+                self._send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+            except OSError:
+                pass
+
+def _write_token() -> str:
+    """TCP 접속용 무작위 토큰을 같은 사용자만 읽을 수 있는 파일(0600)로 씁니다."""
+    token = secrets.token_hex(32)
+    if os.path.exists(config.LLM_SERVER_TOKEN_PATH):
+        os.unlink(config.LLM_SERVER_TOKEN_PATH)
+    fd = os.open(config.LLM_SERVER_TOKEN_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return token
+
+def _make_server():
+    global _token
+    family, address = _address()
+    if family == socket.AF_INET:
+        if address[0] not in ("127.0.0.1", "::1", "localhost"):
+            print(f"경고: LLM 서버가 loopback이 아닌 주소({address[0]})에서 접속을 받습니다. "
+                  f"토큰 파일을 가진 클라이언트만 처리하지만, 통신은 암호화되지 않습니다.")
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        server = socketserver.ThreadingTCPServer(address, _Handler)
+        _token = _write_token()
+    else:
+        if os.path.exists(address):
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    probe.connect(address)
+                raise ValueError(f"이미 LLM 서버가 실행 중입니다: {address}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(address)  # 비정상 종료로 남은 소켓 파일
+        server = socketserver.ThreadingUnixStreamServer(address, _Handler)
+        os.chmod(address, 0o600)  # 같은 사용자 프로세스만 접속
+    server.daemon_threads = True
+    return server, address
+
+def serve(preload: bool = True):
+    """
+    추론 서버를 실행합니다. (Ctrl+C로 종료)
+    preload이면 접속을 받기 전에 모델을 로딩하고 시스템 프롬프트 KV 상태를 만들어 둡니다.
+    동시에 들어온 요청은 llm_service의 스케줄러가 우선순위에 따라 묶거나 차례로 처리합니다.
+    """
+    import llm_service
+    # 이 프로세스가 서버이므로, llm_service가 자기 자신에게 요청을 보내지 않도록 끕니다.
+    config.LLM_SERVER_ENABLED = False
+    server, address = _make_server()
+    if preload:
+        import ai_email
+        import ai_greeting
+        elapsed = llm_service.warmup([ai_email.CONTACT_SYSTEM_PROMPT, ai_email.SUMMARY_SYSTEM_PROMPT,
+                                      ai_greeting.THANK_YOU_SYSTEM_PROMPT])
+        if elapsed < 0:
+            print("경고: 모델 없이 서버를 시작합니다. 요청에는 빈 결과(null)를 돌려줍니다.")
+        else:
+            print(f"모델 준비 완료 ({elapsed:.1f}초)")
+    print(f"LLM 서버 대기 중: {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("LLM 서버를 종료합니다.")
+    finally:
+        server.server_close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)
+        if _token is not None and os.path.exists(config.LLM_SERVER_TOKEN_PATH):
+            os.unlink(config.LLM_SERVER_TOKEN_PATH)
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    import argparse
+    import llm_server  # 직접 실행 시 __main__과 별개로 import된 모듈의 상태를 쓰도록
+
+    parser = argparse.ArgumentParser(description="로컬 LLM 추론 서버")
+    parser.add_argument("command", nargs="?", default="serve", choices=["serve", "ping", "bench"],
+                        help="serve: 서버 실행(기본) / ping: 서버 상태 / bench: 요청 왕복 지연 측정")
+    parser.add_argument("--no-preload", action="store_true", help="첫 요청이 올 때 모델 로딩")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        llm_server.serve(preload=not args.no_preload)
+    elif args.command == "ping":
+        info = llm_server.server_info()
+        print(info if info is not None else f"실행 중인 LLM 서버가 없습니다: {llm_server._address()[1]}")
+    else:
+        if llm_server.server_info() is None:
+            print("실행 중인 LLM 서버가 없습니다.")
+        else:
+            # 추론을 제외한 요청 왕복 비용 (연결 + JSON 직렬화)
+            n = 200
+            start = time.perf_counter()
+            for _ in range(n):
+                llm_server.server_info()
+            print(f"ping 왕복: {(time.perf_counter() - start) / n * 1000:.2f} ms")
+            import ai_email
+            start = time.perf_counter()
+            result = ai_email.parse_contact_with_llm("홍길동 / 영업팀 과장 / gildong@example.com / 010-1234-5678")
+            print(f"연락처 추출 (서버 경유): {time.perf_counter() - start:.2f}초 -> {result}")
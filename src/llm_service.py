@@ -0,0 +1,372 @@
+# llm_service.py
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import config
+import llm_cache
+import llm_scheduler
+from config import MODEL_PATH
+
+# --------------------------------------------------------------------
+# 공유 LLM 런타임
+# --------------------------------------------------------------------
+# ai_email / ai_greeting이 각자 Llama를 만들면 같은 GGUF 모델이 두 번 로딩되고,
+# import만 해도 수 초가 걸립니다. 모델은 이 모듈에서 프로세스당 한 번, 처음 필요할 때만 로딩합니다.
+
+_llm = None
+_load_attempted = False
+_load_lock = threading.Lock()
+# Llama 인스턴스는 동시에 여러 스레드에서 호출할 수 없으므로 추론 호출을 직렬화합니다.
+_inference_lock = threading.Lock()
+
+# 고정 시스템 프롬프트(prefix)별로 prefill이 끝난 KV 상태를 보관하는 LRU 캐시 { prefix 문자열: LlamaState }
+# _inference_lock 안에서만 접근합니다.
+_prefix_cache = OrderedDict()
+_prefix_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+_NO_SERVER = object()  # complete()에서 추론 서버를 쓰지 못했음을 나타내는 값
+_scheduler = None      # 모델 앞에서 요청 순서를 정하는 llm_scheduler.Scheduler (처음 요청할 때 생성)
+
+def _load_model():
+    if not os.path.exists(MODEL_PATH):
+        print(f"경고: 모델 파일을 찾을 수 없습니다. 경로: {MODEL_PATH}")
+        return None
+
+    from llama_cpp import Llama  # 모델을 쓰지 않는 화면에서는 llama_cpp import 비용도 들지 않도록 지연 import
+
+    print("LLM 모델을 로딩합니다...")
+    start = time.perf_counter()
+    llm = Llama(
+        model_path=MODEL_PATH,
+        n_ctx=config.LLM_N_CTX,
+        n_threads=config.LLM_N_THREADS,
+        n_batch=config.LLM_N_BATCH,
+        use_mmap=config.LLM_USE_MMAP,
+        use_mlock=config.LLM_USE_MLOCK,
+        verbose=False,
+    )
+    print(f"모델 로딩 완료. ({time.perf_counter() - start:.1f}초)")
+    return llm
+
+def get_llm():
+    """
+    공유 Llama 인스턴스를 반환합니다. (모델 파일이 없으면 None)
+    처음 호출한 스레드만 모델을 로딩하고, 동시에 들어온 다른 스레드는 로딩이 끝날 때까지 기다립니다.
+    """
+    global _llm, _load_attempted
+    if not _load_attempted:
+        with _load_lock:
+            if not _load_attempted:
+                _llm = _load_model()
+                _load_attempted = True
+    return _llm
+
+def is_loaded() -> bool:
+    """모델이 이미 메모리에 올라와 있는지 확인합니다. (로딩을 유발하지 않음)"""
+    return _llm is not None
+
+def available() -> bool:
+    """
+    생성을 요청할 수 있는지 확인합니다. 모델이 로딩된 추론 서버(llm_server)가 있으면 True,
+    없으면 이 프로세스에서 모델을 로딩해 봅니다.
+    """
+    if config.LLM_SERVER_ENABLED:
+        import llm_server
+        info = llm_server.server_info()
+        if info is not None:
+            return info['loaded']
+    return get_llm() is not None
+
+# --------------------------------------------------------------------
+# 시스템 프롬프트 KV 캐시
+# --------------------------------------------------------------------
+# ai_email / ai_greeting의 프롬프트는 긴 고정 시스템 프롬프트 + 짧은 사용자 입력으로 구성됩니다.
+# 고정 부분의 prefill 결과(KV 상태)를 저장해 두었다가 다음 호출 전에 복원하면,
+# llama_cpp가 이미 평가된 토큰 접두사를 건너뛰므로 가변 부분만 prefill 하게 됩니다.
+
+def _state_size(state) -> int:
+    return getattr(state, "llama_state_size", None) or len(state.llama_state)
+
+def _evict_prefix_states():
+    total = sum(_state_size(s) for s in _prefix_cache.values())
+    while _prefix_cache and (len(_prefix_cache) > config.LLM_PREFIX_CACHE_ENTRIES
+                             or total > config.LLM_PREFIX_CACHE_BYTES):
+        _, state = _prefix_cache.popitem(last=False)
+        total -= _state_size(state)
+        _prefix_stats["evictions"] += 1
+
+def _restore_prefix(llm, prefix: str):
+    """prefix의 KV 상태를 모델에 올립니다. 캐시에 없으면 prefix만 평가한 뒤 상태를 저장합니다."""
+    state = _prefix_cache.get(prefix)
+    if state is not None:
+        _prefix_cache.move_to_end(prefix)
+        _prefix_stats["hits"] += 1
+        llm.load_state(state)
+        return
+    _prefix_stats["misses"] += 1
+    llm.reset()
+    # create_completion과 같은 방식(special=True)으로 토큰화해야 전체 프롬프트와 접두사가 일치합니다.
+    llm.eval(llm.tokenize(prefix.encode("utf-8"), special=True))
+    _prefix_cache[prefix] = llm.save_state()
+    _evict_prefix_states()
+
+def prefix_cache_stats() -> dict:
+    """시스템 프롬프트 KV 캐시의 적중/미스/제거 횟수와 현재 보관 중인 항목 수, 크기(바이트)."""
+    with _inference_lock:
+        return dict(_prefix_stats,
+                    entries=len(_prefix_cache),
+                    bytes=sum(_state_size(s) for s in _prefix_cache.values()))
+
+def clear_prefix_cache():
+    """보관 중인 KV 상태를 모두 버립니다."""
+    with _inference_lock:
+        _prefix_cache.clear()
+
+# --------------------------------------------------------------------
+# JSON 스키마 제약 디코딩
+# --------------------------------------------------------------------
+# complete(..., json_schema=스키마 dict)로 요청하면 스키마를 GBNF 문법으로 바꿔 Llama에 grammar로 넘깁니다.
+# 문법에 맞지 않는 토큰은 샘플링 단계에서 제외되므로 결과는 항상 스키마에 맞는 JSON 하나이고,
+# 객체가 닫히면 문법상 EOS만 남아 생성이 바로 끝납니다.
+# 스키마는 dict 그대로 kwargs에 실어 보내므로 llm_cache 키와 추론 서버 요청에도 그대로 들어갑니다.
+
+_grammars = {}  # 스키마 JSON 문자열 -> LlamaGrammar (스케줄러 스레드에서만 접근)
+
+def _grammar(schema: dict):
+    """스키마에 해당하는 LlamaGrammar. 이 llama_cpp 버전이 지원하지 않으면 None (제약 없이 생성)."""
+    key = json.dumps(schema, ensure_ascii=False, sort_keys=True)
+    if key not in _grammars:
+        try:
+            from llama_cpp import LlamaGrammar
+            _grammars[key] = LlamaGrammar.from_json_schema(key, verbose=False)
+        except (ImportError, AttributeError, ValueError) as e:
+            print(f"경고: JSON 스키마를 문법으로 변환하지 못해 제약 없이 생성합니다. - {e}")
+            _grammars[key] = None
+    return _grammars[key]
+
+def _run_sequential(req) -> dict:
+    """
+    스케줄러가 요청 하나를 기존 방식(Llama.__call__ + 시스템 프롬프트 KV 캐시)으로 실행할 때 쓰는 함수.
+    스트림 요청이면 텍스트 조각을 req.chunks에 넣고 None을 반환합니다.
+    """
+    llm = get_llm()
+    kwargs = dict(req.kwargs, max_tokens=req.max_tokens)
+    schema = kwargs.pop("json_schema", None)
+    if schema is not None:
+        kwargs["grammar"] = _grammar(schema)
+    with _inference_lock:
+        if req.prefix and req.prompt.startswith(req.prefix):
+            _restore_prefix(llm, req.prefix)
+        if not req.stream:
+            return llm(req.prompt, **kwargs)
+        chunks = llm(req.prompt, stream=True, **kwargs)
+        try:
+            for chunk in chunks:
+                if req.cancelled:
+                    break
+                text = chunk["choices"][0]["text"]
+                if text:
+                    req.chunks.put(text)
+        finally:
+            chunks.close()
+
+def _get_scheduler(llm) -> llm_scheduler.Scheduler:
+    """이 프로세스의 요청 스케줄러. 모델을 로딩한 뒤 처음 요청할 때 만듭니다."""
+    global _scheduler
+    if _scheduler is None:
+        with _load_lock:
+            if _scheduler is None:
+                engine = None
+                if config.LLM_BATCH_SEQUENCES > 1:
+                    try:
+                        engine = llm_scheduler.BatchEngine(llm, config.LLM_BATCH_SEQUENCES, _inference_lock)
+                    except (ImportError, AttributeError) as e:
+                        print(f"경고: 이 llama_cpp 버전에서는 배치 디코딩을 쓸 수 없어 한 건씩 실행합니다. - {e}")
+                    # 요청마다 프롬프트 + max_tokens를 예약하므로, 컨텍스트가 작으면 두 건도 함께 들어가지 못합니다.
+                    budget = max(config.LLM_TOKEN_BUDGET.values())
+                    if engine is not None and engine.n_ctx < 2 * budget:
+                        print(f"경고: 컨텍스트 길이({engine.n_ctx})가 요청 두 건의 예약량(약 2 x {budget} 토큰)보다 "
+                              f"작아 배치 디코딩이 거의 묶이지 않습니다. config.LLM_N_CTX를 늘려주세요.")
+                _scheduler = llm_scheduler.Scheduler(_run_sequential, engine)
+    return _scheduler
+
+def scheduler_stats() -> dict:
+    """요청 스케줄러의 처리 건수 / 배치 디코딩 step 수 / 대기 중인 요청 수. (아직 요청이 없었으면 None)"""
+    return _scheduler.stats() if _scheduler is not None else None
+
+def complete(prompt: str, prefix: str = None, cache_tag: str = None, priority: str = None, **kwargs) -> dict:
+    """
+    공유 모델로 텍스트 생성을 수행합니다. kwargs는 Llama.__call__에 그대로 전달됩니다.
+    추론 서버(llm_server)가 실행 중이면 모델을 로딩하지 않고 서버에서 생성합니다.
+
+    Args:
+        prompt (str): 전체 프롬프트.
+        prefix (str): prompt의 고정 앞부분(시스템 프롬프트). 지정하면 이 부분의 KV 상태를 캐시하여
+                      다음 호출부터는 나머지 부분만 prefill 합니다.
+        cache_tag (str): 프롬프트 템플릿 이름/버전 (예: 'contact/v1'). 지정하면 같은 프롬프트와 옵션의
+                         결과를 llm_cache에서 바로 돌려줍니다. (템플릿을 바꾸면 버전을 올려주세요)
+        json_schema (dict): kwargs로 JSON 스키마를 넘기면 그 스키마에 맞는 JSON만 생성합니다. (문법 제약 디코딩)
+        priority (str): 'interactive' / 'batch'. 생략하면 llm_scheduler.request_class()로 지정한 값
+                        (기본 interactive). max_tokens는 종류별 config.LLM_TOKEN_BUDGET으로 제한됩니다.
+
+    Returns:
+        dict: llama_cpp의 completion 결과. 모델이 없거나 추론 서버 요청이 실패하면(시간 초과 등) None.
+    """
+    priority = priority or llm_scheduler.current_class()
+    use_cache = cache_tag and config.LLM_CACHE_ENABLED and not kwargs.get("stream")
+    if use_cache:
+        key = llm_cache.make_key(cache_tag, prompt, kwargs)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached  # 적중 시 모델 로딩도 하지 않습니다.
+
+    output = _NO_SERVER
+    if config.LLM_SERVER_ENABLED and not kwargs.get("stream"):
+        import llm_server  # llm_server가 이 모듈을 import하므로 지연 import
+        try:
+            output = llm_server.remote_complete(prompt, prefix, kwargs, priority)
+        except ConnectionError:
+            pass  # 서버가 없으면 이 프로세스에서 직접 로딩
+        except (OSError, RuntimeError, ValueError) as e:
+            # 서버는 있지만 응답 시간 초과 / 서버 쪽 오류 / 잘못된 응답. 서버가 모델을 들고 있으므로
+            # 이 프로세스에서 또 로딩하지 않고, 모델이 없을 때처럼 None을 돌려줍니다.
+            print(f"오류: LLM 서버 요청 실패 - {type(e).__name__}: {e}")
+            return None
+    if output is _NO_SERVER:
+        llm = get_llm()
+        if llm is None:
+            return None
+        output = _get_scheduler(llm).generate(prompt, prefix, kwargs, priority)
+    if output is None:
+        return None
+    requested = kwargs.get("max_tokens", 16)
+    truncated = (output["choices"][0].get("finish_reason") == "length"
+                 and llm_scheduler.token_budget(priority, requested) != requested)
+    if use_cache and not truncated:  # 토큰 상한으로 잘린 결과는 같은 키로 저장하지 않습니다.
+        llm_cache.put(key, cache_tag, output)
+    return output
+
+def stream(prompt: str, prefix: str = None, cancel_event: threading.Event = None, priority: str = None, **kwargs):
+    """
+    생성되는 텍스트를 토큰 조각 단위로 돌려주는 제너레이터. (kwargs는 Llama.__call__에 전달)
+    - cancel_event가 set 되거나, 호출한 쪽이 반복을 멈추고 제너레이터를 닫으면 즉시 생성을 중단합니다.
+    - 다 쓰지 않을 제너레이터는 close() 해주세요. 닫아야 스케줄러가 그 요청의 생성을 멈춥니다.
+      (for 문에서 break 하거나 예외로 빠져나가면 가비지 컬렉션 시 자동으로 닫힙니다)
+    - 스트리밍 결과는 llm_cache에 저장하지 않습니다.
+    - 추론 서버(llm_server)가 실행 중이면 서버의 스트림을 그대로 전달합니다.
+    - priority는 complete()와 같습니다.
+
+    Yields:
+        str: 새로 생성된 텍스트 조각. 모델이 없으면 아무것도 내보내지 않습니다.
+    """
+    priority = priority or llm_scheduler.current_class()
+    if config.LLM_SERVER_ENABLED:
+        import llm_server
+        try:
+            remote = llm_server.remote_stream(prompt, prefix, kwargs, priority)
+        except ConnectionError:
+            remote = None
+        if remote is not None:
+            try:
+                for text in remote:
+                    if cancel_event is not None and cancel_event.is_set():
+                        break
+                    yield text
+            except (OSError, RuntimeError, ValueError) as e:  # 시간 초과 / 서버 쪽 오류: 지금까지 내보낸 데서 끝냄
+                print(f"오류: LLM 서버 스트림 실패 - {type(e).__name__}: {e}")
+            finally:
+                remote.close()  # 연결을 끊으면 서버도 생성을 멈춤
+            return
+
+    llm = get_llm()
+    if llm is None:
+        return
+    chunks = _get_scheduler(llm).stream(prompt, prefix, kwargs, priority, cancel_event)
+    try:
+        yield from chunks
+    finally:
+        chunks.close()
+
+def warmup(prefixes=()) -> float:
+    """
+    모델을 미리 로딩하고 짧은 생성을 한 번 실행하여 첫 요청의 지연을 없앱니다.
+    (앱 시작 직후 백그라운드 스레드 등에서 호출)
+    추론 서버(llm_server)가 실행 중이면 이 프로세스에서는 모델을 로딩하지 않고 서버에 warmup을 요청합니다.
+
+    Args:
+        prefixes: 미리 KV 상태를 만들어 둘 시스템 프롬프트 목록.
+
+    Returns:
+        float: 소요 시간(초). 모델이 없거나 서버 요청이 실패하면 -1.
+    """
+    if config.LLM_SERVER_ENABLED:
+        import llm_server
+        try:
+            return llm_server.remote_warmup(list(prefixes))
+        except ConnectionError:
+            pass  # 서버가 없으면 이 프로세스에서 직접 로딩
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"오류: LLM 서버 warmup 요청 실패 - {type(e).__name__}: {e}")
+            return -1
+    start = time.perf_counter()
+    if complete("<|user|>\n안녕하세요\n<|assistant|>\n", max_tokens=1) is None:
+        return -1
+    for prefix in prefixes:
+        with _inference_lock:
+            _restore_prefix(get_llm(), prefix)
+    return time.perf_counter() - start
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    # 시작 시간 / 메모리(RSS) 벤치마크
+    def rss_mb() -> float:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return float("nan")
+
+    print(f"시작 RSS: {rss_mb():.0f} MB")
+
+    start = time.perf_counter()
+    import ai_email, ai_greeting  # 이제 import만으로는 모델을 로딩하지 않습니다.
+    print(f"ai_email + ai_greeting import: {time.perf_counter() - start:.3f}초, RSS {rss_mb():.0f} MB")
+
+    start = time.perf_counter()
+    get_llm()
+    print(f"모델 로딩 (1회): {time.perf_counter() - start:.1f}초, RSS {rss_mb():.0f} MB")
+
+    elapsed = warmup()
+    if elapsed >= 0:
+        print(f"warmup: {elapsed:.2f}초, RSS {rss_mb():.0f} MB")
+
+    # 첫 토큰까지의 시간(TTFT) 비교: 시스템 프롬프트 KV 캐시 미사용 vs 사용
+    # max_tokens=1 생성 시간 = prefill + 첫 토큰 디코딩
+    if is_loaded():
+        samples = [
+            ("연락처 추출", ai_email.CONTACT_SYSTEM_PROMPT,
+             ai_email.build_contact_prompt("홍길동 / 영업팀 과장 / gildong@example.com / 010-1234-5678")),
+            ("이메일 요약", ai_email.SUMMARY_SYSTEM_PROMPT,
+             ai_email.build_summary_prompt("다음 주 화요일까지 견적서를 보내주시기 바랍니다.")),
+            ("감사메일", ai_greeting.THANK_YOU_SYSTEM_PROMPT,
+             ai_greeting.build_thank_you_prompt("AI 엑스포", "김철수", "테크솔루션", "NPU 도입 논의")),
+        ]
+
+        def ttft(prompt, prefix=None) -> float:
+            with _inference_lock:
+                get_llm().reset()  # 직전 호출의 컨텍스트가 재사용되지 않도록 초기화
+            start = time.perf_counter()
+            complete(prompt, prefix=prefix, max_tokens=1, temperature=0)
+            return time.perf_counter() - start
+
+        print("\n--- TTFT (캐시 없음 -> 시스템 프롬프트 KV 캐시 적중) ---")
+        for label, prefix, prompt in samples:
+            cold = ttft(prompt)
+            ttft(prompt, prefix)  # KV 상태 생성
+            warm = ttft(prompt, prefix)
+            print(f"{label:<8}: {cold * 1000:7.0f} ms -> {warm * 1000:7.0f} ms")
+        print(prefix_cache_stats())
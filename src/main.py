@@ -65,8 +65,7 @@ def main_menu():
 
         elif choice == '9':
             print("\n--- 회사 목록 엑셀 내보내기 ---")
-            companies_data = queries.get_all_companies_summary()
-            excel_exporter.export_to_excel(companies_data, 'companies_summary')
+            excel_exporter.export_companies_to_excel()
 
         elif choice == '0':
             print("프로그램을 종료합니다.")
@@ -230,6 +229,7 @@ def contact_search_menu():
         print("\n--- 담당자 검색 ---")
         print("1. 담당자 검색 (이름, 이메일, 전화번호)")
         print("2. 전체 담당자 목록")
+        print("3. 통합 검색 (담당자, Task, 프로젝트, 기술 문의)")
         print("0. 메인 메뉴로 돌아가기")
         choice = input("선택하세요: ")
         
@@ -247,6 +247,17 @@ def contact_search_menu():
             print("\n--- 전체 담당자 목록 ---")
             pprint(contacts)
             
+        elif choice == '3':
+            search_term = input("검색어를 입력하세요 (여러 단어는 모두 포함): ")
+            results = queries.search(search_term)
+            if results:
+                print(f"\n--- '{search_term}' 통합 검색 결과 ---")
+                for r in results:
+                    print(f"[{r['source']} #{r['id']}] {r['title']} ({r['company_name'] or 'N/A'})")
+                    print(f"    {r['snippet']}")
+            else:
+                print(f"'{search_term}'에 대한 검색 결과가 없습니다.")
+            
         elif choice == '0':
             break
         else:
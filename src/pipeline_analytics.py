@@ -0,0 +1,318 @@
+# pipeline_analytics.py
+
+import time
+from db_connection import get_connection, transaction, mark_written
+
+# --------------------------------------------------------------------
+# 영업 파이프라인 분석 (최초 컨택 -> 프로젝트 -> 무상 대여 -> 구매)
+# --------------------------------------------------------------------
+# db_schema v6의 트리거가 First_Contact_Logs / Projects / Free_Trials / Invoices / Invoice_Items의
+# 변경을 Pipeline_Changes에 쌓아 둡니다. refresh()는 쌓인 변경에 해당하는 행만 다시 계산하여
+#   1) 그 행이 예전에 Pipeline_Daily에 더했던 값(Pipeline_Facts)을 빼고
+#   2) 현재 상태로 다시 계산한 값을 더합니다.
+# 전체를 다시 집계하지 않으므로 refresh() 비용은 변경된 행 수에 비례하고,
+# 조회 함수는 작은 일별 집계 테이블만 읽으므로 데이터가 늘어나도 몇 ms 안에 끝납니다.
+#
+# 지표 (Pipeline_Daily.metric) - 날짜는 각 단계가 시작된 날(코호트) 기준입니다.
+#   first_contact           : 최초 컨택 수              (dim1=channel, dim2=contact_type, 날짜=contact_date)
+#   contact_to_project      : 프로젝트로 전환된 컨택 수  (dim1=channel, dim2=contact_type)
+#   days_contact_to_project : 컨택 -> 프로젝트 시작 일수  (dim1=channel)
+#   project                 : 프로젝트 수                (날짜=start_date, 없으면 등록일)
+#   days_project_to_paid    : 프로젝트 시작 -> 첫 입금 인보이스 일수
+#   trial                   : 무상 대여 수               (dim1=product_id, 날짜=start_date)
+#   trial_converted         : 구매로 전환된 무상 대여 수   (dim1=product_id)
+#   days_trial_to_purchase  : 대여 시작 -> 첫 입금 인보이스 일수 (dim1=product_id)
+#   paid_revenue            : 입금 완료(status=2) 인보이스 항목 금액 (dim1=product_id, dim2=nationality, 날짜=issue_date)
+# 일수 지표는 total / n이 평균입니다.
+
+# 원본 행 하나가 일별 집계에 더하는 값: (row_id, metric, day, dim1, dim2, value)
+# {ids}는 이번에 다시 계산할 id 목록(임시 테이블)입니다.
+_FACT_QUERIES = {
+    "First_Contact_Logs": """
+        SELECT F.log_id AS row_id, 'first_contact' AS metric, F.contact_date AS day,
+               COALESCE(F.channel, '') AS dim1, COALESCE(F.contact_type, '') AS dim2, 1 AS value
+          FROM First_Contact_Logs F
+         WHERE F.log_id IN ({ids}) AND F.is_deleted = 0
+        UNION ALL
+        SELECT F.log_id, 'contact_to_project', F.contact_date,
+               COALESCE(F.channel, ''), COALESCE(F.contact_type, ''), 1
+          FROM First_Contact_Logs F
+          JOIN Projects P ON P.project_id = F.project_id AND P.is_deleted = 0
+         WHERE F.log_id IN ({ids}) AND F.is_deleted = 0
+        UNION ALL
+        SELECT F.log_id, 'days_contact_to_project', F.contact_date, COALESCE(F.channel, ''), '',
+               julianday(COALESCE(P.start_date, date(P.created_at))) - julianday(F.contact_date)
+          FROM First_Contact_Logs F
+          JOIN Projects P ON P.project_id = F.project_id AND P.is_deleted = 0
+         WHERE F.log_id IN ({ids}) AND F.is_deleted = 0
+    """,
+    "Projects": """
+        SELECT P.project_id AS row_id, 'project' AS metric, COALESCE(P.start_date, date(P.created_at)) AS day,
+               '' AS dim1, '' AS dim2, 1 AS value
+          FROM Projects P
+         WHERE P.project_id IN ({ids}) AND P.is_deleted = 0
+        UNION ALL
+        SELECT P.project_id, 'days_project_to_paid', COALESCE(P.start_date, date(P.created_at)), '', '',
+               julianday(V.first_paid) - julianday(COALESCE(P.start_date, date(P.created_at)))
+          FROM Projects P
+          JOIN (SELECT project_id, MIN(issue_date) AS first_paid FROM Invoices
+                 WHERE status = 2 AND is_deleted = 0 AND project_id IN ({ids})
+                 GROUP BY project_id) V ON V.project_id = P.project_id
+         WHERE P.project_id IN ({ids}) AND P.is_deleted = 0
+    """,
+    "Free_Trials": """
+        SELECT T.task_id AS row_id, 'trial' AS metric, COALESCE(T.start_date, date(T.created_at)) AS day,
+               CAST(T.product_id AS TEXT) AS dim1, '' AS dim2, 1 AS value
+          FROM Free_Trials T
+         WHERE T.task_id IN ({ids}) AND T.is_deleted = 0
+        UNION ALL
+        SELECT T.task_id, 'trial_converted', COALESCE(T.start_date, date(T.created_at)),
+               CAST(T.product_id AS TEXT), '', 1
+          FROM Free_Trials T
+         WHERE T.task_id IN ({ids}) AND T.is_deleted = 0 AND T.is_converted = 1
+        UNION ALL
+        SELECT T.task_id, 'days_trial_to_purchase', COALESCE(T.start_date, date(T.created_at)),
+               CAST(T.product_id AS TEXT), '',
+               julianday(V.first_paid) - julianday(COALESCE(T.start_date, date(T.created_at)))
+          FROM Free_Trials T
+          JOIN (SELECT project_id, MIN(issue_date) AS first_paid FROM Invoices
+                 WHERE status = 2 AND is_deleted = 0 GROUP BY project_id) V ON V.project_id = T.project_id
+         WHERE T.task_id IN ({ids}) AND T.is_deleted = 0 AND T.is_converted = 1
+    """,
+    "Invoice_Items": """
+        SELECT I.item_id AS row_id, 'paid_revenue' AS metric, V.issue_date AS day,
+               CAST(I.product_id AS TEXT) AS dim1, COALESCE(C.nationality, '') AS dim2, I.subtotal AS value
+          FROM Invoice_Items I
+          JOIN Invoices V ON V.invoice_id = I.invoice_id AND V.status = 2 AND V.is_deleted = 0
+          JOIN Companies C ON C.company_id = V.company_id
+         WHERE I.item_id IN ({ids}) AND I.is_deleted = 0
+    """,
+}
+
+# 변경된 행 -> 함께 다시 계산해야 하는 행 (위에서부터 순서대로 펼칩니다)
+#   (변경된 테이블, 다시 계산할 테이블, 그 테이블의 id를 찾는 SQL)
+_DEPENDENCIES = [
+    ("Companies", "Invoices", "SELECT invoice_id FROM Invoices WHERE company_id IN ({ids})"),
+    ("Invoices", "Invoice_Items", "SELECT item_id FROM Invoice_Items WHERE invoice_id IN ({ids})"),
+    ("Projects", "First_Contact_Logs", "SELECT log_id FROM First_Contact_Logs WHERE project_id IN ({ids})"),
+    ("Projects", "Free_Trials", "SELECT task_id FROM Free_Trials WHERE project_id IN ({ids})"),
+]
+
+_IDS = "SELECT id FROM temp.Pipeline_Ids"
+
+def _load_ids(c, ids):
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS Pipeline_Ids (id INTEGER PRIMARY KEY)")
+    c.execute("DELETE FROM temp.Pipeline_Ids")
+    c.executemany("INSERT INTO temp.Pipeline_Ids (id) VALUES (?)", [(i,) for i in ids])
+
+def _apply_facts(c, source: str, sign: int):
+    """source의 대상 행(Pipeline_Ids)이 가진 Facts를 Pipeline_Daily에 더하거나(sign=1) 뺍니다(sign=-1)."""
+    c.execute(f"""
+        INSERT INTO Pipeline_Daily (metric, day, dim1, dim2, total, n)
+        SELECT metric, day, dim1, dim2, {sign} * SUM(value), {sign} * COUNT(*)
+          FROM Pipeline_Facts
+         WHERE source = ? AND row_id IN ({_IDS})
+         GROUP BY metric, day, dim1, dim2
+        ON CONFLICT(metric, day, dim1, dim2) DO UPDATE
+           SET total = total + excluded.total, n = n + excluded.n
+    """, (source,))
+
+def refresh(max_changes: int = None) -> dict:
+    """
+    쌓인 변경 로그를 일별 집계에 반영합니다. 반영할 변경이 없으면 쿼리 한 번으로 끝납니다.
+
+    Args:
+        max_changes (int): 한 번에 처리할 최대 변경 수 (None이면 전부).
+
+    Returns:
+        dict: {'changes': 처리한 변경 수, 'rows': 다시 계산한 원본 행 수, 'seconds': 소요 시간}
+    """
+    start = time.perf_counter()
+    conn = get_connection()
+    if conn.execute("SELECT 1 FROM Pipeline_Changes LIMIT 1").fetchone() is None:
+        return {'changes': 0, 'rows': 0, 'seconds': time.perf_counter() - start}
+
+    with transaction() as conn:
+        # 여러 프로세스가 동시에 refresh해도 같은 변경을 두 번 반영하지 않도록 쓰기 잠금을 먼저 잡습니다.
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        c = conn.cursor()
+        sql = "SELECT change_id, source, row_id FROM Pipeline_Changes ORDER BY change_id"
+        if max_changes:
+            sql += f" LIMIT {int(max_changes)}"
+        changes = c.execute(sql).fetchall()
+        if not changes:
+            return {'changes': 0, 'rows': 0, 'seconds': time.perf_counter() - start}
+
+        pending = {}
+        for _, source, row_id in changes:
+            pending.setdefault(source, set()).add(row_id)
+        for changed, target, sql in _DEPENDENCIES:
+            if pending.get(changed):
+                _load_ids(c, pending[changed])
+                pending.setdefault(target, set()).update(r[0] for r in c.execute(sql.format(ids=_IDS)))
+
+        rows = 0
+        for source, query in _FACT_QUERIES.items():
+            ids = pending.get(source)
+            if not ids:
+                continue
+            rows += len(ids)
+            _load_ids(c, ids)
+            _apply_facts(c, source, -1)
+            c.execute(f"DELETE FROM Pipeline_Facts WHERE source = ? AND row_id IN ({_IDS})", (source,))
+            c.execute(f"""
+                INSERT INTO Pipeline_Facts (source, row_id, metric, day, dim1, dim2, value)
+                SELECT ?, row_id, metric, day, dim1, dim2, value FROM ({query.format(ids=_IDS)})
+                 WHERE day IS NOT NULL AND value IS NOT NULL
+            """, (source,))
+            _apply_facts(c, source, 1)
+
+        c.execute("DELETE FROM Pipeline_Daily WHERE n = 0")
+        c.execute("DELETE FROM Pipeline_Changes WHERE change_id <= ?", (changes[-1][0],))
+        mark_written("Pipeline_Daily")
+    return {'changes': len(changes), 'rows': rows, 'seconds': time.perf_counter() - start}
+
+def rebuild() -> dict:
+    """집계를 비우고 원본 테이블 전체를 다시 계산합니다. (트리거가 없던 기간의 데이터 복구용)"""
+    with transaction() as conn:
+        conn.execute("DELETE FROM Pipeline_Facts")
+        conn.execute("DELETE FROM Pipeline_Daily")
+        for source, key in (("First_Contact_Logs", "log_id"), ("Projects", "project_id"),
+                            ("Free_Trials", "task_id"), ("Invoice_Items", "item_id")):
+            conn.execute(f"INSERT INTO Pipeline_Changes (source, row_id) SELECT '{source}', {key} FROM {source}")
+        mark_written("Pipeline_Daily")
+    return refresh()
+
+# --------------------------------------------------------------------
+# 조회 API (대시보드/내보내기용) - 모두 refresh() 후 Pipeline_Daily만 읽습니다.
+# --------------------------------------------------------------------
+
+def _range(start_date: str, end_date: str) -> tuple:
+    return start_date or "0000-01-01", end_date or "9999-12-31"
+
+def _totals(metrics, start_date, end_date, group_by: str = None) -> dict:
+    """{(metric, 그룹 값): (total, n)} - group_by는 'dim1' / 'dim2' / 'day' / None"""
+    refresh()
+    marks = ",".join("?" * len(metrics))
+    group = group_by or "''"
+    rows = get_connection().execute(f"""
+        SELECT metric, {group}, SUM(total), SUM(n) FROM Pipeline_Daily
+         WHERE metric IN ({marks}) AND day BETWEEN ? AND ?
+         GROUP BY metric, {group}
+    """, (*metrics, *_range(start_date, end_date))).fetchall()
+    return {(m, g): (total, n) for m, g, total, n in rows}
+
+def _rate(numerator: int, denominator: int):
+    return round(numerator / denominator, 4) if denominator else None
+
+def _average(total_n):
+    return round(total_n[0] / total_n[1], 1) if total_n and total_n[1] else None
+
+def get_funnel_summary(start_date: str = None, end_date: str = None) -> dict:
+    """
+    기간 내 단계별 건수, 전환율, 단계 간 평균 소요 일수, 입금 매출.
+
+    Returns:
+        dict: {'first_contacts', 'contacts_converted', 'contact_to_project_rate', 'projects',
+               'trials', 'trials_converted', 'trial_to_purchase_rate', 'paid_revenue',
+               'avg_days_contact_to_project', 'avg_days_project_to_paid', 'avg_days_trial_to_purchase'}
+    """
+    t = _totals(["first_contact", "contact_to_project", "project", "trial", "trial_converted", "paid_revenue",
+                 "days_contact_to_project", "days_project_to_paid", "days_trial_to_purchase"],
+                start_date, end_date)
+    n = lambda metric: t.get((metric, ''), (0, 0))[1]
+    return {
+        'first_contacts': n("first_contact"),
+        'contacts_converted': n("contact_to_project"),
+        'contact_to_project_rate': _rate(n("contact_to_project"), n("first_contact")),
+        'projects': n("project"),
+        'trials': n("trial"),
+        'trials_converted': n("trial_converted"),
+        'trial_to_purchase_rate': _rate(n("trial_converted"), n("trial")),
+        'paid_revenue': t.get(("paid_revenue", ''), (0, 0))[0] or 0,
+        'avg_days_contact_to_project': _average(t.get(("days_contact_to_project", ''))),
+        'avg_days_project_to_paid': _average(t.get(("days_project_to_paid", ''))),
+        'avg_days_trial_to_purchase': _average(t.get(("days_trial_to_purchase", ''))),
+    }
+
+def get_first_contacts_by_channel(start_date: str = None, end_date: str = None) -> list:
+    """채널별 최초 컨택 수, 프로젝트 전환 수/전환율, 평균 전환 소요 일수 (컨택 수 내림차순)."""
+    t = _totals(["first_contact", "contact_to_project", "days_contact_to_project"], start_date, end_date, "dim1")
+    channels = sorted({g for m, g in t if m == "first_contact"},
+                      key=lambda ch: -t[("first_contact", ch)][1])
+    result = []
+    for ch in channels:
+        contacts = t[("first_contact", ch)][1]
+        converted = t.get(("contact_to_project", ch), (0, 0))[1]
+        result.append({'channel': ch or '(미기재)', 'first_contacts': contacts, 'converted': converted,
+                       'conversion_rate': _rate(converted, contacts),
+                       'avg_days_to_project': _average(t.get(("days_contact_to_project", ch)))})
+    return result
+
+def get_trial_conversion_by_product(start_date: str = None, end_date: str = None) -> list:
+    """제품별 무상 대여 수, 구매 전환 수/전환율, 평균 전환 소요 일수."""
+    t = _totals(["trial", "trial_converted", "days_trial_to_purchase"], start_date, end_date, "dim1")
+    names = _product_names()
+    result = []
+    for (metric, pid), (_, trials) in sorted(t.items()):
+        if metric != "trial":
+            continue
+        converted = t.get(("trial_converted", pid), (0, 0))[1]
+        result.append({'product_id': int(pid), 'product_name': names.get(int(pid)), 'trials': trials,
+                       'converted': converted, 'conversion_rate': _rate(converted, trials),
+                       'avg_days_to_purchase': _average(t.get(("days_trial_to_purchase", pid)))})
+    return result
+
+def get_paid_revenue(start_date: str = None, end_date: str = None, by: str = "product") -> list:
+    """
+    입금 완료 매출 합계.
+
+    Args:
+        by (str): 'product' / 'nationality' / 'product_nationality' / 'day'
+    """
+    refresh()
+    columns = {"product": "dim1", "nationality": "dim2", "product_nationality": "dim1, dim2", "day": "day"}
+    if by not in columns:
+        raise ValueError(f"지원하지 않는 집계 기준입니다: {by}")
+    rows = get_connection().execute(f"""
+        SELECT {columns[by]}, SUM(total), SUM(n) FROM Pipeline_Daily
+         WHERE metric = 'paid_revenue' AND day BETWEEN ? AND ?
+         GROUP BY {columns[by]} ORDER BY {'day' if by == 'day' else 'SUM(total) DESC'}
+    """, _range(start_date, end_date)).fetchall()
+    names = _product_names()
+    result = []
+    for row in rows:
+        *keys, revenue, items = row
+        entry = {'revenue': revenue, 'items': items}
+        if by == "day":
+            entry['day'] = keys[0]
+        if by in ("product", "product_nationality"):
+            entry['product_id'] = int(keys[0])
+            entry['product_name'] = names.get(int(keys[0]))
+        if by in ("nationality", "product_nationality"):
+            entry['nationality'] = keys[-1]
+        result.append(entry)
+    return result
+
+def get_daily_series(metric: str, start_date: str = None, end_date: str = None) -> list:
+    """지표 하나의 일별 (day, total, n) 목록 (차트용)."""
+    refresh()
+    rows = get_connection().execute("""
+        SELECT day, SUM(total), SUM(n) FROM Pipeline_Daily
+         WHERE metric = ? AND day BETWEEN ? AND ?
+         GROUP BY day ORDER BY day
+    """, (metric, *_range(start_date, end_date))).fetchall()
+    return [{'day': d, 'total': total, 'n': n} for d, total, n in rows]
+
+def _product_names() -> dict:
+    return dict(get_connection().execute("SELECT product_id, product_name FROM Products"))
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    result = refresh()
+    print(f"변경 {result['changes']}건 반영 (원본 {result['rows']}행, {result['seconds'] * 1000:.1f}ms)")
+    print(get_funnel_summary())
+    for row in get_first_contacts_by_channel():
+        print(row)
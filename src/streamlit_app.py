@@ -3,9 +3,15 @@ import user_auth
 import db_queries as queries
 import db_operations as ops
 import db_export as excel_exporter
+import db_cache
+import llm_jobs
+import pipeline_analytics
+import db_profiler
 from pprint import pprint
 import hashlib
+import os
 import time
+import uuid
 
 def generate_session_token(username: str) -> str:
     """세션 토큰 생성"""
@@ -284,6 +290,71 @@ def edit_profile_page():
                     st.session_state.password_verified = False
                     st.rerun()
 
+def paged_view(key: str, fetch, filters=()) -> dict:
+    """
+    키셋 페이지네이션 목록의 이전/다음 버튼을 그리고 현재 페이지를 조회합니다.
+    지나온 페이지의 cursor를 세션에 쌓아 두었다가 '이전'에서 꺼내 씁니다. 필터가 바뀌면 첫 페이지로 돌아갑니다.
+
+    Args:
+        key: 세션 상태 구분용 이름
+        fetch: cursor를 받아 {'rows', 'next_cursor'}를 돌려주는 함수 (queries.get_*_page)
+        filters: 현재 필터 값 (바뀌었는지 비교용)
+    """
+    state = st.session_state.setdefault(f"{key}_paging", {'cursors': [None], 'filters': filters})
+    if state['filters'] != filters:
+        state.update(cursors=[None], filters=filters)
+    page = fetch(state['cursors'][-1])
+
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if st.button("◀ 이전", key=f"{key}_prev", disabled=len(state['cursors']) == 1):
+            state['cursors'].pop()
+            st.rerun()
+    with col2:
+        if st.button("다음 ▶", key=f"{key}_next", disabled=page['next_cursor'] is None):
+            state['cursors'].append(page['next_cursor'])
+            st.rerun()
+    with col3:
+        st.caption(f"{len(state['cursors'])} 페이지")
+    return page
+
+@st.fragment(run_every=0.5)
+def greeting_job_status(job_id: int):
+    """
+    감사메일 생성 작업의 진행 상태. 이 부분만 0.5초마다 다시 그리며, 작업자가 기록한 텍스트를 생성되는 대로
+    보여줍니다. 끝나면 전체 화면을 갱신합니다.
+    """
+    job = llm_jobs.get(job_id)
+    if job is None:
+        st.session_state.greeting_job = None
+        return
+    if job['status'] in ("queued", "running"):
+        if job['status'] == "queued":
+            ahead = llm_jobs.queue_position(job_id)
+            st.info(f"⏳ 메일 생성 대기 중입니다. (앞에 {ahead}건)" if ahead else "⏳ 메일 생성 대기 중입니다.")
+        elif job['cancel_requested']:
+            st.info("⏹ 생성을 중단하는 중입니다...")
+        elif not job['partial']:
+            retry = f" (재시도 {job['attempts'] - 1}회)" if job['attempts'] > 1 else ""
+            st.info(f"✍️ 메일을 생성하고 있습니다...{retry}")
+        if job['partial']:
+            st.markdown(job['partial'] + "▌")
+        if not job['cancel_requested'] and st.button("⏹ 생성 중단", key=f"cancel_job_{job_id}"):
+            llm_jobs.cancel(job_id)
+            st.rerun(scope="fragment")
+    elif job['status'] == "done":
+        st.session_state.generated_email = job['result']
+        st.rerun()
+    elif job['status'] == "cancelled":
+        # 중단 전까지 생성된 내용은 남겨 둡니다.
+        st.session_state.greeting_job = None
+        if job['partial']:
+            st.session_state.generated_email = job['partial']
+        st.rerun()
+    else:
+        st.session_state.greeting_job = None
+        st.error(f"메일을 생성하지 못했습니다. LLM 모델 파일을 확인해주세요. ({job['error'] or job['status']})")
+
 def main_crm():
     """메인 CRM 기능"""
     st.title("📊 Mobilint CRM")
@@ -298,7 +369,7 @@ def main_crm():
             return
     
     # 상단에 사용자 정보와 버튼들
-    col1, col2, col3 = st.columns([3, 1, 1])
+    col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
     with col1:
         auth_level = st.session_state.get('auth_level', 0)
         level_name = user_auth.get_auth_level_name(auth_level)
@@ -309,6 +380,11 @@ def main_crm():
             st.session_state.password_verified = False
             st.rerun()
     with col3:
+        # 조회 결과는 db_cache에 보관되며 이 앱의 쓰기로만 갱신됩니다. CLI 등 다른 곳에서 수정한 경우 새로고침합니다.
+        if st.button("🔄 새로고침"):
+            db_cache.clear()
+            st.rerun()
+    with col4:
         if st.button("🚪 로그아웃"):
             # 세션 상태 초기화
             for key in ['logged_in', 'username', 'user_id', 'auth_level', 'session_token', 'edit_profile_mode', 'password_verified']:
@@ -326,22 +402,42 @@ def main_crm():
     # 메인 메뉴
     menu = st.selectbox(
         "작업을 선택하세요:",
-        ["전체 회사 목록 보기", "전체 Task 목록 보기", "신규 Task 추가하기", "전체 회사 목록 엑셀 내보내기"]
+        ["전체 회사 목록 보기", "전체 Task 목록 보기", "신규 Task 추가하기", "통합 검색", "감사메일 생성",
+         "파이프라인 분석", "전체 회사 목록 엑셀 내보내기"]
     )
     
     if menu == "전체 회사 목록 보기":
         st.subheader("🏢 전체 회사 목록")
-        companies = queries.get_all_companies_summary()
-        if companies:
-            st.dataframe(companies)
+        name_prefix = st.text_input("회사명 (앞부분)", key="company_prefix")
+        page = paged_view("companies", lambda cursor: queries.get_companies_page(
+            cursor, limit=50, name_prefix=name_prefix.strip() or None), filters=(name_prefix,))
+        if page['rows']:
+            st.dataframe(page['rows'])
         else:
             st.info("등록된 회사가 없습니다.")
     
     elif menu == "전체 Task 목록 보기":
         st.subheader("📋 전체 Task 목록")
-        tasks = queries.get_all_from_table('Tasks')
-        if tasks:
-            st.dataframe(tasks)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            company_name = st.text_input("회사명", key="task_company")
+        with col2:
+            status_label = st.selectbox("상태", ["전체", "미완료", "완료"], key="task_status")
+        with col3:
+            descending = st.selectbox("정렬", ["최신순", "오래된 순"], key="task_order") == "최신순"
+        with col4:
+            page_size = st.selectbox("페이지 크기", [50, 100, 500], key="task_page_size")
+        filters = {
+            'company_name': company_name.strip() or None,
+            'task_status': {"전체": None, "미완료": 0, "완료": 1}[status_label],
+        }
+        total, exact = queries.count_tasks(**filters)
+        st.caption(f"{total:,}건" if exact else f"{total:,}건 이상")
+        page = paged_view("tasks", lambda cursor: queries.get_tasks_page(
+            cursor, limit=page_size, descending=descending, **filters),
+            filters=(tuple(filters.items()), descending, page_size))
+        if page['rows']:
+            st.dataframe(page['rows'])
         else:
             st.info("등록된 Task가 없습니다.")
     
@@ -385,6 +481,86 @@ def main_crm():
                 else:
                     st.error("필수 필드를 모두 입력해주세요.")
     
+    elif menu == "통합 검색":
+        st.subheader("🔍 통합 검색")
+        search_term = st.text_input("검색어 (담당자, Task, 프로젝트, 기술 문의)", placeholder="예: 김준엽, YOLO 품질검사")
+        source_labels = {"contact": "담당자", "task": "Task", "project": "프로젝트", "tech_inquiry": "기술 문의"}
+        selected = st.multiselect("검색 대상", list(source_labels), default=list(source_labels),
+                                  format_func=lambda s: source_labels[s])
+        if search_term.strip() and selected:
+            results = queries.search(search_term, sources=selected, limit=50, highlight=("**", "**"))
+            if results:
+                st.caption(f"{len(results)}건")
+                for r in results:
+                    st.markdown(f"**[{source_labels[r['source']]} #{r['id']}] {r['title'] or ''}** "
+                                f"· {r['company_name'] or 'N/A'}  \n{r['snippet'] or ''}")
+            else:
+                st.info("검색 결과가 없습니다.")
+    
+    elif menu == "감사메일 생성":
+        st.subheader("✉️ 행사 방문 감사메일 생성")
+        email_types = {"thank_you": "기본 감사메일", "follow_up": "후속 조치 포함", "meeting_proposal": "미팅 제안 포함"}
+        with st.form("greeting_form"):
+            event_name = st.text_input("행사명")
+            visitor_name = st.text_input("방문자 성명")
+            company = st.text_input("회사명")
+            discussion_content = st.text_area("논의 내용")
+            email_type = st.radio("메일 유형", list(email_types), format_func=lambda t: email_types[t], horizontal=True)
+            extra = st.text_input("후속 조치 / 제안할 미팅 주제 (해당 유형만)")
+            submitted = st.form_submit_button("메일 생성")
+
+        if submitted:
+            if event_name and visitor_name and company and discussion_content:
+                # 생성은 작업자가 하고, 화면은 작업 번호만 들고 상태를 확인합니다. (스크립트가 추론을 기다리지 않음)
+                st.session_state.greeting_job = llm_jobs.submit("greeting", {
+                    'email_type': email_type, 'event_name': event_name, 'visitor_name': visitor_name,
+                    'company': company, 'discussion_content': discussion_content, 'extra': extra,
+                }, priority=llm_jobs.PRIORITY_HIGH)
+                st.session_state.generated_email = None
+                if not llm_jobs.ensure_background_worker():
+                    st.warning("실행 중인 LLM 작업자가 없습니다. `python src/llm_jobs.py worker`로 작업자를 실행해주세요.")
+            else:
+                st.error("행사명, 방문자 성명, 회사명, 논의 내용을 모두 입력해주세요.")
+
+        job_id = st.session_state.get('greeting_job')
+        if job_id and not st.session_state.get('generated_email'):
+            greeting_job_status(job_id)
+        elif st.session_state.get('generated_email'):
+            st.markdown(st.session_state.generated_email)
+
+        if st.session_state.get('generated_email'):
+            st.download_button("📥 메일 저장 (.txt)", data=st.session_state.generated_email.encode('utf-8'),
+                               file_name="감사메일.txt", mime="text/plain")
+    
+    elif menu == "파이프라인 분석":
+        st.subheader("📈 영업 파이프라인 분석")
+        col1, col2 = st.columns(2)
+        with col1:
+            start_date = st.date_input("시작일", value=None, key="pipeline_start")
+        with col2:
+            end_date = st.date_input("종료일", value=None, key="pipeline_end")
+        period = (str(start_date) if start_date else None, str(end_date) if end_date else None)
+
+        summary = pipeline_analytics.get_funnel_summary(*period)
+        rate = lambda r: f"{r * 100:.1f}%" if r is not None else "-"
+        days = lambda d: f"{d}일" if d is not None else "-"
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("최초 컨택", f"{summary['first_contacts']:,}")
+        col2.metric("프로젝트 전환", f"{summary['contacts_converted']:,}", rate(summary['contact_to_project_rate']))
+        col3.metric("무상 대여 -> 구매", f"{summary['trials_converted']:,} / {summary['trials']:,}",
+                    rate(summary['trial_to_purchase_rate']))
+        col4.metric("입금 매출", f"{summary['paid_revenue']:,.0f}")
+        st.caption(f"평균 소요: 컨택→프로젝트 {days(summary['avg_days_contact_to_project'])} · "
+                   f"프로젝트→첫 입금 {days(summary['avg_days_project_to_paid'])} · "
+                   f"대여→구매 {days(summary['avg_days_trial_to_purchase'])}")
+
+        st.markdown("**채널별 최초 컨택**")
+        st.dataframe(pipeline_analytics.get_first_contacts_by_channel(*period))
+        st.markdown("**제품별 무상 대여 전환**")
+        st.dataframe(pipeline_analytics.get_trial_conversion_by_product(*period))
+        st.markdown("**입금 매출 (제품 × 국가)**")
+        st.dataframe(pipeline_analytics.get_paid_revenue(*period, by="product_nationality"))
+
     elif menu == "전체 회사 목록 엑셀 내보내기":
         st.subheader("📤 엑셀 내보내기")
         if st.button("엑셀 파일 생성"):
@@ -397,12 +573,43 @@ def main_crm():
                     st.download_button(
                         label="📥 파일 다운로드",
                         data=f.read(),
-                        file_name=filepath.split('\\')[-1],
+                        file_name=os.path.basename(filepath),
                         mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
                     )
             except Exception as e:
                 st.error(f"엑셀 파일 생성 중 오류가 발생했습니다: {e}")
 
+def debug_query_panel():
+    """Debug Mode에서 페이지 하단에 DB 쿼리 프로파일을 보여줍니다."""
+    with st.expander("🐛 DB 쿼리 프로파일", expanded=False):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            threshold = st.number_input("느린 쿼리 기준 (ms)", min_value=1, step=10,
+                                        value=int(db_profiler.slow_threshold_ms()), key="slow_query_ms")
+            if threshold != db_profiler.slow_threshold_ms():
+                db_profiler.enable(threshold)
+        with col2:
+            if st.button("통계 초기화", key="profiler_reset"):
+                db_profiler.reset()
+                st.rerun()
+
+        st.caption("통계는 Debug Mode를 켠 뒤 실행된 쿼리만 포함하며, 화면을 새로 그릴 때마다 누적됩니다.")
+        tab_callers, tab_queries, tab_slow = st.tabs(["함수별", "문장별", "느린 쿼리"])
+        with tab_callers:
+            st.dataframe(db_profiler.top_callers(20))
+        with tab_queries:
+            by = st.selectbox("정렬 기준", ["total_ms", "max_ms", "avg_ms", "calls", "rows"], key="profiler_sort")
+            st.dataframe(db_profiler.top_queries(20, by=by))
+        with tab_slow:
+            entries = db_profiler.slow_queries(20)
+            if not entries:
+                st.info("느린 쿼리가 없습니다.")
+            for entry in entries:
+                st.markdown(f"**{entry['ms']:.1f} ms** · {entry['rows']:,}행 · `{entry['caller']}` · {entry['at']}")
+                st.code(entry['sql'], language="sql")
+                if entry['plan']:
+                    st.code(entry['plan'], language="text")
+
 def main():
     """메인 함수"""
     st.set_page_config(
@@ -428,10 +635,17 @@ def main():
     # 우측 상단에 디버그 모드 버튼 추가
     with st.sidebar:
         st.write("---")
-        if st.checkbox("🐛 Debug Mode", value=st.session_state.debug_mode):
-            st.session_state.debug_mode = True
+        debug_mode = st.checkbox("🐛 Debug Mode", value=st.session_state.debug_mode)
+    # Debug Mode에서만 쿼리 프로파일링 (끄면 일반 커넥션으로 돌아가 오버헤드 없음)
+    # 프로파일링은 서버 프로세스 전체 설정이므로, 재실행마다가 아니라 이 세션이 체크박스를 바꿀 때만 요청/해제하고
+    # 다른 세션이 켜 둔 동안은 꺼지지 않습니다. (db_profiler.request / release)
+    if debug_mode != st.session_state.debug_mode:
+        st.session_state.debug_mode = debug_mode
+        owner = st.session_state.setdefault('profiler_owner', uuid.uuid4().hex)
+        if debug_mode:
+            db_profiler.request(owner)
         else:
-            st.session_state.debug_mode = False
+            db_profiler.release(owner)
     
     # 로그인 상태에 따른 페이지 분기
     if st.session_state.logged_in:
@@ -439,5 +653,8 @@ def main():
     else:
         login_page()
 
+    if st.session_state.debug_mode:
+        debug_query_panel()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
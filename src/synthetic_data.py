@@ -0,0 +1,534 @@
+# synthetic_data.py
+
+import hashlib
+import json
+import os
+import numpy as np
+import config
+from db_connection import get_connection, transaction, close_connection
+from db_schema import initialize_database, rebuild_company_stats, FTS_TABLES
+
+# --------------------------------------------------------------------
+# 합성 데이터 생성기 (성능 측정용)
+# --------------------------------------------------------------------
+# 실제 DB에는 데이터가 몇 건뿐이라 운영 규모에서 db_queries가 어떻게 동작하는지 알 수 없으므로,
+# db_schema의 모든 테이블을 실제와 비슷한 분포로 채운 DB를 만듭니다.
+#   - 같은 seed/scale이면 항상 같은 데이터 (created_at 등 DB 기본값 타임스탬프만 다름)
+#   - 회사별 활동량은 로그정규 가중치로 치우치게 (소수의 큰 고객사에 Task/담당자/프로젝트가 몰림)
+#   - 국내 회사는 한국어 이름/텍스트, 해외 회사는 영어 이름/텍스트 (국내 회사의 20%는 영어 텍스트 섞임)
+# 적재 중에는 트리거를 잠시 지우고, 적재가 끝나면 다시 만든 뒤 Company_Stats/FTS/파이프라인 집계를 재구축합니다.
+# 변경 저널(Change_Journal)은 비워 둡니다. (초기 데이터이므로 소비자는 current_seq()부터 읽으면 됨)
+# scale=1.0 생성에는 1코어 기준 4~5분, 메모리 약 1GB가 필요하고 DB 파일은 약 600MB입니다. (빠른 확인은 --scale 0.01)
+#
+# 생성 규칙을 바꾸면 GENERATOR_VERSION을 올려야 db_benchmark가 서로 다른 데이터의 결과를 비교하지 않습니다.
+
+GENERATOR_VERSION = 1
+
+# scale=1.0일 때의 행 수 (나머지 테이블은 이 값들에서 파생)
+SIZES = {
+    "companies": 10_000,
+    "contacts": 100_000,
+    "projects": 30_000,
+    "invoices": 40_000,
+    "tasks": 1_000_000,
+}
+N_USERS = 12
+START_DATE = np.datetime64("2022-07-01")
+END_DATE = np.datetime64("2025-06-30")
+
+# 국가 분포 (db_schema.NATIONALITY_MAP의 코드)
+_NATIONALITY_WEIGHTS = {"KOR": 0.55, "USA": 0.12, "JPN": 0.08, "CHN": 0.07, "DEU": 0.05,
+                        "GBR": 0.03, "FRA": 0.03, "SGP": 0.03, "CAN": 0.02, "IND": 0.02}
+
+_KO_COMPANY = (
+    ["한빛", "세진", "대성", "미래", "동원", "태광", "신화", "유니", "하이", "코어", "에이스", "그린", "스마트", "누리",
+     "한울", "케이", "제이", "비전", "나노", "아이", "대한", "삼영", "우리", "푸른", "새한", "동양", "정우", "성진",
+     "온누리", "가온"],
+    ["", "", "", "테크", "정밀", "로직", "웨이브", "비전", "아이", "센스", "모션", "브레인", "넷", "메디", "에너지",
+     "오토", "픽셀", "큐브", "링크", "엠"],
+    ["전자", "시스템즈", "테크", "로보틱스", "반도체", "모빌리티", "솔루션", "에이아이", "네트웍스", "인더스트리",
+     "오토모티브", "디스플레이", "소프트", "이노베이션", "랩스", "산업", "정보통신", "바이오", "중공업", "엔지니어링"],
+)
+_EN_COMPANY = (
+    ["Blue", "Bright", "Silver", "North", "Apex", "Quantum", "Vertex", "Nova", "Prime", "Summit", "Pioneer", "Atlas",
+     "Polar", "Crystal", "Iron", "Red", "Swift", "Clear", "Deep", "Vivid", "Golden", "Sky", "Ocean", "Stellar",
+     "Urban", "Solid", "Rapid", "Smart", "Green", "True"],
+    ["River", "Peak", "Wave", "Field", "Forge", "Bridge", "Harbor", "Stone", "Vision", "Logic", "Signal", "Orbit",
+     "Pixel", "Sense", "Motion", "Core", "Edge", "Path", "Point", "Mind", "Gate", "Star", "Line", "Frame", "Node",
+     "Grid", "Beam", "Cloud", "Link", "Spark"],
+    ["Robotics", "Systems", "Technologies", "Semiconductor", "Mobility", "Labs", "Automation", "Devices", "Imaging",
+     "AI", "Electronics", "Dynamics", "Networks", "Solutions", "Industries"],
+)
+_EN_COMPANY_FORM = {"USA": "Inc.", "CAN": "Inc.", "GBR": "Ltd.", "SGP": "Pte. Ltd.", "IND": "Pvt. Ltd.",
+                    "DEU": "GmbH", "FRA": "SAS", "JPN": "Co., Ltd.", "CHN": "Co., Ltd."}
+
+_KO_SURNAMES = ["김", "이", "박", "최", "정", "강", "조", "윤", "장", "임", "한", "오", "서", "신", "권", "황", "안",
+                "송", "류", "홍"]
+_KO_SURNAME_WEIGHTS = [21, 15, 8, 5, 4, 2.5, 2, 2, 2, 1.8, 1.5, 1.5, 1.5, 1.4, 1.3, 1.3, 1.3, 1.2, 1.2, 1.1]
+_KO_SURNAME_ROMAN = ["kim", "lee", "park", "choi", "jung", "kang", "cho", "yoon", "jang", "lim", "han", "oh",
+                     "seo", "shin", "kwon", "hwang", "ahn", "song", "ryu", "hong"]
+_KO_GIVEN = ["민", "서", "준", "지", "현", "우", "수", "영", "하", "은", "도", "윤", "재", "성", "진", "훈", "연", "희",
+             "경", "태", "호", "석", "혜", "정", "유", "동", "상", "미", "승", "예"]
+_EN_FIRST = ["James", "Mary", "John", "Linda", "Michael", "Sarah", "David", "Emma", "Daniel", "Olivia", "Thomas",
+             "Sophie", "Kevin", "Laura", "Brian", "Anna", "Eric", "Julia", "Mark", "Grace", "Hiroshi", "Yuki",
+             "Wei", "Li", "Hans", "Lena", "Pierre", "Claire", "Raj", "Priya", "Lucas", "Mia", "Noah", "Chloe",
+             "Ethan", "Hannah", "Ryan", "Zoe", "Adam", "Nina"]
+_EN_LAST = ["Smith", "Johnson", "Brown", "Miller", "Davis", "Wilson", "Taylor", "Anderson", "Thomas", "Moore",
+            "Martin", "Clark", "Lewis", "Walker", "Young", "Allen", "King", "Wright", "Scott", "Green", "Tanaka",
+            "Sato", "Suzuki", "Wang", "Zhang", "Chen", "Müller", "Schmidt", "Dubois", "Bernard", "Patel", "Sharma",
+            "Lim", "Tan", "Baker", "Hall", "Adams", "Nelson", "Hill", "Campbell"]
+
+_DEPARTMENTS = {"ko": ["구매팀", "연구소", "AI팀", "영업팀", "기술지원팀", "사업개발팀", "품질팀", "전략기획팀"],
+                "en": ["Purchasing", "R&D", "AI Lab", "Sales", "Engineering", "Business Development", "Quality",
+                       "Strategy"]}
+_POSITIONS = {"ko": ["사원", "대리", "과장", "차장", "부장", "이사", "상무", "연구원", "선임연구원", "책임연구원",
+                     "수석연구원"],
+              "en": ["Engineer", "Senior Engineer", "Manager", "Senior Manager", "Director", "VP", "CTO",
+                     "Researcher", "Buyer"]}
+
+# (제품명, 기준 단가) - 단가 범위는 기준의 80~120%
+_PRODUCTS = [
+    ("MLA100", 1_500_000), ("MLA100 PCIe", 1_800_000), ("MLA100 M.2", 900_000), ("MLA200", 3_200_000),
+    ("REGULUS", 450_000), ("REGULUS EVK", 700_000), ("ARIES", 2_400_000), ("ARIES Dual", 4_500_000),
+    ("Sample PC", 3_000_000), ("Edge Box", 2_200_000), ("Edge Box Pro", 3_800_000), ("SDK license", 5_000_000),
+    ("SDK license (annual)", 1_200_000), ("Compiler license", 2_000_000), ("Model porting service", 8_000_000),
+    ("Technical support (annual)", 3_000_000), ("Training workshop", 1_500_000), ("Heatsink kit", 60_000),
+    ("Carrier board", 350_000), ("Power adapter", 40_000),
+]
+_APPLICATIONS = {"ko": ["반도체 품질검사", "CCTV 영상 분석", "스마트 팩토리 결함 검출", "자율주행 인지", "의료 영상 판독",
+                        "물류 로봇 비전", "드론 영상 처리", "음성 인식 단말", "리테일 고객 분석", "교통 신호 제어"],
+                 "en": ["Semiconductor inspection", "CCTV video analytics", "Factory defect detection",
+                        "Autonomous driving perception", "Medical imaging", "Warehouse robot vision",
+                        "Drone video processing", "On-device speech recognition", "Retail analytics",
+                        "Traffic signal control"]}
+_AI_MODELS = ["YOLOv8", "YOLOv5", "ResNet50", "EfficientNet-B0", "MobileNetV2", "Llama2-7B", "Whisper-small",
+              "DeepLabV3", "ViT-B/16", "RT-DETR", "PointPillars", "BERT-base"]
+_PROJECT_STATUS = (["active", "completed", "on_hold", "lost"], [0.35, 0.30, 0.15, 0.20])
+
+_TASK_TYPES = (["contact", "meeting", "quote", "trial", "tech_inquiry", "delayed"],
+               [0.38, 0.22, 0.12, 0.06, 0.16, 0.06])
+_AGENDA = {
+    "contact": {"ko": ["{product} 관련 메일 회신", "{app} 요구사항 확인 통화", "{product} 자료 요청 대응",
+                       "담당자 변경 안내 및 인사"],
+                "en": ["Replied to email about {product}", "Call to confirm {app} requirements",
+                       "Sent {product} documentation on request", "Introduction to new contact"]},
+    "meeting": {"ko": ["{product} 도입 검토 미팅", "{app} 적용 방안 논의", "분기 정기 미팅 - {product} 공급 일정",
+                       "{model} 데모 시연"],
+                "en": ["{product} adoption review meeting", "Discussion on {app} use case",
+                       "Quarterly sync - {product} delivery schedule", "{model} demo session"]},
+    "quote": {"ko": ["{product} 견적서 발송 ({qty}대)", "{product} 단가 협상", "{product} 수정 견적 요청 접수"],
+              "en": ["Sent quotation for {product} x{qty}", "Price negotiation for {product}",
+                     "Revised quote requested for {product}"]},
+    "trial": {"ko": ["{product} 샘플 무상 대여 시작", "{product} 평가 결과 공유", "{product} 대여 기간 연장 요청"],
+              "en": ["Free trial of {product} started", "Shared {product} evaluation results",
+                     "Trial extension requested for {product}"]},
+    "tech_inquiry": {"ko": ["{model} 컴파일 오류 문의", "{model} 양자화 후 정확도 저하 문의",
+                            "{product} 드라이버 설치 문제", "{model} 추론 속도 최적화 문의"],
+                     "en": ["Compilation error with {model}", "Accuracy drop after quantizing {model}",
+                            "Driver installation issue on {product}", "Inference latency tuning for {model}"]},
+    "delayed": {"ko": ["{product} 납기 지연 안내", "{app} 과제 일정 연기", "구매 품의 지연으로 발주 보류"],
+                "en": ["Delivery of {product} delayed", "{app} project postponed", "PO on hold pending approval"]},
+}
+_ACTION_ITEMS = {"ko": ["{n}일 내 회신", "기술지원팀 전달", "견적 재검토", "샘플 발송 준비", "후속 미팅 일정 조율",
+                        "자료 업데이트 후 재전달"],
+                 "en": ["Reply within {n} days", "Forward to support team", "Review pricing", "Prepare sample shipment",
+                        "Schedule follow-up meeting", "Send updated materials"]}
+_MEMOS = {"ko": ["고객 만족도 높음", "경쟁사 제품과 비교 중", "예산 확정 전", "담당 임원 관심 많음", "보안 검토 필요"],
+          "en": ["Customer is satisfied", "Comparing with competitor", "Budget not yet approved",
+                 "Strong executive interest", "Security review required"]}
+_CONTACT_TYPES = (["인바운드", "콜드콜", "전시", "소개"], [0.35, 0.25, 0.25, 0.15])
+_CHANNELS = ["홈페이지 문의", "AI EXPO KOREA", "CES", "Embedded World", "SEMICON", "LinkedIn", "지인 소개",
+             "파트너사 소개", "뉴스 기사", "세미나"]
+_ROLES = ["의사결정권자", "기술 담당", "구매 담당", "PM", "Decision maker", "Technical lead"]
+
+
+def _unique_names(rng, groups, make_name) -> list:
+    """
+    groups[i] 안에서 겹치지 않는 이름 목록. make_name(rng, i)가 만든 이름이 이미 있으면 다시 뽑고,
+    계속 겹치면 번호를 붙입니다.
+    """
+    seen, names = set(), []
+    for i, group in enumerate(groups):
+        name = make_name(rng, i)
+        tries = 0
+        while (group, name) in seen:
+            tries += 1
+            name = make_name(rng, i) if tries < 5 else f"{make_name(rng, i)} {tries}"
+        seen.add((group, name))
+        names.append(name)
+    return names
+
+def _ranges(sorted_owner: np.ndarray, n_owners: int) -> tuple:
+    """owner 순으로 정렬된 행들에서 owner별 (시작 위치, 개수). owner는 1부터."""
+    owners = np.arange(1, n_owners + 1)
+    start = np.searchsorted(sorted_owner, owners, side="left")
+    end = np.searchsorted(sorted_owner, owners, side="right")
+    return start, end - start
+
+def _pick_within(rng, owner: np.ndarray, start: np.ndarray, count: np.ndarray, probability: float = 1.0) -> list:
+    """owner마다 그 owner에 속한 행 중 하나의 id(위치+1)를 고릅니다. 없거나 probability에 걸리지 않으면 None."""
+    idx = owner - 1
+    n = count[idx]
+    picked = start[idx] + np.floor(rng.random(len(owner)) * np.maximum(n, 1)).astype(np.int64) + 1
+    use = (n > 0) & (rng.random(len(owner)) < probability)
+    return [int(p) if u else None for p, u in zip(picked, use)]
+
+def _dates(days: np.ndarray) -> list:
+    return (START_DATE + days).astype(str).tolist()
+
+def _days_between(start=START_DATE, end=END_DATE) -> int:
+    return int((end - start) / np.timedelta64(1, "D"))
+
+def _generate_rows(seed: int, scale: float) -> dict:
+    """{테이블: (컬럼 목록, 행 목록)} - 모든 id는 1부터 순서대로 부여되는 것으로 가정합니다."""
+    rng = np.random.default_rng(seed)
+    size = {k: max(1, int(v * scale)) for k, v in SIZES.items()}
+    span = _days_between()
+    tables = {}
+
+    # Users
+    user_rows = [("admin", hashlib.sha256(b"admin").hexdigest(), "admin@example.com", 5)]
+    for i in range(N_USERS):
+        user_rows.append((f"sales{i + 1:02d}", hashlib.sha256(b"synthetic").hexdigest(),
+                          f"sales{i + 1:02d}@example.com", 1))
+    tables["Users"] = (["username", "password_hash", "user_email", "auth_level"], user_rows)
+    user_weights = rng.lognormal(0, 0.5, N_USERS)
+    user_weights /= user_weights.sum()
+
+    # Companies: 활동량 가중치(로그정규)와 국가
+    n_comp = size["companies"]
+    codes = list(_NATIONALITY_WEIGHTS)
+    nat = rng.choice(len(codes), n_comp, p=list(_NATIONALITY_WEIGHTS.values()))
+    is_ko = nat == 0
+    weight = rng.lognormal(0, 1.2, n_comp)
+    weight /= weight.sum()
+
+    def company_name(r, i):
+        if is_ko[i]:
+            return "".join(part[r.integers(len(part))] for part in _KO_COMPANY)
+        words = " ".join(part[r.integers(len(part))] for part in _EN_COMPANY)
+        return f"{words} {_EN_COMPANY_FORM.get(codes[nat[i]], 'Inc.')}"
+    names = _unique_names(rng, [0] * n_comp, company_name)
+    employees = np.round(rng.lognormal(4.5, 1.5, n_comp)).astype(np.int64) + 5
+    revenue = employees * np.round(rng.lognormal(19, 0.6, n_comp)).astype(np.int64)
+    company_rows = []
+    for i in range(n_comp):
+        domain = f"corp{i + 1:05d}.co.kr" if is_ko[i] else \
+            "".join(ch for ch in names[i].split()[0] + names[i].split()[1] if ch.isalnum()).lower() + f"{i + 1}.com"
+        lang = "ko" if is_ko[i] else "en"
+        app = _APPLICATIONS[lang][i % len(_APPLICATIONS[lang])]
+        overview = f"{app} 분야 고객사" if is_ko[i] else f"Customer in {app.lower()}"
+        company_rows.append((names[i], int(employees[i]), int(revenue[i]), overview, f"https://www.{domain}",
+                             codes[nat[i]]))
+    tables["Companies"] = (["company_name", "employee_count", "revenue", "overview", "website", "nationality"],
+                           company_rows)
+    domains = [row[4][len("https://www."):] for row in company_rows]
+
+    # Contacts: 회사 순으로 정렬해 id를 부여하므로 회사별 담당자 id가 연속 구간이 됩니다.
+    n_cont = size["contacts"]
+    cont_company = np.sort(rng.choice(n_comp, n_cont, p=weight)) + 1
+    cont_start, cont_count = _ranges(cont_company, n_comp)
+    surname_p = np.array(_KO_SURNAME_WEIGHTS) / sum(_KO_SURNAME_WEIGHTS)
+
+    def person_name(r, i):
+        if is_ko[cont_company[i] - 1]:
+            s = r.choice(len(_KO_SURNAMES), p=surname_p)
+            return _KO_SURNAMES[s] + _KO_GIVEN[r.integers(len(_KO_GIVEN))] + _KO_GIVEN[r.integers(len(_KO_GIVEN))]
+        return f"{_EN_FIRST[r.integers(len(_EN_FIRST))]} {_EN_LAST[r.integers(len(_EN_LAST))]}"
+    person = _unique_names(rng, cont_company.tolist(), person_name)
+    dept_i = rng.integers(0, 8, n_cont)
+    pos_i = rng.integers(0, 9, n_cont)
+    has_email = rng.random(n_cont) < 0.9
+    has_phone = rng.random(n_cont) < 0.6
+    digits = rng.integers(0, 10_000, (n_cont, 3))
+    contact_rows = []
+    for i in range(n_cont):
+        c = cont_company[i] - 1
+        lang = "ko" if is_ko[c] else "en"
+        if lang == "ko":
+            local = _KO_SURNAME_ROMAN[_KO_SURNAMES.index(person[i][0])]
+            phone = f"02-{digits[i, 0]:04d}-{digits[i, 1]:04d}"
+            mobile = f"010-{digits[i, 1]:04d}-{digits[i, 2]:04d}"
+        else:
+            local = person[i].split()[0].lower()
+            phone = f"+1-555-{digits[i, 0]:04d}"
+            mobile = None
+        contact_rows.append((
+            int(cont_company[i]), person[i],
+            _DEPARTMENTS[lang][dept_i[i] % len(_DEPARTMENTS[lang])],
+            _POSITIONS[lang][pos_i[i] % len(_POSITIONS[lang])],
+            f"{local}{i + 1}@{domains[c]}" if has_email[i] else None,
+            phone if has_phone[i] else None, mobile,
+        ))
+    tables["Contacts"] = (["company_id", "contact_name", "department", "position", "email", "phone",
+                           "mobile_phone"], contact_rows)
+
+    # Products
+    product_rows = [(name, base * 0.8, base * 1.2) for name, base in _PRODUCTS]
+    tables["Products"] = (["product_name", "min_price", "max_price"], product_rows)
+    n_prod = len(product_rows)
+    product_p = rng.lognormal(0, 0.8, n_prod)
+    product_p /= product_p.sum()
+
+    # Projects (회사 순 정렬)
+    n_proj = size["projects"]
+    proj_company = np.sort(rng.choice(n_comp, n_proj, p=weight)) + 1
+    proj_start, proj_count = _ranges(proj_company, n_comp)
+    proj_app = rng.integers(0, 10, n_proj)
+    proj_model = rng.integers(0, len(_AI_MODELS), n_proj)
+    proj_status = rng.choice(len(_PROJECT_STATUS[0]), n_proj, p=_PROJECT_STATUS[1])
+    proj_begin = rng.integers(0, span - 30, n_proj)
+    proj_length = rng.integers(30, 365, n_proj)
+    proj_contact = _pick_within(rng, proj_company, cont_start, cont_count, 0.9)
+
+    def project_name(r, i):
+        lang = "ko" if is_ko[proj_company[i] - 1] else "en"
+        suffix = r.choice(["PoC", "양산", "평가"] if lang == "ko" else ["PoC", "Pilot", "Rollout"])
+        return f"{_APPLICATIONS[lang][proj_app[i]]} {_AI_MODELS[proj_model[i]]} {suffix}"
+    proj_names = _unique_names(rng, proj_company.tolist(), project_name)
+    begin_dates, end_dates = _dates(proj_begin), _dates(np.minimum(proj_begin + proj_length, span))
+    project_rows = []
+    for i in range(n_proj):
+        lang = "ko" if is_ko[proj_company[i] - 1] else "en"
+        status = _PROJECT_STATUS[0][proj_status[i]]
+        project_rows.append((
+            int(proj_company[i]), proj_contact[i], proj_names[i],
+            f"{_APPLICATIONS[lang][proj_app[i]]} 과제" if lang == "ko" else f"{_APPLICATIONS[lang][proj_app[i]]} project",
+            status, begin_dates[i], end_dates[i] if status in ("completed", "lost") else None,
+            _APPLICATIONS[lang][proj_app[i]], _AI_MODELS[proj_model[i]],
+            "INT8 양자화, 30fps 이상" if lang == "ko" else "INT8 quantization, >= 30 fps", None,
+        ))
+    tables["Projects"] = (["company_id", "contact_id", "project_name", "description", "status", "start_date",
+                           "end_date", "application", "ai_model", "requirement", "memo"], project_rows)
+
+    # Project_Products / Project_Participants
+    pp_rows, part_rows = [], []
+    n_products_per = rng.integers(1, 4, n_proj)
+    n_people_per = rng.integers(1, 4, n_proj)
+    for i in range(n_proj):
+        for p in rng.choice(n_prod, n_products_per[i], replace=False, p=product_p):
+            pp_rows.append((i + 1, int(p) + 1))
+        c = proj_company[i] - 1
+        if cont_count[c]:
+            k = min(n_people_per[i], cont_count[c])
+            for j, offset in enumerate(rng.choice(cont_count[c], k, replace=False)):
+                part_rows.append((i + 1, int(cont_start[c] + offset) + 1, _ROLES[(i + j) % len(_ROLES)]))
+    tables["Project_Products"] = (["project_id", "product_id"], pp_rows)
+    tables["Project_Participants"] = (["project_id", "contact_id", "role"], part_rows)
+
+    # First_Contact_Logs: 회사당 한 건 (5%는 기록 없음). 프로젝트가 있으면 첫 프로젝트로 전환된 것으로 봅니다.
+    fc_rows = []
+    has_log = rng.random(n_comp) < 0.95
+    fc_type = rng.choice(len(_CONTACT_TYPES[0]), n_comp, p=_CONTACT_TYPES[1])
+    fc_channel = rng.integers(0, len(_CHANNELS), n_comp)
+    fc_lead = rng.integers(7, 180, n_comp)
+    fc_random_day = rng.integers(0, span, n_comp)
+    for c in range(n_comp):
+        if not has_log[c]:
+            continue
+        if proj_count[c]:
+            first = proj_start[c] + int(np.argmin(proj_begin[proj_start[c]:proj_start[c] + proj_count[c]]))
+            day, project_id = max(int(proj_begin[first]) - int(fc_lead[c]), 0), int(first) + 1
+        else:
+            day, project_id = int(fc_random_day[c]), 0
+        fc_rows.append((c + 1, int(cont_start[c]) + 1 if cont_count[c] else None, project_id,
+                        _CONTACT_TYPES[0][fc_type[c]], _CHANNELS[fc_channel[c]], str(START_DATE + day)))
+    tables["First_Contact_Logs"] = (["company_id", "contact_id", "project_id", "contact_type", "channel",
+                                     "contact_date"], fc_rows)
+
+    # Invoices / Invoice_Items: 진행 중/완료 프로젝트에서 발행, 회사 순 정렬
+    n_inv = size["invoices"]
+    billable = np.flatnonzero(np.isin(proj_status, [0, 1]))
+    inv_project = np.sort(rng.choice(billable, n_inv)) + 1
+    inv_company = proj_company[inv_project - 1]
+    order = np.argsort(inv_company, kind="stable")
+    inv_project, inv_company = inv_project[order], inv_company[order]
+    inv_start, inv_count = _ranges(inv_company, n_comp)
+    inv_day = np.minimum(proj_begin[inv_project - 1] + rng.integers(0, 365, n_inv), span)
+    inv_status = rng.choice(6, n_inv, p=[0.05, 0.15, 0.60, 0.10, 0.07, 0.03])
+    inv_user = rng.choice(N_USERS, n_inv, p=user_weights) + 2
+    items_per = rng.integers(1, 6, n_inv)
+    item_invoice = np.repeat(np.arange(1, n_inv + 1), items_per)
+    n_items = len(item_invoice)
+    item_product = rng.choice(n_prod, n_items, p=product_p)
+    base = np.array([b for _, b in _PRODUCTS], dtype=np.float64)
+    item_qty = np.maximum(1, np.round(rng.lognormal(1.0, 0.9, n_items))).astype(np.int64)
+    item_price = np.round(base[item_product] * rng.uniform(0.8, 1.2, n_items), -3)
+    item_subtotal = item_qty * item_price
+    inv_total = np.bincount(item_invoice - 1, weights=item_subtotal, minlength=n_inv)
+    issue, due = _dates(inv_day), _dates(inv_day + 30)
+    tables["Invoices"] = (
+        ["project_id", "company_id", "contact_id", "user_id", "issue_date", "due_date", "total_amount", "status"],
+        [(int(inv_project[i]), int(inv_company[i]), proj_contact[inv_project[i] - 1], int(inv_user[i]),
+          issue[i], due[i], float(inv_total[i]), int(inv_status[i])) for i in range(n_inv)])
+    tables["Invoice_Items"] = (
+        ["invoice_id", "product_id", "quantity", "unit_price_at_sale", "subtotal"],
+        list(zip(item_invoice.tolist(), (item_product + 1).tolist(), item_qty.tolist(), item_price.tolist(),
+                 item_subtotal.tolist())))
+
+    # Tasks
+    n_task = size["tasks"]
+    t_company = rng.choice(n_comp, n_task, p=weight) + 1
+    t_contact = _pick_within(rng, t_company, cont_start, cont_count, 0.8)
+    t_project = _pick_within(rng, t_company, proj_start, proj_count, 0.6)
+    t_user = (rng.choice(N_USERS, n_task, p=user_weights) + 2).tolist()
+    t_type = rng.choice(len(_TASK_TYPES[0]), n_task, p=_TASK_TYPES[1])
+    t_invoice = _pick_within(rng, t_company, inv_start, inv_count, 0.3)
+    t_day = rng.integers(0, span + 1, n_task)
+    t_due = t_day + rng.integers(1, 31, n_task)
+    has_due = rng.random(n_task) < 0.7
+    # 오래된 Task일수록 완료되어 있을 가능성이 높음 (최근 90일은 절반 정도 미완료)
+    t_done = rng.random(n_task) < np.where(t_day < span - 90, 0.95, 0.5)
+    t_priority = rng.choice(3, n_task, p=[0.2, 0.6, 0.2])
+    t_english = ~is_ko[t_company - 1] | (rng.random(n_task) < 0.2)
+    t_template = rng.integers(0, 12, n_task)
+    t_product = rng.choice(n_prod, n_task, p=product_p)
+    t_model = rng.integers(0, len(_AI_MODELS), n_task)
+    t_app = rng.integers(0, 10, n_task)
+    t_qty = rng.integers(1, 50, n_task)
+    t_action = rng.integers(0, 6, n_task)
+    has_action = rng.random(n_task) < 0.7
+    t_memo = rng.integers(0, 5, n_task)
+    has_memo = rng.random(n_task) < 0.25
+    action_dates, due_dates = _dates(t_day), _dates(t_due)
+    type_names = _TASK_TYPES[0]
+    task_rows = []
+    for i in range(n_task):
+        lang = "en" if t_english[i] else "ko"
+        kind = type_names[t_type[i]]
+        templates = _AGENDA[kind][lang]
+        agenda = templates[t_template[i] % len(templates)].format(
+            product=_PRODUCTS[t_product[i]][0], model=_AI_MODELS[t_model[i]], app=_APPLICATIONS[lang][t_app[i]],
+            qty=t_qty[i])
+        task_rows.append((
+            t_project[i], int(t_company[i]), t_contact[i], t_user[i], t_invoice[i] if kind == "quote" else None,
+            action_dates[i], agenda,
+            _ACTION_ITEMS[lang][t_action[i]].format(n=t_qty[i] % 7 + 1) if has_action[i] else None,
+            due_dates[i] if has_due[i] else None, int(t_done[i]), kind, int(t_priority[i]),
+            _MEMOS[lang][t_memo[i]] if has_memo[i] else None,
+        ))
+    tables["Tasks"] = (["project_id", "company_id", "contact_id", "user_id", "invoice_id", "action_date", "agenda",
+                        "action_item", "due_date", "task_status", "task_type", "priority", "memo"], task_rows)
+
+    # Free_Trials / Tech_Inquiries: trial / tech_inquiry Task와 1:1
+    trial_rows, inquiry_rows = [], []
+    converted = rng.random(n_task) < 0.3
+    resolved = rng.random(n_task) < 0.7
+    trial_length = rng.integers(14, 61, n_task)
+    for i in np.flatnonzero(t_type == type_names.index("trial")):
+        if t_project[i] is None:
+            continue
+        trial_rows.append((int(i) + 1, t_project[i], int(t_product[i]) + 1, action_dates[i],
+                           str(START_DATE + int(t_day[i] + trial_length[i])), int(converted[i])))
+    for i in np.flatnonzero(t_type == type_names.index("tech_inquiry")):
+        lang = "en" if t_english[i] else "ko"
+        standalone = t_project[i] is None
+        inquiry_rows.append((int(i) + 1, t_project[i], int(t_product[i]) + 1,
+                             _APPLICATIONS[lang][t_app[i]] if standalone else None,
+                             _AI_MODELS[t_model[i]] if standalone else None, int(resolved[i])))
+    tables["Free_Trials"] = (["task_id", "project_id", "product_id", "start_date", "end_date", "is_converted"],
+                             trial_rows)
+    tables["Tech_Inquiries"] = (["task_id", "project_id", "product_id", "application", "ai_model", "is_resolved"],
+                                inquiry_rows)
+
+    # Email_Import_Log: contact Task 일부가 이메일 일괄 요약(email_batch)으로 들어온 것으로 기록 (2%는 실패)
+    log_rows = []
+    contact_tasks = np.flatnonzero(t_type == type_names.index("contact"))
+    for i in contact_tasks[rng.random(len(contact_tasks)) < 0.1]:
+        key = hashlib.sha256(f"{seed}:{i}".encode()).hexdigest()
+        failed = (i % 50) == 0
+        log_rows.append((key, f"mail/inbox.mbox#{i}", task_rows[i][6], "failed" if failed else "done",
+                         None if failed else int(i) + 1))
+    tables["Email_Import_Log"] = (["message_key", "source", "subject", "status", "task_id"], log_rows)
+    return tables
+
+def _remove_db_files(db_path: str):
+    close_connection(db_path)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+def meta_path(db_path: str) -> str:
+    """생성 정보(seed, scale, 행 수)를 저장하는 파일 경로."""
+    return db_path + ".meta.json"
+
+def read_meta(db_path: str):
+    """generate()가 남긴 생성 정보. 없으면 None."""
+    try:
+        with open(meta_path(db_path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def generate(db_path: str, seed: int = 0, scale: float = 1.0, overwrite: bool = False) -> dict:
+    """
+    db_path에 새 DB를 만들고 합성 데이터로 채웁니다.
+
+    Args:
+        db_path (str): 만들 DB 파일 경로. (실제 CRM DB 경로는 거부)
+        seed (int): 난수 seed. 같은 seed/scale이면 같은 데이터가 만들어집니다.
+        scale (float): SIZES에 곱할 배율. (예: 0.01이면 Task 1만 건)
+        overwrite (bool): 이미 파일이 있으면 지우고 다시 만듭니다.
+
+    Returns:
+        dict: 생성 정보 {'generator_version', 'seed', 'scale', 'rows': {테이블: 행 수}, 'seconds'}
+    """
+    import time
+    import pipeline_analytics
+
+    if os.path.abspath(db_path) == os.path.abspath(config.DB_PATH):
+        raise ValueError("실제 CRM DB에는 합성 데이터를 만들 수 없습니다. 다른 경로를 지정하세요.")
+    if os.path.exists(db_path):
+        if not overwrite:
+            raise ValueError(f"이미 파일이 있습니다: {db_path} (overwrite=True로 다시 만들 수 있습니다)")
+        _remove_db_files(db_path)
+
+    started = time.perf_counter()
+    tables = _generate_rows(seed, scale)
+    initialize_database(db_path)
+
+    saved_path = config.DB_PATH
+    config.DB_PATH = db_path
+    try:
+        with transaction() as conn:
+            # 적재 속도를 위해 트리거를 잠시 지우고, 적재 후 같은 정의로 다시 만듭니다.
+            triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+            for name, _ in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+            for table, (columns, rows) in tables.items():
+                conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                 rows)
+            for _, sql in triggers:
+                conn.execute(sql)
+            for fts in FTS_TABLES:
+                conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+        rebuild_company_stats(db_path)
+        pipeline_analytics.rebuild()
+        get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        config.DB_PATH = saved_path
+        close_connection(db_path)
+
+    meta = {'generator_version': GENERATOR_VERSION, 'seed': seed, 'scale': scale,
+            'rows': {table: len(rows) for table, (_, rows) in tables.items()},
+            'seconds': round(time.perf_counter() - started, 1)}
+    with open(meta_path(db_path), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+# --- 이 파일을 직접 실행했을 때 테스트할 수 있는 코드 ---
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="성능 측정용 합성 CRM DB 생성")
+    parser.add_argument("db_path", help="만들 DB 파일 경로")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0, help="SIZES 배율 (1.0 = Task 100만 건)")
+    parser.add_argument("--overwrite", action="store_true", help="이미 있는 파일을 지우고 다시 만들기")
+    args = parser.parse_args()
+
+    result = generate(args.db_path, args.seed, args.scale, args.overwrite)
+    print(f"--- 생성 완료 ({result['seconds']}초) ---")
+    for table, n in result['rows'].items():
+        print(f"{table:<22} {n:>10,}")
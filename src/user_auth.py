@@ -1,6 +1,6 @@
 import hashlib
 import sqlite3
-from config import DB_PATH
+from db_connection import get_connection, transaction, mark_written
 import db_operations as ops
 
 def hash_password(password: str) -> str:
@@ -13,8 +13,7 @@ def verify_password(password: str, hashed: str) -> bool:
 
 def authenticate_user(username: str, password: str) -> dict:
     """사용자 인증을 수행합니다."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_connection().cursor()
     try:
         c.execute("""
             SELECT user_id, username, password_hash, auth_level 
@@ -32,12 +31,11 @@ def authenticate_user(username: str, password: str) -> dict:
             }
         return {'authenticated': False}
     finally:
-        conn.close()
+        c.close()
 
 def authenticate_user_by_username(username: str) -> dict:
     """사용자명으로만 사용자 정보를 조회합니다. (세션 복원용)"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_connection().cursor()
     try:
         c.execute("""
             SELECT user_id, username, auth_level 
@@ -55,7 +53,7 @@ def authenticate_user_by_username(username: str) -> dict:
             }
         return {'authenticated': False}
     finally:
-        conn.close()
+        c.close()
 
 def register_user(username: str, password: str, email: str = None) -> bool:
     """신규 사용자 등록 (레벨 0으로 시작)"""
@@ -69,8 +67,7 @@ def register_user(username: str, password: str, email: str = None) -> bool:
 def approve_user(admin_username: str, target_username: str, level: int = 1) -> bool:
     """Level 4 이상 사용자가 권한 레벨 설정 가능"""
     # 요청자의 권한 레벨 확인
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_connection().cursor()
     try:
         c.execute("""
             SELECT auth_level FROM Users 
@@ -90,20 +87,20 @@ def approve_user(admin_username: str, target_username: str, level: int = 1) -> b
         if not (0 <= level <= 5):
             return False
         
-        c.execute("""
-            UPDATE Users 
-            SET auth_level = ?, updated_at = CURRENT_TIMESTAMP 
-            WHERE username = ? AND is_deleted = 0
-        """, (level, target_username))
-        conn.commit()
+        with transaction():
+            mark_written("Users")
+            c.execute("""
+                UPDATE Users 
+                SET auth_level = ?, updated_at = CURRENT_TIMESTAMP 
+                WHERE username = ? AND is_deleted = 0
+            """, (level, target_username))
         return c.rowcount == 1
     finally:
-        conn.close()
+        c.close()
 
 def get_pending_users() -> list:
     """레벨 0 사용자 목록 (승인 대기)"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_connection().cursor()
     try:
         c.execute("""
             SELECT username, user_email, created_at, auth_level 
@@ -112,12 +109,11 @@ def get_pending_users() -> list:
         """)
         return c.fetchall()
     finally:
-        conn.close()
+        c.close()
 
 def get_all_users() -> list:
     """모든 사용자 목록 (관리자용)"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_connection().cursor()
     try:
         c.execute("""
             SELECT username, user_email, auth_level, created_at 
@@ -127,12 +123,11 @@ def get_all_users() -> list:
         """)
         return c.fetchall()
     finally:
-        conn.close()
+        c.close()
 
 def initialize_admin_user():
     """관리자 계정 초기화"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_connection().cursor()
     try:
         c.execute("SELECT COUNT(*) FROM Users WHERE username = 'admin'")
         if c.fetchone()[0] == 0:
@@ -142,7 +137,7 @@ def initialize_admin_user():
         else:
             print("관리자 계정이 이미 존재합니다.")
     finally:
-        conn.close()
+        c.close()
 
 def get_auth_level_name(level: int) -> str:
     """권한 레벨 이름 반환"""
@@ -158,29 +153,28 @@ def get_auth_level_name(level: int) -> str:
 
 def update_user_email(username: str, new_email: str) -> bool:
     """사용자 이메일 업데이트"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_connection().cursor()
     try:
         # 빈 문자열을 None으로 변환
         if new_email == "":
             new_email = None
         
-        c.execute("""
-            UPDATE Users 
-            SET user_email = ?, updated_at = CURRENT_TIMESTAMP 
-            WHERE username = ? AND is_deleted = 0
-        """, (new_email, username))
-        conn.commit()
+        with transaction():
+            mark_written("Users")
+            c.execute("""
+                UPDATE Users 
+                SET user_email = ?, updated_at = CURRENT_TIMESTAMP 
+                WHERE username = ? AND is_deleted = 0
+            """, (new_email, username))
         return c.rowcount == 1
     except sqlite3.IntegrityError:
         return False  # 이메일 중복
     finally:
-        conn.close()
+        c.close()
 
 def update_user_password(username: str, old_password: str, new_password: str) -> bool:
     """사용자 비밀번호 업데이트 (기존 비밀번호 확인)"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_connection().cursor()
     try:
         # 기존 비밀번호 확인
         c.execute("""
@@ -194,20 +188,20 @@ def update_user_password(username: str, old_password: str, new_password: str) ->
         
         # 새 비밀번호로 업데이트
         new_password_hash = hash_password(new_password)
-        c.execute("""
-            UPDATE Users 
-            SET password_hash = ?, updated_at = CURRENT_TIMESTAMP 
-            WHERE username = ? AND is_deleted = 0
-        """, (new_password_hash, username))
-        conn.commit()
+        with transaction():
+            mark_written("Users")
+            c.execute("""
+                UPDATE Users 
+                SET password_hash = ?, updated_at = CURRENT_TIMESTAMP 
+                WHERE username = ? AND is_deleted = 0
+            """, (new_password_hash, username))
         return c.rowcount == 1
     finally:
-        conn.close()
+        c.close()
 
 def get_user_info(username: str) -> dict:
     """사용자 정보 조회 (정보수정용)"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_connection().cursor()
     try:
         c.execute("""
             SELECT username, user_email, auth_level, created_at 
@@ -226,7 +220,7 @@ def get_user_info(username: str) -> dict:
             }
         return {'found': False}
     finally:
-        conn.close()
+        c.close()
 
 def delete_user(admin_username: str, target_username: str) -> bool:
     """Level 4 이상 사용자가 삭제 가능 (soft delete)"""
@@ -235,8 +229,7 @@ def delete_user(admin_username: str, target_username: str) -> bool:
         return False
     
     # 요청자의 권한 레벨 확인
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_connection().cursor()
     try:
         c.execute("""
             SELECT auth_level FROM Users 
@@ -247,14 +240,15 @@ def delete_user(admin_username: str, target_username: str) -> bool:
         if not admin_info or admin_info[0] < 4:
             return False
         
-        c.execute("""
-            UPDATE Users 
-            SET is_deleted = 1, 
-                username = username || '_deleted_' || strftime('%s', 'now'),
-                updated_at = CURRENT_TIMESTAMP 
-            WHERE username = ? AND is_deleted = 0
-        """, (target_username,))
-        conn.commit()
+        with transaction():
+            mark_written("Users")
+            c.execute("""
+                UPDATE Users 
+                SET is_deleted = 1, 
+                    username = username || '_deleted_' || strftime('%s', 'now'),
+                    updated_at = CURRENT_TIMESTAMP 
+                WHERE username = ? AND is_deleted = 0
+            """, (target_username,))
         return c.rowcount == 1
     finally:
-        conn.close()
\ No newline at end of file
+        c.close()
\ No newline at end of file